@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Vertical column physics with and without column compression on land-heavy domains.
+
+Sets up ACC2 on a refined horizontal grid, turns a given fraction of the columns into
+land, and times the kernels that only compute on wet columns if
+``enable_column_compression`` is set: the equation of state, the TKE mixing
+length, and the implicit vertical TKE, EKE and IDEMIX solves.
+"""
+from __future__ import print_function
+
+import time
+import argparse
+
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import thermodynamics, tke, eke, idemix
+
+KERNELS = (
+    ("calc_eq_of_state", lambda pyom: thermodynamics.calc_eq_of_state(pyom, pyom.tau)),
+    ("set_tke_diffusivities", tke.set_tke_diffusivities),
+    ("integrate_tke", tke.integrate_tke),
+    ("integrate_eke", eke.integrate_eke),
+    ("integrate_idemix", idemix.integrate_idemix),
+)
+
+
+def make_setup(refinement, land_fraction, eq_of_state_type):
+    class LandHeavyACC2(ACC2):
+        def set_parameter(self):
+            ACC2.set_parameter(self)
+            self.nx, self.ny = refinement * self.nx, refinement * self.ny
+            self.dt_mom /= refinement
+            self.dt_tracer /= refinement
+            if eq_of_state_type is not None:
+                self.eq_of_state_type = eq_of_state_type
+
+        def set_grid(self):
+            ACC2.set_grid(self)
+            self.dxt[...] /= refinement
+            self.dyt[...] /= refinement
+
+        def set_topography(self):
+            ACC2.set_topography(self)
+            # one continent spanning all latitudes, west of the existing land
+            self.kbot[2:2 + int(land_fraction * self.nx), :] = 0
+
+    simulation = LandHeavyACC2(loglevel="warning")
+    simulation.setup()
+    return simulation
+
+
+def timeit(function, pyom, repetitions):
+    function(pyom)
+    start = time.time()
+    for _ in range(repetitions):
+        function(pyom)
+    return (time.time() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--refinement", type=int, default=6, help="Horizontal refinement of the ACC2 grid.")
+    parser.add_argument("--land-fraction", type=float, nargs="+", default=(0.3, 0.5))
+    parser.add_argument("--eq-of-state-type", type=int, default=None, choices=(1, 2, 3, 4, 5),
+                        help="Equation of state (default: the one of ACC2).")
+    parser.add_argument("--repetitions", type=int, default=3)
+    args, _ = parser.parse_known_args()
+
+    print("{:>6} {:>24} {:>12} {:>14} {:>10}".format("land", "kernel", "dense (s)", "compressed (s)", "speedup"))
+    for land_fraction in args.land_fraction:
+        simulation = make_setup(args.refinement, land_fraction, args.eq_of_state_type)
+        for name, kernel in KERNELS:
+            timings = []
+            for compress in (False, True):
+                simulation.enable_column_compression = compress
+                timings.append(timeit(kernel, simulation, args.repetitions))
+            print("{:>6.2f} {:>24} {:>12.3f} {:>14.3f} {:>10.2f}".format(land_fraction, name, timings[0], timings[1],
+                                                                          timings[0] / timings[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Filling of missing values (e.g. land points of a climatology) on ETOPO-sized grids.
+
+Compares :func:`climate.tools.fill_holes` against the previous implementation,
+which repeatedly shifted valid values into neighboring holes until no hole was
+left. The reference implementation is skipped for grids that are too large for it
+to finish in reasonable time.
+"""
+from __future__ import print_function
+
+import time
+import argparse
+
+import numpy as np
+import scipy.ndimage
+
+from climate import tools
+
+SHAPES = {
+    "etopo20": (1080, 540),
+    "etopo5": (4320, 2160),
+    "etopo2": (10800, 5400),
+}
+
+
+def fill_holes_sweep(data):
+    data = data.copy()
+    flag = ~np.isnan(data)
+    slcs = [slice(None)] * data.ndim
+    while np.any(~flag):
+        for i in range(data.ndim):
+            slcs1 = slcs[:]
+            slcs2 = slcs[:]
+            slcs1[i] = slice(0, -1)
+            slcs2[i] = slice(1, None)
+            slcs1, slcs2 = tuple(slcs1), tuple(slcs2)
+
+            repmask = np.logical_and(~flag[slcs1], flag[slcs2])
+            data[slcs1][repmask] = data[slcs2][repmask]
+            flag[slcs1][repmask] = True
+
+            repmask = np.logical_and(~flag[slcs2], flag[slcs1])
+            data[slcs2][repmask] = data[slcs1][repmask]
+            flag[slcs2][repmask] = True
+    return data
+
+
+def make_field(shape, land_fraction):
+    np.random.seed(42)
+    # smooth random field with continent-sized structures
+    noise = scipy.ndimage.gaussian_filter(np.random.randn(*shape), sigma=shape[0] / 40.)
+    land = noise > np.percentile(noise, 100 * (1 - land_fraction))
+    data = np.random.rand(*shape)
+    data[land] = np.nan
+    return data
+
+
+def timeit(function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    return time.time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--grids", nargs="+", choices=sorted(SHAPES), default=["etopo20", "etopo5"])
+    parser.add_argument("--land-fraction", type=float, default=0.3)
+    parser.add_argument("--max-reference-size", type=int, default=10**7,
+                        help="Largest grid size for which the reference implementation is run.")
+    args, _ = parser.parse_known_args()
+
+    print("{:>10} {:>14} {:>14} {:>14} {:>10}".format("grid", "points", "sweep (s)", "edt (s)", "speedup"))
+    for grid in args.grids:
+        shape = SHAPES[grid]
+        data = make_field(shape, args.land_fraction)
+        elapsed, filled = timeit(tools.fill_holes, data)
+        assert not np.any(np.isnan(filled))
+        timeit(tools.fill_holes, data, cyclic_x=True)
+        if data.size <= args.max_reference_size:
+            reference, _ = timeit(fill_holes_sweep, data)
+            print("{:>10} {:>14d} {:>14.2f} {:>14.2f} {:>10.1f}".format(grid, data.size, reference, elapsed, reference / elapsed))
+        else:
+            print("{:>10} {:>14d} {:>14} {:>14.2f} {:>10}".format(grid, data.size, "-", elapsed, "-"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Cost of integrating a batch of passive tracers as a function of the batch size.
+
+Sets up ACC2 with a given number of passive tracers and times one call of
+``integrate_passive_tracers`` (advection, lateral and isoneutral mixing, and implicit
+vertical mixing of all tracers). Terms that do not depend on the tracers are only
+computed once per batch, so the cost per tracer decreases with the batch size.
+"""
+from __future__ import print_function
+
+import time
+import argparse
+
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import passive_tracers
+
+
+def make_setup(ntracers):
+    class TracerACC2(ACC2):
+        def set_parameter(self):
+            ACC2.set_parameter(self)
+            for n in range(ntracers):
+                self.register_passive_tracer("tracer_{}".format(n), "Tracer {}".format(n), "", "Passive tracer", output=False)
+
+        def set_initial_conditions(self):
+            ACC2.set_initial_conditions(self)
+            self.tracer[...] = np.random.rand(*self.tracer.shape) * self.maskT[..., np.newaxis, np.newaxis]
+
+    simulation = TracerACC2(loglevel="warning")
+    simulation.setup()
+    return simulation
+
+
+def timeit(function, pyom, repetitions):
+    function(pyom)
+    start = time.time()
+    for _ in range(repetitions):
+        function(pyom)
+    return (time.time() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ntracers", type=int, nargs="+", default=(1, 5, 20))
+    parser.add_argument("--repetitions", type=int, default=5)
+    args, _ = parser.parse_known_args()
+
+    print("{:>9} {:>12} {:>16} {:>16}".format("tracers", "time (s)", "per tracer (s)", "relative to 1"))
+    single = None
+    for ntracers in args.ntracers:
+        simulation = make_setup(ntracers)
+        timing = timeit(passive_tracers.integrate_passive_tracers, simulation, args.repetitions)
+        if single is None:
+            single = timing / ntracers
+        print("{:>9} {:>12.3f} {:>16.4f} {:>16.2f}".format(ntracers, timing, timing / ntracers, timing / single))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+"""
+Run all benchmarks (files ending with _benchmark.py) in this folder.
+Additional command line arguments are passed to every benchmark.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import glob
+import subprocess
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    for benchmark in sorted(glob.glob(os.path.join(here, "*_benchmark.py"))):
+        print("Running {}".format(os.path.basename(benchmark)))
+        subprocess.check_call([sys.executable, benchmark] + sys.argv[1:])
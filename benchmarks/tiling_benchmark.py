@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Scaling of tiled multithreaded execution on the global one degree setup.
+
+Runs the model for a few time steps with an increasing number of threads (each
+in a fresh process) and reports the main loop time, speedup, and parallel
+efficiency relative to the untiled run.
+"""
+from __future__ import print_function
+
+import sys
+import argparse
+import subprocess
+
+THREADS = (1, 2, 4, 8, 16, 32)
+
+
+def run_model(threads, tile_size, timesteps):
+    from climate.setup.global_1deg import GlobalOneDegree
+    simulation = GlobalOneDegree()
+    simulation.run(runlen=timesteps * 3600., snapint=1e10,
+                   tiling_threads=threads, tile_size=tile_size)
+    return simulation.timers["main"].getTime()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=THREADS,
+                        help="Thread counts to benchmark (0 runs without tiling).")
+    parser.add_argument("--tile-size", type=int, nargs=2, default=(64, 64), metavar=("X", "Y"))
+    parser.add_argument("--timesteps", type=int, default=5)
+    parser.add_argument("--single", type=int, default=None, help=argparse.SUPPRESS)
+    args, _ = parser.parse_known_args()
+
+    if args.single is not None:
+        print(run_model(args.single, tuple(args.tile_size), args.timesteps))
+        return
+
+    def measure(threads):
+        print("Running with {} threads ...".format(threads or "no tiling and 1"))
+        output = subprocess.check_output([sys.executable, __file__, "--single", str(threads),
+                                          "--tile-size"] + [str(t) for t in args.tile_size] +
+                                         ["--timesteps", str(args.timesteps), "--loglevel", "warning"])
+        return float(output.decode().strip().splitlines()[-1])
+
+    reference = measure(0)
+    timings = [(threads, measure(threads)) for threads in args.threads]
+
+    print("{:>8} {:>12} {:>10} {:>12}".format("threads", "time (s)", "speedup", "efficiency"))
+    print("{:>8} {:>12.3f} {:>10} {:>12}".format("-", reference, "-", "-"))
+    for threads, elapsed in timings:
+        speedup = reference / elapsed
+        print("{:>8d} {:>12.3f} {:>10.2f} {:>12.2f}".format(threads, elapsed, speedup, speedup / threads))
+
+
+if __name__ == "__main__":
+    main()
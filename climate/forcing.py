@@ -0,0 +1,376 @@
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import numpy as np
+
+from climate import tools
+
+def _read_record(source, n, record_axis):
+    if callable(source):
+        return source(n)
+    index = [slice(None)] * np.ndim(source)
+    index[record_axis] = n
+    return source[tuple(index)]
+
+
+class _ForcingField(object):
+    def __init__(self, source, transform, record_axis):
+        self.source = source
+        self.transform = transform
+        self.record_axis = record_axis
+        self.records = {}
+        self.buffer = None
+        self.index = None
+
+    def read(self, n):
+        record = np.array(_read_record(self.source, n, self.record_axis), dtype=np.float64)
+        if self.transform is not None:
+            record = self.transform(record)
+        if self.index is not None:
+            record = record[self.index]
+        return record
+
+    def decompose(self, index):
+        self.index = index
+        self.records = {n: record[index] for n, record in self.records.items()}
+        self.buffer = self.buffer[index].copy() if self.buffer is not None else None
+
+    def blend(self, n1, f1, n2, f2):
+        # keep at most the two bracketing records, re-using one if the interval moved on
+        records = {n: self.records[n] if n in self.records else self.read(n) for n in (n1, n2)}
+        self.records = records
+        if self.buffer is None:
+            self.buffer = np.empty_like(records[n1])
+        np.multiply(records[n1], f1, out=self.buffer)
+        self.buffer += f2 * records[n2]
+
+
+class PeriodicForcing(object):
+    """Linear interpolation of periodic forcing records (e.g. a monthly climatology)
+    to the current model time.
+
+    Records are read on demand, and only the two records bracketing the current time
+    are kept in memory for each field. A record source can be
+
+    - an array containing all records along ``record_axis``; memory-mapped .npy files
+      (``np.load(filename, mmap_mode="r")``) and netCDF variables are read one record
+      at a time, or
+    - a callable that takes a record index and returns that record.
+
+    An optional ``transform`` is applied to every record after reading (e.g. unit
+    conversion, masking or padding to the model grid). Interpolated fields are blended
+    into preallocated buffers that are only updated when the interpolation weights
+    change by more than ``weight_tolerance``.
+
+    Arguments:
+       cycle_length (float): Total length of one periodic cycle.
+       n_rec (int): Number of records per cycle.
+       rec_spacing (float, optional): Time spacing between records. Defaults to
+          ``cycle_length / n_rec``.
+       weight_tolerance (float, optional): Change of the interpolation weights below
+          which the interpolated fields are not updated. Defaults to 0, i.e., fields
+          are updated whenever the current time changes.
+
+    Example:
+       >>> year_in_seconds = 360 * 86400.
+       >>> forcing = PeriodicForcing(year_in_seconds, 12)
+       >>> forcing.add("taux", np.load("taux.npy", mmap_mode="r"), transform=lambda taux: taux / 1024.)
+       >>> forcing.update(current_time)
+       >>> surface_taux[2:-2, 2:-2] = forcing["taux"]
+    """
+    def __init__(self, cycle_length, n_rec, rec_spacing=None, weight_tolerance=0.):
+        self.cycle_length = cycle_length
+        self.n_rec = n_rec
+        self.rec_spacing = rec_spacing if rec_spacing is not None else cycle_length / float(n_rec)
+        self.weight_tolerance = weight_tolerance
+        self._fields = {}
+        self._interval = None
+
+    def add(self, name, source, transform=None, record_axis=-1):
+        """Register a forcing field.
+
+        Arguments:
+           name (str): Name under which the interpolated field is accessible.
+           source: Array of records or callable returning a single record (see above).
+           transform (callable, optional): Function that is applied to every record after reading.
+           record_axis (int, optional): Axis of ``source`` that holds the records. Defaults to the
+              last axis.
+        """
+        if name in self._fields:
+            raise ValueError("forcing field {} already exists".format(name))
+        self._fields[name] = _ForcingField(source, transform, record_axis)
+        self._interval = None
+
+    def update(self, current_time):
+        """Interpolate all fields to ``current_time``.
+
+        Returns:
+           ``True`` if the interpolated fields were updated, ``False`` if the interpolation
+           weights did not change.
+        """
+        (n1, f1), (n2, f2) = tools.get_periodic_interval(current_time, self.cycle_length, self.rec_spacing, self.n_rec)
+        if self._interval is not None:
+            m1, m2, g2 = self._interval
+            if (n1, n2) == (m1, m2) and abs(f2 - g2) <= self.weight_tolerance:
+                return False
+        for field in self._fields.values():
+            field.blend(n1, f1, n2, f2)
+        self._interval = (n1, n2, f2)
+        return True
+
+    def decompose(self, x_slice, y_slice):
+        """Restrict all fields to a horizontal subdomain (see :func:`climate.pyom.distributed.decompose`).
+
+        Records are still read and transformed on the full grid (so transforms may
+        e.g. apply cyclic boundary conditions), and cut to the subdomain afterwards.
+        The first two axes of every record must be the horizontal axes of the model grid.
+        """
+        for field in self._fields.values():
+            field.decompose((x_slice, y_slice))
+
+    def __getitem__(self, name):
+        field = self._fields[name]
+        if field.buffer is None:
+            raise RuntimeError("forcing field {} has not been interpolated yet; call update first".format(name))
+        return field.buffer
+
+    def __contains__(self, name):
+        return name in self._fields
+
+
+class InterpolationPlan(object):
+    """Precomputed interpolation from one rectilinear grid to another.
+
+    The sparse interpolation operators (see :func:`climate.tools.get_regrid_operator`)
+    are built once, so that repeatedly interpolating records defined on the same grid
+    (e.g. the time steps of a forcing archive) only costs one sparse product per
+    dimension. Results are identical to :func:`climate.tools.interpolate` with
+    ``fill=False`` (linear extrapolation outside of the source grid, ``NaN`` values
+    are propagated).
+
+    Arguments:
+       coords: Tuple of (strictly increasing) coordinate arrays of the source grid.
+       interp_coords: Tuple of coordinate arrays to interpolate to.
+       kind (str, optional): Order of interpolation. Supported are `nearest` and
+          `linear` (default).
+
+    Example:
+       >>> plan = InterpolationPlan((lon, lat), (xt[2:-2], yt[2:-2]))
+       >>> sst_on_model_grid = plan(sst_record)
+    """
+    def __init__(self, coords, interp_coords, kind="linear"):
+        self.coords = coords
+        self.interp_coords = interp_coords
+        self.kind = kind
+        self.shape = tuple(len(x) for x in coords)
+        tools.get_regrid_operator(coords, interp_coords, kind)
+
+    def __call__(self, var):
+        """Interpolate ``var`` (defined on the source grid) to the target grid."""
+        if np.shape(var) != self.shape:
+            raise ValueError("Expected data of shape {}, got {}".format(self.shape, np.shape(var)))
+        return tools.regrid(self.coords, var, self.interp_coords, kind=self.kind)
+
+
+class _RecordLoader(object):
+    """Reads records of all fields of a stream on a background thread."""
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._results = {}
+        self._thread = threading.Thread(target=self._work)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            field, n, done, result = task
+            try:
+                result.append(field.read(n))
+            except Exception as e:
+                result.append(e)
+            done.set()
+
+    def request(self, field, n):
+        key = (id(field), n)
+        if key not in self._results:
+            done, result = threading.Event(), []
+            self._results[key] = (done, result)
+            self._tasks.put((field, n, done, result))
+
+    def get(self, field, n):
+        self.request(field, n)
+        done, result = self._results.pop((id(field), n))
+        done.wait()
+        if isinstance(result[0], Exception):
+            raise result[0]
+        return result[0]
+
+    def discard(self, field, keep):
+        for key in [k for k in self._results if k[0] == id(field) and k[1] not in keep]:
+            del self._results[key]
+
+    def close(self):
+        self._tasks.put(None)
+        self._thread.join()
+
+
+class _StreamField(object):
+    def __init__(self, source, transform, record_axis, plan, missing_value):
+        self.source = source
+        self.transform = transform
+        self.record_axis = record_axis
+        self.plan = plan
+        self.missing_value = missing_value
+        self.records = {}
+        self.buffers = None
+        self.front = 0
+
+    def read(self, n):
+        record = np.array(_read_record(self.source, n, self.record_axis), dtype=np.float64)
+        if self.missing_value is not None:
+            record[record == self.missing_value] = np.nan
+        if self.plan is not None:
+            record = self.plan(record)
+        if self.missing_value is not None:
+            record = tools.fill_holes(record)
+        if self.transform is not None:
+            record = self.transform(record)
+        return record
+
+    def blend(self, records, n1, f1, n2, f2):
+        self.records = records
+        if self.buffers is None:
+            self.buffers = (np.empty_like(records[n1]), np.empty_like(records[n1]))
+        # write into the back buffer, so the array handed out last stays valid
+        self.front = 1 - self.front
+        buffer = self.buffers[self.front]
+        np.multiply(records[n1], f1, out=buffer)
+        buffer += f2 * records[n2]
+
+
+class ForcingStream(object):
+    """Linear interpolation of a (non-periodic) forcing time series, e.g. 6-hourly
+    reanalysis data, that is too large to be held in memory.
+
+    Records are read one at a time from netCDF variables, memory-mapped .npy files
+    (``np.load(filename, mmap_mode="r")``) or callables returning a single record.
+    While the model integrates, the next ``prefetch`` records of every field are read
+    (and interpolated to the model grid) on a background thread, so that forcing I/O
+    overlaps with computation. Interpolated fields are written alternately into two
+    buffers, so the array returned for the previous time step is left untouched by
+    :meth:`update`.
+
+    .. note::
+        The netCDF library is not thread-safe. Use ``prefetch=0`` when reading from
+        netCDF files while model output is written to netCDF from the main thread
+        at the same time.
+
+    Arguments:
+       record_times (array_like): Model time of every record (strictly increasing).
+       prefetch (int, optional): Number of records to read ahead. Defaults to 1.
+          If 0, records are read synchronously and no thread is started.
+
+    Example:
+       >>> stream = ForcingStream(6 * 3600. * np.arange(4 * 365 * 10))
+       >>> with Dataset("era_u10.nc") as era:
+       >>>     stream.add("u10", era.variables["u10"], coords=(era_lat, era_lon),
+       >>>                grid=(yt[2:-2], xt[2:-2]), transform=pad_to_model_grid)
+       >>>     for n in range(n_steps):
+       >>>         stream.update(n * dt_tracer)
+       >>>         u10 = stream["u10"]
+       >>> stream.close()
+    """
+    def __init__(self, record_times, prefetch=1):
+        self.record_times = np.asarray(record_times, dtype=np.float64)
+        if self.record_times.ndim != 1 or len(self.record_times) < 2 or np.any(np.diff(self.record_times) <= 0):
+            raise ValueError("record times must be a strictly increasing sequence of at least two times")
+        self.prefetch = prefetch
+        self._fields = {}
+        self._interval = None
+        self._loader = _RecordLoader() if prefetch > 0 else None
+
+    def add(self, name, source, transform=None, record_axis=0, coords=None, grid=None,
+            kind="linear", missing_value=None):
+        """Register a forcing field.
+
+        Arguments:
+           name (str): Name under which the interpolated field is accessible.
+           source: Array of records or callable returning a single record.
+           transform (callable, optional): Function that is applied to every record after
+              reading and interpolating (e.g. unit conversion or padding).
+           record_axis (int, optional): Axis of ``source`` that holds the records. Defaults to
+              the first axis (as in most netCDF files).
+           coords, grid (optional): Coordinates of the source data and of the model grid. If
+              given, every record is interpolated using a cached :class:`InterpolationPlan`.
+           kind (str, optional): Order of interpolation (`nearest` or `linear`).
+           missing_value (optional): Value denoting missing data; missing values are filled
+              with the nearest valid value after interpolating.
+        """
+        if name in self._fields:
+            raise ValueError("forcing field {} already exists".format(name))
+        plan = InterpolationPlan(coords, grid, kind=kind) if coords is not None else None
+        self._fields[name] = _StreamField(source, transform, record_axis, plan, missing_value)
+        self._interval = None
+
+    def get_interval(self, current_time):
+        """Indices and weights of the records bracketing ``current_time``."""
+        times = self.record_times
+        if not times[0] <= current_time <= times[-1]:
+            raise ValueError("time {} is outside of the forcing record range [{}, {}]".format(current_time, times[0], times[-1]))
+        n1 = min(np.searchsorted(times, current_time, side="right") - 1, len(times) - 2)
+        f2 = (current_time - times[n1]) / (times[n1+1] - times[n1])
+        return (n1, 1. - f2), (n1 + 1, f2)
+
+    def update(self, current_time):
+        """Interpolate all fields to ``current_time`` and schedule reading the next records.
+
+        Returns:
+           ``True`` if the interpolated fields were updated, ``False`` if the time did not change.
+        """
+        (n1, f1), (n2, f2) = self.get_interval(current_time)
+        if self._interval == (n1, f2):
+            return False
+        ahead = range(n2 + 1, min(n2 + 1 + self.prefetch, len(self.record_times)))
+        for field in self._fields.values():
+            records = {}
+            for n in (n1, n2):
+                if n in field.records:
+                    records[n] = field.records[n]
+                elif self._loader is not None:
+                    records[n] = self._loader.get(field, n)
+                else:
+                    records[n] = field.read(n)
+            field.blend(records, n1, f1, n2, f2)
+            if self._loader is not None:
+                self._loader.discard(field, ahead)
+                for n in ahead:
+                    self._loader.request(field, n)
+        self._interval = (n1, f2)
+        return True
+
+    def close(self):
+        """Stop the background reader."""
+        if self._loader is not None:
+            self._loader.close()
+            self._loader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, name):
+        field = self._fields[name]
+        if field.buffers is None:
+            raise RuntimeError("forcing field {} has not been interpolated yet; call update first".format(name))
+        return field.buffers[field.front]
+
+    def __contains__(self, name):
+        return name in self._fields
@@ -1,3 +1,3 @@
-from .pyom_method import pyom_method, pyom_inline_method
+from .pyom_method import pyom_method, pyom_inline_method, tiled
 from .pyom import PyOM
 from .pyom_legacy import PyOMLegacy
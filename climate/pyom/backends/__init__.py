@@ -0,0 +1,55 @@
+"""
+Registry of computational backends.
+
+A backend consists of an array module that is injected as ``np`` into all PyOM methods,
+and optionally of specialized implementations of individual kernels that replace the
+generic PyOM methods when the backend is used.
+"""
+import warnings
+from collections import OrderedDict
+
+BACKENDS = OrderedDict()
+KERNELS = {}
+
+def register_backend(name, module, kernels=None):
+    """Register a backend under the given name.
+
+    Arguments:
+        name (:obj:`str`): Name of the backend, as used in the ``--backend`` command
+            line flag.
+        module: Array module providing the NumPy interface, or ``None`` if the backend
+            is not available (e.g. failed to import).
+        kernels (:obj:`dict`, optional): Specialized kernels for this backend. Maps the
+            qualified name of a PyOM method (e.g. ``climate.pyom.core.advection.adv_flux_2nd``)
+            to a function with the same signature. All other methods use the generic
+            implementation.
+    """
+    BACKENDS[name] = module
+    KERNELS[name] = dict(kernels or {})
+
+def get_kernel(backend_name, function):
+    """
+    return specialized implementation of function for the given backend, or None
+    """
+    kernels = KERNELS.get(backend_name)
+    if not kernels:
+        return None
+    return kernels.get("{}.{}".format(function.__module__, function.__name__))
+
+
+import numpy
+if numpy.__name__ == "bohrium":
+    warnings.warn("Running pyOM with -m bohrium is discouraged (use --backend bohrium instead)")
+    import numpy_force
+    numpy = numpy_force
+try:
+    import bohrium
+    import bohrium.lapack
+except ImportError:
+    warnings.warn("Could not import Bohrium")
+    bohrium = None
+
+register_backend("numpy", numpy)
+register_backend("bohrium", bohrium)
+
+from . import numba_backend
@@ -0,0 +1,283 @@
+"""
+CPU backend that compiles the hottest stencil kernels to fused loops with Numba,
+avoiding the array temporaries created by the NumPy implementation. All other
+PyOM methods run on plain NumPy.
+"""
+import math
+import warnings
+
+import numpy as np
+
+from . import register_backend
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _jit(function):
+    return numba.njit(cache=True)(function) if numba is not None else function
+
+
+"""
+superbee advection
+"""
+
+@_jit
+def _superbee_flux(vel, var_m1, var_0, var_p1, var_p2, mask_m1, mask_0, mask_p1, dxr, velfac, dt):
+    eps = 1e-20
+    rjp = (var_p2 - var_p1) * mask_p1
+    rj = (var_p1 - var_0) * mask_0
+    rjm = (var_0 - var_m1) * mask_m1
+    if rj != 0.:
+        cr = rjm / (rj + eps) if vel > 0 else rjp / (rj + eps)
+    else:
+        cr = rjm * 1e20 if vel > 0 else rjp * 1e20
+    cr = max(0., max(min(1., 2 * cr), min(2., cr)))
+    u_cfl = abs(velfac * vel * dt * dxr)
+    return velfac * vel * (var_p1 + var_0) * 0.5 - abs(velfac * vel) * ((1. - cr) + u_cfl * cr) * rj * 0.5
+
+@_jit
+def _superbee_x(vel, var, mask, dxr, costr, dt, out):
+    for i in range(out.shape[0]):
+        ii = i + 1
+        for j in range(out.shape[1]):
+            jj = j + 2
+            for k in range(out.shape[2]):
+                out[i, j, k] = _superbee_flux(vel[ii, jj, k], var[ii-1, jj, k], var[ii, jj, k], var[ii+1, jj, k],
+                                              var[ii+2, jj, k], mask[ii-1, jj, k], mask[ii, jj, k], mask[ii+1, jj, k],
+                                              costr[jj] * dxr[ii], 1., dt)
+
+@_jit
+def _superbee_y(vel, var, mask, dxr, costr, cosu, dt, out):
+    for i in range(out.shape[0]):
+        ii = i + 2
+        for j in range(out.shape[1]):
+            jj = j + 1
+            for k in range(out.shape[2]):
+                out[i, j, k] = _superbee_flux(vel[ii, jj, k], var[ii, jj-1, k], var[ii, jj, k], var[ii, jj+1, k],
+                                              var[ii, jj+2, k], mask[ii, jj-1, k], mask[ii, jj, k], mask[ii, jj+1, k],
+                                              costr[jj] * dxr[jj], cosu[jj], dt)
+
+@_jit
+def _superbee_z(vel, var, mask, dxr, dt, out):
+    nz = var.shape[2]
+    for i in range(out.shape[0]):
+        ii = i + 2
+        for j in range(out.shape[1]):
+            jj = j + 2
+            for k in range(out.shape[2]):
+                # edge values are repeated at the top and bottom
+                km1 = max(k - 1, 0)
+                kp2 = min(k + 2, nz - 1)
+                out[i, j, k] = _superbee_flux(vel[ii, jj, k], var[ii, jj, km1], var[ii, jj, k], var[ii, jj, k+1],
+                                              var[ii, jj, kp2], mask[ii, jj, km1], mask[ii, jj, k], mask[ii, jj, k+1],
+                                              dxr[k], 1., dt)
+
+def _adv_flux_superbee(pyom, adv_fe, adv_fn, adv_ft, var, velocity, masks, dxr, grid=None):
+    # tracers stacked along trailing axes are advected one at a time; the fused loops
+    # create no velocity terms, so there is nothing to take from the cache of grid
+    for index in np.ndindex(*var.shape[3:]):
+        index = (Ellipsis,) + index
+        _superbee_x(velocity[0], var[index], masks[0], dxr[0], pyom.costr, pyom.dt_tracer, adv_fe[1:-2, 2:-2][index])
+        _superbee_y(velocity[1], var[index], masks[1], dxr[1], pyom.costr, pyom.cosu, pyom.dt_tracer, adv_fn[2:-2, 1:-2][index])
+        _superbee_z(velocity[2], var[index], masks[2], dxr[2], pyom.dt_tracer, adv_ft[2:-2, 2:-2, :-1][index])
+    adv_ft[:, :, -1] = 0.
+
+
+"""
+second order advection
+"""
+
+@_jit
+def _flux_2nd(u, v, w, maskU, maskV, maskW, cosu, var, adv_fe, adv_fn, adv_ft):
+    nx, ny, nz = var.shape[0] - 4, var.shape[1] - 4, var.shape[2]
+    for i in range(1, nx + 2):
+        for j in range(2, ny + 2):
+            for k in range(nz):
+                adv_fe[i, j, k] = 0.5 * (var[i, j, k] + var[i+1, j, k]) * u[i, j, k] * maskU[i, j, k]
+    for i in range(2, nx + 2):
+        for j in range(1, ny + 2):
+            for k in range(nz):
+                adv_fn[i, j, k] = cosu[j] * 0.5 * (var[i, j, k] + var[i, j+1, k]) * v[i, j, k] * maskV[i, j, k]
+    for i in range(2, nx + 2):
+        for j in range(2, ny + 2):
+            for k in range(nz - 1):
+                adv_ft[i, j, k] = 0.5 * (var[i, j, k] + var[i, j, k+1]) * w[i, j, k] * maskW[i, j, k]
+    for i in range(adv_ft.shape[0]):
+        for j in range(adv_ft.shape[1]):
+            adv_ft[i, j, nz-1] = 0.
+
+def adv_flux_2nd(pyom, adv_fe, adv_fn, adv_ft, var):
+    # tracers stacked along trailing axes are advected one at a time
+    for index in np.ndindex(*var.shape[3:]):
+        index = (Ellipsis,) + index
+        _flux_2nd(pyom.u[..., pyom.tau], pyom.v[..., pyom.tau], pyom.w[..., pyom.tau],
+                  pyom.maskU, pyom.maskV, pyom.maskW, pyom.cosu, var[index], adv_fe[index], adv_fn[index], adv_ft[index])
+
+
+"""
+Coriolis and metric terms
+"""
+
+@_jit
+def _coriolis_and_metric(u, v, maskU, maskV, coriolis_t, tantr, dxt, dxu, dyt, dyu, cost, cosu,
+                         coord_degree, du_cor, dv_cor):
+    nx, ny, nz = u.shape[0] - 4, u.shape[1] - 4, u.shape[2]
+    for i in range(2, nx + 2):
+        for j in range(2, ny + 2):
+            fy = dyu[j] * cosu[j]
+            for k in range(nz):
+                du_cor[i, j, k] = maskU[i, j, k] \
+                    * (coriolis_t[i, j] * (v[i, j, k] + v[i, j-1, k]) * dxt[i] / dxu[i]
+                       + coriolis_t[i+1, j] * (v[i+1, j, k] + v[i+1, j-1, k]) * dxt[i+1] / dxu[i]) * 0.25
+                dv_cor[i, j, k] = -maskV[i, j, k] \
+                    * (coriolis_t[i, j] * (u[i-1, j, k] + u[i, j, k]) * dyt[j] * cost[j] / fy
+                       + coriolis_t[i, j+1] * (u[i-1, j+1, k] + u[i, j+1, k]) * dyt[j+1] * cost[j+1] / fy) * 0.25
+                if coord_degree:
+                    du_cor[i, j, k] += maskU[i, j, k] * 0.125 * tantr[j] \
+                        * ((u[i, j, k] + u[i-1, j, k]) * (v[i, j, k] + v[i, j-1, k]) * dxt[i] / dxu[i]
+                           + (u[i+1, j, k] + u[i, j, k]) * (v[i+1, j, k] + v[i+1, j-1, k]) * dxt[i+1] / dxu[i])
+                    dv_cor[i, j, k] += -maskV[i, j, k] * 0.125 \
+                        * (tantr[j] * (u[i, j, k] + u[i-1, j, k])**2 * dyt[j] * cost[j] / fy
+                           + tantr[j+1] * (u[i, j+1, k] + u[i-1, j+1, k])**2 * dyt[j+1] * cost[j+1] / fy)
+
+def _coriolis_and_metric_terms(pyom):
+    _coriolis_and_metric(pyom.u[..., pyom.tau], pyom.v[..., pyom.tau], pyom.maskU, pyom.maskV,
+                         pyom.coriolis_t, pyom.tantr, pyom.dxt, pyom.dxu, pyom.dyt, pyom.dyu,
+                         pyom.cost, pyom.cosu, bool(pyom.coord_degree), pyom.du_cor, pyom.dv_cor)
+
+
+"""
+isoneutral slopes and diffusivities
+"""
+
+@_jit
+def _taper(sx, iso_slopec, iso_dslope):
+    return 0.5 * (1. + math.tanh((-abs(sx) + iso_slopec) / iso_dslope))
+
+@_jit
+def _isoneutral_gradients(temp, salt, maskU, maskV, maskW, dxu, dyu, dzw, cost, ddxt, ddyt, ddzt):
+    nxp, nyp, nz = temp.shape
+    for i in range(nxp):
+        for j in range(nyp):
+            for k in range(nz):
+                if i < nxp - 1:
+                    fac = dxu[i] * cost[j]
+                    ddxt[i, j, k, 0] = maskU[i, j, k] * (temp[i+1, j, k] - temp[i, j, k]) / fac
+                    ddxt[i, j, k, 1] = maskU[i, j, k] * (salt[i+1, j, k] - salt[i, j, k]) / fac
+                if j < nyp - 1:
+                    ddyt[i, j, k, 0] = maskV[i, j, k] * (temp[i, j+1, k] - temp[i, j, k]) / dyu[j]
+                    ddyt[i, j, k, 1] = maskV[i, j, k] * (salt[i, j+1, k] - salt[i, j, k]) / dyu[j]
+                if k < nz - 1:
+                    ddzt[i, j, k, 0] = maskW[i, j, k] * (temp[i, j, k+1] - temp[i, j, k]) / dzw[k]
+                    ddzt[i, j, k, 1] = maskW[i, j, k] * (salt[i, j, k+1] - salt[i, j, k]) / dzw[k]
+
+@_jit
+def _isoneutral_slopes(drdTS, ddxt, ddyt, ddzt, K_iso, maskU, maskV, maskW, dxt, dxu, dyt, dyu, dzt, dzw,
+                       cost, cosu, K_iso_steep, iso_slopec, iso_dslope, Ai_ez, Ai_nz, Ai_bx, Ai_by, K_11, K_22, K_33):
+    epsln = 1e-20
+    nx, ny, nz = K_iso.shape[0] - 4, K_iso.shape[1] - 4, K_iso.shape[2]
+
+    # Ai_ez and K_11 on center of east face of T cell
+    for i in range(1, nx + 2):
+        for j in range(2, ny + 2):
+            for k in range(nz):
+                if k > 0:
+                    diffloc = 0.25 * (K_iso[i, j, k] + K_iso[i, j, k-1] + K_iso[i+1, j, k] + K_iso[i+1, j, k-1])
+                else:
+                    diffloc = 0.5 * (K_iso[i, j, 0] + K_iso[i+1, j, 0])
+                sumz = 0.
+                for kr in range(2):
+                    if kr == 0 and k == 0:
+                        continue
+                    for ip in range(2):
+                        drodxe = drdTS[i+ip, j, k, 0] * ddxt[i, j, k, 0] + drdTS[i+ip, j, k, 1] * ddxt[i, j, k, 1]
+                        drodze = drdTS[i+ip, j, k, 0] * ddzt[i+ip, j, k-1+kr, 0] + drdTS[i+ip, j, k, 1] * ddzt[i+ip, j, k-1+kr, 1]
+                        sxe = -drodxe / (min(0., drodze) - epsln)
+                        taper = _taper(sxe, iso_slopec, iso_dslope)
+                        sumz += dzw[k-1+kr] * maskU[i, j, k] * max(K_iso_steep, diffloc * taper)
+                        Ai_ez[i, j, k, ip, kr] = taper * sxe * maskU[i, j, k]
+                K_11[i, j, k] = sumz / (4. * dzt[k])
+
+    # Ai_nz and K_22 on center of north face of T cell
+    for i in range(2, nx + 2):
+        for j in range(1, ny + 2):
+            for k in range(nz):
+                if k > 0:
+                    diffloc = 0.25 * (K_iso[i, j, k] + K_iso[i, j, k-1] + K_iso[i, j+1, k] + K_iso[i, j+1, k-1])
+                else:
+                    diffloc = 0.5 * (K_iso[i, j, 0] + K_iso[i, j+1, 0])
+                sumz = 0.
+                for kr in range(2):
+                    if kr == 0 and k == 0:
+                        continue
+                    for jp in range(2):
+                        drodyn = drdTS[i, j+jp, k, 0] * ddyt[i, j, k, 0] + drdTS[i, j+jp, k, 1] * ddyt[i, j, k, 1]
+                        drodzn = drdTS[i, j+jp, k, 0] * ddzt[i, j+jp, k-1+kr, 0] + drdTS[i, j+jp, k, 1] * ddzt[i, j+jp, k-1+kr, 1]
+                        syn = -drodyn / (min(0., drodzn) - epsln)
+                        taper = _taper(syn, iso_slopec, iso_dslope)
+                        sumz += dzw[k-1+kr] * maskV[i, j, k] * max(K_iso_steep, diffloc * taper)
+                        Ai_nz[i, j, k, jp, kr] = taper * syn * maskV[i, j, k]
+                K_22[i, j, k] = sumz / (4. * dzt[k])
+
+    # Ai_bx, Ai_by and K_33 on top face of T cell
+    for i in range(2, nx + 2):
+        for j in range(2, ny + 2):
+            for k in range(nz - 1):
+                sumx = 0.
+                for ip in range(2):
+                    for kr in range(2):
+                        drodxb = drdTS[i, j, k+kr, 0] * ddxt[i-1+ip, j, k+kr, 0] + drdTS[i, j, k+kr, 1] * ddxt[i-1+ip, j, k+kr, 1]
+                        drodzb = drdTS[i, j, k+kr, 0] * ddzt[i, j, k, 0] + drdTS[i, j, k+kr, 1] * ddzt[i, j, k, 1]
+                        sxb = -drodxb / (min(0., drodzb) - epsln)
+                        taper = _taper(sxb, iso_slopec, iso_dslope)
+                        sumx += dxu[i-1+ip] * K_iso[i, j, k] * taper * sxb**2 * maskW[i, j, k]
+                        Ai_bx[i, j, k, ip, kr] = taper * sxb * maskW[i, j, k]
+                sumy = 0.
+                for jp in range(2):
+                    facty = cosu[j-1+jp] * dyu[j-1+jp]
+                    for kr in range(2):
+                        drodyb = drdTS[i, j, k+kr, 0] * ddyt[i, j-1+jp, k+kr, 0] + drdTS[i, j, k+kr, 1] * ddyt[i, j-1+jp, k+kr, 1]
+                        drodzb = drdTS[i, j, k+kr, 0] * ddzt[i, j, k, 0] + drdTS[i, j, k+kr, 1] * ddzt[i, j, k, 1]
+                        syb = -drodyb / (min(0., drodzb) - epsln)
+                        taper = _taper(syb, iso_slopec, iso_dslope)
+                        sumy += facty * K_iso[i, j, k] * taper * syb**2 * maskW[i, j, k]
+                        Ai_by[i, j, k, jp, kr] = taper * syb * maskW[i, j, k]
+                K_33[i, j, k] = sumx / (4 * dxt[i]) + sumy / (4 * dyt[j] * cost[j])
+            K_33[i, j, nz-1] = 0.
+
+def isoneutral_diffusion_pre(pyom):
+    from ..core import density, isoneutral # avoid circular import
+
+    shape = (pyom.nx+4, pyom.ny+4, pyom.nz, 2)
+    drdTS = np.empty(shape)
+    ddxt, ddyt, ddzt = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    salt, temp = pyom.salt[..., pyom.tau], pyom.temp[..., pyom.tau]
+    drhodT, drhodS = density.get_eos(pyom, salt, temp, np.abs(pyom.zt), ("drhodT", "drhodS"))
+    drdTS[..., 0] = drhodT * pyom.maskT
+    drdTS[..., 1] = drhodS * pyom.maskT
+    _isoneutral_gradients(np.ascontiguousarray(temp), np.ascontiguousarray(salt), pyom.maskU, pyom.maskV,
+                          pyom.maskW, pyom.dxu, pyom.dyu, pyom.dzw, pyom.cost, ddxt, ddyt, ddzt)
+    _isoneutral_slopes(drdTS, ddxt, ddyt, ddzt, pyom.K_iso, pyom.maskU, pyom.maskV, pyom.maskW,
+                       pyom.dxt, pyom.dxu, pyom.dyt, pyom.dyu, pyom.dzt, pyom.dzw, pyom.cost, pyom.cosu,
+                       pyom.K_iso_steep, pyom.iso_slopec, pyom.iso_dslope,
+                       pyom.Ai_ez, pyom.Ai_nz, pyom.Ai_bx, pyom.Ai_by, pyom.K_11, pyom.K_22, pyom.K_33)
+    isoneutral.isoneutral_flux_weights(pyom, pyom.K_iso, pyom.K_iso_ez, pyom.K_iso_nz)
+    if pyom.enable_skew_diffusion:
+        isoneutral.isoneutral_flux_weights(pyom, pyom.K_gm, pyom.K_gm_ez, pyom.K_gm_nz)
+
+
+KERNELS = {
+    "climate.pyom.core.advection._adv_flux_superbee": _adv_flux_superbee,
+    "climate.pyom.core.advection.adv_flux_2nd": adv_flux_2nd,
+    "climate.pyom.core.momentum._coriolis_and_metric_terms": _coriolis_and_metric_terms,
+    "climate.pyom.core.isoneutral.isoneutral.isoneutral_diffusion_pre": isoneutral_diffusion_pre,
+}
+
+if numba is None:
+    warnings.warn("Could not import Numba")
+    register_backend("numba", None)
+else:
+    register_backend("numba", np, KERNELS)
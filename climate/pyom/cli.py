@@ -1,7 +1,7 @@
 import argparse
 
 def parse_command_line():
-    from climate.pyom.pyom import BACKENDS
+    from climate.pyom.backends import BACKENDS
     parser = argparse.ArgumentParser(description="PyOM command line interface")
     parser.add_argument("--backend", "-b", default="numpy", choices=BACKENDS.keys(),
                         help="Backend to use for computations. Defaults to 'numpy'.")
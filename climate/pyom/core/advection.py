@@ -1,63 +1,119 @@
 import warnings
 
-from .. import pyom_method
-from .utilities import pad_z_edges
+from .. import pyom_method, tiled
 
 @pyom_method
-def _calc_cr(pyom,rjp,rj,rjm,vel):
+def _calc_cr(pyom,rjp,rj,rjm,positive):
     """
-    Calculates cr value used in superbee advection scheme
+    Calculates cr value used in superbee advection scheme, where positive
+    flags faces with positive velocity
     """
     eps = 1e-20 # prevent division by 0
     mask_rj = rj == 0.
-    mask_vel = vel > 0
-    pyom.flush() # prevent precision problems
-    mask1 = ~mask_rj & mask_vel
-    cr = np.where(mask1, rjm / (rj + eps), np.zeros_like(rj))
-    mask2 = ~mask_rj & ~mask_vel
-    cr[...] = np.where(mask2, rjp / (rj + eps), cr)
-    mask3 = mask_rj & mask_vel
-    cr[...] = np.where(mask3, rjm * 1e20, cr)
-    mask4 = mask_rj & ~mask_vel
-    cr[...] = np.where(mask4, rjp * 1e20, cr)
-    return cr
+    if pyom.flush_policy == "per_kernel":
+        # prevent precision problems of lazy backends; coarser flush policies
+        # trade this for fewer flushes
+        pyom.flush()
+    rj_upwind = np.where(positive, rjm, rjp)
+    return np.where(mask_rj, rj_upwind * 1e20, rj_upwind / (rj + eps))
 
 @pyom_method
-def _adv_superbee(pyom, vel, var, mask, dx, axis):
+def _limited_flux(pyom, fvel, abs_fvel, uCFL, positive, var_s, var_sp1, rjm, rj, rjp):
+    """
+    Flux-limited advective flux between var_s and var_sp1 from the velocity terms
+    (see _superbee_velocity) and the masked tracer differences rjm, rj, rjp across the
+    upstream, current and downstream face
+    """
     limiter = lambda cr: np.maximum(0.,np.maximum(np.minimum(1.,2*cr), np.minimum(2.,cr)))
-    velfac = 1
+    cr = limiter(_calc_cr(pyom, rjp, rj, rjm, positive))
+    return fvel * (var_sp1 + var_s) * 0.5 - abs_fvel * ((1.-cr) + uCFL*cr) * rj * 0.5
+
+@pyom_method
+def _superbee_flux(pyom, vel, uCFL, var, mask, slices, velfac=1):
+    """
+    Flux-limited advective flux between var[s] and var[sp1], where slices = (sm1, s, sp1, sp2)
+    selects the neighbors along the advection direction, vel is the velocity on the faces
+    (scaled by velfac) and uCFL the Courant number
+    """
+    sm1, s, sp1, sp2 = slices
+    rjp = (var[sp2] - var[sp1]) * mask[sp1]
+    rj = (var[sp1] - var[s]) * mask[s]
+    rjm = (var[s] - var[sm1]) * mask[sm1]
+    return _limited_flux(pyom, velfac * vel, np.abs(velfac * vel), uCFL, vel > 0, var[s], var[sp1], rjm, rj, rjp)
+
+@pyom_method
+def _superbee_velocity(pyom, vel, dxr, axis):
+    """
+    Velocity dependent terms of the superbee scheme along given axis, where dxr is the
+    reciprocal grid spacing along that axis. They do not depend on the tracer, and are
+    shared by all tracers advected with vel.
+    """
     if axis == 0:
-        sm1, s, sp1, sp2 = ((slice(1+n,-2+n or None),slice(2,-2),slice(None)) for n in range(-1,3))
-        dx = pyom.cost[np.newaxis, 2:-2, np.newaxis] * dx[1:-2, np.newaxis, np.newaxis]
+        vel = vel[1:-2, 2:-2]
+        fvel = vel
+        dxr = pyom.costr[np.newaxis, 2:-2, np.newaxis] * dxr[1:-2, np.newaxis, np.newaxis]
     elif axis == 1:
-        sm1, s, sp1, sp2 = ((slice(2,-2),slice(1+n,-2+n or None),slice(None)) for n in range(-1,3))
-        dx = (pyom.cost * dx)[np.newaxis, 1:-2, np.newaxis]
-        velfac = pyom.cosu[np.newaxis, 1:-2, np.newaxis]
+        vel = vel[2:-2, 1:-2]
+        fvel = pyom.cosu[np.newaxis, 1:-2, np.newaxis] * vel
+        dxr = (pyom.costr * dxr)[np.newaxis, 1:-2, np.newaxis]
     elif axis == 2:
-        vel, var, mask = (pad_z_edges(pyom, a) for a in (vel,var,mask))
-        sm1, s, sp1, sp2 = ((slice(2,-2),slice(2,-2),slice(1+n,-2+n or None)) for n in range(-1,3))
-        dx = dx[np.newaxis,np.newaxis,:-1]
+        vel = vel[2:-2, 2:-2, :-1]
+        fvel = vel
+        dxr = dxr[np.newaxis,np.newaxis,:-1]
     else:
         raise ValueError("axis must be 0, 1, or 2")
-    uCFL = np.abs(velfac * vel[s] * pyom.dt_tracer / dx)
-    rjp = (var[sp2] - var[sp1]) * mask[sp1]
-    rj = (var[sp1] - var[s]) * mask[s]
-    rjm = (var[s] - var[sm1]) * mask[sm1]
-    cr = limiter(_calc_cr(pyom, rjp, rj, rjm, vel[s]))
-    return velfac * vel[s] * (var[sp1] + var[s]) * 0.5 - np.abs(velfac * vel[s]) * ((1.-cr) + uCFL*cr) * rj * 0.5
+    uCFL = np.abs(fvel * pyom.dt_tracer * dxr)
+    return fvel, np.abs(fvel), uCFL, vel > 0
+
+@pyom_method
+def _adv_superbee(pyom, velocity, var, mask, axis):
+    """
+    superbee flux along given axis from velocity terms returned by _superbee_velocity
+
+    var may have additional trailing axes (e.g. a batch of tracers), over which the
+    velocity terms are broadcast. Differences are computed once and shifted to get the
+    up- and downstream differences. At the bottom and surface, edge values are repeated,
+    so differences beyond vanish.
+    """
+    batch = (Ellipsis,) + (np.newaxis,) * (var.ndim - 3)
+    fvel, abs_fvel, uCFL, positive = (a[batch] for a in velocity)
+    mask = mask[batch]
+    if axis == 0:
+        diff = (var[1:, 2:-2] - var[:-1, 2:-2]) * mask[:-1, 2:-2]
+        rjm, rj, rjp = diff[:-2], diff[1:-1], diff[2:]
+        var_s, var_sp1 = var[1:-2, 2:-2], var[2:-1, 2:-2]
+    elif axis == 1:
+        diff = (var[2:-2, 1:] - var[2:-2, :-1]) * mask[2:-2, :-1]
+        rjm, rj, rjp = diff[:, :-2], diff[:, 1:-1], diff[:, 2:]
+        var_s, var_sp1 = var[2:-2, 1:-2], var[2:-2, 2:-1]
+    elif axis == 2:
+        shape = list(var[2:-2, 2:-2].shape)
+        shape[2] += 1
+        diff = np.zeros(shape)
+        diff[:, :, 1:-1] = (var[2:-2, 2:-2, 1:] - var[2:-2, 2:-2, :-1]) * mask[2:-2, 2:-2, :-1]
+        rjm, rj, rjp = diff[:, :, :-2], diff[:, :, 1:-1], diff[:, :, 2:]
+        var_s, var_sp1 = var[2:-2, 2:-2, :-1], var[2:-2, 2:-2, 1:]
+    else:
+        raise ValueError("axis must be 0, 1, or 2")
+    return _limited_flux(pyom, fvel, abs_fvel, uCFL, positive, var_s, var_sp1, rjm, rj, rjp)
 
 @pyom_method
+@tiled
 def adv_flux_2nd(pyom,adv_fe,adv_fn,adv_ft,var):
     """
     2th order advective tracer flux
+
+    var may have additional trailing axes, as for adv_flux_superbee
     """
-    adv_fe[1:-2, 2:-2, :] = 0.5*(var[1:-2, 2:-2, :] + var[2:-1, 2:-2, :]) * pyom.u[1:-2, 2:-2, :, pyom.tau] * pyom.maskU[1:-2, 2:-2, :]
-    adv_fn[2:-2, 1:-2, :] = pyom.cosu[np.newaxis,1:-2,np.newaxis] * 0.5 * (var[2:-2, 1:-2, :] + var[2:-2, 2:-1, :]) \
-                    * pyom.v[2:-2, 1:-2, :, pyom.tau] * pyom.maskV[2:-2, 1:-2, :]
-    adv_ft[2:-2, 2:-2, :-1] = 0.5 * (var[2:-2, 2:-2, :-1] + var[2:-2, 2:-2, 1:]) * pyom.w[2:-2, 2:-2, :-1, pyom.tau] * pyom.maskW[2:-2, 2:-2, :-1]
+    batch = (Ellipsis,) + (np.newaxis,) * (var.ndim - 3)
+    adv_fe[1:-2, 2:-2, :] = 0.5*(var[1:-2, 2:-2, :] + var[2:-1, 2:-2, :]) * (pyom.u[1:-2, 2:-2, :, pyom.tau] * pyom.maskU[1:-2, 2:-2, :])[batch]
+    adv_fn[2:-2, 1:-2, :] = 0.5 * (var[2:-2, 1:-2, :] + var[2:-2, 2:-1, :]) \
+                    * (pyom.cosu[np.newaxis,1:-2,np.newaxis] * pyom.v[2:-2, 1:-2, :, pyom.tau] * pyom.maskV[2:-2, 1:-2, :])[batch]
+    adv_ft[2:-2, 2:-2, :-1] = 0.5 * (var[2:-2, 2:-2, :-1] + var[2:-2, 2:-2, 1:]) * (pyom.w[2:-2, 2:-2, :-1, pyom.tau] * pyom.maskW[2:-2, 2:-2, :-1])[batch]
     adv_ft[:,:,-1] = 0.
 
 @pyom_method
+@tiled
 def adv_flux_superbee(pyom,adv_fe,adv_fn,adv_ft,var):
     """
     from MITgcm
@@ -71,11 +127,47 @@ def adv_flux_superbee(pyom,adv_fe,adv_fn,adv_ft,var):
     \end{equation*}
     where the $\psi(C_r)$ is the limiter function and $C_r$ is
     the slope ratio.
+
+    var may have additional trailing axes, e.g. a batch of tracers stacked along the last
+    axis (with fluxes of the same shape). Velocity dependent terms are then computed once
+    for all tracers.
     """
-    adv_fe[1:-2, 2:-2, :] = _adv_superbee(pyom, pyom.u[..., pyom.tau], var, pyom.maskU, pyom.dxt, 0)
-    adv_fn[2:-2, 1:-2, :] = _adv_superbee(pyom, pyom.v[..., pyom.tau], var, pyom.maskV, pyom.dyt, 1)
-    adv_ft[2:-2, 2:-2, :-1] = _adv_superbee(pyom, pyom.w[..., pyom.tau], var, pyom.maskW, pyom.dzt, 2)
-    adv_ft[..., -1] = 0.
+    velocity = (pyom.u[..., pyom.tau], pyom.v[..., pyom.tau], pyom.w[..., pyom.tau])
+    masks = (pyom.maskU, pyom.maskV, pyom.maskW)
+    _adv_flux_superbee(pyom, adv_fe, adv_fn, adv_ft, var, velocity, masks, (pyom.dxtr, pyom.dytr, pyom.dztr), grid="t")
+
+@pyom_method
+def _adv_flux_superbee(pyom, adv_fe, adv_fn, adv_ft, var, velocity, masks, dxr, grid=None):
+    """
+    superbee fluxes along all axes for given face velocities, masks and reciprocal grid spacings
+
+    If grid is given, the velocity terms are taken from the cache of that grid (see
+    _cached_superbee_velocity) instead of being recomputed.
+    """
+    if grid is None:
+        terms = [_superbee_velocity(pyom, velocity[axis], dxr[axis], axis) for axis in range(3)]
+    else:
+        terms = _cached_superbee_velocity(pyom, grid, velocity, dxr)
+    adv_fe[1:-2, 2:-2, :] = _adv_superbee(pyom, terms[0], var, masks[0], 0)
+    adv_fn[2:-2, 1:-2, :] = _adv_superbee(pyom, terms[1], var, masks[1], 1)
+    adv_ft[2:-2, 2:-2, :-1] = _adv_superbee(pyom, terms[2], var, masks[2], 2)
+    adv_ft[:, :, -1] = 0.
+
+@pyom_method
+def _cached_superbee_velocity(pyom, grid, velocity, dxr):
+    """
+    Velocity terms (see _superbee_velocity) along all axes for the velocities of grid
+    ("t" or "w"). All tracers on a grid are advected with the same velocities during a
+    time step, so the terms are computed by the first call of each time step and
+    reused by the following ones. calculate_velocity_on_wgrid invalidates the terms
+    of the W grid.
+    """
+    step = (pyom.itt, pyom.tau)
+    cached = pyom._superbee_velocity_cache.get(grid)
+    if cached is None or cached[0] != step:
+        terms = [_superbee_velocity(pyom, velocity[axis], dxr[axis], axis) for axis in range(3)]
+        cached = pyom._superbee_velocity_cache[grid] = (step, terms)
+    return cached[1]
 
 @pyom_method
 def calculate_velocity_on_wgrid(pyom):
@@ -85,49 +177,49 @@ def calculate_velocity_on_wgrid(pyom):
     Note: this implementation is not strictly equal to the Fortran version. They only match
     if maskW has exactly one true value across each depth slice.
     """
+    pyom._superbee_velocity_cache.pop("w", None)
+
     # lateral advection velocities on W grid
-    pyom.u_wgrid[:,:,:-1] = pyom.u[:,:,1:,pyom.tau] * pyom.maskU[:,:,1:] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,1:] / pyom.dzw[np.newaxis,np.newaxis,:-1] \
-                          + pyom.u[:,:,:-1,pyom.tau] * pyom.maskU[:,:,:-1] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,:-1] / pyom.dzw[np.newaxis,np.newaxis,:-1]
-    pyom.v_wgrid[:,:,:-1] = pyom.v[:,:,1:,pyom.tau] * pyom.maskV[:,:,1:] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,1:] / pyom.dzw[np.newaxis,np.newaxis,:-1] \
-                          + pyom.v[:,:,:-1,pyom.tau] * pyom.maskV[:,:,:-1] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,:-1] / pyom.dzw[np.newaxis,np.newaxis,:-1]
-    pyom.u_wgrid[:,:,-1] = pyom.u[:,:,-1,pyom.tau] * pyom.maskU[:,:,-1] * 0.5 * pyom.dzt[-1:] / pyom.dzw[-1:]
-    pyom.v_wgrid[:,:,-1] = pyom.v[:,:,-1,pyom.tau] * pyom.maskV[:,:,-1] * 0.5 * pyom.dzt[-1:] / pyom.dzw[-1:]
+    pyom.u_wgrid[:,:,:-1] = pyom.u[:,:,1:,pyom.tau] * pyom.maskU[:,:,1:] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,1:] * pyom.dzwr[np.newaxis,np.newaxis,:-1] \
+                          + pyom.u[:,:,:-1,pyom.tau] * pyom.maskU[:,:,:-1] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,:-1] * pyom.dzwr[np.newaxis,np.newaxis,:-1]
+    pyom.v_wgrid[:,:,:-1] = pyom.v[:,:,1:,pyom.tau] * pyom.maskV[:,:,1:] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,1:] * pyom.dzwr[np.newaxis,np.newaxis,:-1] \
+                          + pyom.v[:,:,:-1,pyom.tau] * pyom.maskV[:,:,:-1] * 0.5 * pyom.dzt[np.newaxis,np.newaxis,:-1] * pyom.dzwr[np.newaxis,np.newaxis,:-1]
+    pyom.u_wgrid[:,:,-1] = pyom.u[:,:,-1,pyom.tau] * pyom.maskU[:,:,-1] * 0.5 * pyom.dzt[-1:] * pyom.dzwr[-1:]
+    pyom.v_wgrid[:,:,-1] = pyom.v[:,:,-1,pyom.tau] * pyom.maskV[:,:,-1] * 0.5 * pyom.dzt[-1:] * pyom.dzwr[-1:]
 
     # redirect velocity at bottom and at topography
-    pyom.u_wgrid[:,:,0] = pyom.u_wgrid[:,:,0] + pyom.u[:,:,0,pyom.tau] * pyom.maskU[:,:,0] * 0.5 * pyom.dzt[0:1] / pyom.dzw[0:1]
-    pyom.v_wgrid[:,:,0] = pyom.v_wgrid[:,:,0] + pyom.v[:,:,0,pyom.tau] * pyom.maskV[:,:,0] * 0.5 * pyom.dzt[0:1] / pyom.dzw[0:1]
+    pyom.u_wgrid[:,:,0] = pyom.u_wgrid[:,:,0] + pyom.u[:,:,0,pyom.tau] * pyom.maskU[:,:,0] * 0.5 * pyom.dzt[0:1] * pyom.dzwr[0:1]
+    pyom.v_wgrid[:,:,0] = pyom.v_wgrid[:,:,0] + pyom.v[:,:,0,pyom.tau] * pyom.maskV[:,:,0] * 0.5 * pyom.dzt[0:1] * pyom.dzwr[0:1]
     mask = pyom.maskW[:-1, :, :-1] * pyom.maskW[1:, :, :-1]
-    pyom.u_wgrid[:-1, :, 1:] += (pyom.u_wgrid[:-1, :, :-1] * pyom.dzw[np.newaxis, np.newaxis, :-1] / pyom.dzw[np.newaxis, np.newaxis, 1:]) * (1.-mask)
+    pyom.u_wgrid[:-1, :, 1:] += (pyom.u_wgrid[:-1, :, :-1] * pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.dzwr[np.newaxis, np.newaxis, 1:]) * (1.-mask)
     pyom.u_wgrid[:-1, :, :-1] *= mask
     mask = pyom.maskW[:, :-1, :-1] * pyom.maskW[:, 1:, :-1]
-    pyom.v_wgrid[:, :-1, 1:] += (pyom.v_wgrid[:, :-1, :-1] * pyom.dzw[np.newaxis, np.newaxis, :-1] / pyom.dzw[np.newaxis, np.newaxis, 1:]) * (1.-mask)
+    pyom.v_wgrid[:, :-1, 1:] += (pyom.v_wgrid[:, :-1, :-1] * pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.dzwr[np.newaxis, np.newaxis, 1:]) * (1.-mask)
     pyom.v_wgrid[:, :-1, :-1] *= mask
 
     # vertical advection velocity on W grid from continuity
     pyom.w_wgrid[:, :, 0] = 0.
     pyom.w_wgrid[1:, 1:, :] = np.cumsum(-pyom.dzw[np.newaxis, np.newaxis, :] * \
-                              ((pyom.u_wgrid[1:, 1:, :] - pyom.u_wgrid[:-1, 1:, :]) / (pyom.cost[np.newaxis, 1:, np.newaxis] * pyom.dxt[1:, np.newaxis, np.newaxis]) \
+                              ((pyom.u_wgrid[1:, 1:, :] - pyom.u_wgrid[:-1, 1:, :]) * (pyom.costr[np.newaxis, 1:, np.newaxis] * pyom.dxtr[1:, np.newaxis, np.newaxis]) \
                                + (pyom.cosu[np.newaxis, 1:, np.newaxis] * pyom.v_wgrid[1:, 1:, :] - pyom.cosu[np.newaxis, :-1, np.newaxis] * pyom.v_wgrid[1:, :-1, :]) \
-                                     / (pyom.cost[np.newaxis, 1:, np.newaxis] * pyom.dyt[np.newaxis, 1:, np.newaxis])), axis=2)
+                                     * (pyom.costr[np.newaxis, 1:, np.newaxis] * pyom.dytr[np.newaxis, 1:, np.newaxis])), axis=2)
 
 
 @pyom_method
 def adv_flux_superbee_wgrid(pyom,adv_fe,adv_fn,adv_ft,var):
     """
     Calculates advection of a tracer defined on Wgrid
+
+    var may have additional trailing axes, as for adv_flux_superbee
     """
-    maskUtr = np.zeros_like(adv_fe)
+    maskUtr = np.zeros_like(pyom.maskW)
     maskUtr[:-1, :, :] = pyom.maskW[1:, :, :] * pyom.maskW[:-1, :, :]
-    adv_fe[1:-2, 2:-2, :] = _adv_superbee(pyom, pyom.u_wgrid, var, maskUtr, pyom.dxt, 0)
-
-    maskVtr = np.zeros_like(adv_fn)
+    maskVtr = np.zeros_like(pyom.maskW)
     maskVtr[:, :-1, :] = pyom.maskW[:, 1:, :] * pyom.maskW[:, :-1, :]
-    adv_fn[2:-2, 1:-2, :] = _adv_superbee(pyom, pyom.v_wgrid, var, maskVtr, pyom.dyt, 1)
-
-    maskWtr = np.zeros_like(adv_ft)
+    maskWtr = np.zeros_like(pyom.maskW)
     maskWtr[:, :, :-1] = pyom.maskW[:, :, 1:] * pyom.maskW[:, :, :-1]
-    adv_ft[2:-2, 2:-2, :-1] = _adv_superbee(pyom, pyom.w_wgrid, var, maskWtr, pyom.dzw, 2)
-    adv_ft[..., -1] = 0.0
+    _adv_flux_superbee(pyom, adv_fe, adv_fn, adv_ft, var, (pyom.u_wgrid, pyom.v_wgrid, pyom.w_wgrid),
+                       (maskUtr, maskVtr, maskWtr), (pyom.dxtr, pyom.dytr, pyom.dzwr), grid="w")
 
 
 @pyom_method
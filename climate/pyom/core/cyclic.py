@@ -1,3 +1,9 @@
+import threading
+
+from .. import distributed
+
+MAX_TAG = 32000 # tags 1 to MAX_TAG are used for halo exchanges
+
 def setcyclic_x(array):
     """
     set cyclic boundary conditions on the first axis
@@ -7,10 +13,10 @@ def setcyclic_x(array):
 
 def setcyclic_p(array):
     """
-    set cyclic boundary conditions on the third axis
+    set cyclic boundary conditions on the third (wave angle) axis
     """
-    array[:,:,1] = array[:,:,-2]
-    array[:,:,-1] = array[:,:,2]
+    array[:,:,0] = array[:,:,-2]
+    array[:,:,-1] = array[:,:,1]
 
 def setcyclic_xp(array):
     """
@@ -18,3 +24,75 @@ def setcyclic_xp(array):
     """
     setcyclic_p(array)
     setcyclic_x(array)
+
+class BoundaryUpdate(object):
+    """
+    Ghost cell update of a batch of arrays that may still be in progress
+    (see :func:`start_boundary_update`)
+    """
+    def __init__(self, pyom, thread=None):
+        self._pyom = pyom
+        self._thread = thread
+        self.error = None
+
+    def wait(self):
+        """
+        block until all ghost cells are updated
+        """
+        if self._thread is None:
+            return
+        with self._pyom.timers["boundary"]:
+            self._thread.join()
+        self._thread = None
+        if self.error is not None:
+            raise self.error
+
+def start_boundary_update(pyom, *arrays):
+    """
+    start updating the ghost cells of all given arrays (see :func:`enforce_boundaries`)
+
+    In distributed runs, the halo exchange proceeds in the background until
+    :meth:`BoundaryUpdate.wait` is called on the returned object, so that
+    computations that neither modify nor read the halos of the arrays can overlap
+    with it.
+
+    Serial runs (``pyom.comm`` is None) update the ghost cells right away, so nothing
+    overlaps: the cyclic update only copies two slabs per array within memory, which
+    costs less than handing the work to a thread, and there is no communication
+    latency to hide.
+    """
+    if pyom.comm is None:
+        enforce_boundaries(pyom, *arrays)
+        return BoundaryUpdate(pyom)
+    with pyom.timers["boundary"]:
+        # all processes start updates in the same order, so the tags match
+        pyom.boundary_update_count += 1
+        tag = 1 + pyom.boundary_update_count % MAX_TAG
+        def exchange():
+            try:
+                distributed.exchange_overlap(pyom, *arrays, tag=tag)
+            except Exception as e:
+                update.error = e
+        thread = threading.Thread(target=exchange)
+        update = BoundaryUpdate(pyom, thread)
+        thread.start()
+    return update
+
+def enforce_boundaries(pyom, *arrays):
+    """
+    update ghost cells of all given arrays along the first two axes in one batch,
+    either from neighboring subdomains (distributed runs) or through cyclic
+    boundary conditions
+
+    In serial runs, the copies for all arrays are issued as one group without
+    flushing in between (the boundary timer does not flush either), so lazy
+    backends evaluate them together at the next flush of the flush policy. The
+    arrays do not share memory, so merging the copies into a single operation
+    would need an extra gather and scatter of all halos.
+    """
+    with pyom.timers["boundary"]:
+        if pyom.comm is not None:
+            distributed.exchange_overlap(pyom, *arrays)
+        elif pyom.enable_cyclic_x:
+            for array in arrays:
+                setcyclic_x(array)
@@ -107,7 +107,7 @@ def get_drhodp(pyom,salt_loc,temp_loc,press_loc):
     elif pyom.eq_of_state_type == 4:
         return nq3.nonlin3_eq_of_state_drhodp()
     elif pyom.eq_of_state_type == 5:
-        return gsw.gsw_drhodp(pyom,salt_loc,temp_loc,press_loc)
+        return gsw.gsw_drhodP(pyom,salt_loc,temp_loc,press_loc)
     else:
         raise ValueError('unknown equation of state')
 
@@ -146,3 +146,24 @@ def get_int_drhodS(pyom,salt_loc,temp_loc,press_loc):
         return -(1024.0/9.81)*gsw.gsw_dHdS(pyom,salt_loc,temp_loc,press_loc)
     else:
         raise ValueError('unknown equation of state')
+
+@pyom_method
+def get_eos(pyom,salt_loc,temp_loc,press_loc,quantities):
+    """
+    calculate several equation of state quantities as a function of temperature,
+    salinity and pressure in one pass
+
+    quantities is a sequence of names out of "rho", "dyn_enthalpy", "drhodT", "drhodS",
+    "drhodp", "int_drhodT" and "int_drhodS"; a tuple of the requested quantities is returned
+    in the same order. For the TEOS-10 equation of state, terms are shared between quantities.
+    """
+    getters = {"rho": get_rho, "dyn_enthalpy": get_dyn_enthalpy, "drhodT": get_drhodT, "drhodS": get_drhodS,
+               "drhodp": get_drhodp, "int_drhodT": get_int_drhodT, "int_drhodS": get_int_drhodS}
+    for quantity in quantities:
+        if quantity not in getters:
+            raise ValueError("unknown equation of state quantity {}".format(quantity))
+    if pyom.eq_of_state_type == 5:
+        gsw_names = {"drhodp": "drhodP", "int_drhodT": "dHdT", "int_drhodS": "dHdS"}
+        result = gsw.gsw_eos(pyom,salt_loc,temp_loc,press_loc,[gsw_names.get(q, q) for q in quantities])
+        return tuple(-(1024.0/9.81)*r if q in ("int_drhodT", "int_drhodS") else r for q, r in zip(quantities, result))
+    return tuple(getters[quantity](pyom,salt_loc,temp_loc,press_loc) for quantity in quantities)
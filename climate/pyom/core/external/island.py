@@ -26,7 +26,9 @@ def isleperim(pyom, kmt, boundary_map, iperm, jperm, iofs, nippts, imt, jmt, mni
     when no land points remain unassigned, land mass numbers are
     reduced by 1 and their perimeter ocean points relabelled accordingly
     """
-    pyom.flush() # sync before assigning values to numpy array boundary_map
+    # sync before assigning values to numpy array boundary_map, under every flush
+    # policy, as the perimeters are traced in plain Python
+    pyom.flush()
     boundary_map[...] = np.where(kmt > 0, ocean, land)
 
     """
@@ -10,28 +10,34 @@ except ImportError:
     has_pyamg = False
 
 from .. import cyclic
-from ... import pyom_method
+from ... import pyom_method, distributed
 
 @pyom_method
 def solve(pyom, rhs, sol, boundary_val=None):
     """
     Main solver for streamfunction. Solves a 2D Poisson equation. Uses either pyamg
-    or scipy.sparse.linalg linear solvers.
+    or scipy.sparse.linalg linear solvers. In distributed runs, the equation is either
+    gathered and solved on the first process, or solved by a distributed BiCGSTAB
+    (if ``distributed_poisson_solver`` is set).
 
     :param rhs: Right-hand side vector
     :param sol: Initial guess, gets overwritten with solution
     :param boundary_val: Array containing values to set on boundary elements. Defaults to `sol`.
     """
+    # the linear solvers work on NumPy data outside of the backend, so pending
+    # computations must be done under every flush policy
     pyom.flush()
-    if not solve.pyom or solve.pyom != id(pyom): # only initialize solver if parent object changes
-        if has_pyamg:
-            solve.linear_solver = _get_amg_solver(pyom)
+    solver_key = (id(pyom), id(pyom.comm))
+    if not solve.pyom or solve.pyom != solver_key: # only initialize solver if parent object changes
+        if pyom.comm is None:
+            solve.linear_solver = _get_serial_solver(pyom)
+        elif pyom.distributed_poisson_solver:
+            solve.linear_solver = _get_distributed_solver(pyom)
         else:
-            solve.linear_solver = _get_scipy_solver(pyom)
-        solve.pyom = id(pyom)
+            solve.linear_solver = _get_gathered_solver(pyom)
+        solve.pyom = solver_key
 
-    if pyom.enable_cyclic_x:
-        cyclic.setcyclic_x(sol)
+    cyclic.enforce_boundaries(pyom, sol)
 
     if boundary_val is None:
         boundary_val = sol
@@ -43,6 +49,96 @@ def solve(pyom, rhs, sol, boundary_val=None):
     sol[2:-2,2:-2] = linear_solution.reshape(pyom.nx+4,pyom.ny+4)[2:-2,2:-2]
 solve.pyom = None
 
+def _get_serial_solver(pyom):
+    if has_pyamg:
+        return _get_amg_solver(pyom)
+    return _get_scipy_solver(pyom)
+
+@pyom_method
+def _get_gathered_solver(pyom):
+    """
+    Solver that gathers the equation on the first process, solves it there,
+    and scatters the solution
+    """
+    dims = ("xt", "yt")
+    grid = {name: distributed.gather(pyom, getattr(pyom, name), pyom.variables[name].dims)
+            for name in ("hur", "hvr", "dxt", "dxu", "dyt", "dyu", "cost", "cosu")}
+    grid["boundary_mask"] = distributed.gather(pyom, pyom.boundary_mask, dims + ("isle",))
+    if pyom.comm.rank == 0:
+        global_solver = _get_serial_solver(distributed.GlobalView(pyom, grid))
+    def gathered_solver(rhs, x0):
+        rhs, x0 = distributed.gather(pyom, rhs, dims), distributed.gather(pyom, x0, dims)
+        solution = None
+        if pyom.comm.rank == 0:
+            solution = global_solver(rhs, x0).reshape(pyom.nx_global+4, pyom.ny_global+4)
+        return distributed.scatter(pyom, solution, dims)
+    return gathered_solver
+
+@pyom_method
+def _get_distributed_solver(pyom):
+    """
+    Jacobi-preconditioned BiCGSTAB operating on the subdomains, with global dot
+    products and halo exchanges in every operator application
+    """
+    z = np.prod(~pyom.boundary_mask, axis=2).astype(np.bool)[2:-2, 2:-2]
+    main_diag, east_diag, west_diag, north_diag, south_diag = (diag[2:-2, 2:-2] for diag in _poisson_stencil(pyom))
+    # boundary rows are identity
+    main_diag = np.where(z, main_diag, 1.)
+    east_diag, west_diag, north_diag, south_diag = (z * diag for diag in (east_diag, west_diag, north_diag, south_diag))
+    preconditioner = np.where(main_diag != 0., 1. / main_diag, 1.) * z
+
+    def apply_op(p):
+        """
+        preconditioned operator applied to the interior of p, which has valid halos
+        """
+        return preconditioner * (main_diag * p[2:-2, 2:-2] + east_diag * p[3:-1, 2:-2] + west_diag * p[1:-3, 2:-2] \
+                                 + north_diag * p[2:-2, 3:-1] + south_diag * p[2:-2, 1:-3])
+
+    def with_halo(interior):
+        # ghost cells at closed boundaries stay zero, since the solution is fixed there
+        p = np.zeros((pyom.nx+4, pyom.ny+4))
+        p[2:-2, 2:-2] = interior
+        cyclic.enforce_boundaries(pyom, p)
+        return p
+
+    def dot(a, b):
+        return distributed.global_sum(pyom, np.sum(a * b))
+
+    def distributed_solver(rhs, x0):
+        # ghost cells at closed boundaries are fixed to the right hand side
+        x = rhs.copy()
+        x[2:-2, 2:-2] = x0[2:-2, 2:-2]
+        cyclic.enforce_boundaries(pyom, x)
+        b = preconditioner * rhs[2:-2, 2:-2]
+        r = b - apply_op(x)
+        r_hat = r.copy()
+        tolerance = pyom.congr_epsilon * np.sqrt(dot(b, b))
+        rho = alpha = omega = 1.
+        v = np.zeros_like(r)
+        p = np.zeros_like(r)
+        for iteration in xrange(pyom.congr_max_iterations):
+            rho_new = dot(r_hat, r)
+            if rho_new == 0.:
+                break
+            p = r + (rho_new / rho) * (alpha / omega) * (p - omega * v)
+            v = apply_op(with_halo(p))
+            alpha = rho_new / dot(r_hat, v)
+            s = r - alpha * v
+            x[2:-2, 2:-2] += alpha * p
+            if np.sqrt(dot(s, s)) < tolerance:
+                break
+            t = apply_op(with_halo(s))
+            omega = dot(t, s) / dot(t, t)
+            x[2:-2, 2:-2] += omega * s
+            r = s - omega * t
+            if np.sqrt(dot(r, r)) < tolerance:
+                break
+            rho = rho_new
+        else:
+            warnings.warn("Streamfunction solver did not converge after {} iterations".format(pyom.congr_max_iterations))
+        return x
+    return distributed_solver
+
 @pyom_method
 def _get_scipy_solver(pyom):
     matrix = _assemble_poisson_matrix(pyom)
@@ -92,9 +188,10 @@ def _jacobi_preconditioner(pyom, matrix):
     return scipy.sparse.dia_matrix((Z.flatten(),0), shape=(Z.size,Z.size)).tocsr()
 
 @pyom_method
-def _assemble_poisson_matrix(pyom):
+def _poisson_stencil(pyom):
     """
-    Construct a sparse matrix based on the stencil for the 2D Poisson equation.
+    Coefficients of the 5-point stencil for the 2D Poisson equation (main, east, west,
+    north, and south diagonal).
     """
     # assemble diagonals
     main_diag = np.ones((pyom.nx+4, pyom.ny+4))
@@ -107,6 +204,14 @@ def _assemble_poisson_matrix(pyom):
     west_diag[2:-2, 2:-2] = pyom.hvr[2:-2, 2:-2] / pyom.dxu[2:-2, np.newaxis] / pyom.dxt[2:-2, np.newaxis] / pyom.cosu[np.newaxis, 2:-2]**2
     north_diag[2:-2, 2:-2] = pyom.hur[2:-2, 3:-1] / pyom.dyu[np.newaxis, 2:-2] / pyom.dyt[np.newaxis, 3:-1] * pyom.cost[np.newaxis, 3:-1] / pyom.cosu[np.newaxis, 2:-2]
     south_diag[2:-2, 2:-2] = pyom.hur[2:-2, 2:-2] / pyom.dyu[np.newaxis, 2:-2] / pyom.dyt[np.newaxis, 2:-2] * pyom.cost[np.newaxis, 2:-2] / pyom.cosu[np.newaxis, 2:-2]
+    return main_diag, east_diag, west_diag, north_diag, south_diag
+
+@pyom_method
+def _assemble_poisson_matrix(pyom):
+    """
+    Construct a sparse matrix based on the stencil for the 2D Poisson equation.
+    """
+    main_diag, east_diag, west_diag, north_diag, south_diag = _poisson_stencil(pyom)
     z = np.prod(np.invert(pyom.boundary_mask), axis=2) # used to enforce boundary conditions
     if pyom.enable_cyclic_x:
         # couple edges of the domain
@@ -5,6 +5,7 @@
       used for surface pressure or free surface
       method same as pressure method in MITgcm
 """
+import math
 import warnings
 
 from .. import cyclic
@@ -203,5 +204,5 @@ def fail(n, enable_congrad_verbose, estimated_error, congr_epsilon):
     print ' estimated error=',estimated_error,'/',congr_epsilon
     print ' iterations=',n
     # check for NaN
-    if np.isnan(estimated_error):
+    if math.isnan(estimated_error):
         raise RuntimeError("error is NaN, stopping integration")
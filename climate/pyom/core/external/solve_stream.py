@@ -40,9 +40,7 @@ def solve_streamfunction(pyom):
     fpx = np.sum((pyom.du[:,:,:,pyom.tau] + pyom.du_mix) * pyom.maskU * pyom.dzt, axis=(2,)) * pyom.hur
     fpy = np.sum((pyom.dv[:,:,:,pyom.tau] + pyom.dv_mix) * pyom.maskV * pyom.dzt, axis=(2,)) * pyom.hvr
 
-    if pyom.enable_cyclic_x:
-        cyclic.setcyclic_x(fpx)
-        cyclic.setcyclic_x(fpy)
+    cyclic.enforce_boundaries(pyom, fpx, fpy)
 
     forc = np.zeros((pyom.nx+4, pyom.ny+4))
     forc[2:-2, 2:-2] = (fpy[3:-1, 2:-2] - fpy[2:-2, 2:-2]) \
@@ -54,8 +52,7 @@ def solve_streamfunction(pyom):
     pyom.dpsi[:,:,pyom.taup1] = 2 * pyom.dpsi[:,:,pyom.tau] - pyom.dpsi[:,:,pyom.taum1] # first guess, we need three time levels here
     solve_poisson.solve(pyom, forc, pyom.dpsi[:,:,pyom.taup1])
 
-    if pyom.enable_cyclic_x:
-        cyclic.setcyclic_x(pyom.dpsi[:,:,pyom.taup1])
+    cyclic.enforce_boundaries(pyom, pyom.dpsi[:,:,pyom.taup1])
 
     if pyom.nisle > 1:
         # calculate island integrals of forcing, keep psi constant on island 1
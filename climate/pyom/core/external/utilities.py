@@ -1,4 +1,4 @@
-from ... import pyom_method
+from ... import pyom_method, distributed
 
 @pyom_method
 def line_integrals(pyom,uloc,vloc,kind="same"):
@@ -31,11 +31,14 @@ def line_integrals(pyom,uloc,vloc,kind="same"):
                                 + uloc[1:-2,2:-1,:] \
                                     * pyom.dxu[1:-2, np.newaxis, np.newaxis] \
                                     * pyom.cost[np.newaxis,2:-1,np.newaxis]
-    east = np.sum(east[s1] * (pyom.line_dir_east_mask[1:-2,1:-2] & pyom.boundary_mask[1:-2,1:-2])[s2], axis=(0,1))
-    west = np.sum(west[s1] * (pyom.line_dir_west_mask[1:-2,1:-2] & pyom.boundary_mask[1:-2,1:-2])[s2], axis=(0,1))
-    north = np.sum(north[s1] * (pyom.line_dir_north_mask[1:-2,1:-2] & pyom.boundary_mask[1:-2,1:-2])[s2], axis=(0,1))
-    south = np.sum(south[s1] * (pyom.line_dir_south_mask[1:-2,1:-2] & pyom.boundary_mask[1:-2,1:-2])[s2], axis=(0,1))
-    return east + west + north + south
+    # in distributed runs, only count line elements owned by this process
+    owned = distributed.owned_region(pyom, offset=1)
+    boundary_mask = pyom.boundary_mask[1:-2,1:-2][owned]
+    east = np.sum(east[owned][s1] * (pyom.line_dir_east_mask[1:-2,1:-2][owned] & boundary_mask)[s2], axis=(0,1))
+    west = np.sum(west[owned][s1] * (pyom.line_dir_west_mask[1:-2,1:-2][owned] & boundary_mask)[s2], axis=(0,1))
+    north = np.sum(north[owned][s1] * (pyom.line_dir_north_mask[1:-2,1:-2][owned] & boundary_mask)[s2], axis=(0,1))
+    south = np.sum(south[owned][s1] * (pyom.line_dir_south_mask[1:-2,1:-2][owned] & boundary_mask)[s2], axis=(0,1))
+    return distributed.global_sum(pyom, east + west + north + south)
 
 @pyom_method
 def apply_op(pyom, cf, p1, res):
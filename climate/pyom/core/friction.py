@@ -16,16 +16,16 @@ def explicit_vert_friction(pyom):
     """
     fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[2:-1, 1:-2, :-1])
     pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.u[1:-2, 1:-2, 1:, pyom.tau] - pyom.u[1:-2, 1:-2, :-1, pyom.tau]) \
-                                     / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
+                                     * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
     pyom.flux_top[:,:,-1] = 0.0
-    pyom.du_mix[:,:,0] = pyom.flux_top[:,:,0] / pyom.dzt[0] * pyom.maskU[:,:,0]
-    pyom.du_mix[:,:,1:] = (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) / pyom.dzt[1:] * pyom.maskU[:,:,1:]
+    pyom.du_mix[:,:,0] = pyom.flux_top[:,:,0] * pyom.dztr[0] * pyom.maskU[:,:,0]
+    pyom.du_mix[:,:,1:] = (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) * pyom.dztr[1:] * pyom.maskU[:,:,1:]
 
     """
     diagnose dissipation by vertical friction of zonal momentum
     """
     diss[1:-2, 1:-2, :-1] = (pyom.u[1:-2, 1:-2, 1:, pyom.tau] - pyom.u[1:-2, 1:-2, :-1, pyom.tau]) \
-                            * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[np.newaxis, np.newaxis, :-1]
+                            * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[np.newaxis, np.newaxis, :-1]
     diss[:,:,pyom.nz-1] = 0.0
     diss[...] = numerics.ugrid_to_tgrid(pyom,diss)
     pyom.K_diss_v += diss
@@ -35,18 +35,18 @@ def explicit_vert_friction(pyom):
     """
     fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[1:-2, 2:-1, :-1])
     pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.v[1:-2, 1:-2, 1:, pyom.tau] - pyom.v[1:-2, 1:-2, :-1, pyom.tau]) \
-                                     / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskV[1:-2, 1:-2, 1:] \
+                                     * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskV[1:-2, 1:-2, 1:] \
                                      * pyom.maskV[1:-2, 1:-2, :-1]
     pyom.flux_top[:,:,-1] = 0.0
     pyom.dv_mix[:,:,1:] = (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) \
-                          / pyom.dzt[np.newaxis, np.newaxis, 1:] * pyom.maskV[:, :, 1:]
-    pyom.dv_mix[:,:,0] = pyom.flux_top[:,:,0] / pyom.dzt[0] * pyom.maskV[:,:,0]
+                          * pyom.dztr[np.newaxis, np.newaxis, 1:] * pyom.maskV[:, :, 1:]
+    pyom.dv_mix[:,:,0] = pyom.flux_top[:,:,0] * pyom.dztr[0] * pyom.maskV[:,:,0]
 
     """
     diagnose dissipation by vertical friction of meridional momentum
     """
     diss[1:-2, 1:-2, :-1] = (pyom.v[1:-2, 1:-2, 1:, pyom.tau] - pyom.v[1:-2, 1:-2, :-1, pyom.tau]) \
-                 * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[np.newaxis, np.newaxis, :-1]
+                 * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[np.newaxis, np.newaxis, :-1]
     diss[:,:,-1] = 0.0
     diss[...] = numerics.vgrid_to_tgrid(pyom,diss)
     pyom.K_diss_v += diss
@@ -58,12 +58,12 @@ def explicit_vert_friction(pyom):
         fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[1:-2, 1:-2, 1:])
         pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.w[1:-2, 1:-2, 1:, pyom.tau] \
                                                 - pyom.w[1:-2, 1:-2, :-1, pyom.tau]) \
-                                         / pyom.dzw[np.newaxis, np.newaxis, 1:] \
+                                         * pyom.dzwr[np.newaxis, np.newaxis, 1:] \
                                          * pyom.maskW[1:-2, 1:-2, 1:] * pyom.maskW[1:-2, 1:-2, :-1]
         pyom.flux_top[:,:,-1] = 0.0
         pyom.dw_mix[:,:,1:] = (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) \
-                              / pyom.dzw[np.newaxis, np.newaxis, 1:] * pyom.maskW[:,:,1:]
-        pyom.dw_mix[:,:,0] = pyom.flux_top[:,:,0] / pyom.dzw[0] * pyom.maskW[:,:,0]
+                              * pyom.dzwr[np.newaxis, np.newaxis, 1:] * pyom.maskW[:,:,1:]
+        pyom.dw_mix[:,:,0] = pyom.flux_top[:,:,0] * pyom.dzwr[0] * pyom.maskW[:,:,0]
 
         """
         diagnose dissipation by vertical friction of vertical momentum
@@ -88,12 +88,12 @@ def implicit_vert_friction(pyom):
     """
     kss = np.maximum(pyom.kbot[1:-2, 1:-2], pyom.kbot[2:-1, 1:-2]) - 1
     fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[2:-1, 1:-2, :-1])
-    delta[:,:,:-1] = pyom.dt_mom / pyom.dzw[:-1] * fxa * pyom.maskU[1:-2,1:-2,1:] * pyom.maskU[1:-2,1:-2,:-1]
-    a_tri[:,:, 1:] = -delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,1:]
-    b_tri[:,:, 1:] = 1 + delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,1:]
-    b_tri[:,:, 1:-1] += delta[:,:,1:-1] / pyom.dzt[np.newaxis,np.newaxis,1:-1]
-    b_tri_edge = 1 + delta / pyom.dzt[np.newaxis,np.newaxis,:]
-    c_tri[...] = -delta / pyom.dzt[np.newaxis,np.newaxis,:]
+    delta[:,:,:-1] = pyom.dt_mom * pyom.dzwr[:-1] * fxa * pyom.maskU[1:-2,1:-2,1:] * pyom.maskU[1:-2,1:-2,:-1]
+    a_tri[:,:, 1:] = -delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,1:]
+    b_tri[:,:, 1:] = 1 + delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,1:]
+    b_tri[:,:, 1:-1] += delta[:,:,1:-1] * pyom.dztr[np.newaxis,np.newaxis,1:-1]
+    b_tri_edge = 1 + delta * pyom.dztr[np.newaxis,np.newaxis,:]
+    c_tri[...] = -delta * pyom.dztr[np.newaxis,np.newaxis,:]
     d_tri[...] = pyom.u[1:-2,1:-2,:,pyom.tau]
     res, mask = utilities.solve_implicit(pyom, kss, a_tri, b_tri, c_tri, d_tri, b_edge=b_tri_edge)
     pyom.u[1:-2,1:-2,:,pyom.taup1] = np.where(mask, res, pyom.u[1:-2,1:-2,:,pyom.taup1])
@@ -105,9 +105,9 @@ def implicit_vert_friction(pyom):
     """
     fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[2:-1, 1:-2, :-1])
     pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.u[1:-2, 1:-2, 1:, pyom.taup1] - pyom.u[1:-2, 1:-2, :-1, pyom.taup1]) \
-                                    / pyom.dzw[:-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
+                                    * pyom.dzwr[:-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
     diss[1:-2, 1:-2, :-1] = (pyom.u[1:-2, 1:-2, 1:, pyom.tau] - pyom.u[1:-2, 1:-2, :-1, pyom.tau]) \
-                            * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[:-1]
+                            * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[:-1]
     diss[:,:,-1] = 0.0
     diss[...] = numerics.ugrid_to_tgrid(pyom,diss)
     pyom.K_diss_v += diss
@@ -117,12 +117,12 @@ def implicit_vert_friction(pyom):
     """
     kss = np.maximum(pyom.kbot[1:-2, 1:-2], pyom.kbot[1:-2, 2:-1]) - 1
     fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[1:-2, 2:-1, :-1])
-    delta[:,:,:-1] = pyom.dt_mom / pyom.dzw[np.newaxis,np.newaxis,:-1] * fxa * pyom.maskV[1:-2,1:-2,1:] * pyom.maskV[1:-2,1:-2,:-1]
-    a_tri[:,:,1:] = -delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,1:]
-    b_tri[:,:,1:] = 1 + delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,1:]
-    b_tri[:,:,1:-1] += delta[:,:,1:-1] / pyom.dzt[np.newaxis,np.newaxis,1:-1]
-    b_tri_edge = 1 + delta / pyom.dzt[np.newaxis,np.newaxis,:]
-    c_tri[:,:,:-1] = -delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,:-1]
+    delta[:,:,:-1] = pyom.dt_mom * pyom.dzwr[np.newaxis,np.newaxis,:-1] * fxa * pyom.maskV[1:-2,1:-2,1:] * pyom.maskV[1:-2,1:-2,:-1]
+    a_tri[:,:,1:] = -delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,1:]
+    b_tri[:,:,1:] = 1 + delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,1:]
+    b_tri[:,:,1:-1] += delta[:,:,1:-1] * pyom.dztr[np.newaxis,np.newaxis,1:-1]
+    b_tri_edge = 1 + delta * pyom.dztr[np.newaxis,np.newaxis,:]
+    c_tri[:,:,:-1] = -delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,:-1]
     c_tri[:,:,-1] = 0.
     d_tri[...] = pyom.v[1:-2,1:-2,:,pyom.tau]
     res, mask = utilities.solve_implicit(pyom, kss, a_tri, b_tri, c_tri, d_tri, b_edge=b_tri_edge)
@@ -134,22 +134,22 @@ def implicit_vert_friction(pyom):
     """
     fxa = 0.5*(pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[1:-2, 2:-1, :-1])
     pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.v[1:-2, 1:-2, 1:, pyom.taup1] - pyom.v[1:-2, 1:-2, :-1, pyom.taup1]) \
-            / pyom.dzw[:-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
-    diss[1:-2, 1:-2, :-1] = (pyom.v[1:-2, 1:-2, 1:, pyom.tau] - pyom.v[1:-2, 1:-2, :-1, pyom.tau]) * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[:-1]
+            * pyom.dzwr[:-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
+    diss[1:-2, 1:-2, :-1] = (pyom.v[1:-2, 1:-2, 1:, pyom.tau] - pyom.v[1:-2, 1:-2, :-1, pyom.tau]) * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[:-1]
     diss[:,:,-1] = 0.0
     diss = numerics.vgrid_to_tgrid(pyom,diss)
     pyom.K_diss_v += diss
 
     if not pyom.enable_hydrostatic:
         kss = pyom.kbot[2:-2, 2:-2] - 1
-        delta[:-1,:-1,:-1] = pyom.dt_mom / pyom.dzt[np.newaxis,np.newaxis,:-1] * 0.5 * (pyom.kappaM[2:-2,2:-2,:-1] + pyom.kappaM[2:-2,2:-2,1:])
+        delta[:-1,:-1,:-1] = pyom.dt_mom * pyom.dztr[np.newaxis,np.newaxis,:-1] * 0.5 * (pyom.kappaM[2:-2,2:-2,:-1] + pyom.kappaM[2:-2,2:-2,1:])
         delta[:-1,:-1,-1] = 0.
-        a_tri[:-1,:-1,1:-1] = -delta[:-1,:-1,:-2] / pyom.dzw[np.newaxis,np.newaxis,1:-1]
+        a_tri[:-1,:-1,1:-1] = -delta[:-1,:-1,:-2] * pyom.dzwr[np.newaxis,np.newaxis,1:-1]
         a_tri[:-1,:-1,-1] = 0.
-        b_tri_edge = 1 + delta[:-1,:-1] / pyom.dzw[np.newaxis,np.newaxis,:]
-        b_tri[:-1,:-1,1:] = 1 + delta[:-1,:-1,:-1] / pyom.dzw[np.newaxis,np.newaxis,:-1]
-        b_tri[:-1,:-1,1:-1] += delta[:-1,:-1,1:-1] / pyom.dzw[np.newaxis,np.newaxis,1:-1]
-        c_tri[:-1,:-1,:-1] = - delta[:-1,:-1,:-1] / pyom.dzw[np.newaxis,np.newaxis,:-1]
+        b_tri_edge = 1 + delta[:-1,:-1] * pyom.dzwr[np.newaxis,np.newaxis,:]
+        b_tri[:-1,:-1,1:] = 1 + delta[:-1,:-1,:-1] * pyom.dzwr[np.newaxis,np.newaxis,:-1]
+        b_tri[:-1,:-1,1:-1] += delta[:-1,:-1,1:-1] * pyom.dzwr[np.newaxis,np.newaxis,1:-1]
+        c_tri[:-1,:-1,:-1] = - delta[:-1,:-1,:-1] * pyom.dzwr[np.newaxis,np.newaxis,:-1]
         c_tri[:-1,:-1,-1] = 0.
         d_tri[:-1,:-1] = pyom.w[2:-2,2:-2,:,pyom.tau]
         res, mask = utilities.solve_implicit(pyom, kss, a_tri[:-1,:-1], b_tri[:-1,:-1], c_tri[:-1,:-1], d_tri[:-1,:-1], b_edge=b_tri_edge)
@@ -161,8 +161,8 @@ def implicit_vert_friction(pyom):
         """
         fxa = 0.5 * (pyom.kappaM[1:-2, 1:-2, :-1] + pyom.kappaM[1:-2,1:-2,1:])
         pyom.flux_top[1:-2,1:-2,:-1] = fxa * (pyom.w[1:-2,1:-2,1:,pyom.taup1] - pyom.w[1:-2,1:-2,:-1,pyom.taup1]) \
-                / pyom.dzt[1:] * pyom.maskW[1:-2, 1:-2, 1:] * pyom.maskW[1:-2, 1:-2, :-1]
-        diss[1:-2, 1:-2, :-1] = (pyom.w[1:-2,1:-2,1:,pyom.tau] - pyom.w[1:-2,1:-2,:-1,pyom.tau]) * pyom.flux_top[1:-2,1:-2,:-1] / pyom.dzt[1:]
+                * pyom.dztr[1:] * pyom.maskW[1:-2, 1:-2, 1:] * pyom.maskW[1:-2, 1:-2, :-1]
+        diss[1:-2, 1:-2, :-1] = (pyom.w[1:-2,1:-2,1:,pyom.tau] - pyom.w[1:-2,1:-2,:-1,pyom.tau]) * pyom.flux_top[1:-2,1:-2,:-1] * pyom.dztr[1:]
         diss[:,:,-1] = 0.0
         pyom.K_diss_v += diss
 
@@ -244,7 +244,7 @@ def quadratic_bottom_friction(pyom):
         + pyom.maskV[2:-1,2:-2,:] * pyom.v[2:-1,2:-2,:,pyom.tau]**2 + pyom.maskV[2:-1,1:-3,:] * pyom.v[2:-1,1:-3,:,pyom.tau]**2
     fxa = np.sqrt(pyom.u[1:-2,2:-2,:,pyom.tau]**2 + 0.25 * fxa)
     aloc = pyom.maskU[1:-2,2:-2,:] * pyom.r_quad_bot * pyom.u[1:-2,2:-2,:,pyom.tau] \
-                             * fxa / pyom.dzt[np.newaxis, np.newaxis, :] * mask
+                             * fxa * pyom.dztr[np.newaxis, np.newaxis, :] * mask
     pyom.du_mix[1:-2,2:-2,:] += -aloc
 
     if pyom.enable_conserve_energy:
@@ -258,7 +258,7 @@ def quadratic_bottom_friction(pyom):
         + pyom.maskU[2:-2,2:-1,:] * pyom.u[2:-2,2:-1,:,pyom.tau]**2 + pyom.maskU[1:-3,2:-1,:] * pyom.u[1:-3,2:-1,:,pyom.tau]**2
     fxa = np.sqrt(pyom.v[2:-2,1:-2,:,pyom.tau]**2 + 0.25 * fxa)
     aloc = pyom.maskV[2:-2,1:-2,:] * pyom.r_quad_bot * pyom.v[2:-2,1:-2,:,pyom.tau] \
-                             * fxa / pyom.dzt[np.newaxis, np.newaxis, :] * mask
+                             * fxa * pyom.dztr[np.newaxis, np.newaxis, :] * mask
     pyom.dv_mix[2:-2,1:-2,:] += -aloc
 
     if pyom.enable_conserve_energy:
@@ -283,15 +283,15 @@ def harmonic_friction(pyom):
     if pyom.enable_hor_friction_cos_scaling:
         fxa = pyom.cost**pyom.hor_friction_cosPower
         pyom.flux_east[:-1] = pyom.A_h * fxa[np.newaxis,:,np.newaxis] * (pyom.u[1:,:,:,pyom.tau] - pyom.u[:-1,:,:,pyom.tau]) \
-                / (pyom.cost * pyom.dxt[1:, np.newaxis])[:,:,np.newaxis] * pyom.maskU[1:] * pyom.maskU[:-1]
+                * (pyom.costr * pyom.dxtr[1:, np.newaxis])[:,:,np.newaxis] * pyom.maskU[1:] * pyom.maskU[:-1]
         fxa = pyom.cosu**pyom.hor_friction_cosPower
         pyom.flux_north[:,:-1] = pyom.A_h * fxa[np.newaxis,:-1,np.newaxis] * (pyom.u[:,1:,:,pyom.tau] - pyom.u[:,:-1,:,pyom.tau]) \
-                / pyom.dyu[np.newaxis,:-1,np.newaxis] * pyom.maskU[:,1:] * pyom.maskU[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
+                * pyom.dyur[np.newaxis,:-1,np.newaxis] * pyom.maskU[:,1:] * pyom.maskU[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
     else:
         pyom.flux_east[:-1,:,:] = pyom.A_h * (pyom.u[1:,:,:,pyom.tau] - pyom[:-1,:,:,pyom.tau]) \
-                / (pyom.cost * pyom.dxt[1:, np.newaxis])[:,:,np.newaxis] * pyom.maskU[1:] * pyom.maskU[:-1]
+                * (pyom.costr * pyom.dxtr[1:, np.newaxis])[:,:,np.newaxis] * pyom.maskU[1:] * pyom.maskU[:-1]
         pyom.flux_north[:,:-1,:] = pyom.A_h * (pyom.u[:,1:,:,pyom.tau] - pyom.u[:,:-1,:,pyom.tau]) \
-                / pyom.dyu[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:] * pyom.maskU[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
+                * pyom.dyur[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:] * pyom.maskU[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
 
@@ -299,9 +299,9 @@ def harmonic_friction(pyom):
     update tendency
     """
     pyom.du_mix[2:-2, 2:-2, :] += pyom.maskU[2:-2,2:-2] * ((pyom.flux_east[2:-2,2:-2] - pyom.flux_east[1:-3,2:-2]) \
-                                                            / (pyom.cost[2:-2] * pyom.dxu[2:-2, np.newaxis])[:,:,np.newaxis] \
+                                                            * (pyom.costr[2:-2] * pyom.dxur[2:-2, np.newaxis])[:,:,np.newaxis] \
                                                         + (pyom.flux_north[2:-2,2:-2] - pyom.flux_north[2:-2,1:-3]) \
-                                                            / (pyom.cost[2:-2] * pyom.dyt[2:-2])[np.newaxis, :, np.newaxis])
+                                                            * (pyom.costr[2:-2] * pyom.dytr[2:-2])[np.newaxis, :, np.newaxis])
 
     if pyom.enable_conserve_energy:
         """
@@ -309,10 +309,10 @@ def harmonic_friction(pyom):
         """
         diss[1:-2, 2:-2] = 0.5*((pyom.u[2:-1,2:-2,:,pyom.tau] - pyom.u[1:-2,2:-2,:,pyom.tau]) * pyom.flux_east[1:-2,2:-2] \
                 + (pyom.u[1:-2,2:-2,:,pyom.tau] - pyom.u[:-3,2:-2,:,pyom.tau]) * pyom.flux_east[:-3,2:-2]) \
-                    / (pyom.cost[2:-2] * pyom.dxu[1:-2,np.newaxis])[:,:,np.newaxis]\
+                    * (pyom.costr[2:-2] * pyom.dxur[1:-2,np.newaxis])[:,:,np.newaxis]\
                 + 0.5*((pyom.u[1:-2,3:-1,:,pyom.tau] - pyom.u[1:-2,2:-2,:,pyom.tau]) * pyom.flux_north[1:-2,2:-2] \
                 + (pyom.u[1:-2,2:-2,:,pyom.tau] - pyom.u[1:-2,1:-3,:,pyom.tau]) * pyom.flux_north[1:-2,1:-3]) \
-                    / (pyom.cost[2:-2] * pyom.dyt[2:-2])[np.newaxis,:,np.newaxis]
+                    * (pyom.costr[2:-2] * pyom.dytr[2:-2])[np.newaxis,:,np.newaxis]
         pyom.K_diss_h[...] = 0.
         pyom.K_diss_h[...] = numerics.calc_diss(pyom,diss,pyom.K_diss_h,'U')
 
@@ -322,15 +322,15 @@ def harmonic_friction(pyom):
     if pyom.enable_hor_friction_cos_scaling:
         fxa = (pyom.cosu ** pyom.hor_friction_cosPower) * np.ones(pyom.nx+3)[:,np.newaxis]
         pyom.flux_east[:-1] = pyom.A_h * fxa[:, :, np.newaxis] * (pyom.v[1:,:,:,pyom.tau] - pyom.v[:-1,:,:,pyom.tau]) \
-                / (pyom.cosu * pyom.dxu[:-1, np.newaxis])[:,:,np.newaxis] * pyom.maskV[1:] * pyom.maskV[:-1]
+                * (pyom.cosur * pyom.dxur[:-1, np.newaxis])[:,:,np.newaxis] * pyom.maskV[1:] * pyom.maskV[:-1]
         fxa = (pyom.cost[1:] ** pyom.hor_friction_cosPower) * np.ones(pyom.nx+4)[:, np.newaxis]
         pyom.flux_north[:,:-1] = pyom.A_h * fxa[:,:,np.newaxis] * (pyom.v[:,1:,:,pyom.tau] - pyom.v[:,:-1,:,pyom.tau]) \
-                / pyom.dyt[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis,1:,np.newaxis] * pyom.maskV[:,:-1] * pyom.maskV[:,1:]
+                * pyom.dytr[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis,1:,np.newaxis] * pyom.maskV[:,:-1] * pyom.maskV[:,1:]
     else:
         pyom.flux_east[:-1] = pyom.A_h * (pyom.v[1:,:,:,pyom.tau] - pyom.v[:-1,:,:,pyom.tau]) \
-                / (pyom.cosu * pyom.dxu[:-1, np.newaxis])[:,:,np.newaxis] * pyom.maskV[1:] * pyom.maskV[:-1]
+                * (pyom.cosur * pyom.dxur[:-1, np.newaxis])[:,:,np.newaxis] * pyom.maskV[1:] * pyom.maskV[:-1]
         pyom.flux_north[:,:-1] = pyom.A_h * (pyom.v[:,1:,:,pyom.tau] - pyom.v[:,:-1,:,pyom.tau]) \
-                / pyom.dyt[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis,1:,np.newaxis] * pyom.maskV[:,:-1] * pyom.maskV[:,1:]
+                * pyom.dytr[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis,1:,np.newaxis] * pyom.maskV[:,:-1] * pyom.maskV[:,1:]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
 
@@ -338,9 +338,9 @@ def harmonic_friction(pyom):
     update tendency
     """
     pyom.dv_mix[2:-2,2:-2] += pyom.maskV[2:-2,2:-2] * ((pyom.flux_east[2:-2,2:-2] - pyom.flux_east[1:-3,2:-2]) \
-                                / (pyom.cosu[2:-2] * pyom.dxt[2:-2,np.newaxis])[:,:,np.newaxis] \
+                                * (pyom.cosur[2:-2] * pyom.dxtr[2:-2,np.newaxis])[:,:,np.newaxis] \
                             + (pyom.flux_north[2:-2,2:-2] - pyom.flux_north[2:-2,1:-3]) \
-                                / (pyom.dyu[2:-2] * pyom.cosu[2:-2])[np.newaxis,:,np.newaxis])
+                                * (pyom.dyur[2:-2] * pyom.cosur[2:-2])[np.newaxis,:,np.newaxis])
 
     if pyom.enable_conserve_energy:
         """
@@ -348,10 +348,10 @@ def harmonic_friction(pyom):
         """
         diss[2:-2,1:-2] = 0.5 * ((pyom.v[3:-1,1:-2,:,pyom.tau] - pyom.v[2:-2,1:-2,:,pyom.tau]) * pyom.flux_east[2:-2,1:-2]\
                 + (pyom.v[2:-2,1:-2,:,pyom.tau] - pyom.v[1:-3,1:-2,:,pyom.tau]) * pyom.flux_east[1:-3,1:-2]) \
-                / (pyom.cosu[1:-2] * pyom.dxt[2:-2,np.newaxis])[:,:,np.newaxis] \
+                * (pyom.cosur[1:-2] * pyom.dxtr[2:-2,np.newaxis])[:,:,np.newaxis] \
                 + 0.5*((pyom.v[2:-2,2:-1,:,pyom.tau] - pyom.v[2:-2,1:-2,:,pyom.tau]) * pyom.flux_north[2:-2,1:-2] \
                 + (pyom.v[2:-2,1:-2,:,pyom.tau] - pyom.v[2:-2,:-3,:,pyom.tau]) * pyom.flux_north[2:-2,:-3]) \
-                / (pyom.cosu[1:-2] * pyom.dyu[1:-2])[np.newaxis,:,np.newaxis]
+                * (pyom.cosur[1:-2] * pyom.dyur[1:-2])[np.newaxis,:,np.newaxis]
         pyom.K_diss_h[...] = numerics.calc_diss(pyom,diss,pyom.K_diss_h,'V')
 
     if not pyom.enable_hydrostatic:
@@ -359,9 +359,9 @@ def harmonic_friction(pyom):
             raise NotImplementedError("scaling of lateral friction for vertical velocity not implemented")
 
         pyom.flux_east[:-1] = pyom.A_h * (pyom.w[1:,:,:,pyom.tau] - pyom.w[:-1,:,:,pyom.tau]) \
-                / (pyom.cost * pyom.dxu[:,np.newaxis])[:,:,np.newaxis] * pyom.maskW[1:] * pyom.maskW[:-1]
+                * (pyom.costr * pyom.dxur[:,np.newaxis])[:,:,np.newaxis] * pyom.maskW[1:] * pyom.maskW[:-1]
         pyom.flux_north[:,:-1] = pyom.A_h * (pyom.w[:,1:,:,pyom.tau] - pyom.w[:,:-1,:,pyom.tau]) \
-                / pyom.dyu[np.newaxis,:-1,np.newaxis] * pyom.maskW[:,1:] * pyom.maskW[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
+                * pyom.dyur[np.newaxis,:-1,np.newaxis] * pyom.maskW[:,1:] * pyom.maskW[:,:-1] * pyom.cosu[np.newaxis,:-1,np.newaxis]
         pyom.flux_east[-1,:,:] = 0.
         pyom.flux_north[:,-1,:] = 0.
 
@@ -369,9 +369,9 @@ def harmonic_friction(pyom):
         update tendency
         """
         pyom.dw_mix[2:-2,2:-2] += pyom.maskW[2:-2,2:-2]*((pyom.flux_east[2:-2,2:-2] - pyom.flux_east[1:-3,2:-2]) \
-                / (pyom.cost[2:-2] * pyom.dxt[2:-2,np.newaxis])[:,:,np.newaxis] \
+                * (pyom.costr[2:-2] * pyom.dxtr[2:-2,np.newaxis])[:,:,np.newaxis] \
                 + (pyom.flux_north[2:-2,2:-2] - pyom.flux_north[2:-2,1:-3]) \
-                / (pyom.dyt[2:-2] * pyom.cost[2:-2])[np.newaxis,:,np.newaxis])
+                * (pyom.dytr[2:-2] * pyom.costr[2:-2])[np.newaxis,:,np.newaxis])
 
         """
         diagnose dissipation by lateral friction
@@ -393,25 +393,25 @@ def biharmonic_friction(pyom):
     Zonal velocity
     """
     pyom.flux_east[:-1,:,:] = fxa * (pyom.u[1:,:,:,pyom.tau] - pyom.u[:-1,:,:,pyom.tau]) \
-                            / (pyom.cost[np.newaxis, :, np.newaxis] * pyom.dxt[1:, np.newaxis, np.newaxis]) \
+                            * (pyom.costr[np.newaxis, :, np.newaxis] * pyom.dxtr[1:, np.newaxis, np.newaxis]) \
                             * pyom.maskU[1:,:,:] * pyom.maskU[:-1,:,:]
     pyom.flux_north[:,:-1,:] = fxa * (pyom.u[:,1:,:,pyom.tau] - pyom.u[:,:-1,:,pyom.tau]) \
-                             / pyom.dyu[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:,:] \
+                             * pyom.dyur[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:,:] \
                              * pyom.maskU[:,:-1,:] * pyom.cosu[np.newaxis, :-1, np.newaxis]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
 
     del2 = np.zeros((pyom.nx+4, pyom.ny+4, pyom.nz))
     del2[1:,1:,:] = (pyom.flux_east[1:,1:,:] - pyom.flux_east[:-1,1:,:]) \
-                        / (pyom.cost[np.newaxis, 1:, np.newaxis] * pyom.dxu[1:, np.newaxis, np.newaxis]) \
+                        * (pyom.costr[np.newaxis, 1:, np.newaxis] * pyom.dxur[1:, np.newaxis, np.newaxis]) \
                   + (pyom.flux_north[1:,1:,:] - pyom.flux_north[1:,:-1,:]) \
-                        / (pyom.cost[np.newaxis, 1:, np.newaxis] * pyom.dyt[np.newaxis, 1:, np.newaxis])
+                        * (pyom.costr[np.newaxis, 1:, np.newaxis] * pyom.dytr[np.newaxis, 1:, np.newaxis])
 
     pyom.flux_east[:-1,:,:] = fxa * (del2[1:,:,:] - del2[:-1,:,:]) \
-                            / (pyom.cost[np.newaxis, :, np.newaxis] * pyom.dxt[1:, np.newaxis, np.newaxis]) \
+                            * (pyom.costr[np.newaxis, :, np.newaxis] * pyom.dxtr[1:, np.newaxis, np.newaxis]) \
                             * pyom.maskU[1:,:,:] * pyom.maskU[:-1,:,:]
     pyom.flux_north[:,:-1,:] = fxa * (del2[:,1:,:] - del2[:,:-1,:]) \
-                             / pyom.dyu[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:,:] \
+                             * pyom.dyur[np.newaxis, :-1, np.newaxis] * pyom.maskU[:,1:,:] \
                              * pyom.maskU[:,:-1,:] * pyom.cosu[np.newaxis, :-1, np.newaxis]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
@@ -420,23 +420,21 @@ def biharmonic_friction(pyom):
     update tendency
     """
     pyom.du_mix[2:-2,2:-2,:] += -pyom.maskU[2:-2,2:-2,:] * ((pyom.flux_east[2:-2,2:-2,:] - pyom.flux_east[1:-3,2:-2,:]) \
-                                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxu[2:-2, np.newaxis, np.newaxis]) \
+                                    * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxur[2:-2, np.newaxis, np.newaxis]) \
                                     + (pyom.flux_north[2:-2,2:-2,:] - pyom.flux_north[2:-2,1:-3,:]) \
-                                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dyt[np.newaxis, 2:-2, np.newaxis]))
+                                    * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dytr[np.newaxis, 2:-2, np.newaxis]))
     if pyom.enable_conserve_energy:
         """
         diagnose dissipation by lateral friction
         """
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_x(pyom.flux_east)
-            cyclic.setcyclic_x(pyom.flux_north)
+        cyclic.enforce_boundaries(pyom, pyom.flux_east, pyom.flux_north)
         diss = np.zeros((pyom.nx+4, pyom.ny+4, pyom.nz))
         diss[1:-2, 2:-2, :] = -0.5 * ((pyom.u[2:-1,2:-2,:,pyom.tau] - pyom.u[1:-2,2:-2,:,pyom.tau]) * pyom.flux_east[1:-2,2:-2,:] \
                                     + (pyom.u[1:-2,2:-2,:,pyom.tau] - pyom.u[:-3,2:-2,:,pyom.tau]) * pyom.flux_east[:-3,2:-2,:]) \
-                                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxu[1:-2, np.newaxis, np.newaxis])  \
+                                    * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxur[1:-2, np.newaxis, np.newaxis])  \
                               -0.5 * ((pyom.u[1:-2,3:-1,:,pyom.tau] - pyom.u[1:-2,2:-2,:,pyom.tau]) * pyom.flux_north[1:-2,2:-2,:] \
                                     + (pyom.u[1:-2,2:-2,:,pyom.tau] - pyom.u[1:-2,1:-3,:,pyom.tau]) * pyom.flux_north[1:-2,1:-3,:]) \
-                                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dyt[np.newaxis, 2:-2, np.newaxis])
+                                    * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dytr[np.newaxis, 2:-2, np.newaxis])
         pyom.K_diss_h[...] = 0.
         pyom.K_diss_h[...] = numerics.calc_diss(pyom,diss,pyom.K_diss_h,'U')
 
@@ -444,23 +442,23 @@ def biharmonic_friction(pyom):
     Meridional velocity
     """
     pyom.flux_east[:-1, :, :] = fxa * (pyom.v[1:,:,:,pyom.tau] - pyom.v[:-1,:,:,pyom.tau]) \
-                             / (pyom.cosu[np.newaxis, :, np.newaxis] * pyom.dxu[:-1, np.newaxis, np.newaxis]) \
+                             * (pyom.cosur[np.newaxis, :, np.newaxis] * pyom.dxur[:-1, np.newaxis, np.newaxis]) \
                              * pyom.maskV[1:,:,:] * pyom.maskV[:-1,:,:]
     pyom.flux_north[:,:-1,:] = fxa * (pyom.v[:,1:,:,pyom.tau] - pyom.v[:,:-1,:,pyom.tau]) \
-                             / pyom.dyt[np.newaxis, 1:, np.newaxis] * pyom.cost[np.newaxis, 1:, np.newaxis] \
+                             * pyom.dytr[np.newaxis, 1:, np.newaxis] * pyom.cost[np.newaxis, 1:, np.newaxis] \
                              * pyom.maskV[:,:-1,:] * pyom.maskV[:,1:,:]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
 
     del2[1:,1:,:] = (pyom.flux_east[1:,1:,:] - pyom.flux_east[:-1,1:,:]) \
-                        / (pyom.cosu[np.newaxis, 1:, np.newaxis] * pyom.dxt[1:, np.newaxis, np.newaxis])  \
+                        * (pyom.cosur[np.newaxis, 1:, np.newaxis] * pyom.dxtr[1:, np.newaxis, np.newaxis])  \
                   + (pyom.flux_north[1:,1:,:] - pyom.flux_north[1:,:-1,:]) \
-                        / (pyom.dyu[np.newaxis, 1:, np.newaxis] * pyom.cosu[np.newaxis, 1:, np.newaxis])
+                        * (pyom.dyur[np.newaxis, 1:, np.newaxis] * pyom.cosur[np.newaxis, 1:, np.newaxis])
     pyom.flux_east[:-1,:,:] = fxa * (del2[1:,:,:] - del2[:-1,:,:]) \
-                            / (pyom.cosu[np.newaxis,:,np.newaxis] * pyom.dxu[:-1,np.newaxis,np.newaxis]) \
+                            * (pyom.cosur[np.newaxis,:,np.newaxis] * pyom.dxur[:-1,np.newaxis,np.newaxis]) \
                             * pyom.maskV[1:,:,:] * pyom.maskV[:-1,:,:]
     pyom.flux_north[:,:-1,:] = fxa * (del2[:,1:,:] - del2[:,:-1,:]) \
-                             / pyom.dyt[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis, 1:, np.newaxis] \
+                             * pyom.dytr[np.newaxis,1:,np.newaxis] * pyom.cost[np.newaxis, 1:, np.newaxis] \
                              * pyom.maskV[:,:-1,:] * pyom.maskV[:,1:,:]
     pyom.flux_east[-1,:,:] = 0.
     pyom.flux_north[:,-1,:] = 0.
@@ -469,23 +467,21 @@ def biharmonic_friction(pyom):
     update tendency
     """
     pyom.dv_mix[2:-2, 2:-2, :] += -pyom.maskV[2:-2,2:-2,:] * ((pyom.flux_east[2:-2,2:-2,:] - pyom.flux_east[1:-3,2:-2,:]) \
-                                    / (pyom.cosu[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                                    * (pyom.cosur[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                                     + (pyom.flux_north[2:-2,2:-2,:] - pyom.flux_north[2:-2,1:-3,:]) \
-                                    / (pyom.dyu[np.newaxis, 2:-2, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis]))
+                                    * (pyom.dyur[np.newaxis, 2:-2, np.newaxis] * pyom.cosur[np.newaxis, 2:-2, np.newaxis]))
 
     if pyom.enable_conserve_energy:
         """
         diagnose dissipation by lateral friction
         """
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_x(pyom.flux_east)
-            cyclic.setcyclic_x(pyom.flux_north)
+        cyclic.enforce_boundaries(pyom, pyom.flux_east, pyom.flux_north)
         diss[2:-2, 1:-2, :] = -0.5*((pyom.v[3:-1,1:-2,:,pyom.tau] - pyom.v[2:-2,1:-2,:,pyom.tau]) * pyom.flux_east[2:-2,1:-2,:] \
                                   + (pyom.v[2:-2,1:-2,:,pyom.tau] - pyom.v[1:-3,1:-2,:,pyom.tau]) * pyom.flux_east[1:-3,1:-2,:]) \
-                                  / (pyom.cosu[np.newaxis, 1:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                                  * (pyom.cosur[np.newaxis, 1:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                              - 0.5*((pyom.v[2:-2,2:-1,:,pyom.tau] - pyom.v[2:-2,1:-2,:,pyom.tau]) * pyom.flux_north[2:-2,1:-2,:] \
                                   + (pyom.v[2:-2,1:-2,:,pyom.tau] - pyom.v[2:-2,:-3,:,pyom.tau]) * pyom.flux_north[2:-2,:-3,:]) \
-                                  / (pyom.cosu[np.newaxis, 1:-2, np.newaxis] * pyom.dyu[np.newaxis, 1:-2, np.newaxis])
+                                  * (pyom.cosur[np.newaxis, 1:-2, np.newaxis] * pyom.dyur[np.newaxis, 1:-2, np.newaxis])
         pyom.K_diss_h[...] = numerics.calc_diss(pyom,diss,pyom.K_diss_h,'V')
 
 @pyom_method
@@ -1,5 +1,4 @@
 import warnings
-import math
 
 from ... import pyom_method
 from .. import numerics, cyclic
@@ -16,277 +15,209 @@ def set_spectral_parameter(pyom):
     calc_vertical_struct_fct(pyom)
 
     if cfl > 0.6:
-        warnings.warn("low mode CFL number = {}".format(fxa))
+        warnings.warn("low mode CFL number = {}".format(cfl))
 
 @pyom_method
 def calc_wave_speed(pyom):
     """
     calculate barolinic wave speed
     """
-
-    pyom.cn = 0.0 # calculate cn = int_(-h)^0 N/pi dz
-    for k in xrange(pyom.nz): # k = 1,nz
-        for j in xrange(pyom.js_pe-pyom.onx,pyom.je_pe+pyom.onx): # j = js_pe-onx,je_pe+onx
-            for i in xrange(pyom.is_pe-pyom.onx,pyom.ie_pe+pyom.onx): # i = is_pe-onx,ie_pe+onx
-                pyom.cn[i,j] += math.sqrt(max(0., pyom.Nsqr[i,j,k,tau])) * pyom.dzt[k] * pyom.maskT[i,j,k] / pyom.pi
+    # cn = int_(-h)^0 N/pi dz, summed from bottom to surface
+    pyom.cn[...] = np.cumsum(np.sqrt(np.maximum(0., pyom.Nsqr[:,:,:,pyom.tau])) * pyom.dzt[np.newaxis, np.newaxis, :] \
+                             * pyom.maskT / pyom.pi, axis=2)[:,:,-1]
 
 @pyom_method
 def get_shelf(pyom):
-    # real*8 :: map2(pyom.is_pe-pyom.onx:pyom.ie_pe+pyom.onx,pyom.js_pe-pyom.onx:pyom.je_pe+pyom.onx),fxa
-    map2 = np.zeros((pyom.nx+4, pyom.ny+4))
-    pyom.topo_shelf = np.where(pyom.ht == 0.0, 1, 0)
-
-    fxa = 0
-    if pyom.js_pe >= pyom.ny/2 and pyom.je_pe <= pyom.ny/2: # I guess this is always False
-        fxa = pyom.dyt(pyom.ny/2)
-
-    for k in xrange(max(1,int(300e3/fxa))): # k = 1,max(1,int(300e3/fxa))
-        map2[...] = pyom.topo_shelf
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                if map2[i,j] == 1:
-                    pyom.topo_shelf[i-1:i+2,j-1:j+2] = 1 # (i-1:i+1,j-1:j+1)
-    if pyom.enable_cyclic_x:
-        cyclic.setcyclic_x(pyom.topo_shelf)
+    """
+    mark shelf regions (within ~300km of land) for wave interaction
+    """
+    pyom.topo_shelf[...] = np.where(pyom.ht == 0.0, 1., 0.)
+    fxa = pyom.dyt[pyom.ny // 2 + 1]
+    for _ in xrange(max(1, int(300e3 / fxa))):
+        # grow shelf by one grid cell around every (interior) shelf cell
+        map2 = pyom.topo_shelf[2:-2, 2:-2].copy()
+        for i in xrange(3):
+            for j in xrange(3):
+                pyom.topo_shelf[1+i:pyom.nx+1+i, 1+j:pyom.ny+1+j] = \
+                        np.maximum(pyom.topo_shelf[1+i:pyom.nx+1+i, 1+j:pyom.ny+1+j], map2)
+        cyclic.enforce_boundaries(pyom, pyom.topo_shelf)
 
 @pyom_method
 def set_time_scales(pyom):
     """
     set decay and interaction time scales
     """
-    # real*8 :: mstar = 0.01,M2_f = 2*pi/(12.42*60*60)
     mstar = 0.01
     pyom.M2_f = 2 * pyom.pi / (12.42 * 60 * 60)
 
+    ht = pyom.ht[2:-2, 2:-2]
+    cn = pyom.cn[2:-2, 2:-2]
+    coriolis_t = pyom.coriolis_t[2:-2, 2:-2]
+    is_wet = ht > 0
+    ht_safe = np.where(is_wet, ht, 1.)
+    N0 = cn * pyom.pi / ht_safe
+    fxc = pyom.topo_hrms[2:-2, 2:-2]**2 * 2 * pyom.pi / (1e-12 + pyom.topo_lam[2:-2, 2:-2]) # Goff
+
     if pyom.enable_idemix_niw:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                if pyom.ht[i,j] > 0:
-                    N0 = pyom.cn[i,j] * pyom.pi / pyom.ht[i,j]
-                    if N0 > abs(pyom.coriolis_t[i,j]) and pyom.omega_niw[i,j] > abs(pyom.coriolis_t[i,j]):
-                        fxc = pyom.topo_hrms[i,j]**2 * 2*pyom.pi / (1e-12 + pyom.topo_lam[i,j]) # Goff
-                        fxb = 0.5 * N0 * ((pyom.omega_niw[i,j]**2 + pyom.coriolis_t[i,j]**2) / pyom.omega_niw[i,j]**2) ** 2  \
-                                        * (pyom.omega_niw[i,j]**2 - pyom.coriolis_t[i,j]**2) ** 0.5 / pyom.omega_niw[i,j]
-                        pyom.tau_niw[i,j] = min(0.5 / pyom.dt_tracer, fxb * fxc / pyom.ht[i,j])
+        omega_niw = pyom.omega_niw[2:-2, 2:-2]
+        mask = is_wet & (N0 > np.abs(coriolis_t)) & (omega_niw > np.abs(coriolis_t))
+        fxb = 0.5 * N0 * ((omega_niw**2 + coriolis_t**2) / omega_niw**2)**2 \
+                  * np.maximum(0., omega_niw**2 - coriolis_t**2)**0.5 / omega_niw
+        pyom.tau_niw[2:-2, 2:-2] = np.where(mask, np.minimum(0.5 / pyom.dt_tracer, fxb * fxc / ht_safe),
+                                            pyom.tau_niw[2:-2, 2:-2])
         pyom.tau_niw[pyom.topo_shelf == 1.0] = 1. / (3. * 86400)
-        pyom.tau_niw = np.maximum(1/(50.*86400), pyom.tau_niw) * pyom.maskT[:,:,pyom.nz-1]
+        pyom.tau_niw[...] = np.maximum(1 / (50. * 86400), pyom.tau_niw) * pyom.maskT[:,:,-1]
 
     if pyom.enable_idemix_M2:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                if pyom.ht[i,j] > 0:
-                    N0 = pyom.cn[i,j] * pyom.pi / pyom.ht[i,j]
-                    if N0 > abs(pyom.coriolis_t[i,j]) and pyom.omega_M2 > abs(pyom.coriolis_t[i,j]):
-                        fxc = pyom.topo_hrms[i,j]**2 * 2 * pyom.pi / (1e-12 + pyom.topo_lam[i,j]) # Goff
-                        fxb = 0.5 * N0 * ((pyom.omega_M2**2 + pyom.coriolis_t[i,j]**2) / pyom.omega_M2**2) ** 2 \
-                                  * (pyom.omega_M2**2 - pyom.coriolis_t[i,j]**2) ** 0.5 / pyom.omega_M2
-                        pyom.tau_m2[i,j] = min(0.5 / pyom.dt_tracer, fxc * fxb / pyom.ht[i,j])
-        pyom.tau_m2[pyom.topo_shelf == 1.0] = 1. / (3. * 86400)
-        pyom.tau_m2 = np.maximum(1 / (50. * 86400), pyom.tau_m2) * pyom.maskT[:,:,pyom.nz-1]
-
-        pyom.alpha_M2_cont[...] = 0.0
-        for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-            for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-                if pyom.ht[i,j] > 0.:
-                    N0 = pyom.cn[i,j] * pyom.pi / pyom.ht[i,j] + 1e-20
-                    if abs(pyom.yt[j]) < 28.5:
-                        #! lambda+/M2 = 15*E*mstar/N * (sin(phi-28.5)/sin(28.5))^1/2
-                        pyom.alpha_M2_cont[i,j] += pyom.M2_f * 15 * mstar / N0 * (np.sin(abs(abs(pyom.yt[j]) -28.5) / 180. * pyom.pi) \
-                                                                                  / np.sin(28.5 / 180. * pyom.pi)) ** 0.5
-                    if abs(pyom.yt(j)) < 74.5 :
-                        #! lambda-/M2 = 0.7*E*mstar/N *sin^2(phi)
-                        pyom.alpha_M2_cont[i,j] += pyom.M2_f * 0.7 * mstar / N0 * np.sin(abs(pyom.yt[j]) / 180. * pyom.pi) ** 2
-                    pyom.alpha_M2_cont[i,j] *= 1./pyom.ht[i,j]
-        pyom.alpha_M2_cont = np.clip(pyom.alpha_M2_cont,0., 1e-5) * pyom.maskT[:,:,pyom.nz-1]
+        mask = is_wet & (N0 > np.abs(coriolis_t)) & (pyom.omega_M2 > np.abs(coriolis_t))
+        fxb = 0.5 * N0 * ((pyom.omega_M2**2 + coriolis_t**2) / pyom.omega_M2**2)**2 \
+                  * np.maximum(0., pyom.omega_M2**2 - coriolis_t**2)**0.5 / pyom.omega_M2
+        pyom.tau_M2[2:-2, 2:-2] = np.where(mask, np.minimum(0.5 / pyom.dt_tracer, fxc * fxb / ht_safe),
+                                           pyom.tau_M2[2:-2, 2:-2])
+        pyom.tau_M2[pyom.topo_shelf == 1.0] = 1. / (3. * 86400)
+        pyom.tau_M2[...] = np.maximum(1 / (50. * 86400), pyom.tau_M2) * pyom.maskT[:,:,-1]
+
+        yt = np.abs(pyom.yt[np.newaxis, 2:-2])
+        N0 = N0 + 1e-20
+        alpha_M2_cont = np.zeros_like(ht)
+        # lambda+/M2 = 15*E*mstar/N * (sin(phi-28.5)/sin(28.5))^1/2
+        alpha_M2_cont += np.where(yt < 28.5, pyom.M2_f * 15 * mstar / N0 * (np.sin(np.abs(yt - 28.5) / 180. * pyom.pi) \
+                                                                            / np.sin(28.5 / 180. * pyom.pi))**0.5, 0.)
+        # lambda-/M2 = 0.7*E*mstar/N *sin^2(phi)
+        alpha_M2_cont += np.where(yt < 74.5, pyom.M2_f * 0.7 * mstar / N0 * np.sin(yt / 180. * pyom.pi)**2, 0.)
+        alpha_M2_cont *= 1. / ht_safe
+        pyom.alpha_M2_cont[...] = 0.
+        pyom.alpha_M2_cont[2:-2, 2:-2] = np.where(is_wet, alpha_M2_cont, 0.)
+        pyom.alpha_M2_cont[...] = np.clip(pyom.alpha_M2_cont, 0., 1e-5) * pyom.maskT[:,:,-1]
 
 @pyom_method
 def group_velocity(pyom):
     """
     calculate (modulus of) group velocity of long gravity waves and change of wavenumber angle phi
     """
-    # real*8 :: gradx(pyom.is_pe-pyom.onx:pyom.ie_pe+pyom.onx,pyom.js_pe-pyom.onx:pyom.je_pe+pyom.onx),fxa
-    # real*8 :: grady(pyom.is_pe-pyom.onx:pyom.ie_pe+pyom.onx,pyom.js_pe-pyom.onx:pyom.je_pe+pyom.onx)
-    gradx = np.zeros((pyom.nx+4, pyom.ny+4))
-    grady = np.zeros((pyom.nx+4, pyom.ny+4))
-
     if pyom.enable_idemix_M2:
         pyom.omega_M2 = 2 * pyom.pi / (12.*60*60 + 25.2*60) # M2 frequency in 1/s
 
     if pyom.enable_idemix_niw:
-        pyom.omega_niw = np.maximum(1e-8, np.abs(1.05 * pyom.coriolis_t))
+        pyom.omega_niw[...] = np.maximum(1e-8, np.abs(1.05 * pyom.coriolis_t))
 
     if pyom.enable_idemix_M2:
-        pyom.cg_M2 = np.sqrt(np.maximum(0., pyom.omega_M2**2 - pyom.coriolis_t**2)) * pyom.cn / pyom.omega_M2
+        pyom.cg_M2[...] = np.sqrt(np.maximum(0., pyom.omega_M2**2 - pyom.coriolis_t**2)) * pyom.cn / pyom.omega_M2
 
     if pyom.enable_idemix_niw:
-        pyom.cg_niw = np.sqrt(np.maximum(0.,pyom.omega_niw**2 - pyom.coriolis_t**2)) * pyom.cn / pyom.omega_niw
+        pyom.cg_niw[...] = np.sqrt(np.maximum(0., pyom.omega_niw**2 - pyom.coriolis_t**2)) * pyom.cn / pyom.omega_niw
 
-    grady[...] = 0.0
-    for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-        grady[:,j] = (pyom.coriolis_t[:,j+1] - pyom.coriolis_t[:,j-1]) / (pyom.dyu[j] + pyom.dyu[j-1])
+    coriolis_t = pyom.coriolis_t[2:-2, 2:-2]
+    cn = pyom.cn[2:-2, 2:-2]
 
+    # refraction due to the meridional gradient of f
+    grady = (pyom.coriolis_t[2:-2, 3:-1] - pyom.coriolis_t[2:-2, 1:-3]) / (pyom.dyu[np.newaxis, 2:-2] + pyom.dyu[np.newaxis, 1:-3])
     if pyom.enable_idemix_M2:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(1e-10, pyom.omega_M2**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_y_M2[i,j] = -pyom.cn[i,j] / math.sqrt(fxa) * pyom.coriolis_t[i,j] / pyom.omega_M2 * grady[i,j]
-
+        fxa = np.maximum(1e-10, pyom.omega_M2**2 - coriolis_t**2)
+        pyom.kdot_y_M2[2:-2, 2:-2] = -cn / np.sqrt(fxa) * coriolis_t / pyom.omega_M2 * grady
     if pyom.enable_idemix_niw:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(1e-10, pyom.omega_niw[i,j]**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_y_niw[i,j] = -pyom.cn[i,j] / math.sqrt(fxa) * pyom.coriolis_t[i,j] / pyom.omega_niw[i,j] * grady[i,j]
-
-    grady = 0.0
-    for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-        grady[:,j] = 0.5*(pyom.cn[:,j+1] - pyom.cn[:,j]) / pyom.dyu[j] * pyom.maskTp[:,j,0] * pyom.maskTp[:,j+1,0] \
-                   + 0.5*(pyom.cn[:,j] - pyom.cn[:,j-1]) / pyom.dyu[j-1] * pyom.maskTp[:,j-1,0] * pyom.maskTp[:,j,0]
+        omega_niw = pyom.omega_niw[2:-2, 2:-2]
+        fxa = np.maximum(1e-10, omega_niw**2 - coriolis_t**2)
+        pyom.kdot_y_niw[2:-2, 2:-2] = -cn / np.sqrt(fxa) * coriolis_t / omega_niw * grady
 
+    # refraction due to gradients of the wave speed
+    grady = 0.5 * (pyom.cn[2:-2, 3:-1] - cn) / pyom.dyu[np.newaxis, 2:-2] * pyom.maskTp[2:-2, 2:-2, 0] * pyom.maskTp[2:-2, 3:-1, 0] \
+          + 0.5 * (cn - pyom.cn[2:-2, 1:-3]) / pyom.dyu[np.newaxis, 1:-3] * pyom.maskTp[2:-2, 1:-3, 0] * pyom.maskTp[2:-2, 2:-2, 0]
     if pyom.enable_idemix_M2:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(0., pyom.omega_M2**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_y_M2[i,j] += -math.sqrt(fxa) / pyom.omega_M2 * grady[i,j]
-
+        fxa = np.maximum(0., pyom.omega_M2**2 - coriolis_t**2)
+        pyom.kdot_y_M2[2:-2, 2:-2] += -np.sqrt(fxa) / pyom.omega_M2 * grady
     if pyom.enable_idemix_niw:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(0., pyom.omega_niw[i,j]**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_y_niw[i,j] = pyom.kdot_y_niw[i,j] - math.sqrt[fxa] / pyom.omega_niw[i,j] * grady[i,j]
-
-    gradx = 0.0
-    for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-        for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-            gradx[i,j] = 0.5 * (pyom.cn[i+1,j] - pyom.cn[i,j]) / (pyom.dxu[i] * pyom.cost(j)) * pyom.maskTp[i,j,1] * pyom.maskTp[i+1,j,1] \
-                       + 0.5 * (pyom.cn[i,j] - pyom.cn[i-1,j]) / (pyom.dxu[i-1] * pyom.cost(j)) * pyom.maskTp[i-1,j,1] * pyom.maskTp[i,j,1]
+        fxa = np.maximum(0., omega_niw**2 - coriolis_t**2)
+        pyom.kdot_y_niw[2:-2, 2:-2] = pyom.kdot_y_niw[2:-2, 2:-2] - np.sqrt(fxa) / omega_niw * grady
 
+    gradx = 0.5 * (pyom.cn[3:-1, 2:-2] - cn) / (pyom.dxu[2:-2, np.newaxis] * pyom.cost[np.newaxis, 2:-2]) \
+                * pyom.maskTp[2:-2, 2:-2, 1] * pyom.maskTp[3:-1, 2:-2, 1] \
+          + 0.5 * (cn - pyom.cn[1:-3, 2:-2]) / (pyom.dxu[1:-3, np.newaxis] * pyom.cost[np.newaxis, 2:-2]) \
+                * pyom.maskTp[1:-3, 2:-2, 1] * pyom.maskTp[2:-2, 2:-2, 1]
     if pyom.enable_idemix_M2:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(0.,pyom.omega_M2**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_x_M2[i,j] = math.sqrt(fxa) / pyom.omega_M2 * gradx[i,j]
-
+        fxa = np.maximum(0., pyom.omega_M2**2 - coriolis_t**2)
+        pyom.kdot_x_M2[2:-2, 2:-2] = np.sqrt(fxa) / pyom.omega_M2 * gradx
     if pyom.enable_idemix_niw:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                fxa = max(0.,pyom.omega_niw[i,j]**2 - pyom.coriolis_t[i,j]**2)
-                pyom.kdot_x_niw[i,j] = math.sqrt(fxa) / pyom.omega_niw[i,j] * gradx[i,j]
+        fxa = np.maximum(0., omega_niw**2 - coriolis_t**2)
+        pyom.kdot_x_niw[2:-2, 2:-2] = np.sqrt(fxa) / omega_niw * gradx
+
+    cos_phit = np.cos(pyom.phit[np.newaxis, np.newaxis, 1:-1])
+    sin_phit = np.sin(pyom.phit[np.newaxis, np.newaxis, 1:-1])
+    cos_phiu = np.cos(pyom.phiu[np.newaxis, np.newaxis, :-1])
+    sin_phiu = np.sin(pyom.phiu[np.newaxis, np.newaxis, :-1])
 
     if pyom.enable_idemix_M2:
-        for k in xrange(1,pyom.np-1): # k = 2,np-1
-            for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-                for i in xrange(pyom.is_pe-1,pyom.ie_pe): # i = is_pe-1,ie_pe
-                    pyom.u_M2[i,j,k] = 0.5 * (pyom.cg_M2[i+1,j] + pyom.cg_M2[i,j]) * np.cos(pyom.phit[k]) * pyom.maskUp[i,j,k]
-        for k in xrange(1,pyom.np-1): # k = 2,np-1
-            for j in xrange(pyom.js_pe-1,pyom.je_pe): # j = js_pe-1,je_pe
-                for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                    pyom.v_M2[i,j,k] = 0.5 * (pyom.cg_M2[i,j] + pyom.cg_M2[i,j+1]) * np.sin(pyom.phit[k]) * pyom.cosu[j] * pyom.maskVp[i,j,k]
-        for k in xrange(0,pyom.np-1): # k = 1,np-1
-            for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-                for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                    pyom.w_M2[i,j,k] = (pyom.kdot_y_M2[i,j] * np.cos(pyom.phiu[k]) + pyom.kdot_x_M2[i,j] * np.sin(pyom.phiu[k])) * pyom.maskWp[i,j,k]
+        pyom.u_M2[1:-2, 2:-2, 1:-1] = 0.5 * (pyom.cg_M2[2:-1, 2:-2, np.newaxis] + pyom.cg_M2[1:-2, 2:-2, np.newaxis]) \
+                                      * cos_phit * pyom.maskUp[1:-2, 2:-2, 1:-1]
+        pyom.v_M2[2:-2, 1:-2, 1:-1] = 0.5 * (pyom.cg_M2[2:-2, 1:-2, np.newaxis] + pyom.cg_M2[2:-2, 2:-1, np.newaxis]) \
+                                      * sin_phit * pyom.cosu[np.newaxis, 1:-2, np.newaxis] * pyom.maskVp[2:-2, 1:-2, 1:-1]
+        pyom.w_M2[2:-2, 2:-2, :-1] = (pyom.kdot_y_M2[2:-2, 2:-2, np.newaxis] * cos_phiu \
+                                      + pyom.kdot_x_M2[2:-2, 2:-2, np.newaxis] * sin_phiu) * pyom.maskWp[2:-2, 2:-2, :-1]
 
     if pyom.enable_idemix_niw:
-        for k in xrange(1,pyom.np-1): # k = 2,np-1
-            for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-                for i in xrange(pyom.is_pe-1,pyom.ie_pe): # i = is_pe-1,ie_pe
-                    pyom.u_niw[i,j,k] = 0.5 * (pyom.cg_niw[i+1,j] + pyom.cg_niw[i,j]) * np.cos(pyom.phit[k]) * pyom.maskUp[i,j,k]
-        for k in xrange(1,pyom.np-1): # k = 2,np-1
-            for j in xrange(pyom.js_pe-1,pyom.je_pe): # j = js_pe-1,je_pe
-                for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                    pyom.v_niw[i,j,k] = 0.5 * (pyom.cg_niw[i,j] + pyom.cg_niw[i,j+1]) * np.sin(pyom.phit[k]) * pyom.cosu[j] * pyom.maskVp[i,j,k]
-        for k in xrange(pyom.np-1): # k = 1,np-1
-            for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-                for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                    pyom.w_niw[i,j,k] = (pyom.kdot_y_niw[i,j] * np.cos(pyom.phiu[k]) + pyom.kdot_x_niw[i,j] * np.sin(pyom.phiu[k])) * pyom.maskWp[i,j,k]
+        pyom.u_niw[1:-2, 2:-2, 1:-1] = 0.5 * (pyom.cg_niw[2:-1, 2:-2, np.newaxis] + pyom.cg_niw[1:-2, 2:-2, np.newaxis]) \
+                                       * cos_phit * pyom.maskUp[1:-2, 2:-2, 1:-1]
+        pyom.v_niw[2:-2, 1:-2, 1:-1] = 0.5 * (pyom.cg_niw[2:-2, 1:-2, np.newaxis] + pyom.cg_niw[2:-2, 2:-1, np.newaxis]) \
+                                       * sin_phit * pyom.cosu[np.newaxis, 1:-2, np.newaxis] * pyom.maskVp[2:-2, 1:-2, 1:-1]
+        pyom.w_niw[2:-2, 2:-2, :-1] = (pyom.kdot_y_niw[2:-2, 2:-2, np.newaxis] * cos_phiu \
+                                       + pyom.kdot_x_niw[2:-2, 2:-2, np.newaxis] * sin_phiu) * pyom.maskWp[2:-2, 2:-2, :-1]
 
     cfl = 0.0
-    if pyom.enable_idemix_M2:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                cfl = max(cfl, 0.5*(pyom.cg_M2[i,j] + pyom.cg_M2[i+1,j]) * pyom.dt_tracer / (pyom.cost[j] * pyom.dxt[i]))
-                cfl = max(cfl, 0.5*(pyom.cg_M2[i,j] + pyom.cg_M2[i,j+1]) * pyom.dt_tracer / pyom.dyt[j])
-                cfl = max(cfl, pyom.kdot_y_M2[i,j] * pyom.dt_tracer / dphit[1])
-                cfl = max(cfl, pyom.kdot_x_M2[i,j] * pyom.dt_tracer / dphit[1])
-                # !if (cfl>0.5) print*,' WARNING: CFL =',cfl,' at i=',i,' j=',j
-    if pyom.enable_idemix_niw:
-        for j in xrange(pyom.js_pe,pyom.je_pe): # j = js_pe,je_pe
-            for i in xrange(pyom.is_pe,pyom.ie_pe): # i = is_pe,ie_pe
-                cfl = max(cfl, 0.5*(pyom.cg_niw[i,j] + pyom.cg_niw[i+1,j]) * pyom.dt_tracer / (pyom.cost[j] * pyom.dxt[i]))
-                cfl = max(cfl, 0.5*(pyom.cg_niw[i,j] + pyom.cg_niw[i,j+1]) * pyom.dt_tracer / pyom.dyt[j])
-                cfl = max(cfl, pyom.kdot_y_niw[i,j] * pyom.dt_tracer / dphit[0])
-                cfl = max(cfl, pyom.kdot_x_niw[i,j] * pyom.dt_tracer / dphit[0])
-    return cfl
+    for enabled, cg, kdot_x, kdot_y, dphi in ((pyom.enable_idemix_M2, "cg_M2", "kdot_x_M2", "kdot_y_M2", pyom.dphit[1]),
+                                              (pyom.enable_idemix_niw, "cg_niw", "kdot_x_niw", "kdot_y_niw", pyom.dphit[0])):
+        if not enabled:
+            continue
+        cg, kdot_x, kdot_y = getattr(pyom, cg), getattr(pyom, kdot_x), getattr(pyom, kdot_y)
+        cfl = max(cfl, np.max(0.5 * (cg[2:-2, 2:-2] + cg[3:-1, 2:-2]) * pyom.dt_tracer \
+                              / (pyom.cost[np.newaxis, 2:-2] * pyom.dxt[2:-2, np.newaxis])))
+        cfl = max(cfl, np.max(0.5 * (cg[2:-2, 2:-2] + cg[2:-2, 3:-1]) * pyom.dt_tracer / pyom.dyt[np.newaxis, 2:-2]))
+        cfl = max(cfl, np.max(kdot_y[2:-2, 2:-2] * pyom.dt_tracer / dphi))
+        cfl = max(cfl, np.max(kdot_x[2:-2, 2:-2] * pyom.dt_tracer / dphi))
+    return float(cfl)
 
 @pyom_method
 def calc_vertical_struct_fct(pyom):
     """
     calculate vertical structure function for low modes
     """
-    # real*8 :: norm(pyom.is_pe-pyom.onx:pyom.ie_pe+pyom.onx,pyom.js_pe-pyom.onx:pyom.je_pe+pyom.onx)
-    # real*8 :: Nsqr_lim(pyom.is_pe-pyom.onx:pyom.ie_pe+pyom.onx,pyom.js_pe-pyom.onx:pyom.je_pe+pyom.onx,pyom.nz)
-    # real*8, parameter :: small = 1d-12
-    norm = np.zeros((pyom.nx+4, pyom.ny+4))
-    Nsqr_lim = np.zeros((pyom.nx+4, pyom.ny+4, pyom.nz))
     small = 1e-12
-
-    Nsqr_lim = np.maximum(small,pyom.Nsqr[:,:,:,tau])
+    Nsqr_lim = np.maximum(small, pyom.Nsqr[:,:,:,pyom.tau])
 
     # calculate int_(-h)^z N dz
-    pyom.phin[...] = 0.
-    for k in xrange(pyom.nz): # k = 1,nz
-        km1 = max(0,k-1)
-        for j in xrange(pyom.js_pe-pyom.onx,pyom.je_pe+pyom.onx): # j = js_pe-onx,je_pe+onx
-            for i in xrange(pyom.is_pe-pyom.onx,pyom.ie_pe+pyom.onx): # i = is_pe-onx,ie_pe+onx
-                #!fxa = (Nsqr_lim[i,j,k]*pyom.maskT[i,j,k]+Nsqr_lim(i,j,km1)*pyom.maskT(i,j,km1))/(pyom.maskT[i,j,k]+pyom.maskT(i,j,km1)+1d-22)
-                fxa = Nsqr_lim[i,j,k] * pyom.maskW[i,j,k]
-                pyom.phin[i,j,k] = pyom.phin[i,j,km1] * pyom.maskT[i,j,km1] + math.sqrt(fxa) * pyom.dzw[km1] #!*pyom.maskT[i,j,k]
+    # the integral restarts above every dry cell; since dry cells only occur below
+    # the bottom, it is a cumulative sum starting at the lowest wet cell
+    dzw_below = np.concatenate((pyom.dzw[:1], pyom.dzw[:-1]))
+    increment = np.sqrt(Nsqr_lim * pyom.maskW) * dzw_below[np.newaxis, np.newaxis, :]
+    k = np.arange(pyom.nz)[np.newaxis, np.newaxis, :]
+    restarts = (k == 0) | (pyom.maskT[:,:,np.maximum(np.arange(pyom.nz) - 1, 0)] == 0)
+    start = np.max(np.where(restarts, k, 0), axis=2)[:,:,np.newaxis]
+    pyom.phin[...] = np.where(k <= start, increment, np.cumsum(np.where(k >= start, increment, 0.), axis=2))
 
     # calculate phi_n = cos(int_(-h)^z N/c_n dz)*N^0.5
     # and   dphi_n/dz = sin(int_(-h)^z N/c_n dz)/N^0.5
-    for k in xrange(pyom.nz): # k = 1,nz
-        for j in xrange(pyom.js_pe-pyom.onx,pyom.je_pe+pyom.onx): # j = js_pe-onx,je_pe+onx
-            for i in xrange(pyom.is_pe-pyom.onx,pyom.ie_pe+pyom.onx): # i = is_pe-onx,ie_pe+onx
-                fxa = pyom.phin[i,j,k] / (small + pyom.cn[i,j])
-                pyom.phinz[i,j,k] = np.sin(fxa) / Nsqr_lim[i,j,k]**0.25
-                pyom.phin[i,j,k] = np.cos(fxa) * Nsqr_lim[i,j,k]**0.25
+    fxa = pyom.phin / (small + pyom.cn[:,:,np.newaxis])
+    pyom.phinz[...] = np.sin(fxa) / Nsqr_lim**0.25
+    pyom.phin[...] = np.cos(fxa) * Nsqr_lim**0.25
+
+    # vertical integrals (trapezoidal at the surface), summed from bottom to surface
+    dzw_int = np.concatenate((pyom.dzw[:-1], 0.5 * pyom.dzw[-1:]))[np.newaxis, np.newaxis, :]
 
     # normalization with int_(-h)^0 dz (dphi_n/dz)^2 /N^2 = 1
-    norm[...] = 0.
-    #!for k in xrange(1,pyom.nz): # k = 1,nz
-    #!norm = norm+ pyom.phinz[:,:,k]**2/Nsqr_lim[:,:,k]*pyom.dzt(k)*pyom.maskT[:,:,k]
-    for k in xrange(pyom.nz-1): # k = 1,nz-1
-        norm += pyom.phinz[:,:,k]**2 / Nsqr_lim[:,:,k] * pyom.dzw[k] * pyom.maskW[:,:,k]
-    k = pyom.nz-1
-    norm += pyom.phinz[:,:,k]**2 / Nsqr_lim[:,:,k] * 0.5 * pyom.dzw[k] * pyom.maskW[:,:,k]
-    for k in xrange(pyom.nz): # k = 1,nz
-        pyom.phinz[:,:,k] = np.where(norm > 0, pyom.phinz[:,:,k] / norm**0.5, pyom.phinz[:,:,k])
+    norm = np.cumsum(pyom.phinz**2 / Nsqr_lim * dzw_int * pyom.maskW, axis=2)[:,:,-1:]
+    pyom.phinz[...] = np.where(norm > 0, pyom.phinz / norm**0.5, pyom.phinz)
 
     # normalization with int_(-h)^0 dz phi_n^2 /c_n^2 = 1
-    norm[...] = 0.
-    #!for k in xrange(1,pyom.nz): # k = 1,nz
-    #!norm = norm+ pyom.phin[:,:,k]**2/max(1d-22,pyom.cn)**2*pyom.dzt(k)*pyom.maskT[:,:,k]
-    for k in xrange(pyom.nz-1): # k = 1,nz-1
-        norm += pyom.phin[:,:,k]**2 / (small + pyom.cn**2) * pyom.dzw[k] * pyom.maskW[:,:,k]
-    k = pyom.nz-1
-    norm += pyom.phin[:,:,k]**2 / (small + pyom.cn**2) * 0.5 * pyom.dzw[k] * pyom.maskW[:,:,k]
-    for k in xrange(pyom.nz): # k = 1,nz
-        pyom.phin[:,:,k] = np.where(norm > 0, pyom.phin[:,:,k] / norm**0.5, pyom.phin[:,:,k])
+    norm = np.cumsum(pyom.phin**2 / (small + pyom.cn[:,:,np.newaxis]**2) * dzw_int * pyom.maskW, axis=2)[:,:,-1:]
+    pyom.phin[...] = np.where(norm > 0, pyom.phin / norm**0.5, pyom.phin)
 
+    coriolis_t = pyom.coriolis_t[:,:,np.newaxis]
     if pyom.enable_idemix_M2:
         # calculate structure function for energy:
         # E(z) = E_0 0.5((1+f^2/om^2) phi_n^2/c_n^2 + (1-f^2/om^2) (dphi_n/dz)^2/N^2)
-        for k in xrange(pyom.nz): # k = 1,nz
-            for j in xrange(pyom.js_pe-pyom.onx,pyom.je_pe+pyom.onx): # j = js_pe-onx,je_pe+onx
-                for i in xrange(pyom.is_pe-pyom.onx,pyom.ie_pe+pyom.onx): # i = is_pe-onx,ie_pe+onx
-                    pyom.E_struct_M2[i,j,k] = 0.5*((1+pyom.coriolis_t[i,j]**2 / pyom.omega_M2**2) * pyom.phin[i,j,k]**2 / (small + pyom.cn[i,j]**2) \
-                                                  +(1-pyom.coriolis_t[i,j]**2 / pyom.omega_M2**2) * pyom.phinz[i,j,k]**2 / Nsqr_lim[i,j,k]) #\
-                                                  #!)*pyom.maskT[i,j,k])*pyom.maskW[i,j,k]
+        pyom.E_struct_M2[...] = 0.5 * ((1 + coriolis_t**2 / pyom.omega_M2**2) * pyom.phin**2 / (small + pyom.cn[:,:,np.newaxis]**2) \
+                                       + (1 - coriolis_t**2 / pyom.omega_M2**2) * pyom.phinz**2 / Nsqr_lim)
 
     if pyom.enable_idemix_niw:
-        for k in xrange(pyom.nz): # k = 1,nz
-            for j in xrange(pyom.js_pe-pyom.onx,pyom.je_pe+pyom.onx): # j = js_pe-onx,je_pe+onx
-                for i in xrange(pyom.is_pe-pyom.onx,pyom.ie_pe+pyom.onx): # i = is_pe-onx,ie_pe+onx
-                    pyom.E_struct_niw[i,j,k] = 0.5*((1+pyom.coriolis_t[i,j]**2 / pyom.omega_niw[i,j]**2) * pyom.phin[i,j,k]**2 / (small+pyom.cn[i,j]**2) \
-                                              #!+(1-pyom.coriolis_t[i,j]**2/pyom.omega_niw[i,j]**2)*pyom.phinz[i,j,k]**2/Nsqr_lim[i,j,k])*pyom.maskT[i,j,k]
-                                              + (1 - pyom.coriolis_t[i,j]**2 / pyom.omega_niw[i,j]**2) * pyom.phinz[i,j,k]**2 / Nsqr_lim[i,j,k]) * pyom.maskW[i,j,k]
+        omega_niw = pyom.omega_niw[:,:,np.newaxis]
+        pyom.E_struct_niw[...] = 0.5 * ((1 + coriolis_t**2 / omega_niw**2) * pyom.phin**2 / (small + pyom.cn[:,:,np.newaxis]**2) \
+                                        + (1 - coriolis_t**2 / omega_niw**2) * pyom.phinz**2 / Nsqr_lim) * pyom.maskW
@@ -1,198 +1,95 @@
 from ... import pyom_method
+from .. import advection, cyclic
+from .idemix_group_vel import get_shelf
 
 @pyom_method
-def adv_flux_superbee_spectral(pyom,is_,ie_,js_,je_,np_,adv_fe,adv_fn,adv_ft,var,uvel,vvel,wvel):
+def adv_flux_superbee_spectral(pyom, adv_fe, adv_fn, adv_ft, var, uvel, vvel, wvel):
     """
-    Calculates advection of a tracer in spectral space
+    Calculates advection of a tracer in spectral space (x, y and wave angle)
+    using the superbee flux limiter
     """
-    # integer, intent(in) :: is_,ie_,js_,je_,np_
-    # real*8, intent(inout) :: adv_fe(is_:ie_,js_:je_,np_), adv_fn(is_:ie_,js_:je_,np_)
-    # real*8, intent(inout) :: adv_ft(is_:ie_,js_:je_,np_),    var(is_:ie_,js_:je_,np_,3)
-    # real*8, intent(in) :: uvel(is_:ie_,js_:je_,np_),vvel(is_:ie_,js_:je_,np_),wvel(is_:ie_,js_:je_,np_)
-    # integer :: i,j,k,km1,kp2
-    # real*8 :: Rjp,Rj,Rjm,uCFL = 0.5,Cr
-    # real*8 :: Limiter
-    Limiter = lambda Cr: max(0.,max(min(1.,2.*Cr), min(2.,Cr)))
-
-    for k in xrange(2,np-1): # k = 2,np-1
-        for j in xrange(js_pe,je_pe): # j = js_pe,je_pe
-            for i in xrange(is_pe-1,ie_pe): # i = is_pe-1,ie_pe
-                uCFL = abs(uvel[i,j,k]*dt_tracer/(cost[j]*dxt[min(nx,max(1,i))]))
-                Rjp = (var[i+2,j,k]-var[i+1,j,k])*maskUp[i+1,j,k]
-                Rj = (var[i+1,j,k]-var[i,j,k])*maskUp[i,j,k]
-                Rjm = (var[i,j,k]-var[i-1,j,k])*maskUp[i-1,j,k]
-                if Rj != 0.:
-                    if uvel[i,j,k] > 0:
-                        Cr = Rjm/Rj
-                    else:
-                        Cr = Rjp/Rj
-                else:
-                    if uvel[i,j,k] > 0:
-                        Cr = Rjm*1.E20
-                    else:
-                        Cr = Rjp*1.E20
-                Cr = Limiter(Cr)
-                adv_fe[i,j,k] = uvel[i,j,k]*(var[i+1,j,k]+var[i,j,k])*0.5   \
-                                            -abs(uvel[i,j,k])*((1.-Cr)+uCFL*Cr)*Rj*0.5
-
-    for k in xrange(2,np-1): # k = 2,np-1
-        for j in xrange(js_pe-1,je_pe): # j = js_pe-1,je_pe
-            for i in xrange(is_pe,ie_pe): # i = is_pe,ie_pe
-                Rjp = (var[i,j+2,k]-var[i,j+1,k])*maskVp[i,j+1,k]
-                Rj = (var[i,j+1,k]-var[i,j,k])*maskVp[i,j,k]
-                Rjm = (var[i,j,k]-var[i,j-1,k])*maskVp[i,j-1,k]
-                uCFL = abs(vvel[i,j,k]*dt_tracer/dyt[min(ny,max(1,j))])
-                if Rj != 0.:
-                    if vvel[i,j,k] > 0:
-                        Cr = Rjm/Rj
-                    else:
-                        Cr = Rjp/Rj
-                else:
-                    if vvel[i,j,k] > 0:
-                        Cr = Rjm*1.E20
-                    else:
-                        Cr = Rjp*1.E20
-                Cr = Limiter(Cr)
-                adv_fn[i,j,k] = vvel[i,j,k]*(var[i,j+1,k]+var[i,j,k])*0.5   \
-                                            -abs(vvel[i,j,k])*((1.-Cr)+uCFL*Cr)*Rj*0.5
-
-    for k in xrange(1,np-1): # k = 1,np-1
-        kp2 = k+2
-        if kp2 > np:
-            kp2 = 3
-        km1 = k-1
-        if km1 < 1:
-            km1 = np-2
-        for j in xrange(js_pe,je_pe): # j = js_pe,je_pe
-            for i in xrange(is_pe,ie_pe): # i = is_pe,ie_pe
-                Rjp = (var[i,j,kp2,tau]-var[i,j,k+1])*maskWp[i,j,k+1]
-                Rj = (var[i,j,k+1]-var[i,j,k])*maskWp[i,j,k]
-                Rjm = (var[i,j,k]-var[i,j,km1,tau])*maskWp[i,j,km1]
-                uCFL = abs(wvel[i,j,k]*dt_tracer/dphit[k])
-                if Rj != 0.:
-                    if wvel[i,j,k] > 0:
-                        Cr = Rjm/Rj
-                    else:
-                        Cr = Rjp/Rj
-                else:
-                    if wvel[i,j,k] > 0:
-                        Cr = Rjm*1.E20
-                    else:
-                        Cr = Rjp*1.E20
-                Cr = Limiter(Cr)
-                adv_ft[i,j,k] = wvel[i,j,k]*(var[i,j,k+1]+var[i,j,k])*0.5   \
-                                            -abs(wvel[i,j,k])*((1.-Cr)+uCFL*Cr)*Rj*0.5
+    # zonal and meridional fluxes for all inner wave angles
+    velocity = advection._superbee_velocity(pyom, uvel[..., 1:-1], pyom.dxtr, 0)
+    adv_fe[1:-2, 2:-2, 1:-1] = advection._adv_superbee(pyom, velocity, var[..., 1:-1], pyom.maskUp[..., 1:-1], 0)
+    # meridional velocity already contains the metric factor
+    slices = tuple((slice(2,-2), slice(1+n, -2+n or None), slice(1,-1)) for n in range(-1,3))
+    uCFL = np.abs(vvel[2:-2, 1:-2, 1:-1] * pyom.dt_tracer * pyom.dytr[np.newaxis, 1:-2, np.newaxis])
+    adv_fn[2:-2, 1:-2, 1:-1] = advection._superbee_flux(pyom, vvel[2:-2, 1:-2, 1:-1], uCFL, var, pyom.maskVp, slices)
+
+    # fluxes in wave angle are periodic; the first and last wave angle are boundary points
+    k = np.arange(pyom.np - 1)
+    km1 = np.where(k == 0, pyom.np - 3, k - 1)
+    kp2 = np.where(k == pyom.np - 2, 2, k + 2)
+    slices = tuple((slice(2,-2), slice(2,-2), index) for index in (km1, k, k + 1, kp2))
+    uCFL = np.abs(wvel[2:-2, 2:-2, :-1] * pyom.dt_tracer / pyom.dphit[np.newaxis, np.newaxis, :-1])
+    adv_ft[2:-2, 2:-2, :-1] = advection._superbee_flux(pyom, wvel[2:-2, 2:-2, :-1], uCFL, var, pyom.maskWp, slices)
 
 @pyom_method
-def reflect_flux(pyom,is_,ie_,js_,je_,np_,adv_fe,adv_fn):
+def reflect_flux(pyom, adv_fe, adv_fn):
     """
     refection boundary condition for advective flux in spectral space
-    """
-    # integer, intent(in) :: is_,ie_,js_,je_,np_
-    # real*8, intent(inout) :: adv_fe(is_:ie_,js_:je_,np_),adv_fn(is_:ie_,js_:je_,np_)
-    # integer :: i,j,k,kk
-    # real*8 :: flux
 
-    for k in xrange(2,np-1): # k = 2,np-1
-        # reflexion at southern boundary
-        for j in xrange(js_pe-1,je_pe): # j = js_pe-1,je_pe
-            for i in xrange(is_pe,ie_pe): # i = is_pe,ie_pe
-                kk = bc_south[i,j,k]
-                if kk > 0:
-                    flux = adv_fn[i,j+1,k]
-                    adv_fn[i,j,k] = adv_fn[i,j,k]  + flux
-                    adv_fn[i,j,kk] = adv_fn[i,j,kk] - flux
-
-        # reflexion at northern boundary
-        for j in xrange(js_pe-1,je_pe): # j = js_pe-1,je_pe
-            for i in xrange(is_pe,ie_pe): # i = is_pe,ie_pe
-                kk = bc_north[i,j,k]
-                if kk > 0:
-                    flux = adv_fn[i,j-1,k]
-                    adv_fn[i,j,k] = adv_fn[i,j,k]  + flux
-                    adv_fn[i,j,kk] = adv_fn[i,j,kk] - flux
-
-        # reflexion at western boundary
-        for j in xrange(js_pe,je_pe): # j = js_pe,je_pe
-            for i in xrange(is_pe-1,ie_pe): # i = is_pe-1,ie_pe
-                kk = bc_west[i,j,k]
-                if kk > 0:
-                    flux = adv_fe[i+1,j,k]
-                    adv_fe[i,j,k] = adv_fe[i,j,k]  + flux
-                    adv_fe[i,j,kk] = adv_fe[i,j,kk] - flux
+    The flux through a boundary face is set to the flux arriving at the boundary
+    cell, and subtracted from the wave angle it is reflected into (see :func:`reflect_ini`).
+    Fluxes through boundary faces vanish before reflection, so all boundaries
+    can be treated at once.
+    """
+    flux_south = np.where(pyom.bc_south[2:-2, 1:-2] > 0, adv_fn[2:-2, 2:-1], 0.)
+    flux_north = np.where(pyom.bc_north[2:-2, 1:-2] > 0, adv_fn[2:-2, :-3], 0.)
+    for flux, src in ((flux_south, pyom.bc_south_src), (flux_north, pyom.bc_north_src)):
+        adv_fn[2:-2, 1:-2] += flux
+        adv_fn[2:-2, 1:-2] -= flux[..., src]
+
+    flux_west = np.where(pyom.bc_west[1:-2, 2:-2] > 0, adv_fe[2:-1, 2:-2], 0.)
+    flux_east = np.where(pyom.bc_east[1:-2, 2:-2] > 0, adv_fe[:-3, 2:-2], 0.)
+    for flux, src in ((flux_west, pyom.bc_west_src), (flux_east, pyom.bc_east_src)):
+        adv_fe[1:-2, 2:-2] += flux
+        adv_fe[1:-2, 2:-2] -= flux[..., src]
 
-        # reflexion at eastern boundary
-        for j in xrange(js_pe,je_pe): # j = js_pe,je_pe
-            for i in xrange(is_pe-1,ie_pe): # i = is_pe-1,ie_pe
-                kk = bc_east[i,j,k]
-                if kk > 0:
-                    flux = adv_fe[i-1,j,k]
-                    adv_fe[i,j,k] = adv_fe[i,j,k]  + flux
-                    adv_fe[i,j,kk] = adv_fe[i,j,kk] - flux
+@pyom_method
+def _reflected_angle(pyom, fxa, is_reflected):
+    """
+    index of the wave angle closest to fxa (0 if not reflected), and the inverse mapping
+    """
+    fxa = np.where(fxa < 0., fxa + 2 * pyom.pi, fxa)
+    fxa = np.where(fxa > 2 * pyom.pi, fxa - 2 * pyom.pi, fxa)
+    kk = np.argmin((pyom.phit[np.newaxis, :] - fxa[:, np.newaxis])**2, axis=1)
+    kk = np.where(is_reflected, kk, 0)
+    src = np.zeros(pyom.np, dtype="int")
+    for k in range(1, pyom.np - 1):
+        if is_reflected[k]:
+            if src[kk[k]] != 0:
+                raise RuntimeError("wave angles {} and {} are reflected into the same angle".format(src[kk[k]], k))
+            src[kk[k]] = k
+    return kk, src
 
 @pyom_method
 def reflect_ini(pyom):
     """
     initialize indexing for reflection boundary conditions
     """
-    # integer :: i,j,k,kk
-    # real*8 :: fxa
-
-    if my_pe == 0:
-        print("preparing reflection boundary conditions")
-
-    for k in xrange(2,np-1): # k = 2,np-1
-        # southern boundary from pi to 2 pi
-        if phit[k] >= pyom.pi and phit[k] < 2*pyom.pi:
-            fxa = 2*pyom.pi - phit[k]
-            if xa < 0.:
-                fxa = fxa + 2*pi
-            if fxa > 2*pi:
-                fxa = fxa - 2*pi
-            kk = np.argmin(np.abs(phit - fxa),axis=1) #kk = minloc((phit  - fxa)**2,1)
-            for j in xrange(js_pe-1,je_pe): # j = js_pe-1,je_pe
-                # where (maskTp(is_pe:ie_pe,j,k) == 0.0 .and. maskTp(is_pe:ie_pe,j+1,k)== 1.0) bc_south(is_pe:ie_pe,j,k) = kk
-                bc_south_mask = np.logical_and(maskTp[is_pe:ie_pe,j,k] == 0.0, maskTp[is_pe:ie_pe,j+1,k] == 1.0)
-                bc_south[is_pe:ie_pe,j,k][bc_south_mask] = kk
-
-        # northern boundary from 0 to pi
-        else:
-            fxa = 2*pyom.pi - phit[k]
-            if fxa < 0:
-                fxa = fxa + 2*pyom.pi
-            if fxa > 2*pi:
-                fxa = fxa - 2*pyom.pi
-            kk = np.argmin(np.abs(phit - fxa),axis=1) #kk = minloc((phit  - fxa)**2,1)
-            for j in xrange(js_pe-1,je_pe): # j = js_pe-1,je_pe
-                # where (maskTp(is_pe:ie_pe,j,k) == 1.0 .and. maskTp(is_pe:ie_pe,j+1,k)== 0.0) bc_north(is_pe:ie_pe,j,k) = kk
-                bc_north_mask = np.logical_and(maskTp[is_pe:ie_pe,j,k] == 1.0, maskTp[is_pe:ie_pe,j+1,k] == 0.0)
-                bc_north[is_pe:ie_pe,j,k][bc_north_mask] = kk
-
-        # western boundary from 0.5 pi to 0.75 pi
-        if phit[k] >= pyom.pi/2 and phit[k] < 3*pyom.pi/2.:
-            fxa = pyom.pi - phit[k]
-            if fxa < 0.:
-                fxa = fxa + 2*pi
-            if fxa > 2*pi:
-                fxa = fxa - 2*pi
-            kk = np.argmin(np.abs(phit - fxa),axis=1) # kk = minloc((phit  - fxa)**2,1)
-            for i in xrange(is_pe-1,ie_pe): # i = is_pe-1,ie_pe
-                # where (maskTp(i,js_pe:je_pe,k) == 0.0 .and. maskTp(i+1,js_pe:je_pe,k)== 1.0) bc_west(i,js_pe:je_pe,k) = kk
-                bc_west_mask = np.logical_and(maskTp[i,js_pe:je_pe,k] == 0.0, maskTp[i+1,js_pe:je_pe,k] == 1.0)
-                bc_west[i,js_pe:je_pe,k][bc_west_mask] = kk
-
-        # eastern boundary from 0 to 0.5 pi and from 0.75 pi to 2 pi
-        else:
-            fxa = pyom.pi - phit[k]
-            if fxa < 0:
-                fxa = fxa + 2*pyom.pi
-            if fxa > 2*pi:
-                fxa = fxa - 2*pyom.pi
-            kk = np.argmin(np.abs(phit - fxa),axis=1) # kk = minloc((phit  - fxa)**2,1)
-            for i in xrange(is_pe-1,ie_pe): # i = is_pe-1,ie_pe
-                # where (maskTp(i,js_pe:je_pe,k) == 1.0 .and. maskTp(i+1,js_pe:je_pe,k)== 0.0) bc_east(i,js_pe:je_pe,k) = kk
-                bc_east_mask = np.logical_and(maskTp[i,js_pe:je_pe,k] == 1.0, maskTp[i+1,js_pe:je_pe,k] == 0.0)
-                bc_east[i,js_pe:je_pe,k][bc_east_mask] = kk
+    inner = np.zeros(pyom.np, dtype="bool")
+    inner[1:-1] = True
+
+    # southern boundary from pi to 2 pi, northern boundary from 0 to pi
+    is_south = inner & (pyom.phit >= pyom.pi) & (pyom.phit < 2 * pyom.pi)
+    for boundary, is_reflected, (mask_low, mask_high) in (("south", is_south, (0, 1)), ("north", inner & ~is_south, (1, 0))):
+        kk, src = _reflected_angle(pyom, 2 * pyom.pi - pyom.phit, is_reflected)
+        at_boundary = (pyom.maskTp[2:-2, 1:-2] == mask_low) & (pyom.maskTp[2:-2, 2:-1] == mask_high)
+        bc = getattr(pyom, "bc_" + boundary)
+        bc[...] = 0
+        bc[2:-2, 1:-2] = np.where(at_boundary, kk[np.newaxis, np.newaxis, :], 0)
+        getattr(pyom, "bc_{}_src".format(boundary))[...] = src
+
+    # western boundary from 0.5 pi to 1.5 pi, eastern boundary elsewhere
+    is_west = inner & (pyom.phit >= pyom.pi / 2) & (pyom.phit < 3 * pyom.pi / 2.)
+    for boundary, is_reflected, (mask_low, mask_high) in (("west", is_west, (0, 1)), ("east", inner & ~is_west, (1, 0))):
+        kk, src = _reflected_angle(pyom, pyom.pi - pyom.phit, is_reflected)
+        at_boundary = (pyom.maskTp[1:-2, 2:-2] == mask_low) & (pyom.maskTp[2:-1, 2:-2] == mask_high)
+        bc = getattr(pyom, "bc_" + boundary)
+        bc[...] = 0
+        bc[1:-2, 2:-2] = np.where(at_boundary, kk[np.newaxis, np.newaxis, :], 0)
+        getattr(pyom, "bc_{}_src".format(boundary))[...] = src
 
 @pyom_method
 def calc_spectral_topo(pyom):
@@ -200,41 +97,28 @@ def calc_spectral_topo(pyom):
     spectral stuff related to topography
     """
     if pyom.enable_idemix_M2 or pyom.enable_idemix_niw:
-        # wavenumber grid
-        dphit = 2.*pyom.pi/(np-2)
-        dphiu = dphit
-        phit[1] = 0.0 - dphit[1]
-        phiu[1] = phit[1]+dphit[1]/2.
-        for i in xrange(2,np): # i = 2,np
-            phit[i] = phit[i-1]+dphit[i]; phiu[i] = phiu[i-1]+dphiu[i]
+        if pyom.np < 4:
+            raise ValueError("np must be at least 4 for the low mode wave compartments")
+        # wavenumber grid, with one periodic boundary point on each end
+        pyom.dphit[...] = 2. * pyom.pi / (pyom.np - 2)
+        pyom.dphiu[...] = pyom.dphit
+        pyom.phit[...] = np.cumsum(np.concatenate((-pyom.dphit[:1], pyom.dphit[1:])))
+        pyom.phiu[...] = np.cumsum(np.concatenate((pyom.phit[:1] + pyom.dphit[:1] / 2., pyom.dphiu[1:])))
+
         # topographic mask for waves
-        maskTp = 0.0
-        for j in xrange(js_pe,je_pe): # j = js_pe,je_pe
-            for i in xrange(is_pe,ie_pe): # i = is_pe,ie_pe
-                if (kbot[i,j] != 0):
-                    maskTp[i,j,:] = 1.0
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_xp(maskTp)
-        else:
-            cyclic.setcyclic_p(maskTp)
-        maskUp = maskTp
-        for i in xrange(is_pe-onx,ie_pe+onx-1): # i = is_pe-onx,ie_pe+onx-1
-            maskUp[i,:,:] = min(maskTp[i,:,:],maskTp[i+1,:,:])
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_xp(maskUp)
-        else:
-            cyclic.setcyclic_p(maskUp)
-        maskVp = maskTp
-        for j in xrange(js_pe-onx,je_pe+onx-1): # j = js_pe-onx,je_pe+onx-1
-            maskVp[:,j,:] = min(maskTp[:,j,:],maskTp[:,j+1,:])
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_xp(maskVp)
-        else:
-            cyclic.setcyclic_p(maskVp)
-        maskWp = maskTp
-        for k in xrange(1,np-1): # k = 1,np-1
-            maskWp[:,:,k] = min(maskTp[:,:,k],maskTp[:,:,k+1])
-        # precalculate mirrow boundary conditions
-        reflect_ini()
+        pyom.maskTp[...] = 0
+        pyom.maskTp[2:-2, 2:-2, :] = (pyom.kbot[2:-2, 2:-2] != 0)[..., np.newaxis]
+        cyclic.enforce_boundaries(pyom, pyom.maskTp)
+        pyom.maskUp[...] = pyom.maskTp
+        pyom.maskUp[:-1, :, :] = np.minimum(pyom.maskTp[:-1, :, :], pyom.maskTp[1:, :, :])
+        cyclic.enforce_boundaries(pyom, pyom.maskUp)
+        pyom.maskVp[...] = pyom.maskTp
+        pyom.maskVp[:, :-1, :] = np.minimum(pyom.maskTp[:, :-1, :], pyom.maskTp[:, 1:, :])
+        cyclic.enforce_boundaries(pyom, pyom.maskVp)
+        pyom.maskWp[...] = pyom.maskTp
+        pyom.maskWp[:, :, :-1] = np.minimum(pyom.maskTp[:, :, :-1], pyom.maskTp[:, :, 1:])
+
+        # precalculate mirror boundary conditions
+        reflect_ini(pyom)
         # mark shelf for wave interaction
-        get_shelf()
+        get_shelf(pyom)
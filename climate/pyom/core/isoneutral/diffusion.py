@@ -1,71 +1,143 @@
 from ... import pyom_method
 from .. import numerics, utilities, diffusion
+from .isoneutral import isoneutral_flux_weights
 
 @pyom_method
-def _calc_tracer_fluxes(pyom, tr, K_iso, K_skew):
-    tr_pad = np.empty((pyom.nx+4,pyom.ny+4,pyom.nz+2))
-    tr_pad[:,:,1:-1] = tr[...,pyom.tau]
-    tr_pad[:,:,0] = tr[:,:,1,pyom.tau]
-    tr_pad[:,:,-1] = tr[:,:,-2,pyom.tau]
+def _calc_slope_sums(pyom, tr):
+    """
+    tracer dependent part of the isoneutral fluxes of tr (without time levels):
+    sums of the slope tensor components times the tracer gradients at east, north,
+    and top faces of "T" cells, and the fluxes by the diagonal components K_11 and K_22
+
+    These do not depend on the diffusivity, so they are shared by isopycnal and skew
+    fluxes (see _calc_fluxes). tr may have additional trailing axes (e.g. tracers),
+    the sums then have them, too.
+    """
+    batch = (Ellipsis,) + (np.newaxis,) * (tr.ndim - 3)
+    tr_pad = np.empty((pyom.nx+4,pyom.ny+4,pyom.nz+2) + tr.shape[3:])
+    tr_pad[:,:,1:-1] = tr
+    tr_pad[:,:,0] = tr[:,:,1]
+    tr_pad[:,:,-1] = tr[:,:,-2]
 
-    K1 = K_iso - K_skew
-    K2 = K_iso + K_skew
+    """
+    tracer differences, shared by all slope tensor components
+    """
+    diff_x = tr[1:,2:-2] - tr[:-1,2:-2]
+    diff_y = tr[2:-2,1:] - tr[2:-2,:-1]
+    diff_z = tr_pad[1:-1,1:-1,1:] - tr_pad[1:-1,1:-1,:-1]
 
     """
-    construct total isoneutral tracer flux at east face of "T" cells
+    east face of "T" cells
     """
-    diffloc = np.empty((pyom.nx+1,pyom.ny,pyom.nz))
-    diffloc[:,:,1:] = 0.25 * (K1[1:-2,2:-2,1:] + K1[1:-2,2:-2,:-1] + K1[2:-1,2:-2,1:] + K1[2:-1,2:-2,:-1])
-    diffloc[:,:,0] = 0.5 * (K1[1:-2,2:-2,0] + K1[2:-1,2:-2,0])
-    sumz = np.zeros((pyom.nx+1,pyom.ny,pyom.nz))
+    sum_east = 0.
     for kr in xrange(2):
         for ip in xrange(2):
-            sumz += diffloc * pyom.Ai_ez[1:-2,2:-2,:,ip,kr] * (tr_pad[1+ip:-2+ip,2:-2,1+kr:-1+kr or None] - tr_pad[1+ip:-2+ip,2:-2,kr:-2+kr])
-    pyom.flux_east[1:-2,2:-2,:] = sumz / (4.*pyom.dzt[np.newaxis,np.newaxis,:]) + (tr[2:-1,2:-2,:,pyom.tau] - tr[1:-2,2:-2,:,pyom.tau]) / (pyom.cost[np.newaxis,2:-2,np.newaxis] * pyom.dxu[1:-2,np.newaxis,np.newaxis]) * pyom.K_11[1:-2,2:-2,:]
+            sum_east += pyom.Ai_ez[1:-2,2:-2,:,ip,kr][batch] * diff_z[ip:pyom.nx+1+ip,1:-1,kr:pyom.nz+kr]
+    diag_east = diff_x[1:-1] * ((pyom.costr[np.newaxis,2:-2,np.newaxis] * pyom.dxur[1:-2,np.newaxis,np.newaxis]) * pyom.K_11[1:-2,2:-2,:])[batch]
 
     """
-    construct total isoneutral tracer flux at north face of "T" cells
+    north face of "T" cells
     """
-    diffloc = np.empty((pyom.nx,pyom.ny+1,pyom.nz))
-    diffloc[:,:,1:] = 0.25 * (K1[2:-2,1:-2,1:] + K1[2:-2,1:-2,:-1] + K1[2:-2,2:-1,1:] + K1[2:-2,2:-1,:-1])
-    diffloc[:,:,0] = 0.5 * (K1[2:-2,1:-2,0] + K1[2:-2,2:-1,0])
-    sumz = np.zeros((pyom.nx,pyom.ny+1,pyom.nz))
+    sum_north = 0.
     for kr in xrange(2):
         for jp in xrange(2):
-            sumz += diffloc * pyom.Ai_nz[2:-2,1:-2,:,jp,kr] * (tr_pad[2:-2,1+jp:-2+jp,1+kr:-1+kr or None] - tr_pad[2:-2,1+jp:-2+jp,kr:-2+kr])
-    pyom.flux_north[2:-2,1:-2,:] = pyom.cosu[np.newaxis,1:-2,np.newaxis] * (sumz / (4.*pyom.dzt[np.newaxis,np.newaxis,:]) + (tr[2:-2,2:-1,:,pyom.tau] - tr[2:-2,1:-2,:,pyom.tau]) / pyom.dyu[np.newaxis,1:-2,np.newaxis] * pyom.K_22[2:-2,1:-2,:])
+            sum_north += pyom.Ai_nz[2:-2,1:-2,:,jp,kr][batch] * diff_z[1:-1,jp:pyom.ny+1+jp,kr:pyom.nz+kr]
+    diag_north = diff_y[:,1:-1] * (pyom.cosu[np.newaxis,1:-2,np.newaxis] * pyom.dyur[np.newaxis,1:-2,np.newaxis] * pyom.K_22[2:-2,1:-2,:])[batch]
 
     """
-    compute the vertical tracer flux "pyom.flux_top" containing the K31
-    and K32 components which are to be solved explicitly. The K33
-    component will be treated implicitly. Note that there are some
-    cancellations of dxu(i-1+ip) and dyu(jrow-1+jp)
+    top face of "T" cells, containing the K31 and K32 components which are
+    to be solved explicitly. The K33 component will be treated implicitly.
+    Note that there are some cancellations of dxu(i-1+ip) and dyu(jrow-1+jp)
     """
-    diffloc = K2[2:-2,2:-2,:-1]
     sumx = 0.
     for ip in xrange(2):
         for kr in xrange(2):
-            sumx += diffloc * pyom.Ai_bx[2:-2,2:-2,:-1,ip,kr] / pyom.cost[np.newaxis,2:-2,np.newaxis] \
-                    * (tr[2+ip:-2+ip,2:-2,kr:-1+kr or None,pyom.tau] - tr[1+ip:-3+ip,2:-2,kr:-1+kr or None,pyom.tau])
+            sumx += (pyom.Ai_bx[2:-2,2:-2,:-1,ip,kr] * pyom.costr[np.newaxis,2:-2,np.newaxis])[batch] \
+                    * diff_x[1+ip:pyom.nx+1+ip,:,kr:pyom.nz-1+kr]
     sumy = 0.
     for jp in xrange(2):
         for kr in xrange(2):
-            sumy += diffloc * pyom.Ai_by[2:-2,2:-2,:-1,jp,kr] * pyom.cosu[np.newaxis,1+jp:-3+jp,np.newaxis] \
-                    * (tr[2:-2,2+jp:-2+jp,kr:-1+kr or None,pyom.tau] - tr[2:-2,1+jp:-3+jp,kr:-1+kr or None, pyom.tau])
-    pyom.flux_top[2:-2,2:-2,:-1] = sumx / (4*pyom.dxt[2:-2,np.newaxis,np.newaxis]) + sumy / (4*pyom.dyt[np.newaxis,2:-2,np.newaxis] * pyom.cost[np.newaxis,2:-2,np.newaxis])
-    pyom.flux_top[:,:,-1] = 0.
+            sumy += (pyom.Ai_by[2:-2,2:-2,:-1,jp,kr] * pyom.cosu[np.newaxis,1+jp:-3+jp,np.newaxis])[batch] \
+                    * diff_y[:,1+jp:pyom.ny+1+jp,kr:pyom.nz-1+kr]
+    sum_top = sumx / (4*pyom.dxt[2:-2,np.newaxis,np.newaxis])[batch] \
+            + sumy / (4*pyom.dyt[np.newaxis,2:-2,np.newaxis] * pyom.cost[np.newaxis,2:-2,np.newaxis])[batch]
+
+    return sum_east, diag_east, sum_north, diag_north, sum_top
+
+@pyom_method
+def _flux_weights(pyom, iso, skew, precomputed=True):
+    """
+    weights of the slope sums in the isoneutral fluxes across east, north, and top
+    faces of "T" cells, for isopycnal and / or skew diffusion. Weights are either
+    taken from isoneutral_diffusion_pre or computed from the current K_iso and K_gm.
+    """
+    weight_east, weight_north, weight_top = 0., 0., 0.
+    for enabled, K, sign in ((iso, pyom.K_iso, 1.), (skew, pyom.K_gm, -1.)):
+        if not enabled:
+            continue
+        if not precomputed:
+            K_ez, K_nz = np.zeros_like(K), np.zeros_like(K)
+            isoneutral_flux_weights(pyom, K, K_ez, K_nz)
+        elif sign > 0:
+            K_ez, K_nz = pyom.K_iso_ez, pyom.K_iso_nz
+        else:
+            K_ez, K_nz = pyom.K_gm_ez, pyom.K_gm_nz
+        weight_east = weight_east + sign * K_ez
+        weight_north = weight_north + sign * K_nz
+        weight_top = weight_top + K
+    return weight_east, weight_north, weight_top
+
+@pyom_method
+def _calc_fluxes(pyom, sums, weights, flux_east, flux_north, flux_top):
+    """
+    isoneutral tracer fluxes from the slope sums of _calc_slope_sums and the
+    weights of _flux_weights, stored in flux_east, flux_north, and flux_top
+    """
+    sum_east, diag_east, sum_north, diag_north, sum_top = sums
+    weight_east, weight_north, weight_top = weights
+    batch = (Ellipsis,) + (np.newaxis,) * (sum_east.ndim - 3)
+    flux_east[1:-2,2:-2,:] = weight_east[1:-2,2:-2,:][batch] * sum_east + diag_east
+    flux_north[2:-2,1:-2,:] = weight_north[2:-2,1:-2,:][batch] * sum_north + diag_north
+    flux_top[2:-2,2:-2,:-1] = weight_top[2:-2,2:-2,:-1][batch] * sum_top
+    flux_top[:,:,-1] = 0.
 
 @pyom_method
-def _calc_explicit_part(pyom):
-    aloc = np.zeros((pyom.nx+4, pyom.ny+4, pyom.nz))
-    aloc[2:-2,2:-2,:] = pyom.maskT[2:-2,2:-2,:] * ((pyom.flux_east[2:-2,2:-2,:] - pyom.flux_east[1:-3,2:-2,:]) / (pyom.cost[np.newaxis,2:-2,np.newaxis] * pyom.dxt[2:-2,np.newaxis,np.newaxis]) \
-                                                 + (pyom.flux_north[2:-2,2:-2,:] - pyom.flux_north[2:-2,1:-3,:]) / (pyom.cost[np.newaxis,2:-2,np.newaxis] * pyom.dyt[np.newaxis,2:-2,np.newaxis]))
-    aloc[:,:,0] += pyom.maskT[:,:,0] * pyom.flux_top[:,:,0] / pyom.dzt[0]
-    aloc[:,:,1:] += pyom.maskT[:,:,1:] * (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) / pyom.dzt[np.newaxis,np.newaxis,1:]
+def _calc_tracer_fluxes(pyom, tr, iso, skew, flux_east=None, flux_north=None, flux_top=None):
+    """
+    isoneutral fluxes of tracer tr (with time levels on the last axis), stored in
+    flux_east, flux_north, and flux_top (default: the model's flux arrays)
+
+    Weights are computed from the current diffusivities, so this does not
+    depend on isoneutral_diffusion_pre being called with them.
+    """
+    if flux_east is None:
+        flux_east, flux_north, flux_top = pyom.flux_east, pyom.flux_north, pyom.flux_top
+    sums = _calc_slope_sums(pyom, tr[..., pyom.tau])
+    _calc_fluxes(pyom, sums, _flux_weights(pyom, iso, skew, precomputed=False), flux_east, flux_north, flux_top)
+
+@pyom_method
+def _calc_explicit_part(pyom, flux_east=None, flux_north=None, flux_top=None):
+    """
+    tracer tendency from the divergence of the given fluxes (default: the model's flux arrays)
+    """
+    if flux_east is None:
+        flux_east, flux_north, flux_top = pyom.flux_east, pyom.flux_north, pyom.flux_top
+    batch = (Ellipsis,) + (np.newaxis,) * (flux_east.ndim - 3)
+    aloc = np.zeros(flux_east.shape)
+    aloc[2:-2,2:-2,:] = pyom.maskT[2:-2,2:-2,:][batch] * ((flux_east[2:-2,2:-2,:] - flux_east[1:-3,2:-2,:]) * (pyom.costr[np.newaxis,2:-2,np.newaxis] * pyom.dxtr[2:-2,np.newaxis,np.newaxis])[batch] \
+                                                        + (flux_north[2:-2,2:-2,:] - flux_north[2:-2,1:-3,:]) * (pyom.costr[np.newaxis,2:-2,np.newaxis] * pyom.dytr[np.newaxis,2:-2,np.newaxis])[batch])
+    aloc[:,:,0] += pyom.maskT[:,:,0][batch] * flux_top[:,:,0] * pyom.dztr[0]
+    aloc[:,:,1:] += pyom.maskT[:,:,1:][batch] * (flux_top[:,:,1:] - flux_top[:,:,:-1]) * pyom.dztr[np.newaxis,np.newaxis,1:][batch]
     return aloc
 
 @pyom_method
 def _calc_implicit_part(pyom, tr):
+    """
+    implicit vertical mixing by K_33 of tracer tr (a single time level, modified in place)
+
+    tr may have additional trailing axes (e.g. tracers), all tracers are then
+    solved for with the same matrix
+    """
     ks = pyom.kbot[2:-2,2:-2] - 1
 
     a_tri = np.zeros((pyom.nx,pyom.ny,pyom.nz))
@@ -73,15 +145,36 @@ def _calc_implicit_part(pyom, tr):
     c_tri = np.zeros((pyom.nx,pyom.ny,pyom.nz))
     delta = np.zeros((pyom.nx,pyom.ny,pyom.nz))
 
-    delta[:,:,:-1] = pyom.dt_tracer / pyom.dzw[np.newaxis,np.newaxis,:-1] * pyom.K_33[2:-2,2:-2,:-1]
+    delta[:,:,:-1] = pyom.dt_tracer * pyom.dzwr[np.newaxis,np.newaxis,:-1] * pyom.K_33[2:-2,2:-2,:-1]
     delta[:,:,-1] = 0.
-    a_tri[:,:,1:] = -delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,1:]
-    b_tri[:,:,1:-1] = 1 + (delta[:,:,1:-1] + delta[:,:,:-2]) / pyom.dzt[np.newaxis,np.newaxis,1:-1]
-    b_tri[:,:,-1] = 1 + delta[:,:,-2] / pyom.dzt[np.newaxis,np.newaxis,-1]
-    b_tri_edge = 1 + (delta[:,:,:] / pyom.dzt[np.newaxis,np.newaxis,:])
-    c_tri[:,:,:-1] = -delta[:,:,:-1] / pyom.dzt[np.newaxis,np.newaxis,:-1]
-    sol, water_mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, tr[2:-2, 2:-2, :, pyom.taup1], b_edge=b_tri_edge)
-    tr[2:-2,2:-2,:,pyom.taup1] = np.where(water_mask, sol, tr[2:-2,2:-2,:,pyom.taup1])
+    a_tri[:,:,1:] = -delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,1:]
+    b_tri[:,:,1:-1] = 1 + (delta[:,:,1:-1] + delta[:,:,:-2]) * pyom.dztr[np.newaxis,np.newaxis,1:-1]
+    b_tri[:,:,-1] = 1 + delta[:,:,-2] * pyom.dztr[np.newaxis,np.newaxis,-1]
+    b_tri_edge = 1 + (delta[:,:,:] * pyom.dztr[np.newaxis,np.newaxis,:])
+    c_tri[:,:,:-1] = -delta[:,:,:-1] * pyom.dztr[np.newaxis,np.newaxis,:-1]
+    sol, water_mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, tr[2:-2,2:-2,...], b_edge=b_tri_edge)
+    batch = (Ellipsis,) + (np.newaxis,) * (tr.ndim - 3)
+    tr[2:-2,2:-2,...] = np.where(water_mask[batch], sol, tr[2:-2,2:-2,...])
+
+@pyom_method
+def _calc_dissipation(pyom, p_arr, int_drhodX, flux_east, flux_north, flux_top, tr_new=None):
+    """
+    dissipation of dynamic enthalpy by the isoneutral fluxes of a tracer with
+    density derivative int_drhodX, interpolated on W-grid and added to p_arr
+    If the tracer after the implicit part (tr_new) is given, dissipation by
+    implicit vertical mixing is included
+    """
+    diffusion.dissipation_on_wgrid(pyom, p_arr, int_drhodX=int_drhodX, flux_east=flux_east, flux_north=flux_north)
+
+    """
+    diagnose dissipation of dynamic enthalpy by explicit and implicit vertical mixing
+    """
+    fxa = (-int_drhodX[2:-2,2:-2,1:] + int_drhodX[2:-2,2:-2,:-1]) * pyom.dzwr[np.newaxis,np.newaxis,:-1]
+    diss = - pyom.grav / pyom.rho_0 * fxa * flux_top[2:-2,2:-2,:-1] * pyom.maskW[2:-2,2:-2,:-1]
+    if tr_new is not None:
+        diss = diss - pyom.grav / pyom.rho_0 * fxa * pyom.K_33[2:-2,2:-2,:-1] * (tr_new[2:-2,2:-2,1:] - tr_new[2:-2,2:-2,:-1]) \
+                                                  * pyom.dzwr[np.newaxis,np.newaxis,:-1] * pyom.maskW[2:-2,2:-2,:-1]
+    p_arr[2:-2,2:-2,:-1] += diss
 
 @pyom_method
 def isoneutral_diffusion(pyom, tr, istemp, iso=True, skew=False):
@@ -91,16 +184,7 @@ def isoneutral_diffusion(pyom, tr, istemp, iso=True, skew=False):
     Dissipation is calculated and stored in P_diss_iso
     T/S changes are added to dtemp_iso/dsalt_iso
     """
-    if iso:
-        K_iso = pyom.K_iso
-    else:
-        K_iso = np.zeros_like(pyom.K_iso)
-    if skew:
-        K_skew = pyom.K_gm
-    else:
-        K_skew = np.zeros_like(pyom.K_gm)
-
-    _calc_tracer_fluxes(pyom, tr, K_iso, K_skew)
+    _calc_tracer_fluxes(pyom, tr, iso, skew)
 
     """
     add explicit part
@@ -117,7 +201,7 @@ def isoneutral_diffusion(pyom, tr, istemp, iso=True, skew=False):
     """
     if iso:
         aloc[...] = tr[:,:,:,pyom.taup1]
-        _calc_implicit_part(pyom,tr)
+        _calc_implicit_part(pyom, tr[:,:,:,pyom.taup1])
         if istemp:
             pyom.dtemp_iso += (tr[:,:,:,pyom.taup1] - aloc) / pyom.dt_tracer
         else:
@@ -131,27 +215,11 @@ def isoneutral_diffusion(pyom, tr, istemp, iso=True, skew=False):
             int_drhodX = pyom.int_drhodT[:,:,:,pyom.tau]
         else:
             int_drhodX = pyom.int_drhodS[:,:,:,pyom.tau]
-
-        """
-        dissipation interpolated on W-grid
-        """
         if not iso:
-            diffusion.dissipation_on_wgrid(pyom, pyom.P_diss_skew, int_drhodX=int_drhodX)
+            _calc_dissipation(pyom, pyom.P_diss_skew, int_drhodX, pyom.flux_east, pyom.flux_north, pyom.flux_top)
         else:
-            diffusion.dissipation_on_wgrid(pyom, pyom.P_diss_iso, int_drhodX=int_drhodX)
-
-        """
-        diagnose dissipation of dynamic enthalpy by explicit and implicit vertical mixing
-        """
-        fxa = (-int_drhodX[2:-2,2:-2,1:] + int_drhodX[2:-2,2:-2,:-1]) / pyom.dzw[np.newaxis,np.newaxis,:-1]
-        tracer = pyom.temp if istemp else pyom.salt
-        if not iso:
-            pyom.P_diss_skew[2:-2,2:-2,:-1] += - pyom.grav / pyom.rho_0 * fxa * pyom.flux_top[2:-2,2:-2,:-1] * pyom.maskW[2:-2,2:-2,:-1]
-        else:
-            pyom.P_diss_iso[2:-2,2:-2,:-1] += - pyom.grav / pyom.rho_0 * fxa * pyom.flux_top[2:-2,2:-2,:-1] * pyom.maskW[2:-2,2:-2,:-1] \
-                                              - pyom.grav / pyom.rho_0 * fxa * pyom.K_33[2:-2,2:-2,:-1] * (tracer[2:-2,2:-2,1:,pyom.taup1] \
-                                                                                                         - tracer[2:-2,2:-2,:-1,pyom.taup1]) \
-                                                                                        / pyom.dzw[np.newaxis,np.newaxis,:-1] * pyom.maskW[2:-2,2:-2,:-1]
+            _calc_dissipation(pyom, pyom.P_diss_iso, int_drhodX, pyom.flux_east, pyom.flux_north, pyom.flux_top,
+                              tr_new=tr[:,:,:,pyom.taup1])
 
 @pyom_method
 def isoneutral_skew_diffusion(pyom,tr,istemp):
@@ -171,3 +239,81 @@ def isoneutral_diffusion_all(pyom,tr,istemp):
     Dissipation is calculated and stored in P_diss_iso
     """
     isoneutral_diffusion(pyom,tr,istemp,skew=True,iso=True)
+
+@pyom_method
+def isoneutral_diffusion_tempsalt(pyom):
+    """
+    Isopycnal diffusion and, if enabled, skew diffusion of temperature and salinity,
+    following functional formulation by Griffies et al
+    Same as isoneutral_diffusion for temp and salt followed by isoneutral_skew_diffusion
+    for both, but the slope sums are computed in a single pass for both tracers and
+    shared by isopycnal and skew fluxes, with the weights from isoneutral_diffusion_pre
+    Dissipation is stored in P_diss_iso and P_diss_skew
+    T/S changes are added to dtemp_iso/dsalt_iso
+    """
+    tracers = (pyom.temp, pyom.salt)
+    tendencies = (pyom.dtemp_iso, pyom.dsalt_iso)
+    int_drhodX = (pyom.int_drhodT[:,:,:,pyom.tau], pyom.int_drhodS[:,:,:,pyom.tau])
+
+    tr = np.empty((pyom.nx+4, pyom.ny+4, pyom.nz, len(tracers)))
+    for n, tracer in enumerate(tracers):
+        tr[..., n] = tracer[:,:,:,pyom.tau]
+    sums = _calc_slope_sums(pyom, tr)
+    flux_east, flux_north, flux_top = (np.zeros(tr.shape) for _ in range(3))
+
+    """
+    isopycnal diffusion, explicit and implicit part
+    """
+    _calc_fluxes(pyom, sums, _flux_weights(pyom, iso=True, skew=False), flux_east, flux_north, flux_top)
+    aloc = _calc_explicit_part(pyom, flux_east, flux_north, flux_top)
+    for n, tracer in enumerate(tracers):
+        tendencies[n][...] += aloc[..., n]
+        tracer[2:-2, 2:-2, :, pyom.taup1] += pyom.dt_tracer * aloc[2:-2, 2:-2, :, n]
+        tr[..., n] = tracer[:,:,:,pyom.taup1]
+    _calc_implicit_part(pyom, tr)
+    for n, tracer in enumerate(tracers):
+        tendencies[n][...] += (tr[..., n] - tracer[:,:,:,pyom.taup1]) / pyom.dt_tracer
+        tracer[:,:,:,pyom.taup1] = tr[..., n]
+        if pyom.enable_conserve_energy:
+            _calc_dissipation(pyom, pyom.P_diss_iso, int_drhodX[n], flux_east[..., n], flux_north[..., n],
+                              flux_top[..., n], tr_new=tracer[:,:,:,pyom.taup1])
+
+    """
+    skew diffusion, explicit part only
+    """
+    if pyom.enable_skew_diffusion:
+        _calc_fluxes(pyom, sums, _flux_weights(pyom, iso=False, skew=True), flux_east, flux_north, flux_top)
+        aloc = _calc_explicit_part(pyom, flux_east, flux_north, flux_top)
+        for n, tracer in enumerate(tracers):
+            tendencies[n][...] += aloc[..., n]
+            tracer[2:-2, 2:-2, :, pyom.taup1] += pyom.dt_tracer * aloc[2:-2, 2:-2, :, n]
+            if pyom.enable_conserve_energy:
+                _calc_dissipation(pyom, pyom.P_diss_skew, int_drhodX[n], flux_east[..., n], flux_north[..., n], flux_top[..., n])
+
+    # the model's flux arrays hold the fluxes of salinity, as after the separate calls
+    pyom.flux_east[...] = flux_east[..., -1]
+    pyom.flux_north[...] = flux_north[..., -1]
+    pyom.flux_top[...] = flux_top[..., -1]
+
+@pyom_method
+def isoneutral_diffusion_tracers(pyom, tr, iso=True, skew=False):
+    """
+    Isopycnal and / or skew diffusion for a batch of passive tracers tr with the
+    tracer index on the fourth axis, following functional formulation by Griffies et al
+    Fluxes are computed for all tracers at once with the weights from
+    isoneutral_diffusion_pre, and the implicit part is solved with a single matrix.
+    Terms are applied in the same order as for temperature and salinity
+    (see isoneutral_diffusion_tempsalt): isopycnal diffusion with its implicit part,
+    then skew diffusion. No dissipation is diagnosed.
+    """
+    flux_east, flux_north, flux_top = (np.zeros(tr.shape[:-1]) for _ in range(3))
+    sums = _calc_slope_sums(pyom, tr[..., pyom.tau])
+    if iso:
+        _calc_fluxes(pyom, sums, _flux_weights(pyom, iso=True, skew=False), flux_east, flux_north, flux_top)
+        aloc = _calc_explicit_part(pyom, flux_east, flux_north, flux_top)
+        tr[2:-2, 2:-2, :, :, pyom.taup1] += pyom.dt_tracer * aloc[2:-2, 2:-2, :, :]
+        _calc_implicit_part(pyom, tr[..., pyom.taup1])
+    if skew:
+        _calc_fluxes(pyom, sums, _flux_weights(pyom, iso=False, skew=True), flux_east, flux_north, flux_top)
+        aloc = _calc_explicit_part(pyom, flux_east, flux_north, flux_top)
+        tr[2:-2, 2:-2, :, :, pyom.taup1] += pyom.dt_tracer * aloc[2:-2, 2:-2, :, :]
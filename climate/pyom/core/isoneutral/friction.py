@@ -18,13 +18,13 @@ def isoneutral_friction(pyom):
     ks = np.maximum(pyom.kbot[1:-2, 1:-2], pyom.kbot[2:-1, 1:-2]) - 1
     fxa = 0.5 * (pyom.kappa_gm[1:-2, 1:-2, :] + pyom.kappa_gm[2:-1, 1:-2, :])
     delta, a_tri, b_tri, c_tri = (np.zeros((pyom.nx+1,pyom.ny+1,pyom.nz)) for _ in range(4))
-    delta[:, :, :-1] = pyom.dt_mom / pyom.dzw[np.newaxis, np.newaxis, :-1] * fxa[:, :, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
+    delta[:, :, :-1] = pyom.dt_mom * pyom.dzwr[np.newaxis, np.newaxis, :-1] * fxa[:, :, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
     delta[-1] = 0.
-    a_tri[:, :, 1:] = -delta[:, :, :-1] / pyom.dzt[np.newaxis, np.newaxis, 1:]
-    b_tri_edge = 1 + delta / pyom.dzt[np.newaxis, np.newaxis, :]
-    b_tri[:, :, 1:-1] = 1 + delta[:, :, 1:-1] / pyom.dzt[np.newaxis, np.newaxis, 1:-1] + delta[:, :, :-2] / pyom.dzt[np.newaxis, np.newaxis, 1:-1]
-    b_tri[:, :, -1] = 1 + delta[:, :, -2] / pyom.dzt[-1]
-    c_tri[...] = - delta / pyom.dzt[np.newaxis, np.newaxis, :]
+    a_tri[:, :, 1:] = -delta[:, :, :-1] * pyom.dztr[np.newaxis, np.newaxis, 1:]
+    b_tri_edge = 1 + delta * pyom.dztr[np.newaxis, np.newaxis, :]
+    b_tri[:, :, 1:-1] = 1 + delta[:, :, 1:-1] * pyom.dztr[np.newaxis, np.newaxis, 1:-1] + delta[:, :, :-2] * pyom.dztr[np.newaxis, np.newaxis, 1:-1]
+    b_tri[:, :, -1] = 1 + delta[:, :, -2] * pyom.dztr[-1]
+    c_tri[...] = - delta * pyom.dztr[np.newaxis, np.newaxis, :]
     sol, water_mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, aloc[1:-2, 1:-2, :], b_edge=b_tri_edge)
     pyom.u[1:-2, 1:-2, :, pyom.taup1] = np.where(water_mask, sol, pyom.u[1:-2, 1:-2, :, pyom.taup1])
     pyom.du_mix[1:-2, 1:-2, :] += (pyom.u[1:-2, 1:-2, :, pyom.taup1] - aloc[1:-2, 1:-2, :]) / pyom.dt_mom * water_mask
@@ -33,9 +33,9 @@ def isoneutral_friction(pyom):
         # diagnose dissipation
         fxa = 0.5 * (pyom.kappa_gm[1:-2, 1:-2, :-1] + pyom.kappa_gm[2:-1, 1:-2, :-1])
         pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.u[1:-2, 1:-2, 1:, pyom.taup1] - pyom.u[1:-2, 1:-2, :-1, pyom.taup1]) \
-                                             / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
+                                             * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskU[1:-2, 1:-2, 1:] * pyom.maskU[1:-2, 1:-2, :-1]
         diss[1:-2, 1:-2, :-1] = (pyom.u[1:-2, 1:-2, 1:, pyom.tau] - pyom.u[1:-2, 1:-2, :-1, pyom.tau]) \
-                                                                    * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[np.newaxis, np.newaxis, :-1]
+                                                                    * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[np.newaxis, np.newaxis, :-1]
         diss[:,:,-1] = 0.0
         diss = numerics.ugrid_to_tgrid(pyom, diss)
         pyom.K_diss_gm[...] = diss
@@ -49,13 +49,13 @@ def isoneutral_friction(pyom):
     ks = np.maximum(pyom.kbot[1:-2, 1:-2], pyom.kbot[1:-2, 2:-1]) - 1
     fxa = 0.5 * (pyom.kappa_gm[1:-2, 1:-2, :] + pyom.kappa_gm[1:-2, 2:-1, :])
     delta, a_tri, b_tri, c_tri = (np.zeros((pyom.nx+1,pyom.ny+1,pyom.nz)) for _ in range(4))
-    delta[:, :, :-1] = pyom.dt_mom / pyom.dzw[np.newaxis, np.newaxis, :-1] * fxa[:, :, :-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
+    delta[:, :, :-1] = pyom.dt_mom * pyom.dzwr[np.newaxis, np.newaxis, :-1] * fxa[:, :, :-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
     delta[-1] = 0.
-    a_tri[:, :, 1:] = -delta[:, :, :-1] / pyom.dzt[np.newaxis, np.newaxis, 1:]
-    b_tri_edge = 1 + delta / pyom.dzt[np.newaxis, np.newaxis, :]
-    b_tri[:, :, 1:-1] = 1 + delta[:, :, 1:-1] / pyom.dzt[np.newaxis, np.newaxis, 1:-1] + delta[:, :, :-2] / pyom.dzt[np.newaxis, np.newaxis, 1:-1]
-    b_tri[:, :, -1] = 1 + delta[:, :, -2] / pyom.dzt[-1]
-    c_tri[...] = - delta / pyom.dzt[np.newaxis, np.newaxis, :]
+    a_tri[:, :, 1:] = -delta[:, :, :-1] * pyom.dztr[np.newaxis, np.newaxis, 1:]
+    b_tri_edge = 1 + delta * pyom.dztr[np.newaxis, np.newaxis, :]
+    b_tri[:, :, 1:-1] = 1 + delta[:, :, 1:-1] * pyom.dztr[np.newaxis, np.newaxis, 1:-1] + delta[:, :, :-2] * pyom.dztr[np.newaxis, np.newaxis, 1:-1]
+    b_tri[:, :, -1] = 1 + delta[:, :, -2] * pyom.dztr[-1]
+    c_tri[...] = - delta * pyom.dztr[np.newaxis, np.newaxis, :]
     sol, water_mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, aloc[1:-2, 1:-2, :], b_edge=b_tri_edge)
     pyom.v[1:-2, 1:-2, :, pyom.taup1] = np.where(water_mask, sol, pyom.v[1:-2, 1:-2, :, pyom.taup1])
     pyom.dv_mix[1:-2, 1:-2, :] += (pyom.v[1:-2, 1:-2, :, pyom.taup1] - aloc[1:-2, 1:-2, :]) / pyom.dt_mom * water_mask
@@ -64,9 +64,9 @@ def isoneutral_friction(pyom):
         # diagnose dissipation
         fxa = 0.5 * (pyom.kappa_gm[1:-2, 1:-2, :-1] + pyom.kappa_gm[1:-2, 2:-1, :-1])
         pyom.flux_top[1:-2, 1:-2, :-1] = fxa * (pyom.v[1:-2, 1:-2, 1:, pyom.taup1] - pyom.v[1:-2, 1:-2, :-1, pyom.taup1]) \
-                                             / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
+                                             * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskV[1:-2, 1:-2, 1:] * pyom.maskV[1:-2, 1:-2, :-1]
         diss[1:-2, 1:-2, :-1] = (pyom.v[1:-2, 1:-2, 1:, pyom.tau] - pyom.v[1:-2, 1:-2, :-1, pyom.tau]) \
-                                                                    * pyom.flux_top[1:-2, 1:-2, :-1] / pyom.dzw[np.newaxis, np.newaxis, :-1]
+                                                                    * pyom.flux_top[1:-2, 1:-2, :-1] * pyom.dzwr[np.newaxis, np.newaxis, :-1]
         diss[:,:,-1] = 0.0
         diss = numerics.vgrid_to_tgrid(pyom,diss)
         pyom.K_diss_gm += diss
@@ -1,7 +1,8 @@
 from .. import density, utilities
-from ... import pyom_method, pyom_inline_method
+from ... import pyom_method, pyom_inline_method, tiled
 
 @pyom_method
+@tiled
 def isoneutral_diffusion_pre(pyom):
     """
     Isopycnal diffusion for tracer
@@ -17,27 +18,28 @@ def isoneutral_diffusion_pre(pyom):
     """
     drho_dt and drho_ds at centers of T cells
     """
-    drdTS[:,:,:,0] = density.get_drhodT(pyom,pyom.salt[:,:,:,pyom.tau],pyom.temp[:,:,:,pyom.tau],np.abs(pyom.zt)) * pyom.maskT
-    drdTS[:,:,:,1] = density.get_drhodS(pyom,pyom.salt[:,:,:,pyom.tau],pyom.temp[:,:,:,pyom.tau],np.abs(pyom.zt)) * pyom.maskT
+    drhodT, drhodS = density.get_eos(pyom,pyom.salt[:,:,:,pyom.tau],pyom.temp[:,:,:,pyom.tau],np.abs(pyom.zt),("drhodT","drhodS"))
+    drdTS[:,:,:,0] = drhodT * pyom.maskT
+    drdTS[:,:,:,1] = drhodS * pyom.maskT
 
     """
     gradients at top face of T cells
     """
-    ddzt[:,:,:-1,0] = pyom.maskW[:,:,:-1] * (pyom.temp[:,:,1:,pyom.tau] - pyom.temp[:,:,:-1,pyom.tau]) / pyom.dzw[np.newaxis,np.newaxis,:-1]
-    ddzt[:,:,:-1,1] = pyom.maskW[:,:,:-1] * (pyom.salt[:,:,1:,pyom.tau] - pyom.salt[:,:,:-1,pyom.tau]) / pyom.dzw[np.newaxis,np.newaxis,:-1]
+    ddzt[:,:,:-1,0] = pyom.maskW[:,:,:-1] * (pyom.temp[:,:,1:,pyom.tau] - pyom.temp[:,:,:-1,pyom.tau]) * pyom.dzwr[np.newaxis,np.newaxis,:-1]
+    ddzt[:,:,:-1,1] = pyom.maskW[:,:,:-1] * (pyom.salt[:,:,1:,pyom.tau] - pyom.salt[:,:,:-1,pyom.tau]) * pyom.dzwr[np.newaxis,np.newaxis,:-1]
     ddzt[...,-1,:] = 0.
 
     """
     gradients at eastern face of T cells
     """
-    ddxt[:-1,:,:,0] = pyom.maskU[:-1,:,:] * (pyom.temp[1:,:,:,pyom.tau] - pyom.temp[:-1,:,:,pyom.tau]) / (pyom.dxu[:-1,np.newaxis,np.newaxis] * pyom.cost[np.newaxis,:,np.newaxis])
-    ddxt[:-1,:,:,1] = pyom.maskU[:-1,:,:] * (pyom.salt[1:,:,:,pyom.tau] - pyom.salt[:-1,:,:,pyom.tau]) / (pyom.dxu[:-1,np.newaxis,np.newaxis] * pyom.cost[np.newaxis,:,np.newaxis])
+    ddxt[:-1,:,:,0] = pyom.maskU[:-1,:,:] * (pyom.temp[1:,:,:,pyom.tau] - pyom.temp[:-1,:,:,pyom.tau]) * (pyom.dxur[:-1,np.newaxis,np.newaxis] * pyom.costr[np.newaxis,:,np.newaxis])
+    ddxt[:-1,:,:,1] = pyom.maskU[:-1,:,:] * (pyom.salt[1:,:,:,pyom.tau] - pyom.salt[:-1,:,:,pyom.tau]) * (pyom.dxur[:-1,np.newaxis,np.newaxis] * pyom.costr[np.newaxis,:,np.newaxis])
 
     """
     gradients at northern face of T cells
     """
-    ddyt[:,:-1,:,0] = pyom.maskV[:,:-1,:] * (pyom.temp[:,1:,:,pyom.tau] - pyom.temp[:,:-1,:,pyom.tau]) / pyom.dyu[np.newaxis,:-1,np.newaxis]
-    ddyt[:,:-1,:,1] = pyom.maskV[:,:-1,:] * (pyom.salt[:,1:,:,pyom.tau] - pyom.salt[:,:-1,:,pyom.tau]) / pyom.dyu[np.newaxis,:-1,np.newaxis]
+    ddyt[:,:-1,:,0] = pyom.maskV[:,:-1,:] * (pyom.temp[:,1:,:,pyom.tau] - pyom.temp[:,:-1,:,pyom.tau]) * pyom.dyur[np.newaxis,:-1,np.newaxis]
+    ddyt[:,:-1,:,1] = pyom.maskV[:,:-1,:] * (pyom.salt[:,1:,:,pyom.tau] - pyom.salt[:,:-1,:,pyom.tau]) * pyom.dyur[np.newaxis,:-1,np.newaxis]
 
     """
     Compute Ai_ez and K11 on center of east face of T cell.
@@ -106,6 +108,28 @@ def isoneutral_diffusion_pre(pyom):
     pyom.K_33[2:-2,2:-2,:-1] = sumx / (4*pyom.dxt[2:-2,np.newaxis,np.newaxis]) + sumy / (4*pyom.dyt[np.newaxis,2:-2,np.newaxis] * pyom.cost[np.newaxis,2:-2,np.newaxis])
     pyom.K_33[2:-2,2:-2,-1] = 0.
 
+    """
+    weights of Ai_ez and Ai_nz in the tracer fluxes, shared by all tracers
+    """
+    isoneutral_flux_weights(pyom, pyom.K_iso, pyom.K_iso_ez, pyom.K_iso_nz)
+    if pyom.enable_skew_diffusion:
+        isoneutral_flux_weights(pyom, pyom.K_gm, pyom.K_gm_ez, pyom.K_gm_nz)
+
+
+@pyom_method
+def isoneutral_flux_weights(pyom, K, weight_east, weight_north):
+    """
+    diffusivity weights of the slope tensor components Ai_ez and Ai_nz in the
+    isoneutral tracer fluxes across east and north faces of T cells, for
+    diffusivity K
+    """
+    weight_east[1:-2,2:-2,1:] = 0.25 * (K[1:-2,2:-2,1:] + K[1:-2,2:-2,:-1] + K[2:-1,2:-2,1:] + K[2:-1,2:-2,:-1]) \
+                                / (4. * pyom.dzt[np.newaxis,np.newaxis,1:])
+    weight_east[1:-2,2:-2,0] = 0.5 * (K[1:-2,2:-2,0] + K[2:-1,2:-2,0]) / (4. * pyom.dzt[0])
+    weight_north[2:-2,1:-2,1:] = 0.25 * (K[2:-2,1:-2,1:] + K[2:-2,1:-2,:-1] + K[2:-2,2:-1,1:] + K[2:-2,2:-1,:-1]) \
+                                 * pyom.cosu[np.newaxis,1:-2,np.newaxis] / (4. * pyom.dzt[np.newaxis,np.newaxis,1:])
+    weight_north[2:-2,1:-2,0] = 0.5 * (K[2:-2,1:-2,0] + K[2:-2,2:-1,0]) * pyom.cosu[np.newaxis,1:-2] / (4. * pyom.dzt[0])
+
 
 @pyom_method
 def isoneutral_diag_streamfunction(pyom):
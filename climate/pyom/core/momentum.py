@@ -1,4 +1,4 @@
-from .. import pyom_method
+from .. import pyom_method, tiled
 from . import friction, isoneutral, external, non_hydrostatic
 
 @pyom_method
@@ -7,40 +7,7 @@ def momentum(pyom):
     solve for momentum for taup1
     """
 
-    """
-    time tendency due to Coriolis force
-    """
-    pyom.du_cor[2:-2, 2:-2] = pyom.maskU[2:-2, 2:-2] \
-            * (pyom.coriolis_t[2:-2, 2:-2,np.newaxis] * (pyom.v[2:-2, 2:-2,:,pyom.tau] + pyom.v[2:-2, 1:-3,:,pyom.tau]) \
-            * pyom.dxt[2:-2,np.newaxis,np.newaxis] / pyom.dxu[2:-2,np.newaxis,np.newaxis] \
-            + pyom.coriolis_t[3:-1,2:-2,np.newaxis] * (pyom.v[3:-1,2:-2,:,pyom.tau] + pyom.v[3:-1,1:-3,:,pyom.tau]) \
-            * pyom.dxt[3:-1,np.newaxis,np.newaxis] / pyom.dxu[2:-2,np.newaxis,np.newaxis]) * 0.25
-    pyom.dv_cor[2:-2, 2:-2] = -pyom.maskV[2:-2, 2:-2]\
-            * (pyom.coriolis_t[2:-2, 2:-2,np.newaxis] * (pyom.u[1:-3, 2:-2,:,pyom.tau] + pyom.u[2:-2, 2:-2,:,pyom.tau]) \
-            * pyom.dyt[np.newaxis,2:-2,np.newaxis] * pyom.cost[np.newaxis,2:-2,np.newaxis] \
-            / (pyom.dyu[np.newaxis,2:-2,np.newaxis] * pyom.cosu[np.newaxis,2:-2,np.newaxis]) \
-            + pyom.coriolis_t[2:-2,3:-1,np.newaxis] * (pyom.u[1:-3, 3:-1,:,pyom.tau] + pyom.u[2:-2,3:-1,:,pyom.tau]) \
-            * pyom.dyt[np.newaxis,3:-1,np.newaxis] * pyom.cost[np.newaxis,3:-1,np.newaxis] \
-            / (pyom.dyu[np.newaxis,2:-2,np.newaxis] * pyom.cosu[np.newaxis,2:-2,np.newaxis])) * 0.25
-
-    """
-    time tendency due to metric terms
-    """
-    if pyom.coord_degree:
-        pyom.du_cor[2:-2, 2:-2] += pyom.maskU[2:-2, 2:-2] * 0.125 * pyom.tantr[np.newaxis,2:-2,np.newaxis] \
-                * ((pyom.u[2:-2, 2:-2,:,pyom.tau] + pyom.u[1:-3, 2:-2,:,pyom.tau]) \
-                 * (pyom.v[2:-2, 2:-2,:,pyom.tau] + pyom.v[2:-2, 1:-3,:,pyom.tau]) \
-                 * pyom.dxt[2:-2,np.newaxis,np.newaxis] / pyom.dxu[2:-2,np.newaxis,np.newaxis] \
-                 + (pyom.u[3:-1, 2:-2,:,pyom.tau] + pyom.u[2:-2, 2:-2,:,pyom.tau]) \
-                 * (pyom.v[3:-1, 2:-2,:,pyom.tau] + pyom.v[3:-1, 1:-3,:,pyom.tau]) \
-                 * pyom.dxt[3:-1,np.newaxis,np.newaxis] / pyom.dxu[2:-2,np.newaxis,np.newaxis])
-        pyom.dv_cor[2:-2, 2:-2] += -pyom.maskV[2:-2, 2:-2] * 0.125 \
-                * (pyom.tantr[np.newaxis,2:-2,np.newaxis] * (pyom.u[2:-2,2:-2,:,pyom.tau] + pyom.u[1:-3,2:-2,:,pyom.tau])**2 \
-                * pyom.dyt[np.newaxis,2:-2,np.newaxis] * pyom.cost[np.newaxis,2:-2,np.newaxis] \
-                / (pyom.dyu[np.newaxis,2:-2,np.newaxis] * pyom.cosu[np.newaxis,2:-2,np.newaxis]) \
-                + pyom.tantr[np.newaxis,3:-1,np.newaxis] * (pyom.u[2:-2,3:-1,:,pyom.tau] + pyom.u[1:-3,3:-1,:,pyom.tau])**2 \
-                * pyom.dyt[np.newaxis,3:-1,np.newaxis] * pyom.cost[np.newaxis,3:-1,np.newaxis] \
-                / (pyom.dyu[np.newaxis,2:-2,np.newaxis] * pyom.cosu[np.newaxis,2:-2,np.newaxis]))
+    _coriolis_and_metric_terms(pyom)
 
     """
     non hydrostatic Coriolis terms, metric terms are neglected
@@ -145,6 +112,30 @@ def momentum(pyom):
         if not pyom.enable_hydrostatic:
             non_hydrostytic.solve_non_hydrostatic(pyom)
 
+@pyom_method
+@tiled
+def _coriolis_and_metric_terms(pyom):
+    """
+    time tendency due to Coriolis force and metric terms (hydrostatic part)
+
+    Both terms are evaluated at T points in one pass and averaged to U and V points
+    using the metric coefficients precalculated in calc_grid.
+    """
+    # twice the velocities at T points
+    u_t = pyom.u[2:-1, 2:-1, :, pyom.tau] + pyom.u[1:-2, 2:-1, :, pyom.tau]
+    v_t = pyom.v[2:-1, 2:-1, :, pyom.tau] + pyom.v[2:-1, 1:-2, :, pyom.tau]
+    fac = 0.25 * pyom.coriolis_t[2:-1, 2:-1, np.newaxis]
+    if pyom.coord_degree:
+        # metric terms
+        fac = fac + 0.125 * pyom.tantr[np.newaxis, 2:-1, np.newaxis] * u_t
+    v_t *= fac
+    u_t *= fac
+    pyom.du_cor[2:-2, 2:-2] = pyom.maskU[2:-2, 2:-2] * (pyom.dxt_dxu_w[2:-2, np.newaxis, np.newaxis] * v_t[:-1, :-1] \
+                                                       + pyom.dxt_dxu_e[2:-2, np.newaxis, np.newaxis] * v_t[1:, :-1])
+    pyom.dv_cor[2:-2, 2:-2] = -pyom.maskV[2:-2, 2:-2] * (pyom.dyt_dyu_s[np.newaxis, 2:-2, np.newaxis] * u_t[:-1, :-1] \
+                                                        + pyom.dyt_dyu_n[np.newaxis, 2:-2, np.newaxis] * u_t[:-1, 1:])
+
+
 @pyom_method
 def vertical_velocity(pyom):
     """
@@ -1,3 +1,5 @@
+import itertools
+
 from .. import pyom_method
 from . import cyclic, density, utilities, diffusion
 from scipy.linalg import lapack
@@ -122,6 +124,27 @@ def calc_grid(pyom):
     pyom.area_u[...] = pyom.cost * pyom.dyt * pyom.dxu[:, np.newaxis]
     pyom.area_v[...] = pyom.cosu * pyom.dyu * pyom.dxt[:, np.newaxis]
 
+    calc_grid_metrics(pyom)
+
+@pyom_method
+def calc_grid_metrics(pyom):
+    """
+    precalculate reciprocal grid spacings, metric factors and areas (so that kernels
+    can multiply instead of divide), and metric coefficients for averaging from T
+    to U and V points
+    """
+    for name in ("dxt", "dxu", "dyt", "dyu", "dzt", "dzw", "area_t", "area_u", "area_v"):
+        getattr(pyom, name + "r")[...] = 1. / getattr(pyom, name)
+    pyom.costr[...] = 1. / pyom.cost
+    pyom.cosur[...] = 1. / pyom.cosu
+
+    pyom.dxt_dxu_w[...] = pyom.dxt / pyom.dxu
+    pyom.dxt_dxu_e[:-1] = pyom.dxt[1:] / pyom.dxu[:-1]
+    pyom.dxt_dxu_e[-1] = 0.
+    pyom.dyt_dyu_s[...] = pyom.dyt * pyom.cost / (pyom.dyu * pyom.cosu)
+    pyom.dyt_dyu_n[:-1] = pyom.dyt[1:] * pyom.cost[1:] / (pyom.dyu[:-1] * pyom.cosu[:-1])
+    pyom.dyt_dyu_n[-1] = 0.
+
 @pyom_method
 def calc_beta(pyom):
     """
@@ -188,6 +211,11 @@ def calc_topo(pyom):
     mask = (pyom.hv == 0).astype(np.float)
     pyom.hvr[...] = 1. / (pyom.hv + mask) * (1-mask)
 
+    """
+    masked volume of T-boxes
+    """
+    pyom.volume_t[...] = pyom.area_t[..., np.newaxis] * pyom.dzt[np.newaxis, np.newaxis, :] * pyom.maskT
+
 @pyom_method
 def calc_initial_conditions(pyom):
     """
@@ -200,10 +228,10 @@ def calc_initial_conditions(pyom):
         cyclic.setcyclic_x(pyom.temp)
         cyclic.setcyclic_x(pyom.salt)
 
-    pyom.rho[...] = density.get_rho(pyom,pyom.salt,pyom.temp,np.abs(pyom.zt)[:,np.newaxis]) * pyom.maskT[...,np.newaxis]
-    pyom.Hd[...] = density.get_dyn_enthalpy(pyom,pyom.salt,pyom.temp,np.abs(pyom.zt)[:,np.newaxis]) * pyom.maskT[...,np.newaxis]
-    pyom.int_drhodT[...] = density.get_int_drhodT(pyom,pyom.salt,pyom.temp,np.abs(pyom.zt)[:,np.newaxis])
-    pyom.int_drhodS[...] = density.get_int_drhodS(pyom,pyom.salt,pyom.temp,np.abs(pyom.zt)[:,np.newaxis])
+    rho, Hd, pyom.int_drhodT[...], pyom.int_drhodS[...] = density.get_eos(pyom,pyom.salt,pyom.temp,np.abs(pyom.zt)[:,np.newaxis],
+                                                                          ("rho", "dyn_enthalpy", "int_drhodT", "int_drhodS"))
+    pyom.rho[...] = rho * pyom.maskT[...,np.newaxis]
+    pyom.Hd[...] = Hd * pyom.maskT[...,np.newaxis]
 
     fxa = -pyom.grav / pyom.rho_0 / pyom.dzw[np.newaxis,np.newaxis,:] * pyom.maskW
     pyom.Nsqr[:,:,:-1,:] = fxa[:,:,:-1,np.newaxis] * \
@@ -229,12 +257,22 @@ def solve_tridiag(pyom, a, b, c, d):
     Solves a tridiagonal matrix system with diagonals a, b, c and RHS vector d.
     Uses LAPACK when running with NumPy, and otherwise the Thomas algorithm iterating over the
     last axis of the input arrays.
+
+    d may have additional trailing axes, holding several right-hand sides for the same
+    matrix (e.g. a batch of tracers). With LAPACK, these are solved in a single call.
     """
-    assert a.shape == b.shape and a.shape == c.shape and a.shape == d.shape
+    assert a.shape == b.shape and a.shape == c.shape and a.shape == d.shape[:a.ndim]
     try:
-        return np.linalg.solve_tridiagonal(a,b,c,d)
+        solve_tridiagonal = np.linalg.solve_tridiagonal
     except AttributeError:
-        return lapack.dgtsv(a.flatten()[1:],b.flatten(),c.flatten()[:-1],d.flatten())[3].reshape(a.shape)
+        rhs = d.reshape(a.size, -1)
+        return lapack.dgtsv(a.flatten()[1:],b.flatten(),c.flatten()[:-1],rhs)[3].reshape(d.shape)
+    if d.ndim == a.ndim:
+        return solve_tridiagonal(a,b,c,d)
+    sol = np.empty_like(d)
+    for index in itertools.product(*(range(n) for n in d.shape[a.ndim:])):
+        sol[(Ellipsis,) + index] = solve_tridiagonal(a,b,c,d[(Ellipsis,) + index])
+    return sol
 
 @pyom_method
 def calc_diss(pyom, diss, K_diss, tag):
@@ -0,0 +1,136 @@
+"""
+Integration of passive tracers (see :meth:`climate.pyom.PyOM.register_passive_tracer`).
+
+All passive tracers are stored in one array with the tracer index on the fourth axis,
+and every operation acts on all of them at once: velocity dependent terms of the
+advection scheme, diffusivities, isoneutral flux coefficients, and the matrices of
+the implicit vertical mixing are only computed once per time step.
+"""
+
+import math
+
+from .. import pyom_method
+from . import advection, isoneutral, utilities, cyclic
+
+@pyom_method
+def integrate_passive_tracers(pyom):
+    """
+    integrate all passive tracers by one time step, in the same way as temperature
+    and salinity (without diagnosing any energy dissipation)
+    """
+    mask = pyom.maskT[..., np.newaxis]
+    advect_passive_tracers(pyom)
+
+    """
+    Adam Bashforth time stepping for advection
+    """
+    pyom.tracer[..., pyom.taup1] = pyom.tracer[..., pyom.tau] + pyom.dt_tracer * \
+                    ((1.5+pyom.AB_eps)*pyom.dtracer[..., pyom.tau] - (0.5+pyom.AB_eps)*pyom.dtracer[..., pyom.taum1]) * mask
+
+    if pyom.enable_hor_diffusion:
+        passive_tracer_diffusion(pyom)
+    if pyom.enable_biharmonic_mixing:
+        passive_tracer_biharmonic(pyom)
+
+    """
+    sources and sinks
+    """
+    pyom.tracer[..., pyom.taup1] += pyom.dt_tracer * pyom.tracer_source * mask
+
+    if pyom.enable_neutral_diffusion:
+        isoneutral.isoneutral_diffusion_tracers(pyom, pyom.tracer, iso=True, skew=pyom.enable_skew_diffusion)
+
+    passive_tracer_vmix(pyom)
+
+@pyom_method
+def _flux_divergence(pyom, flux_east, flux_north):
+    """
+    horizontal divergence of tracer fluxes in the interior
+    """
+    batch = (Ellipsis, np.newaxis)
+    return (flux_east[2:-2, 2:-2] - flux_east[1:-3, 2:-2]) \
+                * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis])[batch] \
+         + (flux_north[2:-2, 2:-2] - flux_north[2:-2, 1:-3]) \
+                * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dytr[np.newaxis, 2:-2, np.newaxis])[batch]
+
+@pyom_method
+def advect_passive_tracers(pyom):
+    """
+    calculate time tendency of all passive tracers due to advection
+    """
+    batch = (Ellipsis, np.newaxis)
+    tr = pyom.tracer[..., pyom.tau]
+    dtr = pyom.dtracer[..., pyom.tau]
+    flux_east, flux_north, flux_top = (np.zeros(tr.shape) for _ in range(3))
+    if pyom.enable_superbee_advection:
+        advection.adv_flux_superbee(pyom, flux_east, flux_north, flux_top, tr)
+    else:
+        advection.adv_flux_2nd(pyom, flux_east, flux_north, flux_top, tr)
+    dtr[2:-2, 2:-2] = -pyom.maskT[2:-2, 2:-2][batch] * _flux_divergence(pyom, flux_east, flux_north)
+    dtr[:, :, 0] += -pyom.maskT[:, :, 0, np.newaxis] * flux_top[:, :, 0] * pyom.dztr[0]
+    dtr[:, :, 1:] += -pyom.maskT[:, :, 1:, np.newaxis] * (flux_top[:, :, 1:] - flux_top[:, :, :-1]) * pyom.dztr[1:, np.newaxis]
+
+@pyom_method
+def _horizontal_fluxes(pyom, tr, diffusivity):
+    """
+    downgradient fluxes of tracers tr with (scalar) diffusivity
+    """
+    batch = (Ellipsis, np.newaxis)
+    flux_east, flux_north = np.zeros(tr.shape), np.zeros(tr.shape)
+    flux_east[:-1] = (tr[1:] - tr[:-1]) * (diffusivity * pyom.costr[np.newaxis, :, np.newaxis]
+                                           * pyom.dxur[:-1, np.newaxis, np.newaxis] * pyom.maskU[:-1])[batch]
+    flux_north[:, :-1] = (tr[:, 1:] - tr[:, :-1]) * (diffusivity * pyom.dyur[np.newaxis, :-1, np.newaxis]
+                                                     * pyom.maskV[:, :-1] * pyom.cosu[np.newaxis, :-1, np.newaxis])[batch]
+    return flux_east, flux_north
+
+@pyom_method
+def passive_tracer_diffusion(pyom):
+    """
+    horizontal diffusion of all passive tracers
+    """
+    batch = (Ellipsis, np.newaxis)
+    flux_east, flux_north = _horizontal_fluxes(pyom, pyom.tracer[..., pyom.tau], pyom.K_h)
+    if pyom.enable_hor_friction_cos_scaling:
+        flux_east *= (pyom.cost ** pyom.hor_friction_cosPower)[np.newaxis, :, np.newaxis, np.newaxis]
+        flux_north *= (pyom.cosu ** pyom.hor_friction_cosPower)[np.newaxis, :, np.newaxis, np.newaxis]
+    pyom.tracer[2:-2, 2:-2, ..., pyom.taup1] += pyom.dt_tracer * pyom.maskT[2:-2, 2:-2][batch] \
+                                                * _flux_divergence(pyom, flux_east, flux_north)
+
+@pyom_method
+def passive_tracer_biharmonic(pyom):
+    """
+    biharmonic mixing of all passive tracers
+    """
+    batch = (Ellipsis, np.newaxis)
+    fxa = math.sqrt(abs(pyom.K_hbi))
+    flux_east, flux_north = _horizontal_fluxes(pyom, pyom.tracer[..., pyom.tau], -fxa)
+    del2 = np.zeros(flux_east.shape)
+    del2[2:-2, 2:-2] = pyom.maskT[2:-2, 2:-2][batch] * _flux_divergence(pyom, flux_east, flux_north)
+    cyclic.enforce_boundaries(pyom, del2)
+
+    flux_east, flux_north = _horizontal_fluxes(pyom, del2, fxa)
+    pyom.tracer[2:-2, 2:-2, ..., pyom.taup1] += pyom.dt_tracer * pyom.maskT[2:-2, 2:-2][batch] \
+                                                * _flux_divergence(pyom, flux_east, flux_north)
+
+@pyom_method
+def passive_tracer_vmix(pyom):
+    """
+    implicit vertical mixing of all passive tracers, with surface fluxes
+    """
+    batch = (Ellipsis, np.newaxis)
+    a_tri = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+    b_tri = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+    c_tri = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+    delta = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+
+    ks = pyom.kbot[2:-2, 2:-2] - 1
+    delta[:, :, :-1] = pyom.dt_tracer * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.kappaH[2:-2, 2:-2, :-1]
+    delta[:, :, -1] = 0.
+    a_tri[:, :, 1:] = -delta[:,:,:-1] * pyom.dztr[np.newaxis, np.newaxis, 1:]
+    b_tri[:, :, 1:] = 1 + (delta[:, :, 1:] + delta[:, :, :-1]) * pyom.dztr[np.newaxis, np.newaxis, 1:]
+    b_tri_edge = 1 + delta * pyom.dztr[np.newaxis, np.newaxis, :]
+    c_tri[:, :, :-1] = -delta[:, :, :-1] * pyom.dztr[np.newaxis, np.newaxis, :-1]
+    d_tri = pyom.tracer[2:-2, 2:-2, :, :, pyom.taup1].copy()
+    d_tri[:, :, -1] += pyom.dt_tracer * pyom.forc_tracer_surface[2:-2, 2:-2] * pyom.dztr[-1]
+    sol, mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, d_tri, b_edge=b_tri_edge)
+    pyom.tracer[2:-2, 2:-2, :, :, pyom.taup1] = np.where(mask[batch], sol, pyom.tracer[2:-2, 2:-2, :, :, pyom.taup1])
@@ -1,4 +1,4 @@
-from .. import pyom_method
+from .. import pyom_method, distributed
 from . import advection, diffusion, isoneutral, cyclic, numerics, density, utilities
 
 @pyom_method
@@ -19,11 +19,11 @@ def thermodynamics(pyom):
             advection.adv_flux_2nd(pyom,pyom.flux_east,pyom.flux_north,pyom.flux_top,pyom.Hd[:,:,:,pyom.tau])
 
         pyom.dHd[2:-2, 2:-2, :, pyom.tau] = pyom.maskT[2:-2, 2:-2, :] * (-(pyom.flux_east[2:-2, 2:-2, :] - pyom.flux_east[1:-3, 2:-2, :]) \
-                                                                            / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                                                                            * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                                                                         - (pyom.flux_north[2:-2, 2:-2,:] - pyom.flux_north[2:-2, 1:-3, :]) \
-                                                                            / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dyt[np.newaxis, 2:-2, np.newaxis]))
-        pyom.dHd[:,:,0,pyom.tau] += -pyom.maskT[:,:,0] * pyom.flux_top[:,:,0] / pyom.dzt[0]
-        pyom.dHd[:,:,1:,pyom.tau] += -pyom.maskT[:,:,1:] * (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) / pyom.dzt[np.newaxis, np.newaxis, 1:]
+                                                                            * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dytr[np.newaxis, 2:-2, np.newaxis]))
+        pyom.dHd[:,:,0,pyom.tau] += -pyom.maskT[:,:,0] * pyom.flux_top[:,:,0] * pyom.dztr[0]
+        pyom.dHd[:,:,1:,pyom.tau] += -pyom.maskT[:,:,1:] * (pyom.flux_top[:,:,1:] - pyom.flux_top[:,:,:-1]) * pyom.dztr[np.newaxis, np.newaxis, 1:]
 
         """
         changes in dyn. Enthalpy due to advection
@@ -38,10 +38,10 @@ def thermodynamics(pyom):
         """
         aloc[:, :, :-1] += -0.25 * pyom.grav / pyom.rho_0 * pyom.w[:, :, :-1, pyom.tau] \
                            * (pyom.rho[:, :, :-1, pyom.tau] + pyom.rho[:, :, 1:, pyom.tau]) \
-                           * pyom.dzw[np.newaxis, np.newaxis, :-1] / pyom.dzt[np.newaxis, np.newaxis, :-1]
+                           * pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.dztr[np.newaxis, np.newaxis, :-1]
         aloc[:, :, 1:] += -0.25 * pyom.grav / pyom.rho_0 * pyom.w[:, :, :-1, pyom.tau] \
                           * (pyom.rho[:, :, 1:, pyom.tau] + pyom.rho[:, :, :-1, pyom.tau]) \
-                          * pyom.dzw[np.newaxis, np.newaxis, :-1] / pyom.dzt[np.newaxis, np.newaxis, 1:]
+                          * pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.dztr[np.newaxis, np.newaxis, 1:]
 
     if pyom.enable_conserve_energy and pyom.enable_tke:
         """
@@ -60,6 +60,7 @@ def thermodynamics(pyom):
         tke_mask = pyom.tke[2:-2, 2:-2, :-1, pyom.tau] > 0.
         fxb = np.sum(pyom.area_t[2:-2, 2:-2, np.newaxis] * pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1] * tke_mask) \
             + np.sum(0.5 * pyom.area_t[2:-2, 2:-2] * pyom.dzw[-1] * pyom.maskW[2:-2, 2:-2, -1])
+        fxa, fxb = distributed.global_sum(pyom, fxa), distributed.global_sum(pyom, fxb)
         pyom.P_diss_adv[...] = 0.
         pyom.P_diss_adv[2:-2, 2:-2, :-1] = fxa / fxb * tke_mask
         pyom.P_diss_adv[2:-2, 2:-2, -1] = fxa / fxb
@@ -94,13 +95,10 @@ def thermodynamics(pyom):
             pyom.P_diss_iso[...] = 0.0
             pyom.dtemp_iso[...] = 0.0
             pyom.dsalt_iso[...] = 0.0
-            isoneutral.isoneutral_diffusion_pre(pyom)
-            isoneutral.isoneutral_diffusion(pyom,pyom.temp,True)
-            isoneutral.isoneutral_diffusion(pyom,pyom.salt,False)
             if pyom.enable_skew_diffusion:
                 pyom.P_diss_skew[...] = 0.0
-                isoneutral.isoneutral_skew_diffusion(pyom,pyom.temp,True)
-                isoneutral.isoneutral_skew_diffusion(pyom,pyom.salt,False)
+            isoneutral.isoneutral_diffusion_pre(pyom)
+            isoneutral.isoneutral_diffusion_tempsalt(pyom)
 
     with pyom.timers["vmix"]:
         """
@@ -116,18 +114,18 @@ def thermodynamics(pyom):
         delta = np.zeros((pyom.nx, pyom.ny, pyom.nz))
 
         ks = pyom.kbot[2:-2, 2:-2] - 1
-        delta[:, :, :-1] = pyom.dt_tracer / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.kappaH[2:-2, 2:-2, :-1]
+        delta[:, :, :-1] = pyom.dt_tracer * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.kappaH[2:-2, 2:-2, :-1]
         delta[:, :, -1] = 0.
-        a_tri[:, :, 1:] = -delta[:,:,:-1] / pyom.dzt[np.newaxis, np.newaxis, 1:]
-        b_tri[:, :, 1:] = 1 + (delta[:, :, 1:] + delta[:, :, :-1]) / pyom.dzt[np.newaxis, np.newaxis, 1:]
-        b_tri_edge = 1 + delta / pyom.dzt[np.newaxis, np.newaxis, :]
-        c_tri[:, :, :-1] = -delta[:, :, :-1] / pyom.dzt[np.newaxis, np.newaxis, :-1]
+        a_tri[:, :, 1:] = -delta[:,:,:-1] * pyom.dztr[np.newaxis, np.newaxis, 1:]
+        b_tri[:, :, 1:] = 1 + (delta[:, :, 1:] + delta[:, :, :-1]) * pyom.dztr[np.newaxis, np.newaxis, 1:]
+        b_tri_edge = 1 + delta * pyom.dztr[np.newaxis, np.newaxis, :]
+        c_tri[:, :, :-1] = -delta[:, :, :-1] * pyom.dztr[np.newaxis, np.newaxis, :-1]
         d_tri[...] = pyom.temp[2:-2, 2:-2, :, pyom.taup1]
-        d_tri[:, :, -1] += pyom.dt_tracer * pyom.forc_temp_surface[2:-2, 2:-2] / pyom.dzt[-1]
+        d_tri[:, :, -1] += pyom.dt_tracer * pyom.forc_temp_surface[2:-2, 2:-2] * pyom.dztr[-1]
         sol, mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, d_tri, b_edge=b_tri_edge)
         pyom.temp[2:-2, 2:-2, :, pyom.taup1] = np.where(mask, sol, pyom.temp[2:-2, 2:-2, :, pyom.taup1])
         d_tri[...] = pyom.salt[2:-2, 2:-2, :, pyom.taup1]
-        d_tri[:, :, -1] += pyom.dt_tracer * pyom.forc_salt_surface[2:-2, 2:-2] / pyom.dzt[-1]
+        d_tri[:, :, -1] += pyom.dt_tracer * pyom.forc_salt_surface[2:-2, 2:-2] * pyom.dztr[-1]
         sol, mask = utilities.solve_implicit(pyom, ks, a_tri, b_tri, c_tri, d_tri, b_edge=b_tri_edge)
         pyom.salt[2:-2, 2:-2, :, pyom.taup1] = np.where(mask, sol, pyom.salt[2:-2, 2:-2, :, pyom.taup1])
 
@@ -137,9 +135,7 @@ def thermodynamics(pyom):
     """
     boundary exchange
     """
-    if pyom.enable_cyclic_x:
-        cyclic.setcyclic_x(pyom.temp[..., pyom.taup1])
-        cyclic.setcyclic_x(pyom.salt[..., pyom.taup1])
+    cyclic.enforce_boundaries(pyom, pyom.temp[..., pyom.taup1], pyom.salt[..., pyom.taup1])
 
     with pyom.timers["eq_of_state"]:
         calc_eq_of_state(pyom, pyom.taup1)
@@ -147,10 +143,9 @@ def thermodynamics(pyom):
     """
     surface density flux
     """
-    pyom.forc_rho_surface[...] = (
-                                density.get_drhodT(pyom,pyom.salt[:,:,-1,pyom.taup1],pyom.temp[:,:,-1,pyom.taup1],np.abs(pyom.zt[-1])) * pyom.forc_temp_surface \
-                              + density.get_drhodS(pyom,pyom.salt[:,:,-1,pyom.taup1],pyom.temp[:,:,-1,pyom.taup1],np.abs(pyom.zt[-1])) * pyom.forc_salt_surface \
-                            ) * pyom.maskT[:,:,-1]
+    drhodT, drhodS = density.get_eos(pyom, pyom.salt[:,:,-1,pyom.taup1], pyom.temp[:,:,-1,pyom.taup1], np.abs(pyom.zt[-1]),
+                                     ("drhodT", "drhodS"))
+    pyom.forc_rho_surface[...] = (drhodT * pyom.forc_temp_surface + drhodS * pyom.forc_salt_surface) * pyom.maskT[:,:,-1]
 
     with pyom.timers["vmix"]:
         pyom.P_diss_v[...] = 0.0
@@ -158,18 +153,18 @@ def thermodynamics(pyom):
             """
             diagnose dissipation of dynamic enthalpy by vertical mixing
             """
-            fxa = (-pyom.int_drhodT[2:-2, 2:-2, 1:, pyom.taup1] + pyom.int_drhodT[2:-2, 2:-2, :-1,pyom.taup1]) / pyom.dzw[np.newaxis, np.newaxis, :-1]
+            fxa = (-pyom.int_drhodT[2:-2, 2:-2, 1:, pyom.taup1] + pyom.int_drhodT[2:-2, 2:-2, :-1,pyom.taup1]) * pyom.dzwr[np.newaxis, np.newaxis, :-1]
             pyom.P_diss_v[2:-2, 2:-2, :-1] += -pyom.grav / pyom.rho_0 * fxa * pyom.kappaH[2:-2, 2:-2, :-1] \
                                               * (pyom.temp[2:-2, 2:-2, 1:, pyom.taup1] - pyom.temp[2:-2, 2:-2, :-1,pyom.taup1]) \
-                                              / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
-            fxa = (-pyom.int_drhodS[2:-2, 2:-2, 1:, pyom.taup1] + pyom.int_drhodS[2:-2, 2:-2, :-1,pyom.taup1]) / pyom.dzw[np.newaxis, np.newaxis, :-1]
+                                              * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
+            fxa = (-pyom.int_drhodS[2:-2, 2:-2, 1:, pyom.taup1] + pyom.int_drhodS[2:-2, 2:-2, :-1,pyom.taup1]) * pyom.dzwr[np.newaxis, np.newaxis, :-1]
             pyom.P_diss_v[2:-2, 2:-2, :-1] += -pyom.grav / pyom.rho_0 * fxa * pyom.kappaH[2:-2, 2:-2, :-1] \
                                               * (pyom.salt[2:-2, 2:-2, 1:, pyom.taup1] - pyom.salt[2:-2, 2:-2, :-1,pyom.taup1]) \
-                                              / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
+                                              * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
 
-            fxa = 2 * pyom.int_drhodT[2:-2, 2:-2, -1, pyom.taup1] / pyom.dzw[-1]
+            fxa = 2 * pyom.int_drhodT[2:-2, 2:-2, -1, pyom.taup1] * pyom.dzwr[-1]
             pyom.P_diss_v[2:-2, 2:-2, -1] += - pyom.grav / pyom.rho_0 * fxa * pyom.forc_temp_surface[2:-2 ,2:-2] * pyom.maskW[2:-2, 2:-2, -1]
-            fxa = 2 * pyom.int_drhodS[2:-2, 2:-2, -1, pyom.taup1] / pyom.dzw[-1]
+            fxa = 2 * pyom.int_drhodS[2:-2, 2:-2, -1, pyom.taup1] * pyom.dzwr[-1]
             pyom.P_diss_v[2:-2, 2:-2, -1] += - pyom.grav / pyom.rho_0 * fxa * pyom.forc_salt_surface[2:-2 ,2:-2] * pyom.maskW[2:-2, 2:-2, -1]
 
         if pyom.enable_conserve_energy:
@@ -196,11 +191,11 @@ def advect_tracer(pyom, tr, dtr):
     else:
         advection.adv_flux_2nd(pyom,pyom.flux_east,pyom.flux_north,pyom.flux_top,tr)
     dtr[2:-2, 2:-2, :] = pyom.maskT[2:-2, 2:-2, :] * (-(pyom.flux_east[2:-2, 2:-2, :] - pyom.flux_east[1:-3, 2:-2, :]) \
-                                                        / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                                                        * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                                                      - (pyom.flux_north[2:-2, 2:-2, :] - pyom.flux_north[2:-2, 1:-3, :]) \
-                                                        / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dyt[np.newaxis, 2:-2, np.newaxis]))
-    dtr[:, :, 0] += -pyom.maskT[:, :, 0] * pyom.flux_top[:, :, 0] / pyom.dzt[0]
-    dtr[:, :, 1:] += -pyom.maskT[:, :, 1:] * (pyom.flux_top[:, :, 1:] - pyom.flux_top[:, :, :-1]) / pyom.dzt[1:]
+                                                        * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dytr[np.newaxis, 2:-2, np.newaxis]))
+    dtr[:, :, 0] += -pyom.maskT[:, :, 0] * pyom.flux_top[:, :, 0] * pyom.dztr[0]
+    dtr[:, :, 1:] += -pyom.maskT[:, :, 1:] * (pyom.flux_top[:, :, 1:] - pyom.flux_top[:, :, :-1]) * pyom.dztr[1:]
 
 @pyom_method
 def advect_temperature(pyom):
@@ -222,24 +217,55 @@ def calc_eq_of_state(pyom, n):
     calculate density, stability frequency, dynamic enthalpy and derivatives
     for time level n from temperature and salinity
     """
+    if pyom.enable_column_compression:
+        _calc_eq_of_state_compressed(pyom, n)
+        return
+
     density_args = (pyom, pyom.salt[..., n], pyom.temp[..., n], np.abs(pyom.zt))
 
     """
-    calculate new density
+    calculate new density, and dynamic enthalpy and derivatives in the same pass
     """
-    pyom.rho[..., n] = density.get_rho(*density_args) * pyom.maskT
-
     if pyom.enable_conserve_energy:
-        """
-        calculate new dynamic enthalpy and derivatives
-        """
-        pyom.Hd[..., n] = density.get_dyn_enthalpy(*density_args) * pyom.maskT
-        pyom.int_drhodT[..., n] = density.get_int_drhodT(*density_args)
-        pyom.int_drhodS[..., n] = density.get_int_drhodS(*density_args)
+        rho, Hd, pyom.int_drhodT[..., n], pyom.int_drhodS[..., n] = \
+                density.get_eos(*density_args, quantities=("rho", "dyn_enthalpy", "int_drhodT", "int_drhodS"))
+        pyom.rho[..., n] = rho * pyom.maskT
+        pyom.Hd[..., n] = Hd * pyom.maskT
+    else:
+        pyom.rho[..., n] = density.get_rho(*density_args) * pyom.maskT
 
     """
     new stability frequency
     """
-    fxa = -pyom.grav / pyom.rho_0 / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskW[:, :, :-1]
+    fxa = -pyom.grav / pyom.rho_0 * pyom.dzwr[np.newaxis, np.newaxis, :-1] * pyom.maskW[:, :, :-1]
     pyom.Nsqr[:, :, :-1, n] = fxa * (density.get_rho(pyom, pyom.salt[:,:,1:,n], pyom.temp[:,:,1:,n], np.abs(pyom.zt[:-1])) - pyom.rho[:,:,:-1,n])
     pyom.Nsqr[:, :, -1, n] = pyom.Nsqr[:,:,-2,n]
+
+@pyom_method
+def _calc_eq_of_state_compressed(pyom, n):
+    """
+    as calc_eq_of_state, but masked quantities are only computed in wet cells
+    """
+    wet = pyom.maskT.astype(bool)
+    density_args = (pyom, pyom.salt[..., n][wet], pyom.temp[..., n][wet], np.broadcast_to(np.abs(pyom.zt), wet.shape)[wet])
+
+    pyom.rho[..., n] = 0.
+    if pyom.enable_conserve_energy:
+        pyom.Hd[..., n] = 0.
+        pyom.rho[..., n][wet], pyom.Hd[..., n][wet] = density.get_eos(*density_args, quantities=("rho", "dyn_enthalpy"))
+        # not masked, so needed everywhere
+        pyom.int_drhodT[..., n], pyom.int_drhodS[..., n] = \
+                density.get_eos(pyom, pyom.salt[..., n], pyom.temp[..., n], np.abs(pyom.zt), quantities=("int_drhodT", "int_drhodS"))
+    else:
+        pyom.rho[..., n][wet] = density.get_rho(*density_args)
+
+    """
+    new stability frequency
+    """
+    wet = pyom.maskW[:, :, :-1].astype(bool)
+    fxa = -pyom.grav / pyom.rho_0 * np.broadcast_to(pyom.dzwr[:-1], wet.shape)[wet] * pyom.maskW[:, :, :-1][wet]
+    rho_below = density.get_rho(pyom, pyom.salt[:, :, 1:, n][wet], pyom.temp[:, :, 1:, n][wet],
+                                np.broadcast_to(np.abs(pyom.zt[:-1]), wet.shape)[wet])
+    pyom.Nsqr[:, :, :-1, n] = 0.
+    pyom.Nsqr[:, :, :-1, n][wet] = fxa * (rho_below - pyom.rho[:, :, :-1, n][wet])
+    pyom.Nsqr[:, :, -1, n] = pyom.Nsqr[:, :, -2, n]
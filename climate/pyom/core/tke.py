@@ -13,51 +13,23 @@ def set_tke_diffusivities(pyom):
     if pyom.enable_tke:
         pyom.sqrttke = np.sqrt(np.maximum(0., pyom.tke[:,:,:,pyom.tau]))
         """
-        calculate buoyancy length scale
+        calculate buoyancy length scale, with limits
         """
-        pyom.mxl[...] = math.sqrt(2) * pyom.sqrttke / np.sqrt(np.maximum(1e-12, pyom.Nsqr[:,:,:,pyom.tau])) * pyom.maskW
-
-        """
-        apply limits for mixing length
-        """
-        if pyom.tke_mxl_choice == 1:
+        if pyom.enable_column_compression:
             """
-            bounded by the distance to surface/bottom
+            only compute wet columns, the length scale is bounded to mxl_min on land
             """
-            pyom.mxl[...] = np.minimum(
-                                np.minimum(pyom.mxl, -pyom.zw[np.newaxis, np.newaxis, :] \
-                                                    + pyom.dzw[np.newaxis, np.newaxis, :] * 0.5
-                                          )
-                                      , pyom.ht[:, :, np.newaxis] + pyom.zw[np.newaxis, np.newaxis, :]
-                                      )
-            pyom.mxl[...] = np.maximum(pyom.mxl, pyom.mxl_min)
-        elif pyom.tke_mxl_choice == 2:
-            """
-            bound length scale as in mitgcm/OPA code
-
-            Note that the following code doesn't vectorize. If critical for performance,
-            consider re-implementing it in Cython.
-            """
-            if pyom.backend_name == "bohrium":
-                mxl = pyom.mxl.copy2numpy()
-                dzt = pyom.dzt.copy2numpy()
-            else:
-                mxl = pyom.mxl
-                dzt = pyom.dzt
-            for k in xrange(pyom.nz-2,-1,-1):
-                mxl[:,:,k] = np.minimum(mxl[:,:,k], mxl[:,:,k+1] + dzt[k+1])
-            mxl[:,:,-1] = np.minimum(mxl[:,:,-1], pyom.mxl_min + dzt[-1])
-            for k in xrange(1,pyom.nz):
-                mxl[:,:,k] = np.minimum(mxl[:,:,k], mxl[:,:,k-1] + dzt[k])
-            pyom.mxl[...] = np.maximum(np.asarray(mxl), pyom.mxl_min)
+            columns = np.nonzero(pyom.kbot > 0)
+            pyom.mxl[...] = pyom.mxl_min
+            pyom.mxl[columns] = _mixing_length(pyom, pyom.sqrttke[columns], pyom.Nsqr[..., pyom.tau][columns],
+                                               pyom.maskW[columns], pyom.ht[columns])
         else:
-            raise ValueError("unknown mixing length choice in tke_mxl_choice")
+            pyom.mxl[...] = _mixing_length(pyom, pyom.sqrttke, pyom.Nsqr[..., pyom.tau], pyom.maskW, pyom.ht)
 
         """
         calculate viscosity and diffusivity based on Prandtl number
         """
-        if pyom.enable_cyclic_x:
-            cyclic.setcyclic_x(pyom.K_diss_v)
+        cyclic.enforce_boundaries(pyom, pyom.K_diss_v)
         pyom.kappaM = np.minimum(pyom.kappaM_max, pyom.c_k * pyom.mxl * pyom.sqrttke)
         Rinumber = pyom.Nsqr[:,:,:,pyom.tau] / np.maximum(pyom.K_diss_v / np.maximum(1e-12, pyom.kappaM), 1e-12)
         if pyom.enable_idemix:
@@ -74,6 +46,37 @@ def set_tke_diffusivities(pyom):
             """
             pyom.kappaH[...] = np.where(pyom.Nsqr[:,:,:,pyom.tau] < 0.0, 1.0, pyom.kappaH)
 
+@pyom_method
+def _mixing_length(pyom, sqrttke, Nsqr, maskW, ht):
+    """
+    buoyancy length scale bounded according to tke_mxl_choice,
+    for water columns along the last axis
+    """
+    mxl = math.sqrt(2) * sqrttke / np.sqrt(np.maximum(1e-12, Nsqr)) * maskW
+
+    if pyom.tke_mxl_choice == 1:
+        """
+        bounded by the distance to surface/bottom
+        """
+        mxl = np.minimum(np.minimum(mxl, -pyom.zw + pyom.dzw * 0.5), ht[..., np.newaxis] + pyom.zw)
+        mxl = np.maximum(mxl, pyom.mxl_min)
+    elif pyom.tke_mxl_choice == 2:
+        """
+        bound length scale as in mitgcm/OPA code
+
+        The recurrences mxl(k) = min(mxl(k), mxl(k+1) + dzt(k+1)) (downwards) and
+        mxl(k) = min(mxl(k), mxl(k-1) + dzt(k)) (upwards) are min-plus scans. Shifting
+        by the cumulative layer thickness turns them into cumulative minima.
+        """
+        depth = np.cumsum(pyom.dzt)
+        mxl = np.minimum.accumulate((mxl + depth)[..., ::-1], axis=-1)[..., ::-1] - depth
+        mxl[..., -1] = np.minimum(mxl[..., -1], pyom.mxl_min + pyom.dzt[-1])
+        mxl = np.minimum.accumulate(mxl - depth, axis=-1) + depth
+        mxl = np.maximum(mxl, pyom.mxl_min)
+    else:
+        raise ValueError("unknown mixing length choice in tke_mxl_choice")
+    return mxl
+
 @pyom_method
 def integrate_tke(pyom):
     """
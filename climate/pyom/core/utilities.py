@@ -23,12 +23,43 @@ def pad_z_edges(pyom, array):
 
 @pyom_method
 def solve_implicit(pyom, ks, a, b, c, d, b_edge=None, d_edge=None):
+    """
+    solve the tridiagonal systems given by a, b, c, and d in all water columns, where ks
+    is the index of the bottom cell; returns the solution and the water mask
+
+    d (and d_edge) may have additional trailing axes, so that several tracers are mixed
+    with the same matrix in one go
+    """
     from .numerics import solve_tridiag # avoid circular import
 
     land_mask = (ks >= 0)[:,:,np.newaxis]
     edge_mask = land_mask & (np.arange(a.shape[2])[np.newaxis, np.newaxis, :] == ks[:,:,np.newaxis])
     water_mask = land_mask & (np.arange(a.shape[2])[np.newaxis, np.newaxis, :] >= ks[:,:,np.newaxis])
 
+    if pyom.enable_column_compression:
+        """
+        solve only for water cells; these are packed column by column from bottom to
+        top, and columns decouple since a vanishes at the bottom edge and c at the surface
+        """
+        sol = np.zeros(d.shape)
+        column_size = (a.shape[2] - ks)[ks >= 0]
+        if not column_size.size:
+            return sol, water_mask
+        top = np.cumsum(column_size) - 1
+        edge = top - column_size + 1
+        a_tri = a[water_mask]
+        a_tri[edge] = 0.
+        b_tri = b[water_mask]
+        if not (b_edge is None):
+            b_tri[edge] = b_edge[edge_mask]
+        c_tri = c[water_mask]
+        c_tri[top] = 0.
+        d_tri = d[water_mask]
+        if not (d_edge is None):
+            d_tri[edge] = d_edge[edge_mask]
+        sol[water_mask] = solve_tridiag(pyom,a_tri,b_tri,c_tri,d_tri)
+        return sol, water_mask
+
     a_tri = np.where(water_mask, a, 0.)
     a_tri = np.where(edge_mask, 0., a_tri)
     b_tri = np.where(water_mask, b, 1.)
@@ -36,7 +67,8 @@ def solve_implicit(pyom, ks, a, b, c, d, b_edge=None, d_edge=None):
         b_tri = np.where(edge_mask, b_edge, b_tri)
     c_tri = np.where(water_mask, c, 0.)
     c_tri[:,:,-1] = 0.
-    d_tri = np.where(water_mask, d, 0.)
+    batch = (Ellipsis,) + (np.newaxis,) * (d.ndim - a.ndim)
+    d_tri = np.where(water_mask[batch], d, 0.)
     if not (d_edge is None):
-        d_tri = np.where(edge_mask, d_edge, d_tri)
+        d_tri = np.where(edge_mask[batch], d_edge, d_tri)
     return solve_tridiag(pyom,a_tri,b_tri,c_tri,d_tri), water_mask
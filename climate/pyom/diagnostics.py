@@ -2,25 +2,91 @@ import logging
 
 from . import pyom_method, diagnostics_tools
 
+class ScheduledDiagnostic:
+    """
+    Active diagnostic with sampling and output intervals in (integer) time steps
+    """
+    def __init__(self, name, routine, group, sampling_interval, output_interval):
+        self.name = name
+        self.routine = routine
+        self.group = group
+        self.sampling_interval = sampling_interval
+        self.output_interval = output_interval
+        self.next_sampling = None
+        self.next_output = None
+
+    def schedule(self, itt):
+        """
+        set next time steps at which the diagnostic fires, starting from itt
+        """
+        if self.sampling_interval:
+            self.next_sampling = _next_multiple(itt, self.sampling_interval)
+        if self.output_interval:
+            self.next_output = _next_multiple(itt, self.output_interval)
+
+
+def _next_multiple(itt, interval):
+    return -(-itt // interval) * interval
+
+
+def _frequency_to_interval(pyom, name, frequency):
+    """
+    convert a frequency in seconds to a number of time steps
+    """
+    if not frequency:
+        return None
+    interval = max(int(round(frequency / pyom.dt_tracer)), 1)
+    if abs(interval * pyom.dt_tracer - frequency) > 1e-6 * frequency:
+        logging.warning(" frequency {}s of diagnostic '{}' is not a multiple of the time step, using {} time steps"
+                        .format(frequency, name, interval))
+    return interval
+
+
 @pyom_method
 def init_diagnostics(pyom):
     """
-    initialize diagnostic routines
+    initialize diagnostic routines and set up the diagnostics schedule
     """
     logging.info("Diagnostic setup:")
+    pyom._diagnostics_schedule = []
+    pyom._diagnostics_cache = {}
     for name, diag in pyom.diagnostics.items():
         if diag.is_active():
             try:
                 diag_routine = getattr(diagnostics_tools, name)
             except AttributeError:
                 raise AttributeError("unknown diagnostic {}".format(name))
+            if pyom.comm is not None and not getattr(diag_routine, "SUPPORTS_DISTRIBUTED", False):
+                logging.warning(" diagnostic '{}' does not support distributed runs, skipping it".format(name))
+                continue
+            diag_routine.initialize(pyom)
             if diag.sampling_frequency:
                 logging.info(" running diagnostic '{}' every {} seconds / {} time steps"
                             .format(name, diag.sampling_frequency, diag.sampling_frequency / pyom.dt_tracer))
             if diag.output_frequency:
                 logging.info(" writing output for diagnostic '{}' every {} seconds / {} time steps"
                             .format(name, diag.output_frequency, diag.output_frequency / pyom.dt_tracer))
-            diag_routine.initialize(pyom)
+            pyom._diagnostics_schedule.append(ScheduledDiagnostic(
+                name, diag_routine, diag.group,
+                _frequency_to_interval(pyom, name, diag.sampling_frequency),
+                _frequency_to_interval(pyom, name, diag.output_frequency)
+            ))
+    # members of a group are dispatched one after another, so they can share intermediates
+    group_order = {}
+    for scheduled in pyom._diagnostics_schedule:
+        group_order.setdefault(scheduled.group or scheduled.name, len(group_order))
+    pyom._diagnostics_schedule.sort(key=lambda s: (group_order[s.group or s.name], s.name))
+    for scheduled in pyom._diagnostics_schedule:
+        scheduled.schedule(pyom.itt)
+
+@pyom_method
+def finalize_diagnostics(pyom):
+    """
+    write remaining buffered output of diagnostic routines
+    """
+    for scheduled in pyom._diagnostics_schedule:
+        if hasattr(scheduled.routine, "finalize"):
+            scheduled.routine.finalize(pyom)
 
 @pyom_method
 def read_restart(pyom):
@@ -29,26 +95,59 @@ def read_restart(pyom):
 @pyom_method
 def diagnose(pyom):
     """
-    call diagnostic routines
+    call diagnostic routines that are due in the current time step
     """
-    time = pyom.itt * pyom.dt_tracer
-    for name, diag in pyom.diagnostics.items():
-        try:
-            diag_routine = getattr(diagnostics_tools, name)
-        except AttributeError:
-            raise AttributeError("unknown diagnostic '{}'".format(name))
-        if diag.sampling_frequency and time % diag.sampling_frequency < pyom.dt_tracer:
-            diag_routine.diagnose(pyom)
-        if diag.output_frequency and time % diag.output_frequency < pyom.dt_tracer:
-            diag_routine.output(pyom)
+    itt = pyom.itt
+    current_group = None
+    for scheduled in pyom._diagnostics_schedule:
+        # diagnostics without a group do not share intermediates with any other
+        if (scheduled.group or scheduled.name) != current_group:
+            pyom._diagnostics_cache.clear()
+            current_group = scheduled.group or scheduled.name
+        if scheduled.next_sampling is not None and itt >= scheduled.next_sampling:
+            scheduled.routine.diagnose(pyom)
+            scheduled.next_sampling = _next_multiple(itt + 1, scheduled.sampling_interval)
+        if scheduled.next_output is not None and itt >= scheduled.next_output:
+            scheduled.routine.output(pyom)
+            scheduled.next_output = _next_multiple(itt + 1, scheduled.output_interval)
+    pyom._diagnostics_cache.clear()
+
+@pyom_method
+def shared_intermediate(pyom, key, compute):
+    """
+    return a quantity that is shared between the members of a diagnostics group,
+    computing it only on first request in the current time step
+
+    Diagnostics request intermediates by key (e.g. "sigma_2000" for potential
+    density), so grouping diagnostics that use the same key avoids computing it twice.
+    """
+    if not key in pyom._diagnostics_cache:
+        pyom._diagnostics_cache[key] = compute()
+    return pyom._diagnostics_cache[key]
 
 @pyom_method
 def sanity_check(pyom):
-    if np.any(~np.isfinite(pyom.u)):
-        raise RuntimeError("solver diverged at iteration {}".format(pyom.itt))
+    """
+    check newest time level of key variables for non-finite values
+    """
+    if not pyom.sanity_check_interval or pyom.itt % pyom.sanity_check_interval:
+        return
+    for key in pyom.sanity_check_variables:
+        if not hasattr(pyom, key):
+            continue
+        var = getattr(pyom, key)[..., pyom.taup1]
+        # a single reduction propagates any NaN or Inf in the array
+        if not bool(np.isfinite(np.sum(var))):
+            nonfinite = np.argwhere(~np.isfinite(var))
+            if not len(nonfinite):
+                continue # sum overflowed, but all values are finite
+            raise RuntimeError("solver diverged at iteration {} (first non-finite value of {} at index {})"
+                               .format(pyom.itt, key, tuple(int(i) for i in nonfinite[0])))
 
 @pyom_method
 def panic_output(pyom):
+    if pyom.comm is not None:
+        return
     logging.error("Writing snapshot before panic shutdown")
     if not pyom.diagnostics["snapshot"].is_active():
         diagnostics_tools.snapshot.initialize(pyom)
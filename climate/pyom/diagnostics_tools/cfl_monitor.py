@@ -1,4 +1,6 @@
-from .. import pyom_method
+from .. import pyom_method, distributed
+
+SUPPORTS_DISTRIBUTED = True
 
 def initialize(pyom):
     pass
@@ -10,13 +12,14 @@ def diagnose(pyom):
     """
     cfl = max(
         np.max(np.abs(pyom.u[2:-2,2:-2,:,pyom.tau]) * pyom.maskU[2:-2,2:-2,:] \
-                / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                 * pyom.dt_tracer),
         np.max(np.abs(pyom.v[2:-2,2:-2,:,pyom.tau]) * pyom.maskV[2:-2,2:-2,:] \
-                / pyom.dyt[np.newaxis, 2:-2, np.newaxis] * pyom.dt_tracer)
+                * pyom.dytr[np.newaxis, 2:-2, np.newaxis] * pyom.dt_tracer)
     )
     wcfl = np.max(np.abs(pyom.w[2:-2, 2:-2, :, pyom.tau]) * pyom.maskW[2:-2, 2:-2, :] \
-                  / pyom.dzt[np.newaxis, np.newaxis, :] * pyom.dt_tracer)
+                  * pyom.dztr[np.newaxis, np.newaxis, :] * pyom.dt_tracer)
+    cfl, wcfl = distributed.global_max(pyom, cfl), distributed.global_max(pyom, wcfl)
 
     if np.isnan(cfl) or np.isnan(wcfl):
         raise RuntimeError("CFL number is NaN at iteration {}".format(pyom.itt))
@@ -27,13 +30,14 @@ def diagnose(pyom):
     if pyom.enable_eke or pyom.enable_tke or pyom.enable_idemix:
         cfl = max(
             np.max(np.abs(pyom.u_wgrid[2:-2,2:-2,:]) * pyom.maskU[2:-2,2:-2,:] \
-                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                    * (pyom.costr[np.newaxis, 2:-2, np.newaxis] * pyom.dxtr[2:-2, np.newaxis, np.newaxis]) \
                     * pyom.dt_tracer),
             np.max(np.abs(pyom.v_wgrid[2:-2,2:-2,:]) * pyom.maskV[2:-2,2:-2,:] \
-                    / pyom.dyt[np.newaxis, 2:-2, np.newaxis] * pyom.dt_tracer)
+                    * pyom.dytr[np.newaxis, 2:-2, np.newaxis] * pyom.dt_tracer)
         )
         wcfl = np.max(np.abs(pyom.w_wgrid[2:-2, 2:-2, :]) * pyom.maskW[2:-2, 2:-2, :] \
-                      / pyom.dzt[np.newaxis, np.newaxis, :] * pyom.dt_tracer)
+                      * pyom.dztr[np.newaxis, np.newaxis, :] * pyom.dt_tracer)
+        cfl, wcfl = distributed.global_max(pyom, cfl), distributed.global_max(pyom, wcfl)
         logging.warning("maximal hor. CFL number on w grid = {}".format(cfl))
         logging.warning("maximal ver. CFL number on w grid = {}".format(wcfl))
 
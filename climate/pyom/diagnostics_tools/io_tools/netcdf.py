@@ -32,7 +32,8 @@ def initialize_netcdf_file(pyom, ncfile):
 
 @pyom_method
 def initialize_variable(pyom, key, var, ncfile):
-    dims = tuple(d for d in var.dims if d in variables.OUTPUT_DIMENSIONS)
+    # diagnostics may define additional dimensions (e.g. density classes) in the file
+    dims = tuple(d for d in var.dims if d in variables.OUTPUT_DIMENSIONS or d in ncfile.dimensions)
     if var.time_dependent:
         dims += ("Time",)
     if not key in ncfile.variables:
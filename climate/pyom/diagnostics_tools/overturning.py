@@ -1,14 +1,193 @@
+import logging
+import warnings
+
+from . import io_tools
+from .. import pyom_method, variables
+from ..core import density
+
+P_REF = 2000. # reference pressure for sigma levels in dbar
+LEVELS_PER_CELL = 4 # number of sigma levels per vertical grid cell
+
+SIGMA = ("sigma",)
+OVERTURNING_VARIABLES = {
+    "trans": variables.Variable(
+        "Meridional transport", variables.YU + SIGMA, "m^3/s",
+        "Meridional transport below isopycnal"
+    ),
+    "vsf_depth": variables.Variable(
+        "Meridional transport", variables.YU + variables.ZW, "m^3/s",
+        "Meridional transport below depth level"
+    ),
+    "z_sig": variables.Variable(
+        "Depth of isopycnal", variables.YU + SIGMA, "m",
+        "Zonally averaged depth of isopycnal"
+    ),
+}
+BOLUS_VARIABLES = {
+    "bolus_iso": variables.Variable(
+        "Meridional transport", variables.YU + SIGMA, "m^3/s",
+        "Meridional eddy-driven transport below isopycnal"
+    ),
+    "bolus_depth": variables.Variable(
+        "Meridional transport", variables.YU + variables.ZW, "m^3/s",
+        "Meridional eddy-driven transport below depth level"
+    ),
+}
+
+def _get_variables(pyom):
+    out_vars = dict(OVERTURNING_VARIABLES)
+    if pyom.enable_neutral_diffusion and pyom.enable_skew_diffusion:
+        out_vars.update(BOLUS_VARIABLES)
+    return out_vars
+
+@pyom_method
 def initialize(pyom):
+    """
+    set up sigma levels and the (static) zonal index maps used for binning
+    """
+    pyom._overturning_nitts = 0
+    pyom._overturning_nlevel = pyom.nz * LEVELS_PER_CELL
+    nlevel = pyom._overturning_nlevel
+
+    sige = float(density.get_rho(pyom, 35., -2., P_REF))
+    sigs = float(density.get_rho(pyom, 35., 30., P_REF))
+    pyom._overturning_sigs = sigs
+    pyom._overturning_dsig = (sige - sigs) / (nlevel - 1)
+    pyom._overturning_sigma = sigs + pyom._overturning_dsig * np.arange(nlevel)
+    logging.debug(" sigma ranges for overturning diagnostic: start sigma0 = {}, end sigma0 = {}, delta sigma0 = {}"
+                  .format(sigs, sige, pyom._overturning_dsig))
+
+    """
+    cell face areas on V grid and flat bin offsets of each latitude;
+    every wet cell is later assigned to a bin (j, number of sigma levels below)
+    """
+    pyom._overturning_fac = pyom.dxt[2:-2, np.newaxis, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis] \
+                            * pyom.dzt[np.newaxis, np.newaxis, :] * pyom.maskV[2:-2, 2:-2, :]
+    lat_index = np.arange(pyom.ny)[np.newaxis, :, np.newaxis] * (nlevel + 1)
+    pyom._overturning_bin_offset = np.broadcast_to(lat_index, pyom._overturning_fac.shape).flatten()
+
+    """
+    area below z levels, used to map isopycnals to depth
+    """
+    pyom._overturning_zarea = np.cumsum(np.sum(pyom._overturning_fac, axis=0), axis=1)
+
+    pyom._overturning_sums = {}
+    for key in _get_variables(pyom):
+        if SIGMA[0] in _get_variables(pyom)[key].dims:
+            pyom._overturning_sums[key] = np.zeros((pyom.ny+4, nlevel))
+        else:
+            pyom._overturning_sums[key] = np.zeros((pyom.ny+4, pyom.nz))
+
+    filename = pyom.diagnostics["overturning"].outfile.format(**vars(pyom))
+    logging.info("Preparing file {}".format(filename))
+    with io_tools.threaded_io(pyom, filename, "w") as f:
+        io_tools.initialize_file(pyom, f)
+        f.createDimension(SIGMA[0], nlevel)
+        sigma_var = f.createVariable(SIGMA[0], "f8", SIGMA)
+        sigma_var.long_name = "Sigma axis"
+        sigma_var.units = "kg/m^3"
+        sigma_var[...] = pyom._overturning_sigma
+        for key, var in _get_variables(pyom).items():
+            io_tools.initialize_variable(pyom, key, var, f)
+
     diag_over_read_restart(pyom)
 
 def diag_over_read_restart(pyom):
-    import warnings
     warnings.warn("routine is not implemented yet")
 
+@pyom_method
+def _bin_by_density(pyom, weights, sigma_bins):
+    """
+    sum weights in each (latitude, density class) and return the sums
+    below each isopycnal
+    """
+    nlevel = pyom._overturning_nlevel
+    binned = np.bincount(pyom._overturning_bin_offset + sigma_bins, weights=weights.flatten(),
+                         minlength=pyom.ny * (nlevel + 1)).reshape(pyom.ny, nlevel + 1)
+    return np.cumsum(binned[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+@pyom_method
+def potential_density(pyom, p_ref):
+    """
+    density of the current state referenced to pressure p_ref (in dbar) on T grid
+    """
+    return density.get_rho(pyom, pyom.salt[..., pyom.tau], pyom.temp[..., pyom.tau], p_ref)
+
+@pyom_method
 def diagnose(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    accumulate transports below isopycnals and depth levels
+    """
+    nlevel = pyom._overturning_nlevel
+    sums = pyom._overturning_sums
+
+    """
+    number of sigma levels that are lighter than the sigma value at each V cell face
+    """
+    from .. import diagnostics # avoid circular import
+    sig_loc = diagnostics.shared_intermediate(pyom, "sigma_{:g}".format(P_REF), lambda: potential_density(pyom, P_REF))
+    sig_loc_face = 0.5 * (sig_loc[2:-2, 2:-2, :] + sig_loc[2:-2, 3:-1, :])
+    sigma_bins = np.ceil((sig_loc_face - pyom._overturning_sigs) / pyom._overturning_dsig)
+    sigma_bins = np.clip(sigma_bins, 0, nlevel).astype(np.int).flatten()
+
+    transport = pyom.v[2:-2, 2:-2, :, pyom.tau] * pyom._overturning_fac
+    sums["trans"][2:-2, :] += _bin_by_density(pyom, transport, sigma_bins)
+    sums["z_sig"][2:-2, :] += _bin_by_density(pyom, pyom._overturning_fac, sigma_bins)
+    sums["vsf_depth"][2:-2, :] += np.cumsum(np.sum(transport, axis=0), axis=1)
+
+    if pyom.enable_neutral_diffusion and pyom.enable_skew_diffusion:
+        """
+        eddy-driven transport from GM streamfunction
+        """
+        bolus_fac = pyom.dxt[2:-2, np.newaxis, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis] * pyom.maskV[2:-2, 2:-2, :]
+        bolus_transport = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+        bolus_transport[:, :, 0] = pyom.B1_gm[2:-2, 2:-2, 0]
+        bolus_transport[:, :, 1:] = pyom.B1_gm[2:-2, 2:-2, 1:] - pyom.B1_gm[2:-2, 2:-2, :-1]
+        bolus_transport *= bolus_fac
+        sums["bolus_iso"][2:-2, :] += _bin_by_density(pyom, bolus_transport, sigma_bins)
+        sums["bolus_depth"][2:-2, :] += np.sum(bolus_fac * pyom.B1_gm[2:-2, 2:-2, :], axis=0)
 
+    pyom._overturning_nitts += 1
+
+@pyom_method
+def _area_to_depth(pyom, area):
+    """
+    linear interpolation of area below isopycnals onto the depth axis,
+    vectorized over all latitudes
+    """
+    zarea = pyom._overturning_zarea
+    nz = pyom.nz
+    zw = pyom.zw[np.newaxis, :] * np.ones((pyom.ny, 1))
+    # make area monotonic across latitudes so a single searchsorted call suffices
+    offset = (np.arange(pyom.ny) * (np.max(zarea) + np.max(area) + 1.))[:, np.newaxis]
+    k = np.searchsorted((zarea + offset).flatten(), (area + offset).flatten()).reshape(area.shape)
+    k = k - (np.arange(pyom.ny) * nz)[:, np.newaxis]
+    k = np.clip(k, 1, nz - 1)
+    j = np.arange(pyom.ny)[:, np.newaxis]
+    za_lo, za_hi = zarea[j, k-1], zarea[j, k]
+    weight = np.clip((area - za_lo) / np.maximum(za_hi - za_lo, 1e-20), 0., 1.)
+    return (1. - weight) * zw[j, k-1] + weight * zw[j, k]
+
+@pyom_method
 def output(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    write averaged overturning to netcdf file and reset accumulators
+    """
+    if not pyom._overturning_nitts:
+        return
+
+    sums = pyom._overturning_sums
+    for runsum in sums.values():
+        runsum[...] /= pyom._overturning_nitts
+    sums["z_sig"][2:-2, :] = _area_to_depth(pyom, sums["z_sig"][2:-2, :])
+
+    filename = pyom.diagnostics["overturning"].outfile.format(**vars(pyom))
+    time_in_days = pyom.itt * pyom.dt_tracer / 86400.
+    with io_tools.threaded_io(pyom, filename, "a") as f:
+        logging.info(" writing overturning to file " + filename)
+        n = f["Time"].size
+        f["Time"][n] = time_in_days
+        for key, var in _get_variables(pyom).items():
+            io_tools.write_variable(pyom, key, var, n, f, var_data=sums[key])
+            sums[key][...] = 0.
+    pyom._overturning_nitts = 0
@@ -1,25 +1,260 @@
+import logging
+import warnings
+
+from . import io_tools
+from .. import pyom_method, variables
+
+"""
+Lagrangian particles are stored as a structure of arrays (one flat buffer per
+coordinate), so that all particles are advected at once by vectorized operations.
+"""
+
+PARTICLE_DIM = ("particle",)
+PARTICLE_VARIABLES = {
+    "x_particle": variables.Variable(
+        "Zonal particle position", PARTICLE_DIM, "degrees_east / m",
+        "Zonal position of Lagrangian particle"
+    ),
+    "y_particle": variables.Variable(
+        "Meridional particle position", PARTICLE_DIM, "degrees_north / m",
+        "Meridional position of Lagrangian particle"
+    ),
+    "z_particle": variables.Variable(
+        "Vertical particle position", PARTICLE_DIM, "m",
+        "Vertical position of Lagrangian particle"
+    ),
+}
+
+@pyom_method
 def initialize(pyom):
+    """
+    particles are advected every time step, output is written every output_frequency seconds
+    """
+    diag = pyom.diagnostics["particles"]
+    # each step only sees the velocities at tau and taup1, so longer steps would
+    # miss the flow in between
+    if diag.sampling_frequency and diag.sampling_frequency > pyom.dt_tracer:
+        warnings.warn("particles are advected every time step, ignoring sampling_frequency {}s "
+                      "(use output_frequency to write positions less often)".format(diag.sampling_frequency))
+    diag.sampling_frequency = pyom.dt_tracer
+    if not pyom.particles_rk_order in (2, 4):
+        raise ValueError("particles_rk_order must be 2 or 4")
     set_particles(pyom)
     init_diag_particles(pyom)
     diag_particles_read_restart(pyom)
-    diagnose(pyom)
 
+@pyom_method
 def set_particles(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    allocate particle buffers and get initial positions from the setup
+    """
+    x, y, z = pyom.set_particles()
+    pyom._particles_x = np.array(x, dtype=np.float64).flatten()
+    pyom._particles_y = np.array(y, dtype=np.float64).flatten()
+    pyom._particles_z = np.array(z, dtype=np.float64).flatten()
+    if not pyom._particles_x.size == pyom._particles_y.size == pyom._particles_z.size:
+        raise ValueError("particle coordinate arrays must have the same size")
+    pyom._particles_n = pyom._particles_x.size
+    pyom._particles_id = np.arange(pyom._particles_n)
+
+    """
+    zonal coordinates are wrapped in the ghost cells of cyclic domains,
+    so monotonic coordinates are reconstructed from the grid spacings
+    """
+    scale = pyom.degtom if pyom.coord_degree else 1.
+    pyom._particles_xu = pyom.xu[2] + (np.cumsum(pyom.dxt) - np.sum(pyom.dxt[:3])) / scale
+    pyom._particles_xt = pyom.xt[2] + (np.cumsum(pyom.dxu) - pyom.dxu - np.sum(pyom.dxu[:2])) / scale
+
+    if pyom.enable_cyclic_x:
+        _wrap_cyclic(pyom, pyom._particles_x)
+    logging.info(" integrating {} particles using RK{}".format(pyom._particles_n, pyom.particles_rk_order))
+
+    on_land = _is_on_land(pyom, pyom._particles_x, pyom._particles_y, pyom._particles_z)
+    if np.any(on_land):
+        warnings.warn("{} particles are initialized on land".format(int(np.sum(on_land))))
+    if pyom.enable_particles_sorting:
+        _sort_particles(pyom)
 
+@pyom_method
 def init_diag_particles(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    create output file and buffers
+    """
+    pyom._particles_buffer = np.zeros((pyom.particles_output_batch, 3, pyom._particles_n))
+    pyom._particles_buffer_time = np.zeros(pyom.particles_output_batch)
+    pyom._particles_nbuffer = 0
+
+    filename = pyom.diagnostics["particles"].outfile.format(**vars(pyom))
+    pyom._particles_outfile = filename
+    logging.info("Preparing file {}".format(filename))
+    with io_tools.threaded_io(pyom, filename, "w") as f:
+        io_tools.initialize_file(pyom, f)
+        f.createDimension(PARTICLE_DIM[0], pyom._particles_n)
+        for key, var in PARTICLE_VARIABLES.items():
+            io_tools.initialize_variable(pyom, key, var, f)
 
 def diag_particles_read_restart(pyom):
-    import warnings
     warnings.warn("routine is not implemented yet")
 
+@pyom_method
+def _locate(pyom, coord, pos):
+    """
+    index i and weight such that pos is between coord[i] and coord[i+1]
+    (constant extrapolation outside of coord)
+    """
+    i = np.clip(np.searchsorted(coord, pos) - 1, 0, coord.size - 2)
+    weight = np.clip((pos - coord[i]) / (coord[i+1] - coord[i]), 0., 1.)
+    return i, weight
+
+@pyom_method
+def _interpolate(pyom, var, xcoord, ycoord, zcoord, px, py, pz):
+    """
+    trilinear interpolation of var, given on (xcoord, ycoord, zcoord), to particle positions
+    """
+    i, wx = _locate(pyom, xcoord, px)
+    j, wy = _locate(pyom, ycoord, py)
+    k, wz = _locate(pyom, zcoord, pz)
+    var_z0 = (1 - wx) * (1 - wy) * var[i, j, k] + wx * (1 - wy) * var[i+1, j, k] \
+           + (1 - wx) * wy * var[i, j+1, k] + wx * wy * var[i+1, j+1, k]
+    var_z1 = (1 - wx) * (1 - wy) * var[i, j, k+1] + wx * (1 - wy) * var[i+1, j, k+1] \
+           + (1 - wx) * wy * var[i, j+1, k+1] + wx * wy * var[i+1, j+1, k+1]
+    return (1 - wz) * var_z0 + wz * var_z1
+
+@pyom_method
+def _particle_velocity(pyom, fields, px, py, pz):
+    """
+    velocity at particle positions in model coordinates per second
+    """
+    u_loc, v_loc, w_loc = fields
+    dx = _interpolate(pyom, u_loc, pyom._particles_xu, pyom.yt, pyom.zt, px, py, pz)
+    dy = _interpolate(pyom, v_loc, pyom._particles_xt, pyom.yu, pyom.zt, px, py, pz)
+    dz = _interpolate(pyom, w_loc, pyom._particles_xt, pyom.yt, pyom.zw, px, py, pz)
+    if pyom.coord_degree:
+        dx /= pyom.degtom * np.cos(py / 180. * pyom.pi)
+        dy /= pyom.degtom
+    return dx, dy, dz
+
+@pyom_method
+def _cell_index(pyom, px, py, pz):
+    """
+    indices of the T cells containing the particles
+    """
+    i = np.clip(np.searchsorted(pyom._particles_xu, px), 0, pyom.nx + 3)
+    j = np.clip(np.searchsorted(pyom.yu, py), 0, pyom.ny + 3)
+    k = np.clip(np.searchsorted(pyom.zw, pz), 0, pyom.nz - 1)
+    return i, j, k
+
+@pyom_method
+def _is_on_land(pyom, px, py, pz):
+    i, j, k = _cell_index(pyom, px, py, pz)
+    kbot = pyom.kbot[i, j]
+    return np.logical_or(kbot == 0, k < kbot - 1)
+
+@pyom_method
+def _wrap_cyclic(pyom, px):
+    """
+    map zonal positions px into the cyclic domain [xu[1], xu[nx+1]) in place
+    """
+    x0 = pyom._particles_xu[1]
+    domain_length = pyom._particles_xu[pyom.nx + 1] - x0
+    px[...] = x0 + np.mod(px - x0, domain_length)
+
+@pyom_method
+def _reflect(pyom, old_x, old_y):
+    """
+    reflect particles at the surface, the sea floor and lateral boundaries
+    """
+    px, py, pz = pyom._particles_x, pyom._particles_y, pyom._particles_z
+    pz[...] = np.where(pz > 0., -pz, pz)
+
+    # particles that left their water column are put back to their old horizontal position
+    i, j, k = _cell_index(pyom, px, py, pz)
+    dry = pyom.kbot[i, j] == 0
+    px[...] = np.where(dry, old_x, px)
+    py[...] = np.where(dry, old_y, py)
+
+    # particles below the sea floor are mirrored at the bottom interface
+    i, j, k = _cell_index(pyom, px, py, pz)
+    kb = np.maximum(pyom.kbot[i, j] - 1, 0)
+    zbot = pyom.zw[kb] - pyom.dzt[kb]
+    pz[...] = np.where(pz < zbot, 2 * zbot - pz, pz)
+
+@pyom_method
+def _sort_particles(pyom):
+    """
+    reorder particle buffers by grid cell to improve memory locality of the interpolation
+    """
+    i, j, k = _cell_index(pyom, pyom._particles_x, pyom._particles_y, pyom._particles_z)
+    order = np.argsort((i * (pyom.ny + 4) + j) * pyom.nz + k, kind="mergesort")
+    for buf in ("_particles_x", "_particles_y", "_particles_z", "_particles_id"):
+        setattr(pyom, buf, getattr(pyom, buf)[order])
+
+@pyom_method
 def diagnose(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    advect particles over one time step with a Runge-Kutta scheme, velocities are
+    linearly interpolated in time between tau and taup1
+    """
+    dt = pyom.dt_tracer
+    fields_start = tuple(var[..., pyom.tau] for var in (pyom.u, pyom.v, pyom.w))
+    fields_end = tuple(var[..., pyom.taup1] for var in (pyom.u, pyom.v, pyom.w))
+    fields_mid = tuple(0.5 * (v1 + v2) for v1, v2 in zip(fields_start, fields_end))
+
+    px, py, pz = pyom._particles_x, pyom._particles_y, pyom._particles_z
+    old_x, old_y = px.copy(), py.copy()
 
+    k1 = _particle_velocity(pyom, fields_start, px, py, pz)
+    if pyom.particles_rk_order == 2:
+        k2 = _particle_velocity(pyom, fields_mid, *(p + 0.5 * dt * kp for p, kp in zip((px, py, pz), k1)))
+        increment = k2
+    else:
+        k2 = _particle_velocity(pyom, fields_mid, *(p + 0.5 * dt * kp for p, kp in zip((px, py, pz), k1)))
+        k3 = _particle_velocity(pyom, fields_mid, *(p + 0.5 * dt * kp for p, kp in zip((px, py, pz), k2)))
+        k4 = _particle_velocity(pyom, fields_end, *(p + dt * kp for p, kp in zip((px, py, pz), k3)))
+        increment = tuple((a + 2 * b + 2 * c + d) / 6. for a, b, c, d in zip(k1, k2, k3, k4))
+
+    px += dt * increment[0]
+    py += dt * increment[1]
+    pz += dt * increment[2]
+
+    if pyom.enable_cyclic_x:
+        _wrap_cyclic(pyom, px)
+    # old positions are inside the (wrapped) domain, so reverted particles stay there
+    _reflect(pyom, old_x, old_y)
+
+    if pyom.enable_particles_sorting:
+        _sort_particles(pyom)
+
+@pyom_method
 def output(pyom):
-    import warnings
-    warnings.warn("routine is not implemented yet")
+    """
+    store current particle positions in output buffer and write it to disk when full
+    """
+    n = pyom._particles_nbuffer
+    ids = pyom._particles_id
+    pyom._particles_buffer[n, 0, ids] = pyom._particles_x
+    pyom._particles_buffer[n, 1, ids] = pyom._particles_y
+    pyom._particles_buffer[n, 2, ids] = pyom._particles_z
+    pyom._particles_buffer_time[n] = pyom.itt * pyom.dt_tracer / 86400.
+    pyom._particles_nbuffer += 1
+    if pyom._particles_nbuffer == pyom.particles_output_batch:
+        write_particles(pyom)
+
+@pyom_method
+def write_particles(pyom):
+    """
+    write all buffered particle positions to netcdf file
+    """
+    nbuf = pyom._particles_nbuffer
+    if not nbuf:
+        return
+    logging.info(" writing {} particle records to file {}".format(nbuf, pyom._particles_outfile))
+    with io_tools.threaded_io(pyom, pyom._particles_outfile, "a") as f:
+        n = f["Time"].size
+        f["Time"][n:n+nbuf] = pyom._particles_buffer_time[:nbuf]
+        for m, key in enumerate(("x_particle", "y_particle", "z_particle")):
+            f[key][n:n+nbuf, :] = pyom._particles_buffer[:nbuf, m, :]
+    pyom._particles_nbuffer = 0
+
+def finalize(pyom):
+    write_particles(pyom)
@@ -1,6 +1,8 @@
 import logging
 
-from .. import pyom_method
+from .. import pyom_method, distributed
+
+SUPPORTS_DISTRIBUTED = True
 
 def initialize(pyom):
     pass
@@ -10,19 +12,29 @@ def diagnose(pyom):
     """
     Diagnose tracer content
     """
-    cell_volume = pyom.area_t[2:-2, 2:-2, np.newaxis] * pyom.dzt[np.newaxis, np.newaxis, :] \
-                  * pyom.maskT[2:-2, 2:-2, :]
+    cell_volume = pyom.volume_t[2:-2, 2:-2, :]
     volm = np.sum(cell_volume)
     tempm = np.sum(cell_volume * pyom.temp[2:-2, 2:-2, :, pyom.tau])
     saltm = np.sum(cell_volume * pyom.salt[2:-2, 2:-2, :, pyom.tau])
     vtemp = np.sum(cell_volume * pyom.temp[2:-2, 2:-2, :, pyom.tau]**2)
     vsalt = np.sum(cell_volume * pyom.salt[2:-2, 2:-2, :, pyom.tau]**2)
+    volm, tempm, saltm, vtemp, vsalt = (distributed.global_sum(pyom, value) for value in (volm, tempm, saltm, vtemp, vsalt))
 
     logging.warning("")
-    logging.warning("mean temperature {} change to last {}".format(tempm/volm, (tempm-diag_tracer_content.tempm1)/volm))
-    logging.warning("mean salinity    {} change to last {}".format(saltm/volm, (saltm-diag_tracer_content.saltm1)/volm))
-    logging.warning("temperature var. {} change to last {}".format(vtemp/volm, (vtemp-diag_tracer_content.vtemp1)/volm))
-    logging.warning("salinity var.    {} change to last {}".format(vsalt/volm, (vsalt-diag_tracer_content.vsalt1)/volm))
+    logging.warning("mean temperature {} change to last {}".format(tempm/volm, (tempm-diagnose.tempm1)/volm))
+    logging.warning("mean salinity    {} change to last {}".format(saltm/volm, (saltm-diagnose.saltm1)/volm))
+    logging.warning("temperature var. {} change to last {}".format(vtemp/volm, (vtemp-diagnose.vtemp1)/volm))
+    logging.warning("salinity var.    {} change to last {}".format(vsalt/volm, (vsalt-diagnose.vsalt1)/volm))
+
+    if pyom.passive_tracers:
+        tracer = pyom.tracer[2:-2, 2:-2, :, :, pyom.tau]
+        content = distributed.global_sum(pyom, np.sum(cell_volume[..., np.newaxis] * tracer, axis=(0, 1, 2)))
+        variance = distributed.global_sum(pyom, np.sum(cell_volume[..., np.newaxis] * tracer**2, axis=(0, 1, 2)))
+        last_content = getattr(diagnose, "tracerm1", np.zeros_like(content))
+        for n, key in enumerate(pyom.passive_tracers):
+            logging.warning("mean {:<11} {} change to last {}".format(key, content[n]/volm, (content[n]-last_content[n])/volm))
+            logging.warning("{:<11} var. {}".format(key, variance[n]/volm))
+        diagnose.tracerm1 = content
 
     diagnose.tempm1 = tempm
     diagnose.vtemp1 = vtemp
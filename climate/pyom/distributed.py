@@ -0,0 +1,384 @@
+"""
+Horizontal domain decomposition for running one model on several processes.
+
+The horizontal domain is split into ``n_proc[0] x n_proc[1]`` subdomains of equal
+size. Every process (rank) runs the model setup on the global grid, and then
+keeps only its own subdomain plus a halo of 2 ghost cells (see :func:`decompose`).
+This distributes the work of the integration, but not the memory of the setup: every
+process needs as much memory as a serial run, so models that do not fit into the
+memory of one process cannot be run.
+
+Only hydrostatic models with the streamfunction method are supported (see
+:func:`check_configuration`). During integration, halos are updated by :func:`exchange_overlap` wherever the
+serial model applies cyclic boundary conditions, and global quantities are computed
+with :func:`global_sum`, :func:`global_max`, and :func:`global_min`.
+
+Communication happens through a communicator object. :class:`PipeCommunicator`
+connects processes on one machine via :mod:`multiprocessing` pipes (see
+:func:`run_distributed`). It implements the subset of the ``mpi4py`` communicator
+interface that is used here, so ``mpi4py.MPI.COMM_WORLD`` can be used instead:
+
+    >>> from mpi4py import MPI
+    >>> simulation = MyModel()
+    >>> simulation.comm = MPI.COMM_WORLD
+    >>> simulation.run(n_proc=(2, 2))
+
+Halo exchanges started by :func:`climate.pyom.core.cyclic.start_boundary_update`
+run in a background thread, so MPI needs to provide ``MPI_THREAD_MULTIPLE`` (which
+``mpi4py`` requests by default).
+"""
+import logging
+import threading
+import collections
+import multiprocessing
+from functools import reduce
+
+import numpy
+
+SUM, MAX, MIN = "sum", "max", "min"
+_REDUCTIONS = {SUM: numpy.add, MAX: numpy.maximum, MIN: numpy.minimum}
+HALO = 2
+X_DIMS = ("xt", "xu")
+Y_DIMS = ("yt", "yu")
+
+
+class PipeCommunicator(object):
+    """
+    Communicator between processes on one machine, connected pairwise by pipes.
+    Messages are matched by source and tag, so several threads can communicate
+    at the same time as long as they use different tags.
+    """
+    def __init__(self, rank, size, connections):
+        self.rank = rank
+        self.size = size
+        self._connections = connections
+        self._send_locks = {other: threading.Lock() for other in connections}
+        self._received = {other: {} for other in connections}
+        self._reading = {other: False for other in connections}
+        self._conditions = {other: threading.Condition() for other in connections}
+
+    def send(self, obj, dest, tag=0):
+        with self._send_locks[dest]:
+            self._connections[dest].send((tag, obj))
+
+    def recv(self, source, tag=0):
+        received, condition = self._received[source], self._conditions[source]
+        with condition:
+            while not received.get(tag):
+                if self._reading[source]:
+                    # another thread is reading from this pipe and will notify us
+                    condition.wait()
+                    continue
+                self._reading[source] = True
+                condition.release()
+                try:
+                    message_tag, obj = self._connections[source].recv()
+                finally:
+                    condition.acquire()
+                    self._reading[source] = False
+                received.setdefault(message_tag, collections.deque()).append(obj)
+                condition.notify_all()
+            return received[tag].popleft()
+
+    def sendrecv(self, sendobj, dest, sendtag=0, source=None, recvtag=0):
+        # send in background, so that pairs of processes cannot block each other
+        sender = threading.Thread(target=self.send, args=(sendobj, dest, sendtag))
+        sender.start()
+        obj = self.recv(source, recvtag)
+        sender.join()
+        return obj
+
+    def gather(self, sendobj, root=0):
+        if self.rank != root:
+            self.send(sendobj, root)
+            return None
+        return [sendobj if rank == root else self.recv(rank) for rank in range(self.size)]
+
+    def bcast(self, obj, root=0):
+        if self.rank != root:
+            return self.recv(root)
+        for rank in range(self.size):
+            if rank != root:
+                self.send(obj, rank)
+        return obj
+
+    def allreduce(self, sendobj, op=SUM):
+        values = self.gather(sendobj)
+        result = reduce(_REDUCTIONS[op], values) if self.rank == 0 else None
+        return self.bcast(result)
+
+    def barrier(self):
+        self.allreduce(0)
+
+    @staticmethod
+    def create(size):
+        """
+        create communicators for all ranks, connected by one pipe per pair of ranks
+        """
+        connections = [{} for _ in range(size)]
+        for rank in range(size):
+            for other in range(rank + 1, size):
+                connections[rank][other], connections[other][rank] = multiprocessing.Pipe()
+        return [PipeCommunicator(rank, size, connections[rank]) for rank in range(size)]
+
+
+def _get_op(pyom, op):
+    if isinstance(pyom.comm, PipeCommunicator):
+        return op
+    from mpi4py import MPI
+    return getattr(MPI, op.upper())
+
+
+def global_sum(pyom, value):
+    """
+    sum of value over all processes
+    """
+    if pyom.comm is None:
+        return value
+    return pyom.comm.allreduce(value, op=_get_op(pyom, SUM))
+
+
+def global_max(pyom, value):
+    if pyom.comm is None:
+        return value
+    return pyom.comm.allreduce(value, op=_get_op(pyom, MAX))
+
+
+def global_min(pyom, value):
+    if pyom.comm is None:
+        return value
+    return pyom.comm.allreduce(value, op=_get_op(pyom, MIN))
+
+
+def _get_neighbor(pyom, shift_x, shift_y):
+    """
+    rank of the neighboring subdomain in the given direction, None at closed boundaries
+    """
+    n_proc_x, n_proc_y = pyom.n_proc
+    proc_x, proc_y = pyom.proc_idx[0] + shift_x, pyom.proc_idx[1] + shift_y
+    if pyom.enable_cyclic_x:
+        proc_x %= n_proc_x
+    if not (0 <= proc_x < n_proc_x and 0 <= proc_y < n_proc_y):
+        return None
+    return proc_y * n_proc_x + proc_x
+
+
+def _shift(pyom, arrays, axis, send, recv, dest, source, tag):
+    """
+    send arrays[send] to dest and receive arrays[recv] from source along axis,
+    in one message for all arrays
+    """
+    send_index = (slice(None),) * axis + (send,)
+    recv_index = (slice(None),) * axis + (recv,)
+    if dest is not None:
+        message = [numpy.ascontiguousarray(array[send_index]) for array in arrays]
+    if dest is not None and source is not None:
+        received = pyom.comm.sendrecv(message, dest=dest, sendtag=tag, source=source, recvtag=tag)
+    elif dest is not None:
+        pyom.comm.send(message, dest=dest, tag=tag)
+    elif source is not None:
+        received = pyom.comm.recv(source=source, tag=tag)
+    if source is not None:
+        for array, values in zip(arrays, received):
+            array[recv_index] = values
+
+
+def exchange_overlap(pyom, *arrays, **kwargs):
+    """
+    update ghost cells of horizontal (2D or higher) arrays with the values of the
+    neighboring subdomains, including cyclic boundaries
+
+    All arrays are exchanged together in one message per neighbor. Exchanges that
+    may run at the same time (e.g. in different threads) need a distinct ``tag``.
+    """
+    tag = kwargs.pop("tag", 0)
+    if pyom.n_proc[0] == 1:
+        if pyom.enable_cyclic_x:
+            for array in arrays:
+                array[-HALO:, ...] = array[HALO:2*HALO, ...]
+                array[:HALO, ...] = array[-2*HALO:-HALO, ...]
+    else:
+        west, east = _get_neighbor(pyom, -1, 0), _get_neighbor(pyom, 1, 0)
+        _shift(pyom, arrays, 0, slice(HALO, 2*HALO), slice(-HALO, None), west, east, tag)
+        _shift(pyom, arrays, 0, slice(-2*HALO, -HALO), slice(None, HALO), east, west, tag)
+    if pyom.n_proc[1] > 1:
+        # exchanged after x, so corners are filled, too
+        south, north = _get_neighbor(pyom, 0, -1), _get_neighbor(pyom, 0, 1)
+        _shift(pyom, arrays, 1, slice(HALO, 2*HALO), slice(-HALO, None), south, north, tag)
+        _shift(pyom, arrays, 1, slice(-2*HALO, -HALO), slice(None, HALO), north, south, tag)
+
+
+def owned_region(pyom, offset=HALO):
+    """
+    index into a horizontal array that starts at (local) index offset <= 2, selecting
+    the points owned by this process; ghost cells outside of the global domain are
+    owned by the outermost processes (selects everything in serial runs)
+    """
+    if pyom.comm is None:
+        return (slice(None), slice(None))
+    return tuple(slice(0 if pyom.proc_idx[axis] == 0 else HALO - offset, None) for axis in range(2))
+
+
+def _get_index(dims, x_slice, y_slice):
+    return tuple(x_slice if dim in X_DIMS else y_slice if dim in Y_DIMS else slice(None) for dim in dims)
+
+
+def check_configuration(pyom, comm):
+    """
+    raise an error if the model settings cannot be run on the processes of comm
+    (called before the setup on the global grid)
+    """
+    n_proc_x, n_proc_y = pyom.n_proc
+    if comm.size != n_proc_x * n_proc_y:
+        raise ValueError("number of processes ({}) does not match n_proc {!r}".format(comm.size, pyom.n_proc))
+    if pyom.nx % n_proc_x or pyom.ny % n_proc_y:
+        raise ValueError("grid size ({}, {}) must be divisible by n_proc {!r}".format(pyom.nx, pyom.ny, pyom.n_proc))
+    if hasattr(pyom.backend, "flush"):
+        raise ValueError("distributed runs are not supported by the {} backend".format(pyom.backend_name))
+    if not pyom.enable_hydrostatic or not pyom.enable_streamfunction:
+        raise ValueError("distributed runs are only supported for hydrostatic models with the streamfunction "
+                         "method (set enable_hydrostatic and enable_streamfunction)")
+
+
+def decompose(pyom):
+    """
+    cut all horizontal arrays of a model set up on the global grid to the subdomain
+    of this process
+    """
+    n_proc_x, n_proc_y = pyom.n_proc
+    pyom.nx_global, pyom.ny_global = pyom.nx, pyom.ny
+    pyom.proc_idx = (pyom.comm.rank % n_proc_x, pyom.comm.rank // n_proc_x)
+    nx, ny = pyom.nx // n_proc_x, pyom.ny // n_proc_y
+    # interior of this subdomain in global (ghost-free) indices
+    pyom.is_pe, pyom.ie_pe = pyom.proc_idx[0] * nx, (pyom.proc_idx[0] + 1) * nx
+    pyom.js_pe, pyom.je_pe = pyom.proc_idx[1] * ny, (pyom.proc_idx[1] + 1) * ny
+    x_slice = slice(pyom.is_pe, pyom.ie_pe + 2 * HALO)
+    y_slice = slice(pyom.js_pe, pyom.je_pe + 2 * HALO)
+
+    global_shape = (pyom.nx + 2 * HALO, pyom.ny + 2 * HALO)
+    for attr, value in list(vars(pyom).items()):
+        if attr in pyom.variables:
+            index = _get_index(pyom.variables[attr].dims, x_slice, y_slice)
+        elif isinstance(value, numpy.ndarray) and value.shape[:2] == global_shape:
+            # arrays created by setups (e.g. forcing) and setup routines (e.g. island masks)
+            index = (x_slice, y_slice)
+        elif hasattr(value, "decompose"):
+            # objects holding horizontal fields (e.g. climate.forcing.PeriodicForcing)
+            value.decompose(x_slice, y_slice)
+            continue
+        else:
+            continue
+        setattr(pyom, attr, value[index].copy())
+    pyom.nx, pyom.ny = nx, ny
+
+    if pyom.comm.rank != 0:
+        logging.getLogger().setLevel(logging.ERROR)
+    logging.info("Running on {} processes, subdomain size {} x {}".format(pyom.comm.size, nx, ny))
+
+
+def gather(pyom, array, dims):
+    """
+    assemble array with the given dimensions on the global grid on rank 0
+    (returns None on all other ranks)
+    """
+    if pyom.comm is None:
+        return array
+    # send owned region including the outer ghost cells of the global domain
+    n_proc_x, n_proc_y = pyom.n_proc
+    own_x = slice(0 if pyom.proc_idx[0] == 0 else HALO, None if pyom.proc_idx[0] == n_proc_x - 1 else -HALO)
+    own_y = slice(0 if pyom.proc_idx[1] == 0 else HALO, None if pyom.proc_idx[1] == n_proc_y - 1 else -HALO)
+    local_index = _get_index(dims, own_x, own_y)
+    pieces = pyom.comm.gather((pyom.is_pe + own_x.start, pyom.js_pe + own_y.start, array[local_index]))
+    if pieces is None:
+        return None
+    global_shape = tuple(pyom.nx_global + 2 * HALO if dim in X_DIMS else pyom.ny_global + 2 * HALO if dim in Y_DIMS else size
+                         for dim, size in zip(dims, array.shape))
+    global_array = numpy.empty(global_shape, dtype=array.dtype)
+    for start_x, start_y, piece in pieces:
+        shape = dict(zip(dims, piece.shape))
+        global_index = _get_index(dims, slice(start_x, start_x + shape.get("xt", shape.get("xu", 0))),
+                                  slice(start_y, start_y + shape.get("yt", shape.get("yu", 0))))
+        global_array[global_index] = piece
+    return global_array
+
+
+def scatter(pyom, global_array, dims):
+    """
+    distribute array on the global grid from rank 0 to the subdomains of all ranks
+    (including halos)
+    """
+    if pyom.comm is None:
+        return global_array
+    if pyom.comm.rank == 0:
+        n_proc_x = pyom.n_proc[0]
+        nx, ny = pyom.nx, pyom.ny
+        for rank in range(pyom.comm.size):
+            start_x, start_y = (rank % n_proc_x) * nx, (rank // n_proc_x) * ny
+            piece = global_array[_get_index(dims, slice(start_x, start_x + nx + 2 * HALO),
+                                            slice(start_y, start_y + ny + 2 * HALO))]
+            if rank == 0:
+                local_array = piece.copy()
+            else:
+                pyom.comm.send(numpy.ascontiguousarray(piece), dest=rank)
+        return local_array
+    return pyom.comm.recv(source=0)
+
+
+class GlobalView(object):
+    """
+    Proxy to a decomposed model that replaces some arrays by their global versions
+    (e.g. to set up a solver for the full domain on one process)
+    """
+    def __init__(self, pyom, arrays):
+        self._pyom = pyom
+        self.nx, self.ny = pyom.nx_global, pyom.ny_global
+        self.comm = None
+        for key, value in arrays.items():
+            setattr(self, key, value)
+
+    def __getattr__(self, attr):
+        return getattr(self._pyom, attr)
+
+
+def _run_rank(comm, model_class, model_args, model_kwargs, run_kwargs, callback):
+    simulation = model_class(*model_args, **model_kwargs)
+    simulation.comm = comm
+    simulation.run(**run_kwargs)
+    if callback is not None:
+        callback(simulation)
+
+
+def run_distributed(model_class, n_proc, model_args=(), model_kwargs=None, callback=None, **run_kwargs):
+    """Run a model on several local processes, communicating via pipes.
+
+    Arguments:
+        model_class: Model (subclass of :class:`climate.pyom.PyOM`) to run.
+        n_proc (:obj:`tuple`): Number of subdomains in x and y direction.
+        model_args, model_kwargs: Arguments passed to the model constructor.
+        callback (callable, optional): Called with the model instance on every rank
+            after the run (e.g. to :func:`gather` and store results).
+        run_kwargs: Passed to :meth:`climate.pyom.PyOM.run`.
+    """
+    size = n_proc[0] * n_proc[1]
+    run_kwargs["n_proc"] = tuple(n_proc)
+    processes = [multiprocessing.Process(target=_run_rank,
+                                         args=(comm, model_class, model_args, model_kwargs or {}, run_kwargs, callback))
+                 for comm in PipeCommunicator.create(size)]
+    for process in processes:
+        process.start()
+    # a failing rank would leave all others waiting for messages
+    failed = None
+    while any(process.is_alive() for process in processes):
+        for rank, process in enumerate(processes):
+            process.join(0.1)
+            if process.exitcode:
+                failed = rank
+                break
+        if failed is not None:
+            for process in processes:
+                process.terminate()
+            break
+    for process in processes:
+        process.join()
+    if failed is not None:
+        raise RuntimeError("process {} failed with exit code {}".format(failed, processes[failed].exitcode))
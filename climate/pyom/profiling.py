@@ -0,0 +1,134 @@
+import sys
+import time
+import json
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+def _peak_rss():
+    """
+    peak resident set size of this process in bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ProfileNode(object):
+    """
+    Accumulated statistics of one kernel at one position in the call tree
+    """
+    __slots__ = ("name", "calls", "time", "peak_rss_increase", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.time = 0.
+        self.peak_rss_increase = 0
+        self.children = OrderedDict()
+
+    def child(self, name):
+        try:
+            return self.children[name]
+        except KeyError:
+            node = self.children[name] = ProfileNode(name)
+            return node
+
+    def to_dict(self, trace_memory=False):
+        """
+        statistics of this node and its children; peak_rss_increase is only included
+        if memory was traced
+        """
+        node = OrderedDict([
+            ("name", self.name),
+            ("calls", self.calls),
+            ("time", self.time),
+        ])
+        if trace_memory:
+            node["peak_rss_increase"] = self.peak_rss_increase
+        node["children"] = [child.to_dict(trace_memory) for child in self.children.values()]
+        return node
+
+
+class KernelProfiler(object):
+    """Hierarchical profiler for all functions decorated with :func:`pyom_method`.
+
+    Records wall time and number of calls. Nested kernel calls are attributed to
+    their caller, so the report forms a call tree.
+
+    If ``trace_memory`` is set (and :mod:`resource` is available), also records by
+    how much each kernel raised the peak memory usage (resident set size) of the
+    process. This is not the number of bytes a kernel allocates: it includes all
+    arrays, no matter which library created them, but only shows kernels that exceed
+    the previous peak, i.e., mostly the first calls.
+
+    Example:
+      >>> simulation.kernel_profiler = KernelProfiler()
+      >>> simulation.kernel_profiler.start()
+      >>> ...
+      >>> simulation.kernel_profiler.stop()
+      >>> print(simulation.kernel_profiler.report_table())
+    """
+    def __init__(self, trace_memory=False):
+        self.root = ProfileNode("total")
+        self.trace_memory = trace_memory and resource is not None
+        self._stack = []
+        self._start_time = None
+        self._start_memory = 0
+
+    def start(self):
+        self._stack = [(self.root, 0)]
+        self._start_time = time.time()
+        if self.trace_memory:
+            self._start_memory = _peak_rss()
+        self.root.calls += 1
+
+    def stop(self):
+        self.root.time += time.time() - self._start_time
+        if self.trace_memory:
+            self.root.peak_rss_increase += _peak_rss() - self._start_memory
+
+    def enter(self, name):
+        """
+        push a new frame; each frame is (node, peak resident set size at entry)
+        """
+        node = self._stack[-1][0].child(name)
+        node.calls += 1
+        self._stack.append((node, _peak_rss() if self.trace_memory else 0))
+        return time.time()
+
+    def exit(self, start_time):
+        node, memory_at_entry = self._stack.pop()
+        node.time += time.time() - start_time
+        if self.trace_memory:
+            node.peak_rss_increase += _peak_rss() - memory_at_entry
+
+    def report_json(self, **kwargs):
+        return json.dumps(self.root.to_dict(self.trace_memory), **kwargs)
+
+    def report_table(self, min_fraction=0.):
+        """
+        format call tree as text table, omitting kernels that take less than
+        min_fraction of total time
+        """
+        total_time = self.root.time or sum(child.time for child in self.root.children.values())
+        header = "{:<60} {:>10} {:>12} {:>7}".format("kernel", "calls", "time (s)", "%")
+        if self.trace_memory:
+            header += " {:>14}".format("peak RSS +(B)")
+        lines = [header]
+        def add_node(node, depth):
+            fraction = node.time / total_time if total_time else 0.
+            if fraction < min_fraction:
+                return
+            line = "{:<60} {:>10d} {:>12.4f} {:>7.2f}".format(("  " * depth + node.name)[:60], node.calls,
+                                                               node.time, 100 * fraction)
+            if self.trace_memory:
+                line += " {:>14d}".format(node.peak_rss_increase)
+            lines.append(line)
+            for child in sorted(node.children.values(), key=lambda c: c.time, reverse=True):
+                add_node(child, depth + 1)
+        add_node(self.root, 0)
+        return "\n".join(lines)
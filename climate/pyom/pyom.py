@@ -1,25 +1,17 @@
 import math
-import warnings
 import logging
+from collections import OrderedDict
 
 import numpy
-if numpy.__name__ == "bohrium":
-    warnings.warn("Running pyOM with -m bohrium is discouraged (use --backend bohrium instead)")
-    import numpy_force
-    numpy = numpy_force
-try:
-    import bohrium
-    import bohrium.lapack
-except ImportError:
-    warnings.warn("Could not import Bohrium")
-    bohrium = None
-
-BACKENDS = {"numpy": numpy, "bohrium": bohrium}
+
+FLUSH_POLICIES = ("per_kernel", "per_phase", "per_step", "manual")
 
 from .. import Timer
-from . import restart, variables, settings, cli, diagnostics
+from .backends import BACKENDS
+from . import restart, variables, settings, cli, diagnostics, profiling, tiling, distributed
+from .pyom_method import bind_backend
 from .core import momentum, numerics, thermodynamics, eke, tke, idemix, \
-                  isoneutral, external, non_hydrostatic, advection, cyclic
+                  isoneutral, external, non_hydrostatic, advection, cyclic, passive_tracers
 
 class PyOM(object):
     """Main class for PyOM, used for building a model and running it.
@@ -32,7 +24,8 @@ class PyOM(object):
 
     Args:
         backend (:obj:`bool`, optional): Backend to use for array operations.
-            Possible values are ``numpy`` and ``bohrium``. Defaults to ``None``, which
+            Possible values are ``numpy``, ``bohrium``, ``numba``, and any backend added via
+            :func:`climate.pyom.backends.register_backend`. Defaults to ``None``, which
             tries to read the backend from the command line (set via a flag
             ``-b``/``--backend``), and uses ``numpy`` if no command line argument is given.
         loglevel (one of {debug, info, warning, error, critical}, optional): Verbosity
@@ -67,15 +60,23 @@ class PyOM(object):
     def __init__(self, backend=None, loglevel=None, logfile=None):
         args = cli.parse_command_line()
         self.backend, self.backend_name = self._get_backend(backend or args.backend)
+        bind_backend(self.backend_name, self.backend)
         logging.basicConfig(logfile=logfile or args.logfile, filemode="w",
                             level=getattr(logging, (loglevel or args.loglevel).upper()),
                             format="%(message)s")
         self.profile_mode = args.profile
         self._set_default_settings()
-        self.timers = {k: Timer(k) for k in ("setup","main","momentum","temperature",
-                                             "eke","idemix","tke","diagnostics",
-                                             "pressure","friction","isoneutral",
-                                             "vmix","eq_of_state")}
+        self.kernel_profiler = None
+        self.tile_pool = None
+        self.comm = None
+        self.flush_counter = 0
+        self._superbee_velocity_cache = {}
+        self.timers = {k: Timer(k, flush=self._flush_phase) for k in ("setup","main","momentum","temperature",
+                                                               "eke","idemix","tke","diagnostics",
+                                                               "pressure","friction","isoneutral",
+                                                               "vmix","eq_of_state","passive_tracers")}
+        self.timers["boundary"] = Timer("boundary")
+        self.boundary_update_count = 0
 
     def _get_backend(self, backend):
         if not backend in BACKENDS.keys():
@@ -88,6 +89,7 @@ class PyOM(object):
     def _set_default_settings(self):
         for key, setting in settings.SETTINGS.items():
             setattr(self, key, setting.default)
+        self.passive_tracers = OrderedDict()
         self.diagnostics = {}
         for key, setting in settings.DIAGNOSTICS_SETTINGS.items():
             self.diagnostics[key] = setting
@@ -101,14 +103,32 @@ class PyOM(object):
             self.variables[var_name] = var
         for var_name, var in variables.MAIN_VARIABLES.items():
             init_var(var_name, var)
-        for condition, var_dict in variables.CONDITIONAL_VARIABLES.items():
+        def eval_condition(condition):
+            if " or " in condition:
+                return any(eval_condition(c) for c in condition.split(" or "))
             if condition.startswith("not "):
-                eval_condition = not bool(getattr(self, condition[4:]))
-            else:
-                eval_condition = bool(getattr(self, condition))
-            if eval_condition:
+                return not bool(getattr(self, condition[4:]))
+            return bool(getattr(self, condition))
+        for condition, var_dict in variables.CONDITIONAL_VARIABLES.items():
+            if eval_condition(condition):
                 for var_name, var in var_dict.items():
                     init_var(var_name, var)
+        variables.bind_passive_tracers(self)
+
+    def register_passive_tracer(self, key, name, units, long_description, output=True, average=False):
+        """Register a passive tracer.
+
+        Must be called in :meth:`set_parameter`. All passive tracers are stored in
+        :attr:`tracer` (with the tracer index as fourth axis) and integrated together,
+        each tracer is available as attribute ``key`` after setup. Surface fluxes and
+        sources are set through :attr:`forc_tracer_surface` and :attr:`tracer_source`.
+
+        Example:
+          >>> def set_parameter(self):
+          >>>     ...
+          >>>     self.register_passive_tracer("age", "Water age", "s", "Time since last surface contact")
+        """
+        variables.register_passive_tracer(self, key, name, units, long_description, output=output, average=average)
 
     def _not_implemented(self):
         raise NotImplementedError("Needs to be implemented by subclass")
@@ -212,17 +232,63 @@ class PyOM(object):
         """
         self._not_implemented()
 
+    def set_particles(self):
+        """To be implemented by subclass if the particle diagnostic is active.
+
+        Has to return the initial particle positions as a tuple of three arrays
+        ``(x, y, z)`` in model coordinates (i.e., in the units of :attr:`xt`,
+        :attr:`yt`, and :attr:`zt`).
+
+        Example:
+          >>> @pyom_method
+          >>> def set_particles(self):
+          >>>     x, y = np.meshgrid(np.linspace(10, 50, 100), np.linspace(-30, 30, 100))
+          >>>     return x.flatten(), y.flatten(), -100. * np.ones(x.size)
+        """
+        self._not_implemented()
+
+    def _get_prognostic_tracers(self, tau):
+        tracers = []
+        for enabled, var in ((self.enable_tke, "tke"), (self.enable_eke, "eke"), (self.enable_idemix, "E_iw"),
+                             (self.enable_idemix_M2, "E_M2"), (self.enable_idemix_niw, "E_niw")):
+            if enabled:
+                tracers.append(getattr(self, var)[:,:,:,tau])
+        if self.passive_tracers:
+            tracers.append(self.tracer[..., tau])
+        return tracers
+
+    def _write_kernel_profile(self):
+        outfile = self.kernel_profiling_output
+        if outfile is None:
+            logging.info("Kernel profile:\n" + self.kernel_profiler.report_table())
+            return
+        with open(outfile, "w") as f:
+            if outfile.endswith(".json"):
+                f.write(self.kernel_profiler.report_json(indent=2))
+            else:
+                f.write(self.kernel_profiler.report_table())
+        logging.info("Kernel profile written to {}".format(outfile))
+
     def flush(self):
         """Flush computations if supported by the current backend.
         """
+        self.flush_counter += 1
         try:
             self.backend.flush()
         except AttributeError:
             pass
 
+    def _flush_phase(self):
+        if self.flush_policy in ("per_kernel", "per_phase"):
+            self.flush()
+
     def setup(self):
         logging.info("Setting up everything")
+        # distributed models are set up on the global grid and decomposed afterwards
+        comm, self.comm = self.comm, None
         self.set_parameter()
+        if comm is not None:
+            distributed.check_configuration(self, comm)
         self._allocate()
 
         self.set_grid()
@@ -242,6 +308,11 @@ class PyOM(object):
         if self.enable_streamfunction:
             external.streamfunction_init(self)
 
+        if comm is not None:
+            self.comm = comm
+            distributed.decompose(self)
+            variables.bind_passive_tracers(self)
+
         self.set_diagnostics()
         diagnostics.init_diagnostics(self)
 
@@ -270,9 +341,22 @@ class PyOM(object):
             diagnostics.read_restart(self)
 
             self.enditt = self.itt + int(self.runlen / self.dt_tracer)
+            if not self.flush_policy in FLUSH_POLICIES:
+                raise ValueError("unknown flush policy {} (must be either of: {!r})"
+                                 .format(self.flush_policy, FLUSH_POLICIES))
+            if self.tiling_threads and hasattr(self.backend, "flush"):
+                raise ValueError("tiled execution is not supported by the {} backend".format(self.backend_name))
+            if self.enable_column_compression and hasattr(self.backend, "flush"):
+                raise ValueError("column compression is not supported by the {} backend".format(self.backend_name))
             logging.info("Starting integration for {:.2e}s".format(self.runlen))
             logging.info(" from time step {} to {}".format(self.itt,self.enditt))
 
+        if self.enable_kernel_profiling:
+            self.kernel_profiler = profiling.KernelProfiler(trace_memory=self.kernel_profiling_memory)
+            self.kernel_profiler.start()
+
+        tiling.start_pool(self)
+
         try:
             while self.itt < self.enditt:
                 if self.itt == 3 and self.profile_mode:
@@ -282,6 +366,7 @@ class PyOM(object):
                     profiler = pyinstrument.Profiler()
                     profiler.start()
 
+                flush_counter_start = self.flush_counter
                 with self.timers["main"]:
                     self.set_forcing()
 
@@ -295,10 +380,16 @@ class PyOM(object):
 
                     with self.timers["momentum"]:
                         momentum.momentum(self)
+                    # velocities at taup1 are final, update their halos while integrating tracers
+                    velocity_update = cyclic.start_boundary_update(self, self.u[:,:,:,self.taup1], self.v[:,:,:,self.taup1])
 
                     with self.timers["temperature"]:
                         thermodynamics.thermodynamics(self)
 
+                    with self.timers["passive_tracers"]:
+                        if self.passive_tracers:
+                            passive_tracers.integrate_passive_tracers(self)
+
                     if self.enable_eke or self.enable_tke or self.enable_idemix:
                         advection.calculate_velocity_on_wgrid(self)
 
@@ -320,25 +411,16 @@ class PyOM(object):
                         if self.enable_tke:
                             tke.integrate_tke(self)
 
-                    if self.enable_cyclic_x:
-                        cyclic.setcyclic_x(self.u[:,:,:,self.taup1])
-                        cyclic.setcyclic_x(self.v[:,:,:,self.taup1])
-                        if self.enable_tke:
-                            cyclic.setcyclic_x(self.tke[:,:,:,self.taup1])
-                        if self.enable_eke:
-                            cyclic.setcyclic_x(self.eke[:,:,:,self.taup1])
-                        if self.enable_idemix:
-                            cyclic.setcyclic_x(self.E_iw[:,:,:,self.taup1])
-                        if self.enable_idemix_M2:
-                            cyclic.setcyclic_x(self.E_M2[:,:,:,self.taup1])
-                        if self.enable_idemix_niw:
-                            cyclic.setcyclic_x(self.E_niw[:,:,:,self.taup1])
+                    tracer_update = cyclic.start_boundary_update(self, *self._get_prognostic_tracers(self.taup1))
 
                     # diagnose vertical velocity at taup1
+                    velocity_update.wait()
                     if self.enable_hydrostatic:
                         momentum.vertical_velocity(self)
+                    tracer_update.wait()
 
-                self.flush()
+                if self.flush_policy != "manual":
+                    self.flush()
 
                 with self.timers["diagnostics"]:
                     diagnostics.sanity_check(self)
@@ -354,12 +436,18 @@ class PyOM(object):
                 self.itt += 1
                 logging.info("Current iteration: {}".format(self.itt))
                 logging.debug("Time step took {}s".format(self.timers["main"].getLastTime()))
+                logging.debug("Flushes during time step: {}".format(self.flush_counter - flush_counter_start))
+
+            with self.timers["diagnostics"]:
+                diagnostics.finalize_diagnostics(self)
 
         except:
             diagnostics.panic_output(self)
             raise
 
         finally:
+            tiling.stop_pool(self)
+
             logging.debug("Timing summary:")
             logging.debug(" setup time summary       = {}s".format(self.timers["setup"].getTime()))
             logging.debug(" main loop time summary   = {}s".format(self.timers["main"].getTime()))
@@ -370,10 +458,17 @@ class PyOM(object):
             logging.debug("       lateral mixing     = {}s".format(self.timers["isoneutral"].getTime()))
             logging.debug("       vertical mixing    = {}s".format(self.timers["vmix"].getTime()))
             logging.debug("       equation of state  = {}s".format(self.timers["eq_of_state"].getTime()))
+            logging.debug("     passive tracers      = {}s".format(self.timers["passive_tracers"].getTime()))
             logging.debug("     EKE                  = {}s".format(self.timers["eke"].getTime()))
             logging.debug("     IDEMIX               = {}s".format(self.timers["idemix"].getTime()))
             logging.debug("     TKE                  = {}s".format(self.timers["tke"].getTime()))
             logging.debug(" diagnostics and I/O      = {}s".format(self.timers["diagnostics"].getTime()))
+            logging.debug(" boundary updates         = {}s".format(self.timers["boundary"].getTime()))
+            logging.debug(" backend flushes          = {}".format(self.flush_counter))
+
+            if self.kernel_profiler is not None:
+                self.kernel_profiler.stop()
+                self._write_kernel_profile()
 
             if self.profile_mode:
                 try:
@@ -1,6 +1,7 @@
+import types
 from functools import wraps
 
-import climate.pyom
+from . import backends, tiling
 
 def pyom_method(function):
     """Decorator that injects the current backend as variable ``np`` into the wrapped function.
@@ -24,27 +25,90 @@ def pyom_method(function):
 def pyom_inline_method(function):
     return _pyom_method(function, False)
 
+def tiled(function):
+    """Mark a PyOM method as safe for tiled execution (see :mod:`climate.pyom.tiling`).
+
+    Must be applied below :func:`pyom_method`. Marked methods are run on horizontal
+    tiles in parallel if ``tiling_threads`` is set.
+    """
+    function.tiled = True
+    return function
+
 def _pyom_method(function, flush_on_exit):
     _pyom_method.methods.append(function)
+    kernel_name = "{}.{}".format(function.__module__.replace("climate.pyom.", ""), function.__name__)
+    backend_functions = _pyom_method.backend_functions[function] = {}
+    is_tiled = getattr(function, "tiled", False)
     @wraps(function)
     def pyom_method_wrapper(pyom, *args, **kwargs):
-        if not isinstance(pyom, climate.pyom.PyOM):
+        try:
+            bound_function = backend_functions[pyom.backend_name]
+        except AttributeError:
             raise TypeError("first argument to a pyom_method must be subclass of PyOM")
-        g = function.__globals__
-        sentinel = object()
-
-        oldvalue = g.get('np', sentinel)
-        g['np'] = pyom.backend
+        except KeyError:
+            bound_function = _bind_function(function, pyom.backend_name, pyom.backend)
 
+        profiler = pyom.kernel_profiler
+        if profiler is not None:
+            start_time = profiler.enter(kernel_name)
         try:
-            res = function(pyom, *args, **kwargs)
-        finally:
-            if oldvalue is sentinel:
-                del g['np']
+            if is_tiled and pyom.tile_pool is not None:
+                res = tiling.run_tiled(pyom, bound_function, args, kwargs)
             else:
-                g['np'] = oldvalue
-        if flush_on_exit:
+                res = bound_function(pyom, *args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.exit(start_time)
+        if flush_on_exit and pyom.flush_policy == "per_kernel":
             pyom.flush()
         return res
     return pyom_method_wrapper
 _pyom_method.methods = []
+_pyom_method.backend_functions = {}
+
+"""
+Every module containing PyOM methods gets one copy of its namespace per backend, in which
+``np`` refers to that backend. Methods are re-created with these namespaces as globals, so
+calling a method never modifies shared state (and models using different backends can run
+concurrently). Python 2 ignores ``__missing__`` when looking up globals, so the copies
+cannot read through to the module; instead, they are refreshed from the module whenever a
+model is created. Module attributes that are added or replaced later (e.g. by patching a
+module of the core) thus take effect for all models created afterwards.
+"""
+_backend_namespaces = {}
+
+def _get_backend_namespace(module_globals, backend_name, backend):
+    key = (module_globals.get("__name__"), id(module_globals), backend_name)
+    try:
+        return _backend_namespaces[key][1]
+    except KeyError:
+        namespace = dict(module_globals)
+        namespace["np"] = backend
+        return _backend_namespaces.setdefault(key, (module_globals, namespace))[1]
+
+def _refresh_backend_namespaces(backend_name, backend):
+    for (_, _, namespace_backend), (module_globals, namespace) in _backend_namespaces.items():
+        if namespace_backend == backend_name:
+            # update in place, never exposing a different np to running methods
+            namespace.update((name, value) for name, value in module_globals.items() if name != "np")
+            namespace["np"] = backend
+
+def _bind_function(function, backend_name, backend):
+    bound_function = backends.get_kernel(backend_name, function)
+    if bound_function is None:
+        namespace = _get_backend_namespace(function.__globals__, backend_name, backend)
+        bound_function = types.FunctionType(function.__code__, namespace, function.__name__,
+                                            function.__defaults__, function.__closure__)
+        bound_function.__dict__.update(function.__dict__)
+    return _pyom_method.backend_functions[function].setdefault(backend_name, bound_function)
+
+def bind_backend(backend_name, backend):
+    """Bind all registered PyOM methods to the given backend.
+
+    Called whenever a model with the respective backend is created. Methods that are
+    defined later are bound on their first call.
+    """
+    _refresh_backend_namespaces(backend_name, backend)
+    for function in _pyom_method.methods:
+        if not backend_name in _pyom_method.backend_functions[function]:
+            _bind_function(function, backend_name, backend)
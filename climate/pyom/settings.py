@@ -84,7 +84,7 @@ SETTINGS = OrderedDict([
     ("enable_idemix_upwind_advection", Setting(False, "Idemix 2.0")),
     ("enable_idemix_M2", Setting(False, "")),
     ("enable_idemix_niw", Setting(False, "")),
-    ("np", Setting(0, "TKE")),
+    ("np", Setting(0, "Number of wave angle grid points (including 2 boundary points)")),
     ("enable_tke", Setting(False, "")),
     ("c_k", Setting(0.1, "")),
     ("c_eps", Setting(0.7, "")),
@@ -130,15 +130,30 @@ SETTINGS = OrderedDict([
     ("use_io_threads", Setting(True, "")),
     ("io_timeout", Setting(None, "")),
     ("enable_netcdf_zlib_compression", Setting(True, "")),
+    ("sanity_check_interval", Setting(1, "check for non-finite values every n time steps (0 to disable)")),
+    ("sanity_check_variables", Setting(("u", "v", "temp", "salt", "psi"), "variables checked for non-finite values")),
+    ("flush_policy", Setting("per_kernel", "when to flush lazily evaluated backends: per_kernel, per_phase, per_step, or manual")),
+    ("enable_kernel_profiling", Setting(False, "collect wall time and call counts of all PyOM methods")),
+    ("kernel_profiling_memory", Setting(False, "also record by how much each PyOM method raises the peak resident set size of the process")),
+    ("kernel_profiling_output", Setting(None, "file to write kernel profile to (JSON if ending with .json, else a table); logged if not given")),
+    ("tiling_threads", Setting(0, "number of threads used to run tileable kernels on horizontal tiles (0 to disable)")),
+    ("tile_size", Setting((64, 64), "number of interior grid points per tile in x and y direction")),
+    ("enable_column_compression", Setting(False, "compute implicit vertical mixing, mixing length and equation of state on wet columns only")),
+    ("particles_rk_order", Setting(4, "order of the Runge-Kutta scheme used to advect particles (2 or 4)")),
+    ("enable_particles_sorting", Setting(False, "sort particles by grid cell after each step for memory locality")),
+    ("particles_output_batch", Setting(1, "number of particle output records that are buffered before writing to disk")),
+    ("n_proc", Setting((1, 1), "number of subdomains in x and y direction for distributed runs (see climate.pyom.distributed)")),
+    ("distributed_poisson_solver", Setting(False, "solve the streamfunction equation on all processes instead of gathering it on one")),
 ])
 
 
 class Diagnostic:
-    def __init__(self, description, sampling_frequency=None, output_frequency=None, outfile=None):
+    def __init__(self, description, sampling_frequency=None, output_frequency=None, outfile=None, group=None):
         self.sampling_frequency = sampling_frequency
         self.output_frequency = output_frequency
         self.description = description
         self.outfile = outfile
+        self.group = group #: diagnostics in the same group are run together and share intermediates
 
     def is_active(self):
         return self.sampling_frequency or self.output_frequency
@@ -0,0 +1,106 @@
+"""
+Tiled execution of PyOM methods on a thread pool.
+
+The horizontal interior ``(2:-2, 2:-2)`` is split into tiles. Each tile is passed to
+the kernel as a :class:`TileView`, which looks like a PyOM instance with
+``nx``/``ny`` set to the tile size and all grid variables replaced by views of the
+tile plus a halo of width 2. Since the kernels only compute on ``2:-2`` (and the
+halo is filled with the actual neighbor values), running a kernel on all tiles gives
+the same result as running it on the full domain. NumPy releases the GIL in its
+ufuncs, so tiles are processed concurrently.
+
+Only kernels marked with :func:`climate.pyom.pyom_method.tiled` are run tiled. A
+kernel is safe for tiled execution if it
+
+- has no return value,
+- only reads grid variables in a halo of width 2 around the points it writes to,
+- only assigns to (but never accumulates into) points outside of ``2:-2``,
+- takes no array arguments other than full 2D or 3D grid arrays, and
+- performs no global operations (reductions, cumulative sums along x or y,
+  boundary exchanges).
+"""
+from multiprocessing.pool import ThreadPool
+
+HALO = 2
+X_DIMS = ("xt", "xu")
+Y_DIMS = ("yt", "yu")
+
+
+def get_tiles(nx, ny, tile_size):
+    """
+    split interior into tiles of at most tile_size points, returns list of
+    (x-slice, y-slice) including halo
+    """
+    tile_x, tile_y = tile_size
+    return [(slice(i, min(i + tile_x, nx) + 2 * HALO), slice(j, min(j + tile_y, ny) + 2 * HALO))
+            for i in range(0, nx, tile_x) for j in range(0, ny, tile_y)]
+
+
+class TileView(object):
+    """
+    Proxy to a PyOM instance, restricted to one horizontal tile
+    """
+    def __init__(self, pyom, x_slice, y_slice):
+        self._pyom = pyom
+        self._slices = {dim: x_slice for dim in X_DIMS}
+        self._slices.update({dim: y_slice for dim in Y_DIMS})
+        self.nx = x_slice.stop - x_slice.start - 2 * HALO
+        self.ny = y_slice.stop - y_slice.start - 2 * HALO
+        # nested kernels are part of the tile and must not touch shared state
+        self.tile_pool = None
+        self.kernel_profiler = None
+        self.flush_policy = "manual"
+        self._superbee_velocity_cache = {}
+
+    def __getattr__(self, attr):
+        value = getattr(self._pyom, attr)
+        var = self._pyom.variables.get(attr)
+        if var is not None and any(dim in self._slices for dim in var.dims):
+            return value[self._get_index(var.dims)]
+        return value
+
+    def _get_index(self, dims):
+        return tuple(self._slices.get(dim, slice(None)) for dim in dims)
+
+    def slice_argument(self, arg):
+        """
+        restrict array argument to tile if it spans the horizontal grid
+        """
+        shape = getattr(arg, "shape", ())
+        if len(shape) >= 2 and shape[:2] == (self._pyom.nx + 2 * HALO, self._pyom.ny + 2 * HALO):
+            return arg[self._slices["xt"], self._slices["yt"]]
+        return arg
+
+    def flush(self):
+        pass
+
+
+def get_tile_views(pyom):
+    try:
+        return pyom._tile_views
+    except AttributeError:
+        tiles = get_tiles(pyom.nx, pyom.ny, pyom.tile_size)
+        pyom._tile_views = [TileView(pyom, x_slice, y_slice) for x_slice, y_slice in tiles]
+        return pyom._tile_views
+
+
+def run_tiled(pyom, function, args, kwargs):
+    """
+    run function on all tiles of the domain using the thread pool of pyom
+    """
+    def run_tile(tile):
+        function(tile, *(tile.slice_argument(arg) for arg in args),
+                 **{key: tile.slice_argument(arg) for key, arg in kwargs.items()})
+    pyom.tile_pool.map(run_tile, get_tile_views(pyom), chunksize=1)
+
+
+def start_pool(pyom):
+    if pyom.tiling_threads > 0:
+        pyom.tile_pool = ThreadPool(pyom.tiling_threads)
+
+
+def stop_pool(pyom):
+    if pyom.tile_pool is not None:
+        pyom.tile_pool.close()
+        pyom.tile_pool.join()
+        pyom.tile_pool = None
@@ -37,6 +37,7 @@ ZETA_GRID = ("xu","yu","zt")
 TIMESTEPS = ("timesteps",)
 TENSOR_COMP = ("tensor1", "tensor2")
 NP = ("np",)
+TRACER = ("tracer",)
 #
 OUTPUT_DIMENSIONS = XT + XU + YT + YU + ZT + ZW
 
@@ -52,7 +53,8 @@ def get_dimensions(pyom, grid, include_ghosts=True):
         "timesteps": 3,
         "tensor1": 2,
         "tensor2": 2,
-        "np": pyom.np
+        "np": pyom.np,
+        "tracer": len(pyom.passive_tracers)
     }
     if include_ghosts:
         for d in ("xt","xu","yt","yu"):
@@ -86,6 +88,33 @@ def get_grid_mask(pyom, grid):
     return None
 
 
+def register_passive_tracer(pyom, key, name, units, long_description, output=True, average=False):
+    """
+    add a passive tracer to the registry of the model
+
+    All passive tracers share the arrays of the ``passive_tracers`` variables,
+    with the tracer index as fourth axis. After allocation, each tracer is
+    available as attribute ``key`` (a view into :attr:`tracer`) and as a variable
+    for output.
+    """
+    if hasattr(pyom, "variables"):
+        raise RuntimeError("passive tracers must be registered before allocation (i.e., in set_parameter)")
+    # registering a tracer again replaces it (set_parameter may be called more than once)
+    if key in MAIN_VARIABLES or any(key in var_dict for var_dict in CONDITIONAL_VARIABLES.values()):
+        raise ValueError("variable {} already exists".format(key))
+    pyom.passive_tracers[key] = Variable(name, T_GRID + TIMESTEPS, units, long_description,
+                                         output=output, average=average)
+
+
+def bind_passive_tracers(pyom):
+    """
+    make registered passive tracers available as views into :attr:`tracer`
+    """
+    for n, (key, var) in enumerate(pyom.passive_tracers.items()):
+        setattr(pyom, key, pyom.tracer[:, :, :, n, :])
+        pyom.variables[key] = var
+
+
 MAIN_VARIABLES = OrderedDict([
     ("dxt", Variable(
         "Zonal T-grid spacing", XT, "m",
@@ -180,7 +209,61 @@ MAIN_VARIABLES = OrderedDict([
     ("area_v", Variable(
         "Area of V-box", V_HOR, "m^2", "Area of V-box", output=True, time_dependent=False
     )),
+    ("dxtr", Variable(
+        "Reciprocal zonal spacing (T)", XT, "1/m", "Reciprocal zonal spacing", time_dependent=False
+    )),
+    ("dxur", Variable(
+        "Reciprocal zonal spacing (U)", XU, "1/m", "Reciprocal zonal spacing", time_dependent=False
+    )),
+    ("dytr", Variable(
+        "Reciprocal meridional spacing (T)", YT, "1/m", "Reciprocal meridional spacing", time_dependent=False
+    )),
+    ("dyur", Variable(
+        "Reciprocal meridional spacing (U)", YU, "1/m", "Reciprocal meridional spacing", time_dependent=False
+    )),
+    ("dztr", Variable(
+        "Reciprocal vertical spacing (T)", ZT, "1/m", "Reciprocal vertical spacing", time_dependent=False
+    )),
+    ("dzwr", Variable(
+        "Reciprocal vertical spacing (W)", ZW, "1/m", "Reciprocal vertical spacing", time_dependent=False
+    )),
+    ("costr", Variable(
+        "Reciprocal metric factor (T)", YT, "1", "Reciprocal metric factor for spherical coordinates",
+        time_dependent=False
+    )),
+    ("cosur", Variable(
+        "Reciprocal metric factor (U)", YU, "1", "Reciprocal metric factor for spherical coordinates",
+        time_dependent=False
+    )),
+    ("area_tr", Variable(
+        "Reciprocal area of T-box", T_HOR, "1/m^2", "Reciprocal area of T-box", time_dependent=False
+    )),
+    ("area_ur", Variable(
+        "Reciprocal area of U-box", U_HOR, "1/m^2", "Reciprocal area of U-box", time_dependent=False
+    )),
+    ("area_vr", Variable(
+        "Reciprocal area of V-box", V_HOR, "1/m^2", "Reciprocal area of V-box", time_dependent=False
+    )),
+    ("dxt_dxu_w", Variable(
+        "Metric coefficient (U)", XU, "1",
+        "Width of western T-box divided by width of U-box", time_dependent=False
+    )),
+    ("dxt_dxu_e", Variable(
+        "Metric coefficient (U)", XU, "1",
+        "Width of eastern T-box divided by width of U-box", time_dependent=False
+    )),
+    ("dyt_dyu_s", Variable(
+        "Metric coefficient (V)", YU, "1",
+        "Metric height of southern T-box divided by metric height of V-box", time_dependent=False
+    )),
+    ("dyt_dyu_n", Variable(
+        "Metric coefficient (V)", YU, "1",
+        "Metric height of northern T-box divided by metric height of V-box", time_dependent=False
+    )),
 
+    ("volume_t", Variable(
+        "Volume of T-box", T_GRID, "m^3", "Volume of T-box (zero on land)", time_dependent=False
+    )),
     ("maskT", Variable(
         "Mask for tracer points", T_GRID, "",
         "Mask in physical space for tracer points", dtype="int", time_dependent=False
@@ -493,6 +576,25 @@ CONDITIONAL_VARIABLES = OrderedDict([
         ("surf_press", Variable("Surface pressure", T_HOR, "m^2/s^2", "Surface pressure", output=True)),
     ])),
 
+    ("passive_tracers", OrderedDict([
+        ("tracer", Variable(
+            "Passive tracers", T_GRID + TRACER + TIMESTEPS, "",
+            "Concentration of all registered passive tracers"
+        )),
+        ("dtracer", Variable(
+            "Passive tracer tendency", T_GRID + TRACER + TIMESTEPS, "1/s",
+            "Passive tracer tendency due to advection"
+        )),
+        ("forc_tracer_surface", Variable(
+            "Surface passive tracer flux", T_HOR + TRACER, "m/s",
+            "Surface flux of passive tracers"
+        )),
+        ("tracer_source", Variable(
+            "Source of passive tracers", T_GRID + TRACER, "1/s",
+            "Non-conservative source of passive tracers"
+        )),
+    ])),
+
     ("enable_tempsalt_sources", OrderedDict([
         ("temp_source", Variable(
             "Source of temperature", T_GRID, "K/s",
@@ -549,8 +651,24 @@ CONDITIONAL_VARIABLES = OrderedDict([
         ("Ai_nz", Variable("?", T_GRID + TENSOR_COMP, "?", "?")),
         ("Ai_bx", Variable("?", T_GRID + TENSOR_COMP, "?", "?")),
         ("Ai_by", Variable("?", T_GRID + TENSOR_COMP, "?", "?")),
+        ("K_iso_ez", Variable(
+            "Isopycnal flux weight", T_GRID, "m/s",
+            "Weight of Ai_ez in isopycnal fluxes across east face of T cells"
+        )),
+        ("K_iso_nz", Variable(
+            "Isopycnal flux weight", T_GRID, "m/s",
+            "Weight of Ai_nz in isopycnal fluxes across north face of T cells"
+        )),
     ])),
     ("enable_skew_diffusion", OrderedDict([
+        ("K_gm_ez", Variable(
+            "Skew flux weight", T_GRID, "m/s",
+            "Weight of Ai_ez in skew fluxes across east face of T cells"
+        )),
+        ("K_gm_nz", Variable(
+            "Skew flux weight", T_GRID, "m/s",
+            "Weight of Ai_nz in skew fluxes across north face of T cells"
+        )),
         ("B1_gm", Variable(
             "Zonal component of GM streamfunction", V_GRID, "m^2/s",
             "Zonal component of GM streamfunction"
@@ -674,58 +792,126 @@ CONDITIONAL_VARIABLES = OrderedDict([
             "Internal wave bottom forcing", time_dependent=False, output=True
         )),
     ])),
+    ("enable_idemix_M2 or enable_idemix_niw", OrderedDict([
+        ("topo_shelf", Variable(
+            "Shelf mask", T_HOR, "", "Shelf regions for wave-topography interaction",
+            time_dependent=False
+        )),
+        ("topo_hrms", Variable(
+            "Topographic roughness", T_HOR, "m", "RMS height of unresolved topography",
+            time_dependent=False
+        )),
+        ("topo_lam", Variable(
+            "Topographic wavelength", T_HOR, "m", "Wavelength of unresolved topography",
+            time_dependent=False
+        )),
+        ("phit", Variable(
+            "Wave angle (T)", NP, "rad", "Wave angle of T grid point", time_dependent=False
+        )),
+        ("dphit", Variable(
+            "Wave angle spacing (T)", NP, "rad", "Wave angle spacing of T grid point",
+            time_dependent=False
+        )),
+        ("phiu", Variable(
+            "Wave angle (U)", NP, "rad", "Wave angle of U grid point", time_dependent=False
+        )),
+        ("dphiu", Variable(
+            "Wave angle spacing (U)", NP, "rad", "Wave angle spacing of U grid point",
+            time_dependent=False
+        )),
+        ("maskTp", Variable(
+            "Mask for spectral T points", T_HOR + NP, "",
+            "Mask in spectral space for T points", dtype="int", time_dependent=False
+        )),
+        ("maskUp", Variable(
+            "Mask for spectral U points", U_HOR + NP, "",
+            "Mask in spectral space for U points", dtype="int", time_dependent=False
+        )),
+        ("maskVp", Variable(
+            "Mask for spectral V points", V_HOR + NP, "",
+            "Mask in spectral space for V points", dtype="int", time_dependent=False
+        )),
+        ("maskWp", Variable(
+            "Mask for spectral W points", T_HOR + NP, "",
+            "Mask in spectral space for W points", dtype="int", time_dependent=False
+        )),
+        ("cn", Variable("Baroclinic wave speed", T_HOR, "m/s", "First baroclinic wave speed")),
+        ("phin", Variable("Vertical structure function", W_GRID, "", "Vertical structure function")),
+        ("phinz", Variable(
+            "Vertical structure function derivative", W_GRID, "1/m",
+            "Vertical derivative of vertical structure function"
+        )),
+        ("bc_south", Variable(
+            "Southern reflection", V_HOR + NP, "",
+            "Wave angle index after reflection at southern boundary (0 means no reflection)",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_north", Variable(
+            "Northern reflection", V_HOR + NP, "",
+            "Wave angle index after reflection at northern boundary (0 means no reflection)",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_west", Variable(
+            "Western reflection", U_HOR + NP, "",
+            "Wave angle index after reflection at western boundary (0 means no reflection)",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_east", Variable(
+            "Eastern reflection", U_HOR + NP, "",
+            "Wave angle index after reflection at eastern boundary (0 means no reflection)",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_south_src", Variable(
+            "Southern reflection source", NP, "",
+            "Wave angle index that is reflected into each wave angle at southern boundary",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_north_src", Variable(
+            "Northern reflection source", NP, "",
+            "Wave angle index that is reflected into each wave angle at northern boundary",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_west_src", Variable(
+            "Western reflection source", NP, "",
+            "Wave angle index that is reflected into each wave angle at western boundary",
+            dtype="int", time_dependent=False
+        )),
+        ("bc_east_src", Variable(
+            "Eastern reflection source", NP, "",
+            "Wave angle index that is reflected into each wave angle at eastern boundary",
+            dtype="int", time_dependent=False
+        )),
+    ])),
     ("enable_idemix_M2", OrderedDict([
-        ("E_M2", Variable("M2 energy", T_HOR, "m^3/s^2", "M2 energy", output=True)),
-        ("dE_M2", Variable("M2 energy tendency", T_HOR, "m^3/s^3", "M2 energy tendency")),
+        ("E_M2", Variable(
+            "M2 energy", T_HOR + NP + TIMESTEPS, "m^3/s^2", "M2 energy", output=True
+        )),
+        ("dE_M2p", Variable(
+            "M2 energy tendency", T_HOR + NP + TIMESTEPS, "m^3/s^3", "M2 energy tendency"
+        )),
         ("E_struct_M2", Variable("M2 structure function", T_GRID, "", "M2 structure function")),
+        ("E_M2_int", Variable(
+            "Integrated M2 energy", T_HOR, "m^3/s^2", "M2 energy integrated over wave angle"
+        )),
         ("cg_M2", Variable("M2 group velocity", T_HOR, "m/s", "M2 group velocity")),
         ("kdot_x_M2", Variable("M2 refraction", U_HOR, "1/s", "M2 refraction")),
         ("kdot_y_M2", Variable("M2 refraction", V_HOR, "1/s", "M2 refraction")),
+        ("u_M2", Variable("M2 zonal velocity", U_HOR + NP, "m/s", "M2 zonal group velocity")),
+        ("v_M2", Variable("M2 meridional velocity", V_HOR + NP, "m/s", "M2 meridional group velocity")),
+        ("w_M2", Variable("M2 angular velocity", T_HOR + NP, "1/s", "M2 change of wave angle")),
         ("tau_M2", Variable("M2 decay time scale", T_HOR, "1/s", "M2 decay time scale")),
         ("alpha_M2_cont", Variable(
             "M2-continuum coupling coefficient", T_HOR, "s/m^3",
             "M2-continuum coupling coefficient"
         )),
-        ("forc_M2", Variable("M2 forcing", T_HOR, "m^3/s^3", "M2 forcing")),
+        ("M2_psi_diss", Variable(
+            "M2 PSI dissipation", T_HOR + NP, "m^3/s^3",
+            "M2 dissipation by parametric subharmonic instability"
+        )),
+        ("forc_M2", Variable("M2 forcing", T_HOR + NP, "m^3/s^3", "M2 forcing")),
     ])),
-            # if self.enable_idemix_M2 or self.enable_idemix_niw:
-            #     self.topo_shelf = np.zeros((self.nx+4,self.ny+4))
-            #     self.topo_hrms = np.zeros((self.nx+4,self.ny+4))
-            #     self.topo_lam = np.zeros((self.nx+4,self.ny+4))
-            #     self.phit = np.zeros(self.np)
-            #     self.dphit = np.zeros(self.np)
-            #     self.phiu = np.zeros(self.np)
-            #     self.dphiu = np.zeros(self.np)
-            #     self.maskTp = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.maskUp = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.maskVp = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.maskWp = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.cn = np.zeros((self.nx+4,self.ny+4))
-            #     self.phin = np.zeros((self.nx+4,self.ny+4,self.nz))
-            #     self.phinz = np.zeros((self.nx+4,self.ny+4,self.nz))
-            #     self.tau_M2 = np.zeros((self.nx+4,self.ny+4))
-            #     self.tau_niw = np.zeros((self.nx+4,self.ny+4))
-            #     self.alpha_M2_cont = np.zeros((self.nx+4,self.ny+4))
-            #     self.bc_south = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.bc_north = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.bc_west = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.bc_east = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.M2_psi_diss = np.zeros((self.nx+4,self.ny+4,self.np))
-            #
-            # if self.enable_idemix_M2:
-            #     self.E_M2 = np.zeros((self.nx+4,self.ny+4,self.np,3))
-            #     self.dE_M2p = np.zeros((self.nx+4,self.ny+4,self.np,3))
-            #     self.cg_M2 = np.zeros((self.nx+4,self.ny+4))
-            #     self.kdot_x_M2 = np.zeros((self.nx+4,self.ny+4))
-            #     self.kdot_y_M2 = np.zeros((self.nx+4,self.ny+4))
-            #     self.forc_M2 = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.u_M2 = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.v_M2 = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.w_M2 = np.zeros((self.nx+4,self.ny+4,self.np))
-            #     self.E_struct_M2 = np.zeros((self.nx+4,self.ny+4,self.nz))
-            #     self.E_M2_int = np.zeros((self.nx+4,self.ny+4))
     ("enable_idemix_niw", OrderedDict([
-        ("omega_niw", Variable("?", T_HOR, "?", "?")),
+        ("omega_niw", Variable("NIW frequency", T_HOR, "1/s", "NIW frequency")),
         ("E_niw", Variable(
             "NIW energy", T_HOR + NP + TIMESTEPS, "m^3/s^2", "NIW energy", output=True
         )),
@@ -736,15 +922,15 @@ CONDITIONAL_VARIABLES = OrderedDict([
         ("cg_niw", Variable("NIW group velocity", T_HOR, "m/s", "NIW group velocity")),
         ("kdot_x_niw", Variable("NIW refraction", U_HOR, "1/s", "NIW refraction")),
         ("kdot_y_niw", Variable("NIW refraction", V_HOR, "1/s", "NIW refraction")),
-        ("forc_niw", Variable("NIW forcing", T_HOR, "m^3/s^3", "NIW forcing")),
-        ("u_niw", Variable("?", T_HOR + NP, "?", "?")),
-        ("v_niw", Variable("?", T_HOR + NP, "?", "?")),
-        ("w_niw", Variable("?", T_HOR + NP, "?", "?")),
+        ("forc_niw", Variable("NIW forcing", T_HOR + NP, "m^3/s^3", "NIW forcing")),
+        ("u_niw", Variable("NIW zonal velocity", U_HOR + NP, "m/s", "NIW zonal group velocity")),
+        ("v_niw", Variable("NIW meridional velocity", V_HOR + NP, "m/s", "NIW meridional group velocity")),
+        ("w_niw", Variable("NIW angular velocity", T_HOR + NP, "1/s", "NIW change of wave angle")),
         ("E_struct_niw", Variable(
             "NIW structure function", T_GRID, "", "NIW structure function"
         )),
         ("E_niw_int", Variable(
-            "?", T_HOR, "?", "?"
+            "Integrated NIW energy", T_HOR, "m^3/s^2", "NIW energy integrated over wave angle"
         )),
         ("tau_niw", Variable(
             "NIW decay time scale", T_HOR, "1/s", "NIW decay time scale"
@@ -1,5 +1,6 @@
 import os
 
+from climate.forcing import PeriodicForcing
 from climate.pyom import PyOMLegacy, pyom_method
 from climate.pyom.core import cyclic
 
@@ -131,8 +132,15 @@ class GlobalOneDegree(PyOMLegacy):
             setattr(module,key,attribute)
 
     @pyom_method
-    def _read_binary(self, var):
-        return np.load(DATA_FILES[var])
+    def _read_binary(self, var, mmap_mode=None):
+        return np.load(DATA_FILES[var], mmap_mode=mmap_mode)
+
+    @pyom_method
+    def _pad_record(self, record):
+        m = self.main_module
+        padded = np.zeros((m.nx+4, m.ny+4))
+        padded[2:-2, 2:-2] = record
+        return padded
 
     @pyom_method
     def set_grid(self):
@@ -152,14 +160,7 @@ class GlobalOneDegree(PyOMLegacy):
     @pyom_method
     def set_initial_conditions(self):
         m = self.main_module
-        self.t_star = np.zeros((m.nx+4, m.ny+4, 12))
-        self.s_star = np.zeros((m.nx+4, m.ny+4, 12))
-        self.qnec = np.zeros((m.nx+4, m.ny+4, 12))
-        self.qnet = np.zeros((m.nx+4, m.ny+4, 12))
-        self.qsol = np.zeros((m.nx+4, m.ny+4, 12))
         self.divpen_shortwave = np.zeros(m.nz)
-        self.taux = np.zeros((m.nx+4, m.ny+4, 12))
-        self.tauy = np.zeros((m.nx+4, m.ny+4, 12))
 
         rpart_shortwave = 0.58
         efold1_shortwave = 0.35
@@ -174,35 +175,25 @@ class GlobalOneDegree(PyOMLegacy):
         m.salt[2:-2, 2:-2, :, 0] = salt_data[..., ::-1] * m.maskT[2:-2, 2:-2, :]
         m.salt[2:-2, 2:-2, :, 1] = salt_data[..., ::-1] * m.maskT[2:-2, 2:-2, :]
 
-        # wind stress on MIT grid
-        taux_data = self._read_binary("tau_x")
-        self.taux[2:-2, 2:-2, :] = taux_data / m.rho_0
-        self.taux[self.taux < -99.9] = 0.
-
-        tauy_data = self._read_binary("tau_y")
-        self.tauy[2:-2, 2:-2, :] = tauy_data / m.rho_0
-        self.tauy[self.tauy < -99.9] = 0.
-
-        if m.enable_cyclic_x:
-            cyclic.setcyclic_x(self.taux)
-            cyclic.setcyclic_x(self.tauy)
-
-        # Qnet and dQ/dT and Qsol
-        qnet_data = self._read_binary("q_net")
-        self.qnet[2:-2, 2:-2, :] = -qnet_data * m.maskT[2:-2, 2:-2, -1, np.newaxis]
+        # monthly surface forcing, records are read when needed
+        self._forcing = PeriodicForcing(365 * 86400., 12)
 
-        qnec_data = self._read_binary("dqdt")
-        self.qnec[2:-2, 2:-2, :] = qnec_data * m.maskT[2:-2, 2:-2, -1, np.newaxis]
-
-        qsol_data = self._read_binary("swf")
-        self.qsol[2:-2, 2:-2, :] = -qsol_data * m.maskT[2:-2, 2:-2, -1, np.newaxis]
-
-        # SST and SSS
-        sst_data = self._read_binary("sst")
-        self.t_star[2:-2, 2:-2, :] = sst_data * m.maskT[2:-2, 2:-2, -1, np.newaxis]
-
-        sss_data = self._read_binary("sss")
-        self.s_star[2:-2, 2:-2, :] = sss_data * m.maskT[2:-2, 2:-2, -1, np.newaxis]
+        # wind stress on MIT grid
+        def wind_stress(record):
+            tau = self._pad_record(record / m.rho_0)
+            tau[tau < -99.9] = 0.
+            if m.enable_cyclic_x:
+                cyclic.setcyclic_x(tau)
+            return tau
+        self._forcing.add("taux", self._read_binary("tau_x", mmap_mode="r"), transform=wind_stress)
+        self._forcing.add("tauy", self._read_binary("tau_y", mmap_mode="r"), transform=wind_stress)
+
+        # Qnet and dQ/dT and Qsol, SST and SSS
+        surface_mask = m.maskT[2:-2, 2:-2, -1]
+        for name, var, factor in (("qnet", "q_net", -1.), ("qnec", "dqdt", 1.), ("qsol", "swf", -1.),
+                                  ("t_star", "sst", 1.), ("s_star", "sss", 1.)):
+            self._forcing.add(name, self._read_binary(var, mmap_mode="r"),
+                              transform=lambda record, factor=factor: self._pad_record(factor * record * surface_mask))
 
         idm = self.idemix_module
         if idm.enable_idemix:
@@ -261,29 +252,18 @@ class GlobalOneDegree(PyOMLegacy):
         self.divpen_shortwave[1:] = (pen[1:] - pen[:-1]) / m.dzt[1:]
         self.divpen_shortwave[0] = pen[0] / m.dzt[0]
 
-    def _get_periodic_interval(self,currentTime,cycleLength,recSpacing,nbRec):
-        """  interpolation routine taken from mitgcm
-        """
-        locTime = currentTime - recSpacing * 0.5 + cycleLength * (2 - round(currentTime/cycleLength))
-        tmpTime = locTime % cycleLength
-        tRec1 = 1 + int(tmpTime/recSpacing)
-        tRec2 = 1 + tRec1 % int(nbRec)
-        wght2 = (tmpTime - recSpacing*(tRec1 - 1)) / recSpacing
-        wght1 = 1.0 - wght2
-        return (tRec1-1, wght1), (tRec2-1, wght2)
-
     @pyom_method
     def set_forcing(self):
         t_rest = 30. * 86400.
         cp_0 = 3991.86795711963 # J/kg /K
-        fxa = 365 * 86400.
 
         m = self.main_module
-        (n1, f1), (n2, f2) = self._get_periodic_interval((m.itt-1) * m.dt_tracer, fxa, fxa / 12., 12)
+        forcing = self._forcing
+        forcing.update((m.itt-1) * m.dt_tracer)
 
         # linearly interpolate wind stress and shift from MITgcm U/V grid to this grid
-        m.surface_taux[...] = f1 * self.taux[:, :, n1] + f2 * self.taux[:, :, n2]
-        m.surface_tauy[...] = f1 * self.tauy[:, :, n1] + f2 * self.tauy[:, :, n2]
+        m.surface_taux[...] = forcing["taux"]
+        m.surface_tauy[...] = forcing["tauy"]
 
         tkm = self.tke_module
         if tkm.enable_tke:
@@ -291,13 +271,9 @@ class GlobalOneDegree(PyOMLegacy):
                                                       +(0.5 * (m.surface_tauy[1:-1, 1:-1] + m.surface_tauy[1:-1, :-2])) ** 2) ** (3./2.)
 
         # W/m^2 K kg/J m^3/kg = K m/s
-        fxa = f1 * self.t_star[..., n1] + f2 * self.t_star[..., n2]
-        self.qqnec = f1 * self.qnec[..., n1] + f2 * self.qnec[..., n2]
-        self.qqnet = f1 * self.qnet[..., n1] + f2 * self.qnet[..., n2]
-        m.forc_temp_surface[...] = (self.qqnet + self.qqnec * (fxa - m.temp[..., -1, self.get_tau()])) \
+        m.forc_temp_surface[...] = (forcing["qnet"] + forcing["qnec"] * (forcing["t_star"] - m.temp[..., -1, self.get_tau()])) \
                                             * m.maskT[..., -1] / cp_0 / m.rho_0
-        fxa = f1 * self.s_star[..., n1] + f2 * self.s_star[..., n2]
-        m.forc_salt_surface[...] = 1. / t_rest * (fxa - m.salt[..., -1, self.get_tau()]) * m.maskT[..., -1] * m.dzt[-1]
+        m.forc_salt_surface[...] = 1. / t_rest * (forcing["s_star"] - m.salt[..., -1, self.get_tau()]) * m.maskT[..., -1] * m.dzt[-1]
 
         # apply simple ice mask
         ice = np.ones((m.nx+4, m.ny+4), dtype=np.uint8)
@@ -309,7 +285,7 @@ class GlobalOneDegree(PyOMLegacy):
         ice *= mask
 
         # solar radiation
-        m.temp_source[..., :] = (f1 * self.qsol[..., n1, None] + f2 * self.qsol[..., n2, None]) \
+        m.temp_source[..., :] = forcing["qsol"][..., None] \
                                         * self.divpen_shortwave[None, None, :] * ice[..., None] \
                                         * m.maskT[..., :] / cp_0 / m.rho_0
 
@@ -2,6 +2,7 @@ import os
 import logging
 from netCDF4 import Dataset
 
+from climate.forcing import PeriodicForcing
 from climate.pyom import PyOMLegacy, pyom_method
 
 BASE_PATH = os.path.dirname(os.path.realpath(__file__))
@@ -98,8 +99,15 @@ class GlobalFourDegree(PyOMLegacy):
         m.eq_of_state_type = 5
 
     @pyom_method
-    def _read_binary(self, var):
-        return np.load(DATA_FILES[var])
+    def _read_binary(self, var, mmap_mode=None):
+        return np.load(DATA_FILES[var], mmap_mode=mmap_mode)
+
+    @pyom_method
+    def _pad_record(self, record):
+        m = self.fortran.main_module
+        padded = np.zeros((m.nx+4, m.ny+4))
+        padded[2:-2, 2:-2] = record
+        return padded
 
     @pyom_method
     def set_grid(self):
@@ -133,7 +141,6 @@ class GlobalFourDegree(PyOMLegacy):
         """ setup initial conditions
         """
         m = self.fortran.main_module
-        self.taux, self.tauy, self.qnec, self.qnet, self.sss_clim, self.sst_clim = (np.zeros((m.nx+4,m.ny+4,12)) for _ in range(6))
 
         # initial conditions for T and S
         temp_data = self._read_binary("temperature")[:,:,::-1]
@@ -142,52 +149,53 @@ class GlobalFourDegree(PyOMLegacy):
         salt_data = self._read_binary("salt")[:,:,::-1]
         m.salt[2:-2,2:-2,:,:2] = salt_data[...,np.newaxis] * m.maskT[2:-2,2:-2,:,np.newaxis]
 
+        # monthly surface forcing, records are read when needed
+        self._forcing = PeriodicForcing(365*86400.0, 12)
+
         # use Trenberth wind stress from MITgcm instead of ECMWF (also contained in ecmwf_4deg.cdf)
-        self.taux[2:-2,2:-2,:] = self._read_binary("tau_x") / m.rho_0
-        self.tauy[2:-2,2:-2,:] = self._read_binary("tau_y") / m.rho_0
+        for name, var in (("taux", "tau_x"), ("tauy", "tau_y")):
+            self._forcing.add(name, self._read_binary(var, mmap_mode="r"),
+                              transform=lambda record: self._pad_record(record / m.rho_0))
 
         # heat flux
-        with Dataset(DATA_FILES["ecmwf"],"r") as ecmwf_data:
-            self.qnec[2:-2,2:-2,:] = np.array(ecmwf_data.variables["Q3"]).transpose()
-            self.qnec[self.qnec <= -1e10] = 0.0
-
-        q = self._read_binary("q_net")
-        self.qnet[2:-2,2:-2,:] = -q
-        self.qnet[self.qnet <= -1e10] = 0.0
-
-        fxa = np.sum(self.qnet[2:-2, 2:-2, :] * m.area_t[2:-2, 2:-2, np.newaxis]) / 12 / np.sum(m.area_t[2:-2, 2:-2])
+        def read_qnec(n):
+            with Dataset(DATA_FILES["ecmwf"],"r") as ecmwf_data:
+                return ecmwf_data.variables["Q3"][n].transpose()
+        def qnec_transform(record):
+            qnec = self._pad_record(record)
+            qnec[qnec <= -1e10] = 0.0
+            return qnec
+        self._forcing.add("qnec", read_qnec, transform=qnec_transform)
+
+        q = -self._read_binary("q_net")
+        q[q <= -1e10] = 0.0
+        fxa = np.sum(q * m.area_t[2:-2, 2:-2, np.newaxis]) / 12 / np.sum(m.area_t[2:-2, 2:-2])
         logging.info(" removing an annual mean heat flux imbalance of %e W/m^2" % fxa)
-        self.qnet[...] = (self.qnet - fxa) * m.maskT[: ,: , -1, np.newaxis]
+        def qnet_transform(record):
+            qnet = self._pad_record(-record)
+            qnet[qnet <= -1e10] = 0.0
+            return (qnet - fxa) * m.maskT[:, :, -1]
+        self._forcing.add("qnet", self._read_binary("q_net", mmap_mode="r"), transform=qnet_transform)
 
         # SST and SSS
-        self.sst_clim[2:-2,2:-2,:] = self._read_binary("sst")
-        self.sss_clim[2:-2,2:-2,:] = self._read_binary("sss")
+        self._forcing.add("sst_clim", self._read_binary("sst", mmap_mode="r"), transform=self._pad_record)
+        self._forcing.add("sss_clim", self._read_binary("sss", mmap_mode="r"), transform=self._pad_record)
 
         idm = self.fortran.idemix_module
         if idm.enable_idemix:
             idm.forc_iw_bottom[2:-2,2:-2] = self._read_binary("tidal_energy") / m.rho_0
             idm.forc_iw_surface[2:-2,2:-2] = self._read_binary("wind_energy") / m.rho_0 * 0.2
 
-    def _get_periodic_interval(self,currentTime,cycleLength,recSpacing,nbRec):
-        """  interpolation routine taken from mitgcm
-        """
-        locTime = currentTime - recSpacing * 0.5 + cycleLength * (2 - round(currentTime/cycleLength))
-        tmpTime = locTime % cycleLength
-        tRec1 = 1 + int(tmpTime/recSpacing)
-        tRec2 = 1 + tRec1 % int(nbRec)
-        wght2 = (tmpTime - recSpacing*(tRec1 - 1)) / recSpacing
-        wght1 = 1.0 - wght2
-        return (tRec1-1, wght1), (tRec2-1, wght2)
-
     @pyom_method
     def set_forcing(self):
         m=self.fortran.main_module
 
-        (n1,f1), (n2,f2) = self._get_periodic_interval((m.itt - 1) * m.dt_tracer, 365*86400.0, 365*86400./12., 12)
+        forcing = self._forcing
+        forcing.update((m.itt - 1) * m.dt_tracer)
 
         # wind stress
-        m.surface_taux[:]=(f1*self.taux[:,:,n1] + f2*self.taux[:,:,n2])
-        m.surface_tauy[:]=(f1*self.tauy[:,:,n1] + f2*self.tauy[:,:,n2])
+        m.surface_taux[:] = forcing["taux"]
+        m.surface_tauy[:] = forcing["tauy"]
 
         # tke flux
         tkm=self.fortran.tke_module
@@ -196,15 +204,12 @@ class GlobalFourDegree(PyOMLegacy):
                                             + (0.5 * (m.surface_tauy[1:-1,1:-1] + m.surface_tauy[1:-1,:-2]))**2)**(3./2.)
         # heat flux : W/m^2 K kg/J m^3/kg = K m/s
         cp_0 = 3991.86795711963
-        sst  =  f1*self.sst_clim[:,:,n1] + f2*self.sst_clim[:,:,n2]
-        qnec =  f1*self.qnec[:,:,n1] + f2*self.qnec[:,:,n2]
-        qnet =  f1*self.qnet[:,:,n1] + f2*self.qnet[:,:,n2]
-        m.forc_temp_surface[:] = (qnet + qnec * (sst - m.temp[:,:,-1,self.get_tau()])) * m.maskT[:,:,-1] / cp_0 / m.rho_0
+        m.forc_temp_surface[:] = (forcing["qnet"] + forcing["qnec"] * (forcing["sst_clim"] - m.temp[:,:,-1,self.get_tau()])) \
+                                 * m.maskT[:,:,-1] / cp_0 / m.rho_0
 
         # salinity restoring
         t_rest= 30 * 86400.0
-        sss = f1*self.sss_clim[:,:,n1] + f2*self.sss_clim[:,:,n2]
-        m.forc_salt_surface[:] = 1. / t_rest * (sss - m.salt[:,:,-1,self.get_tau()]) * m.maskT[:,:,-1] * m.dzt[-1]
+        m.forc_salt_surface[:] = 1. / t_rest * (forcing["sss_clim"] - m.salt[:,:,-1,self.get_tau()]) * m.maskT[:,:,-1] * m.dzt[-1]
 
         # apply simple ice mask
         mask = (m.temp[:,:,-1,self.get_tau()] * m.maskT[:,:,-1] <= -1.8) & (m.forc_temp_surface <= 0.0)
@@ -212,8 +217,8 @@ class GlobalFourDegree(PyOMLegacy):
         m.forc_salt_surface[mask] = 0.0
 
         if m.enable_tempsalt_sources:
-            m.temp_source[:] = m.maskT * self.rest_tscl * (f1*self.t_star[:,:,:,n1] + f2*self.t_star[:,:,:,n2] - m.temp[:,:,:,self.get_tau()])
-            m.salt_source[:] = m.maskT * self.rest_tscl * (f1*self.s_star[:,:,:,n1] + f2*self.s_star[:,:,:,n2] - m.salt[:,:,:,self.get_tau()])
+            m.temp_source[:] = m.maskT * self.rest_tscl * (forcing["t_star"] - m.temp[:,:,:,self.get_tau()])
+            m.salt_source[:] = m.maskT * self.rest_tscl * (forcing["s_star"] - m.salt[:,:,:,self.get_tau()])
 
     @pyom_method
     def set_diagnostics(self):
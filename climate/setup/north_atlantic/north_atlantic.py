@@ -5,6 +5,8 @@ import scipy.interpolate
 import scipy.spatial
 import scipy.ndimage
 
+from climate import tools
+from climate.forcing import PeriodicForcing
 from climate.pyom import PyOM, pyom_method
 from climate.pyom.core import cyclic
 
@@ -81,62 +83,6 @@ class NorthAtlantic(PyOM):
     def set_coriolis(self):
         self.coriolis_t[:,:] = 2 * self.omega * np.sin(self.yt[np.newaxis, :] / 180. * self.pi)
 
-    def _interpolate_along_axis(self, coords, arr, interp_coords, axis):
-        assert len(coords) == arr.shape[axis]
-
-        diff = coords[np.newaxis, :] - interp_coords[:, np.newaxis]
-        diff_m = np.where(diff <= 0, diff, np.inf)
-
-        i_m = np.argmin(np.abs(diff_m), axis=1)
-        i_p = np.minimum(len(coords) - 1, i_m + 1)
-
-        full_shape = [np.newaxis] * arr.ndim
-        full_shape[axis] = slice(None)
-        s = [slice(None)] * arr.ndim
-        s[axis] = i_m
-        mask = np.isnan(arr[s])
-        i_m_full = np.where(mask, i_p[full_shape], i_m[full_shape])
-        s[axis] = i_p
-        mask = np.isnan(arr[s])
-        i_p_full = np.where(mask, i_m[full_shape], i_p[full_shape])
-
-        pos = np.where(i_p_full == i_m_full, 1., ((coords[i_p] - interp_coords) \
-                        / (coords[i_p] - coords[i_m] + 1e-20))[full_shape])
-
-        indices_p, indices_m = np.indices(i_m_full.shape), np.indices(i_m_full.shape)
-        indices_p[axis] = i_p_full
-        indices_m[axis] = i_m_full
-        return arr[tuple(indices_p)] * (1-pos) + arr[tuple(indices_m)] * pos
-
-    def _fill_holes(self, data):
-        data = data.copy()
-        shape = data.shape
-        dim = data.ndim
-        flag = np.zeros(shape, dtype=bool)
-        t_ct = int(data.size/5)
-        flag[~np.isnan(data)] = True
-
-        slcs = [slice(None)] * dim
-
-        while np.any(~flag): # as long as there are any False's in flag
-            for i in range(dim): # do each axis
-                # make slices to shift view one element along the axis
-                slcs1 = slcs[:]
-                slcs2 = slcs[:]
-                slcs1[i] = slice(0, -1)
-                slcs2[i] = slice(1, None)
-
-                # replace from the right
-                repmask = np.logical_and(~flag[slcs1], flag[slcs2])
-                data[slcs1][repmask] = data[slcs2][repmask]
-                flag[slcs1][repmask] = True
-
-                # replace from the left
-                repmask = np.logical_and(~flag[slcs2], flag[slcs1])
-                data[slcs2][repmask] = data[slcs1][repmask]
-                flag[slcs2][repmask] = True
-        return data
-
     def _interpolate(self, coords, var, grid=None, missing_value=-1e20):
         if grid is None:
             grid = (self.xt[2:-2], self.yt[2:-2])
@@ -147,10 +93,8 @@ class NorthAtlantic(PyOM):
         invalid_mask = var == missing_value
         var[invalid_mask] = np.nan
 
-        interp_values = var
-        for i, (x, x_new) in enumerate(zip(coords, grid)):
-            interp_values = self._interpolate_along_axis(x, interp_values, x_new, i)
-        interp_values = self._fill_holes(interp_values)
+        interp_values = tools.regrid(coords, var, grid, skip_missing=True)
+        interp_values = tools.fill_holes(interp_values)
         return interp_values
 
     def set_topography(self):
@@ -177,46 +121,48 @@ class NorthAtlantic(PyOM):
             salt = 35. + 1000 * self._interpolate(forc_coords, forcing_file.variables["salt_ic"][::-1, ...].T)
             self.salt[2:-2, 2:-2, :, self.tau] = self.maskT[2:-2, 2:-2, :] * salt
 
-            self._taux = np.zeros((self.nx+4, self.ny+4, 12))
-            self._tauy = np.zeros((self.nx+4, self.ny+4, 12))
             forc_u_coords_hor = [forcing_file.variables[k][...].T for k in ("xu","yu")]
             forc_u_coords_hor[0][...] += -360
-            for k in xrange(12):
-                self._taux[2:-2, 2:-2, k] = self._interpolate(forc_u_coords_hor, forcing_file.variables["taux"][k,...].T,
-                                                              grid=(self.xu[2:-2], self.yt[2:-2])) / 10. / self.rho_0
-                self._tauy[2:-2, 2:-2, k] = self._interpolate(forc_u_coords_hor, forcing_file.variables["tauy"][k,...].T,
-                                                              grid=(self.xt[2:-2], self.yu[2:-2])) / 10. / self.rho_0
-
-            for t in (self._taux, self._tauy):
-                if self.enable_cyclic_x:
-                    cyclic.setcyclic_x(t)
-
-            # heat flux and salinity restoring
-            self._sst_clim = np.zeros((self.nx+4, self.ny+4, 12))
-            self._sss_clim = np.zeros((self.nx+4, self.ny+4, 12))
-            self._sst_rest = np.zeros((self.nx+4, self.ny+4, 12))
-            self._sss_rest = np.zeros((self.nx+4, self.ny+4, 12))
-
-            sst_clim, sss_clim, sst_rest, sss_rest = [forcing_file.variables[k][...].T for k in ("sst_clim","sss_clim","sst_rest","sss_rest")]
-            for k in xrange(12):
-                self._sst_clim[2:-2,2:-2,k] = self._interpolate(forc_coords[:-1], sst_clim[...,k])
-                self._sss_clim[2:-2,2:-2,k] = self._interpolate(forc_coords[:-1], sss_clim[...,k]) * 1000 + 35
-                self._sst_rest[2:-2,2:-2,k] = self._interpolate(forc_coords[:-1], sst_rest[...,k]) * 41868.
-                self._sss_rest[2:-2,2:-2,k] = self._interpolate(forc_coords[:-1], sss_rest[...,k]) / 100.0
 
         with Dataset("restoring_zone.cdf", "r") as restoring_file:
             rest_coords = [restoring_file.variables[k][...].T for k in ("xt","yt","zt")]
             rest_coords[0][...] += -360
-
-            # sponge layers
-            self._t_star = np.zeros((self.nx+4, self.ny+4, self.nz, 12))
-            self._s_star = np.zeros((self.nx+4, self.ny+4, self.nz, 12))
             self._rest_tscl = np.zeros((self.nx+4, self.ny+4, self.nz))
-
             self._rest_tscl[2:-2, 2:-2, :] = self._interpolate(rest_coords, restoring_file.variables["tscl"][0, ...].T)
-            for k in xrange(12):
-                self._t_star[2:-2, 2:-2, :, k] = self._interpolate(rest_coords, restoring_file.variables["t_star"][k,...].T, missing_value=0.)
-                self._s_star[2:-2, 2:-2, :, k] = self._interpolate(rest_coords, restoring_file.variables["s_star"][k,...].T, missing_value=0.)
+
+        # monthly forcing, records are read and interpolated when needed
+        year_in_seconds = 360 * 86400.0
+        self._forcing = PeriodicForcing(year_in_seconds, 12)
+
+        def record_reader(filename, var, coords, scale=1., offset=0., **kwargs):
+            def read(k):
+                with Dataset(filename, "r") as f:
+                    record = self._interpolate(coords, f.variables[var][k, ...].T, **kwargs)
+                out = np.zeros((self.nx+4, self.ny+4) + record.shape[2:])
+                out[2:-2, 2:-2, ...] = record * scale + offset
+                return out
+            return read
+
+        # wind stress
+        def wind_stress_transform(tau):
+            if self.enable_cyclic_x:
+                cyclic.setcyclic_x(tau)
+            return tau
+        self._forcing.add("taux", record_reader("forcing.cdf", "taux", forc_u_coords_hor, scale=1. / 10. / self.rho_0,
+                                                grid=(self.xu[2:-2], self.yt[2:-2])), transform=wind_stress_transform)
+        self._forcing.add("tauy", record_reader("forcing.cdf", "tauy", forc_u_coords_hor, scale=1. / 10. / self.rho_0,
+                                                grid=(self.xt[2:-2], self.yu[2:-2])), transform=wind_stress_transform)
+
+        # heat flux and salinity restoring
+        self._forcing.add("sst_clim", record_reader("forcing.cdf", "sst_clim", forc_coords[:-1]))
+        self._forcing.add("sss_clim", record_reader("forcing.cdf", "sss_clim", forc_coords[:-1], scale=1000., offset=35.))
+        self._forcing.add("sst_rest", record_reader("forcing.cdf", "sst_rest", forc_coords[:-1], scale=41868.))
+        self._forcing.add("sss_rest", record_reader("forcing.cdf", "sss_rest", forc_coords[:-1], scale=1. / 100.))
+
+        # sponge layers
+        if self.enable_tempsalt_sources:
+            self._forcing.add("t_star", record_reader("restoring_zone.cdf", "t_star", rest_coords, missing_value=0.))
+            self._forcing.add("s_star", record_reader("restoring_zone.cdf", "s_star", rest_coords, missing_value=0.))
 
         if self.enable_idemix:
             f = np.load("tidal_energy.npy") / self.rho_0
@@ -224,46 +170,31 @@ class NorthAtlantic(PyOM):
             f = np.load("wind_energy.npy") / self.rho_0 * 0.2
             self.forc_iw_surface[2:-2,2:-2] = self._interpolate(forc_coords[:-1], f)
 
-    def _get_periodic_interval(self,currentTime,cycleLength,recSpacing,nbRec):
-        """  interpolation routine taken from mitgcm
-        """
-        locTime = currentTime - recSpacing * 0.5 + cycleLength * (2 - round(currentTime/cycleLength))
-        tmpTime = locTime % cycleLength
-        tRec1 = 1 + int(tmpTime/recSpacing)
-        tRec2 = 1 + tRec1 % int(nbRec)
-        wght2 = (tmpTime - recSpacing*(tRec1 - 1)) / recSpacing
-        wght1 = 1.0 - wght2
-        return (tRec1-1, wght1), (tRec2-1, wght2)
-
     @pyom_method
     def set_forcing(self):
-        year_in_seconds = 360 * 86400.0
-        (n1,f1), (n2,f2) = self._get_periodic_interval(self.itt * self.dt_tracer, year_in_seconds, year_in_seconds / 12., 12)
+        forcing = self._forcing
+        forcing.update(self.itt * self.dt_tracer)
 
-        self.surface_taux[...] = (f1 * self._taux[:,:,n1] + f2 * self._taux[:,:,n2])
-        self.surface_tauy[...] = (f1 * self._tauy[:,:,n1] + f2 * self._tauy[:,:,n2])
+        self.surface_taux[...] = forcing["taux"]
+        self.surface_tauy[...] = forcing["tauy"]
 
         if self.enable_tke:
             self.forc_tke_surface[1:-1,1:-1] = np.sqrt((0.5 * (self.surface_taux[1:-1,1:-1] + self.surface_taux[:-2,1:-1]))**2 \
                                                      + (0.5 * (self.surface_tauy[1:-1,1:-1] + self.surface_tauy[1:-1,:-2]))**2 \
                                                      ) ** (3./2.)
         cp_0 = 3991.86795711963
-        self.forc_temp_surface[...] = (f1 * self._sst_rest[:,:,n1] + f2 * self._sst_rest[:,:,n2]) * \
-                                      (f1 * self._sst_clim[:,:,n1] + f2 * self._sst_clim[:,:,n2] \
-                                        - self.temp[:,:,-1,self.tau]) * self.maskT[:,:,-1] / cp_0 / self.rho_0
-        self.forc_salt_surface[...] = (f1 * self._sss_rest[:,:,n1] + f2 * self._sss_rest[:,:,n2]) * \
-                                      (f1 * self._sss_clim[:,:,n1] + f2 * self._sss_clim[:,:,n2] \
-                                        - self.salt[:,:,-1,self.tau]) * self.maskT[:,:,-1]
+        self.forc_temp_surface[...] = forcing["sst_rest"] * (forcing["sst_clim"] - self.temp[:,:,-1,self.tau]) \
+                                      * self.maskT[:,:,-1] / cp_0 / self.rho_0
+        self.forc_salt_surface[...] = forcing["sss_rest"] * (forcing["sss_clim"] - self.salt[:,:,-1,self.tau]) \
+                                      * self.maskT[:,:,-1]
 
         ice_mask = (self.temp[:,:,-1,self.tau] * self.maskT[:,:,-1] <= -1.8) & (self.forc_temp_surface <= 0.0)
         self.forc_temp_surface[...] *= ~ice_mask
         self.forc_salt_surface[...] *= ~ice_mask
 
         if self.enable_tempsalt_sources:
-            self.temp_source[...] = self.maskT * self._rest_tscl \
-                                * (f1 * self._t_star[:,:,:,n1] + f2 * self._t_star[:,:,:,n2] - self.temp[:,:,:,self.tau])
-            self.salt_source[...] = self.maskT * self._rest_tscl \
-                                * (f1 * self._s_star[:,:,:,n1] + f2 * self._s_star[:,:,:,n2] - self.salt[:,:,:,self.tau])
+            self.temp_source[...] = self.maskT * self._rest_tscl * (forcing["t_star"] - self.temp[:,:,:,self.tau])
+            self.salt_source[...] = self.maskT * self._rest_tscl * (forcing["s_star"] - self.salt[:,:,:,self.tau])
 
     def set_diagnostics(self):
         self.diagnostics["snapshot"].output_frequency = 3600. * 24 * 10
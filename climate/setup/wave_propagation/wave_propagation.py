@@ -6,6 +6,7 @@ import scipy.ndimage
 import matplotlib.pyplot as plt
 
 from climate import tools
+from climate.forcing import PeriodicForcing
 from climate.pyom import PyOM, pyom_method
 from climate.pyom.core import cyclic
 
@@ -186,6 +187,13 @@ class WavePropagation(PyOM):
             plt.imshow(k[2:-2, 2:-2, 0])
         plt.show()
 
+        # monthly records are interpolated in all three dimensions at once above,
+        # so they are kept in memory and only blended by the forcing engine
+        year_in_seconds = 360 * 86400.
+        self._forcing = PeriodicForcing(year_in_seconds, 12)
+        for name in ("taux", "tauy", "qnet", "qnec", "qsol", "t_star", "s_star"):
+            self._forcing.add(name, getattr(self, "_" + name))
+
         if self.enable_idemix:
             tidal_energy_data = tools.interpolate((xt_forc, yt_forc), self._get_data("tidal_energy"), t_grid[:-1], missing_value=0.)
             mask_x, mask_y = (i+2 for i in np.indices((self.nx, self.ny)))
@@ -211,25 +219,21 @@ class WavePropagation(PyOM):
         t_rest = 30. * 86400.
         cp_0 = 3991.86795711963 # J/kg /K
 
-        year_in_seconds = 360 * 86400.
-        (n1, f1), (n2, f2) = tools.get_periodic_interval(self.itt * self.dt_tracer, year_in_seconds, year_in_seconds / 12., 12)
+        forcing = self._forcing
+        forcing.update(self.itt * self.dt_tracer)
 
         # linearly interpolate wind stress and shift from MITgcm U/V grid to this grid
-        self.surface_taux[...] = f1 * self._taux[:, :, n1] + f2 * self._taux[:, :, n2]
-        self.surface_tauy[...] = f1 * self._tauy[:, :, n1] + f2 * self._tauy[:, :, n2]
+        self.surface_taux[...] = forcing["taux"]
+        self.surface_tauy[...] = forcing["tauy"]
 
         if self.enable_tke:
             self.forc_tke_surface[1:-1, 1:-1] = np.sqrt((0.5 * (self.surface_taux[1:-1, 1:-1] + self.surface_taux[:-2, 1:-1])) ** 2 \
                                                       + (0.5 * (self.surface_tauy[1:-1, 1:-1] + self.surface_tauy[1:-1, :-2])) ** 2) ** (3./2.)
 
         # W/m^2 K kg/J m^3/kg = K m/s
-        fxa = f1 * self._t_star[..., n1] + f2 * self._t_star[..., n2]
-        self._qqnec = f1 * self._qnec[..., n1] + f2 * self._qnec[..., n2]
-        self._qqnet = f1 * self._qnet[..., n1] + f2 * self._qnet[..., n2]
-        self.forc_temp_surface[...] = (self._qqnet + self._qqnec * (fxa - self.temp[..., -1, self.tau])) \
+        self.forc_temp_surface[...] = (forcing["qnet"] + forcing["qnec"] * (forcing["t_star"] - self.temp[..., -1, self.tau])) \
                                             * self.maskT[..., -1] / cp_0 / self.rho_0
-        fxa = f1 * self._s_star[..., n1] + f2 * self._s_star[..., n2]
-        self.forc_salt_surface[...] = 1. / t_rest * (fxa - self.salt[..., -1, self.tau]) * self.maskT[..., -1] * self.dzt[-1]
+        self.forc_salt_surface[...] = 1. / t_rest * (forcing["s_star"] - self.salt[..., -1, self.tau]) * self.maskT[..., -1] * self.dzt[-1]
 
         # apply simple ice mask
         ice = np.ones((self.nx+4, self.ny+4), dtype=np.uint8)
@@ -241,7 +245,7 @@ class WavePropagation(PyOM):
         ice *= mask
 
         # solar radiation
-        self.temp_source[..., :] = (f1 * self._qsol[..., n1, None] + f2 * self._qsol[..., n2, None]) \
+        self.temp_source[..., :] = forcing["qsol"][..., None] \
                                         * self._divpen_shortwave[None, None, :] * ice[..., None] \
                                         * self.maskT[..., :] / cp_0 / self.rho_0
 
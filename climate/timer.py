@@ -1,15 +1,13 @@
-import numpy as np
-try:
-    import bohrium as bh
-    flush = bh.flush
-except ImportError:
-    flush = lambda: None
-    
 import time
 
 class Timer:
-    def __init__(self, name):
+    def __init__(self, name, flush=None):
+        """
+        flush (callable, optional): called before stopping the timer, e.g. to
+        synchronize lazily evaluated backends
+        """
         self.name = name
+        self.flush = flush
         self.starts = []
         self.ends = []
 
@@ -17,17 +15,17 @@ class Timer:
         self.starts.append(time.time())
 
     def __exit__(self, type, value, traceback):
-        flush()
+        if self.flush is not None:
+            self.flush()
         self.ends.append(time.time())
 
     def printTime(self):
         self._check_if_active()
-        totalTime = sum([self.ends[i] - self.starts[i] for i in xrange(len(self.starts))])
-        print "[%s]:" % self.name, totalTime, "s"
+        print("[{}]: {} s".format(self.name, self.getTime()))
 
     def getTime(self):
         self._check_if_active()
-        totalTime = sum([self.ends[i] - self.starts[i] for i in xrange(len(self.starts))])
+        totalTime = sum([self.ends[i] - self.starts[i] for i in range(len(self.starts))])
         return totalTime
 
     def getLastTime(self):
@@ -1,5 +1,9 @@
+import hashlib
+
 import numpy as np
 import scipy.interpolate
+import scipy.ndimage
+import scipy.sparse
 
 def _gaussian(x, mu, sig):
     return np.exp(-np.power(x - mu, 2.) / (2 * np.power(sig, 2.)))
@@ -61,50 +65,156 @@ def interpolate(coords, var, interp_coords, missing_value=None, fill=True, kind=
     """
     if len(coords) != len(interp_coords) or len(coords) != var.ndim:
         raise ValueError("Dimensions of coordinates and values do not match")
-    var = np.array(var)
+    var = np.array(var, dtype=np.float64)
     if not missing_value is None:
         invalid_mask = var == missing_value
         var[invalid_mask] = np.nan
-    if var.ndim > 1 and coords[0].ndim == 1:
-        interp_grid = np.rollaxis(np.array(np.meshgrid(*interp_coords, indexing="ij", copy=False)), 0, len(interp_coords)+1)
-    else:
-        interp_grid = coords
-    var = scipy.interpolate.interpn(coords, var, interp_grid, bounds_error=False, fill_value=None, method=kind)
+    var = regrid(coords, var, interp_coords, kind=kind)
 
     if fill:
         var = fill_holes(var)
     return var
 
 
-def fill_holes(data):
+_regrid_operators = {}
+
+def _coordinate_hash(coords):
+    digest = hashlib.sha1()
+    for x in coords:
+        digest.update(np.ascontiguousarray(x, dtype=np.float64).tostring())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+def _regrid_operator_1d(x, xi, kind, side):
+    x, xi = np.asarray(x, dtype=np.float64), np.asarray(xi, dtype=np.float64)
+    if x.ndim != 1 or len(x) < 2 or np.any(np.diff(x) <= 0):
+        raise ValueError("source coordinates must be one-dimensional and strictly increasing")
+    # same indices and weights as scipy.interpolate.interpn (linear extrapolation) for side="left";
+    # side only matters for points coinciding with a source coordinate next to missing values
+    i = np.clip(np.searchsorted(x, xi, side=side) - 1, 0, len(x) - 2)
+    w = (xi - x[i]) / (x[i+1] - x[i])
+    rows = np.arange(len(xi))
+    if kind == "nearest":
+        rows, cols, data = rows, np.where(w <= .5, i, i + 1), np.ones(len(xi))
+    elif kind == "linear":
+        # zero weights are stored explicitly, so that NaN values are propagated as in interpn
+        rows, cols, data = np.concatenate((rows, rows)), np.concatenate((i, i + 1)), np.concatenate((1 - w, w))
+    else:
+        raise ValueError("unknown interpolation kind {}".format(kind))
+    return scipy.sparse.csr_matrix((data, (rows, cols)), shape=(len(xi), len(x)))
+
+def get_regrid_operator(coords, interp_coords, kind="linear"):
+    """Sparse interpolation operators from one rectilinear grid to another.
+
+    Multilinear (and nearest neighbor) interpolation is separable, so the operator
+    consists of one sparse matrix of shape (len(interp_coords[i]), len(coords[i])) per
+    dimension. Operators are cached for every combination of source grid, target grid,
+    and kind of interpolation, so they are only built once per setup.
+
+    Arguments:
+       coords: Tuple of (strictly increasing) coordinate arrays of the source grid.
+       interp_coords: Tuple of coordinate arrays to interpolate to.
+       kind (str, optional): Order of interpolation. Supported are `nearest` and
+          `linear` (default).
+
+    Returns:
+       :obj:`tuple` of :obj:`scipy.sparse.csr_matrix`, one for each dimension.
+    """
+    return _get_regrid_operator(coords, interp_coords, kind, "left")
+
+def _get_regrid_operator(coords, interp_coords, kind, side):
+    if len(coords) != len(interp_coords):
+        raise ValueError("Dimensions of coordinates do not match")
+    key = (_coordinate_hash(coords), _coordinate_hash(interp_coords), kind, side)
+    if key not in _regrid_operators:
+        _regrid_operators[key] = tuple(_regrid_operator_1d(x, xi, kind, side) for x, xi in zip(coords, interp_coords))
+    return _regrid_operators[key]
+
+def _apply_along_axis(operator, var, axis):
+    var = np.rollaxis(var, axis)
+    shape = var.shape
+    out = operator.dot(var.reshape(shape[0], -1)).reshape((operator.shape[0],) + shape[1:])
+    return np.rollaxis(out, 0, axis + 1)
+
+def regrid(coords, var, interp_coords, kind="linear", skip_missing=False):
+    """Interpolate data (or a stack of fields) to a different rectilinear grid, using
+    cached sparse operators (see :func:`get_regrid_operator`).
+
+    Unless ``skip_missing`` is given, results are identical to those of
+    :func:`scipy.interpolate.interpn` (with linear extrapolation).
+
+    Arguments:
+       coords: Tuple of coordinate arrays for each of the first ``len(coords)`` dimensions
+          of ``var``.
+       var (:obj:`ndarray` of dim (nx1, ..., nxd, ...)): Data to interpolate. Trailing
+          dimensions (e.g. time records) are interpolated at once.
+       interp_coords: Tuple of coordinate arrays to interpolate to.
+       kind (str, optional): Order of interpolation. Supported are `nearest` and
+          `linear` (default).
+       skip_missing (bool, optional): If ``True``, `NaN` values in ``var`` are left out when
+          interpolating along each axis, and the remaining neighbor is used instead.
+          Otherwise (default), `NaN` values are propagated.
+
+    Returns:
+       :obj:`ndarray` containing the interpolated values on the grid spanned by
+       ``interp_coords`` (plus trailing dimensions of ``var``).
+    """
+    if len(coords) > var.ndim:
+        raise ValueError("Dimensions of coordinates and values do not match")
+    var = np.asarray(var, dtype=np.float64)
+    # points coinciding with a missing source value take the neighbor to the right
+    side = "right" if skip_missing else "left"
+    for axis, operator in enumerate(_get_regrid_operator(coords, interp_coords, kind, side)):
+        if skip_missing:
+            valid = ~np.isnan(var)
+            weights = _apply_along_axis(operator, valid.astype(np.float64), axis)
+            values = _apply_along_axis(operator, np.where(valid, var, 0.), axis)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values /= weights
+            if np.any(weights == 0.):
+                # if all neighbors with non-zero weight are missing, use the remaining ones
+                stencil = operator.copy()
+                stencil.data[...] = 1.
+                count = _apply_along_axis(stencil, valid.astype(np.float64), axis)
+                fallback = _apply_along_axis(stencil, np.where(valid, var, 0.), axis)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = np.where(weights != 0., values, fallback / count)
+            var = values
+        else:
+            var = _apply_along_axis(operator, var, axis)
+    return var
+
+
+def fill_holes(data, cyclic_x=False):
     """A simple helper function that replaces NaN values with the nearest finite value.
+
+    Nearest values are found in a single pass through a Euclidean distance transform
+    (in index space), so the cost does not depend on the size of the holes.
+
+    Arguments:
+       data (:obj:`ndarray`): Data containing `NaN` values.
+       cyclic_x (bool, optional): Whether the first dimension is periodic, so that holes
+          can be filled across the boundary. Defaults to ``False``.
+
+    Returns:
+       A copy of ``data`` without `NaN` values (unless ``data`` contains no finite values
+       at all).
     """
-    data = data.copy()
-    shape = data.shape
-    dim = data.ndim
-    flag = np.zeros(shape, dtype=bool)
-    t_ct = int(data.size/5)
-    flag[~np.isnan(data)] = True
-
-    slcs = [slice(None)] * dim
-
-    while np.any(~flag):
-        for i in range(dim):
-            slcs1 = slcs[:]
-            slcs2 = slcs[:]
-            slcs1[i] = slice(0, -1)
-            slcs2[i] = slice(1, None)
-
-            # replace from the right
-            repmask = np.logical_and(~flag[slcs1], flag[slcs2])
-            data[slcs1][repmask] = data[slcs2][repmask]
-            flag[slcs1][repmask] = True
-
-            # replace from the left
-            repmask = np.logical_and(~flag[slcs2], flag[slcs1])
-            data[slcs2][repmask] = data[slcs1][repmask]
-            flag[slcs2][repmask] = True
-    return data
+    data = np.array(data)
+    invalid = np.isnan(data)
+    if not np.any(invalid) or np.all(invalid):
+        return data
+    if cyclic_x:
+        # the nearest point in x is never further away than half the domain
+        nx = data.shape[0]
+        pad = nx // 2 + 1
+        wrap = np.arange(-pad, nx + pad) % nx
+        indices = scipy.ndimage.distance_transform_edt(invalid[wrap], return_distances=False, return_indices=True)
+        indices = indices[:, pad:pad+nx]
+        indices[0] = wrap[indices[0]]
+    else:
+        indices = scipy.ndimage.distance_transform_edt(invalid, return_distances=False, return_indices=True)
+    return data[tuple(indices)]
 
 
 def get_periodic_interval(current_time, cycle_length, rec_spacing, n_rec):
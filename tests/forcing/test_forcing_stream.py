@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from climate import tools
+from climate.forcing import ForcingStream, InterpolationPlan
+
+
+class InterpolationPlanTest(unittest.TestCase):
+    def setUp(self):
+        numpy.random.seed(42)
+        self.coords = (numpy.linspace(0., 360., 37), numpy.sort(numpy.random.uniform(-80., 80., 20)))
+        self.grid = (numpy.linspace(-5., 365., 50), numpy.linspace(-90., 90., 41))
+        self.data = numpy.random.rand(37, 20)
+
+    def test_matches_interpolate(self):
+        for kind in ("linear", "nearest"):
+            plan = InterpolationPlan(self.coords, self.grid, kind=kind)
+            expected = tools.interpolate(self.coords, self.data, self.grid, fill=False, kind=kind)
+            self.assertTrue(numpy.allclose(plan(self.data), expected, rtol=1e-12, atol=1e-12))
+
+    def test_missing_values(self):
+        self.data[5:8, 3:6] = numpy.nan
+        plan = InterpolationPlan(self.coords, self.grid)
+        expected = tools.interpolate(self.coords, self.data, self.grid, fill=False)
+        result = plan(self.data)
+        self.assertTrue(numpy.array_equal(numpy.isnan(result), numpy.isnan(expected)))
+        valid = ~numpy.isnan(expected)
+        self.assertTrue(numpy.allclose(result[valid], expected[valid], rtol=1e-12, atol=1e-12))
+
+    def test_shape_mismatch(self):
+        plan = InterpolationPlan(self.coords, self.grid)
+        with self.assertRaises(ValueError):
+            plan(self.data.T)
+
+
+class ForcingStreamTest(unittest.TestCase):
+    n_rec = 20
+    spacing = 6 * 3600.
+
+    def setUp(self):
+        numpy.random.seed(42)
+        self.record_times = self.spacing * numpy.arange(self.n_rec)
+        self.records = numpy.random.rand(self.n_rec, 4, 3)
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def expected(self, time):
+        n1 = min(int(time // self.spacing), self.n_rec - 2)
+        f2 = (time - self.record_times[n1]) / self.spacing
+        return (1 - f2) * self.records[n1] + f2 * self.records[n1 + 1]
+
+    def test_interpolation(self):
+        filename = os.path.join(self.tempdir, "records.npy")
+        numpy.save(filename, self.records)
+        for prefetch in (0, 1, 3):
+            with ForcingStream(self.record_times, prefetch=prefetch) as stream:
+                stream.add("var", numpy.load(filename, mmap_mode="r"), transform=lambda record: record * 2)
+                for time in numpy.linspace(0., self.record_times[-1], 77):
+                    stream.update(time)
+                    self.assertTrue(numpy.allclose(stream["var"], 2 * self.expected(time), rtol=1e-14, atol=0.))
+
+    def test_regridding(self):
+        coords = (numpy.arange(4.), numpy.arange(3.))
+        grid = (numpy.linspace(0., 3., 7), numpy.linspace(0., 2., 5))
+        with ForcingStream(self.record_times) as stream:
+            stream.add("var", self.records, coords=coords, grid=grid)
+            stream.update(1.5 * self.spacing)
+            expected = tools.interpolate(coords, self.expected(1.5 * self.spacing), grid)
+            self.assertTrue(numpy.allclose(stream["var"], expected, rtol=1e-12, atol=0.))
+
+    def test_prefetch(self):
+        reads = []
+        def read(n):
+            reads.append(n)
+            return self.records[n]
+        stream = ForcingStream(self.record_times, prefetch=2)
+        stream.add("var", read)
+        stream.update(0.)
+        stream.update(self.spacing)
+        # wait for the reader to finish
+        stream.close()
+        # records 1 and 2 are needed, 3 and 4 are read ahead
+        self.assertEqual(sorted(set(reads)), [0, 1, 2, 3, 4])
+        self.assertEqual(len(reads), len(set(reads)))
+
+    def test_double_buffering(self):
+        with ForcingStream(self.record_times) as stream:
+            stream.add("var", self.records)
+            stream.update(0.)
+            previous = stream["var"]
+            stream.update(0.5 * self.spacing)
+            self.assertIsNot(previous, stream["var"])
+            self.assertTrue(numpy.allclose(previous, self.expected(0.), rtol=1e-14, atol=0.))
+            self.assertFalse(stream.update(0.5 * self.spacing))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            ForcingStream([0., 0.])
+        def read(n):
+            raise IOError("broken record")
+        with ForcingStream(self.record_times) as stream:
+            stream.add("var", read)
+            with self.assertRaises(RuntimeError):
+                stream["var"]
+            with self.assertRaises(IOError):
+                stream.update(0.)
+            with self.assertRaises(ValueError):
+                stream.update(self.record_times[-1] + 1.)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from climate import tools
+from climate.forcing import PeriodicForcing
+
+
+class PeriodicForcingTest(unittest.TestCase):
+    cycle_length = 360 * 86400.
+    n_rec = 12
+
+    def setUp(self):
+        numpy.random.seed(42)
+        self.records = numpy.random.rand(6, 5, self.n_rec)
+        self.reads = []
+
+    def read_record(self, n):
+        self.reads.append(n)
+        return self.records[..., n]
+
+    def test_interpolation(self):
+        forcing = PeriodicForcing(self.cycle_length, self.n_rec)
+        forcing.add("var", self.records)
+        for time in numpy.linspace(0., 2 * self.cycle_length, 97):
+            forcing.update(time)
+            (n1, f1), (n2, f2) = tools.get_periodic_interval(time, self.cycle_length, self.cycle_length / self.n_rec, self.n_rec)
+            expected = f1 * self.records[..., n1] + f2 * self.records[..., n2]
+            self.assertTrue(numpy.allclose(forcing["var"], expected, rtol=1e-14, atol=0.))
+
+    def test_lazy_loading(self):
+        forcing = PeriodicForcing(self.cycle_length, self.n_rec)
+        forcing.add("var", self.read_record, transform=lambda record: 2 * record)
+        self.assertEqual(self.reads, [])
+        for time in numpy.arange(0., self.cycle_length, 86400.):
+            forcing.update(time)
+            self.assertTrue(len(forcing._fields["var"].records) <= 2)
+        # every record is read once, plus the two records of the first interval that
+        # are read again at the end of the cycle
+        self.assertEqual(sorted(set(self.reads)), range(self.n_rec))
+        self.assertEqual(len(self.reads), self.n_rec + 2)
+        (n1, f1), (n2, f2) = tools.get_periodic_interval(time, self.cycle_length, self.cycle_length / self.n_rec, self.n_rec)
+        expected = 2 * (f1 * self.records[..., n1] + f2 * self.records[..., n2])
+        self.assertTrue(numpy.allclose(forcing["var"], expected, rtol=1e-14, atol=0.))
+
+    def test_memory_mapped_source(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "records.npy")
+            numpy.save(filename, self.records)
+            forcing = PeriodicForcing(self.cycle_length, self.n_rec)
+            forcing.add("var", numpy.load(filename, mmap_mode="r"))
+            forcing.update(0.3 * self.cycle_length)
+            (n1, f1), (n2, f2) = tools.get_periodic_interval(0.3 * self.cycle_length, self.cycle_length,
+                                                             self.cycle_length / self.n_rec, self.n_rec)
+            expected = f1 * self.records[..., n1] + f2 * self.records[..., n2]
+            self.assertTrue(numpy.allclose(forcing["var"], expected, rtol=1e-14, atol=0.))
+            self.assertNotIsInstance(forcing["var"], numpy.memmap)
+            del forcing
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_weight_tolerance(self):
+        forcing = PeriodicForcing(self.cycle_length, self.n_rec, weight_tolerance=0.1)
+        forcing.add("var", self.records)
+        self.assertTrue(forcing.update(0.))
+        buffer = forcing["var"].copy()
+        self.assertFalse(forcing.update(3600.))
+        self.assertTrue(numpy.all(forcing["var"] == buffer))
+        self.assertTrue(forcing.update(0.5 * self.cycle_length / self.n_rec))
+
+    def test_decompose(self):
+        # records are transformed on the full grid before being cut to the subdomain
+        transform = lambda record: record - record.mean()
+        forcing = PeriodicForcing(self.cycle_length, self.n_rec)
+        forcing.add("var", self.read_record, transform=transform)
+        forcing.update(0.)
+        forcing.decompose(slice(1, 4), slice(2, 5))
+        for time in (0., 0.45 * self.cycle_length):
+            forcing.update(time)
+            (n1, f1), (n2, f2) = tools.get_periodic_interval(time, self.cycle_length, self.cycle_length / self.n_rec, self.n_rec)
+            expected = f1 * transform(self.records[..., n1]) + f2 * transform(self.records[..., n2])
+            self.assertEqual(forcing["var"].shape, (3, 3))
+            self.assertTrue(numpy.allclose(forcing["var"], expected[1:4, 2:5], rtol=1e-14, atol=0.))
+
+    def test_errors(self):
+        forcing = PeriodicForcing(self.cycle_length, self.n_rec)
+        forcing.add("var", self.records)
+        self.assertIn("var", forcing)
+        with self.assertRaises(ValueError):
+            forcing.add("var", self.records)
+        with self.assertRaises(RuntimeError):
+            forcing["var"]
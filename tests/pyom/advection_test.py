@@ -34,6 +34,7 @@ class AdvectionTest(PyOMTest):
             self.set_attribute(a,np.random.randn(self.nx+4,self.ny+4,self.nz,3))
 
         self.set_attribute("kbot",np.random.randint(0,self.nz,size=(self.nx+4,self.ny+4)).astype(np.float))
+        numerics.calc_grid_metrics(self.pyom_new)
         calc_topo_new, calc_topo_legacy = self.get_routine("calc_topo",submodule=numerics)
         calc_topo_new(self.pyom_new)
         calc_topo_legacy()
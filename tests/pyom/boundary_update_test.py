@@ -0,0 +1,85 @@
+"""
+Checks that ghost cell updates started in the background
+(climate.pyom.core.cyclic.start_boundary_update) give the same arrays as synchronous
+updates (enforce_boundaries), in serial runs and on several local processes, with
+several updates in flight at the same time, and that serial updates do not flush.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import sys
+import numpy as np
+
+from climate.pyom import PyOM, distributed
+from climate.pyom.core import cyclic
+
+NX, NY, NZ = 12, 8, 3
+
+
+def check_updates(pyom):
+    """
+    update random arrays on the subdomain of pyom through both routines and return
+    whether all results are identical
+    """
+    rank = 0 if pyom.comm is None else pyom.comm.rank
+    random = np.random.RandomState(rank)
+    arrays = [random.randn(pyom.nx + 4, pyom.ny + 4, NZ), random.randn(pyom.nx + 4, pyom.ny + 4),
+              random.randn(pyom.nx + 4, pyom.ny + 4, NZ, 2)]
+    synchronous = [array.copy() for array in arrays]
+    threaded = [array.copy() for array in arrays]
+
+    first_update = cyclic.start_boundary_update(pyom, *threaded[:2])
+    second_update = cyclic.start_boundary_update(pyom, threaded[2])
+    # synchronous exchange while both updates may still be in progress
+    cyclic.enforce_boundaries(pyom, *synchronous)
+    second_update.wait()
+    first_update.wait()
+    return all(np.array_equal(a, b) for a, b in zip(synchronous, threaded))
+
+
+class DistributedBoundaryUpdate(object):
+    """
+    runs check_updates on one subdomain; run by run_distributed in place of a model
+    """
+    def __init__(self):
+        self.comm = None
+
+    def run(self, n_proc):
+        pyom = PyOM(loglevel="error")
+        pyom.enable_cyclic_x = True
+        pyom.comm, pyom.n_proc = self.comm, n_proc
+        pyom.nx, pyom.ny = NX // n_proc[0], NY // n_proc[1]
+        pyom.proc_idx = (self.comm.rank % n_proc[0], self.comm.rank // n_proc[0])
+        if not check_updates(pyom):
+            raise AssertionError("threaded and synchronous updates differ on rank {}".format(self.comm.rank))
+
+
+class BoundaryUpdateTest(object):
+    layouts = ((2, 1), (1, 2), (2, 2))
+
+    def check(self, name, passed, message=""):
+        print("{:<50} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run(self):
+        pyom = PyOM(loglevel="error")
+        pyom.enable_cyclic_x = True
+        pyom.nx, pyom.ny = NX, NY
+        passed = self.check("serial updates", check_updates(pyom))
+        pyom.flush_policy = "per_kernel"
+        flush_counter = pyom.flush_counter
+        check_updates(pyom)
+        passed = self.check("serial updates without flushes", pyom.flush_counter == flush_counter,
+                            "{} flushes".format(pyom.flush_counter - flush_counter)) and passed
+        for n_proc in self.layouts:
+            name = "updates on {}x{} processes".format(*n_proc)
+            try:
+                distributed.run_distributed(DistributedBoundaryUpdate, n_proc)
+            except RuntimeError as error:
+                passed = self.check(name, False, str(error)) and passed
+            else:
+                passed = self.check(name, True) and passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = BoundaryUpdateTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,89 @@
+"""
+Compares the compressed water column kernels (enable_column_compression) of
+climate.pyom.core.utilities.solve_implicit and the TKE mixing length with the dense
+versions, on ACC2 with random partial-depth topography.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import sys
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom import pyom_method
+from climate.pyom.core import utilities, tke
+
+
+class PartialDepthACC2(ACC2):
+    """
+    ACC2 with water columns of random depth
+    """
+    @pyom_method
+    def set_topography(self):
+        ACC2.set_topography(self)
+        depth = np.random.RandomState(42).randint(1, self.nz + 1, size=self.kbot.shape)
+        self.kbot[...] = np.where(self.kbot > 0, depth, 0)
+
+
+class ColumnCompressionTest(object):
+    def check(self, name, actual, expected):
+        difference = np.abs(actual - expected).max()
+        passed = actual.shape == expected.shape and difference <= 1e-12 * np.abs(expected).max()
+        print("{:<60} {} max. abs. difference: {:.2e}".format(name, "passed" if passed else "failed", difference))
+        return passed
+
+    def compare(self, pyom, function):
+        """
+        run function with and without column compression, returning both results
+        """
+        results = []
+        for enable_column_compression in (False, True):
+            pyom.enable_column_compression = enable_column_compression
+            results.append(function())
+        return results
+
+    def check_solve_implicit(self, pyom):
+        passed = True
+        random = np.random.RandomState(1)
+        shape = (pyom.nx, pyom.ny, pyom.nz)
+        ks = pyom.kbot[2:-2, 2:-2] - 1
+        a, c = -random.rand(*shape), -random.rand(*shape)
+        b = 3. + random.rand(*shape)
+        b_edge = 2. + random.rand(*shape)
+        d, d_edge = random.randn(*shape), random.randn(*shape)
+        d_batch = random.randn(*(shape + (2,)))
+        cases = (("solve_implicit", d, {}),
+                 ("solve_implicit with edges", d, dict(b_edge=b_edge, d_edge=d_edge)),
+                 ("solve_implicit with batched right hand side", d_batch, dict(b_edge=b_edge)))
+        for name, rhs, kwargs in cases:
+            (dense, dense_mask), (compressed, compressed_mask) = \
+                    self.compare(pyom, lambda: utilities.solve_implicit(pyom, ks, a, b, c, rhs, **kwargs))
+            passed = self.check(name, compressed, dense) and passed
+            passed = self.check(name + " water mask", compressed_mask.astype(float), dense_mask.astype(float)) and passed
+        return passed
+
+    def check_mixing_length(self, pyom):
+        passed = True
+        random = np.random.RandomState(2)
+        tke_state = random.rand(*pyom.tke.shape) * 1e-3 * pyom.maskW[..., np.newaxis]
+        nsqr_state = random.randn(*pyom.Nsqr.shape) * 1e-5 * pyom.maskW[..., np.newaxis]
+        for tke_mxl_choice in (1, 2):
+            pyom.tke_mxl_choice = tke_mxl_choice
+            def set_diffusivities():
+                pyom.tke[...], pyom.Nsqr[...] = tke_state, nsqr_state
+                tke.set_tke_diffusivities(pyom)
+                return pyom.mxl.copy(), pyom.kappaM.copy(), pyom.kappaH.copy()
+            dense, compressed = self.compare(pyom, set_diffusivities)
+            for var, actual, expected in zip(("mxl", "kappaM", "kappaH"), compressed, dense):
+                passed = self.check("{} with tke_mxl_choice {}".format(var, tke_mxl_choice), actual, expected) and passed
+        return passed
+
+    def run(self):
+        pyom = PartialDepthACC2(loglevel="warning")
+        pyom.setup()
+        passed = self.check_solve_implicit(pyom)
+        passed = self.check_mixing_length(pyom) and passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = ColumnCompressionTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,91 @@
+"""
+Checks the diagnostics schedule (climate.pyom.diagnostics): diagnostics fire at exact
+multiples of their sampling and output intervals (in time steps), also far into a run
+and when starting from a restart, and intermediates are only shared within a group.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import sys
+
+from climate.pyom import PyOM, diagnostics
+
+
+class CountingDiagnostic(object):
+    """
+    records the time steps at which it is sampled and written, and requests an
+    intermediate (counting how often it is computed)
+    """
+    def __init__(self, key=None):
+        self.key = key
+        self.sampled, self.written = [], []
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return self.computed
+
+    def diagnose(self, pyom):
+        self.sampled.append(pyom.itt)
+        if self.key is not None:
+            diagnostics.shared_intermediate(pyom, self.key, self.compute)
+
+    def output(self, pyom):
+        self.written.append(pyom.itt)
+
+
+class DiagnosticsScheduleTest(object):
+    def check(self, name, passed, message=""):
+        print("{:<60} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run_schedule(self, pyom, diags, start, steps):
+        """
+        schedule diags (tuples of name, routine, group, sampling and output interval)
+        at time step start and call diagnose for the given number of steps
+        """
+        pyom._diagnostics_cache = {}
+        pyom._diagnostics_schedule = [diagnostics.ScheduledDiagnostic(*diag) for diag in diags]
+        pyom._diagnostics_schedule.sort(key=lambda s: (s.group or s.name, s.name))
+        for scheduled in pyom._diagnostics_schedule:
+            scheduled.schedule(start)
+        for itt in range(start, start + steps):
+            pyom.itt = itt
+            diagnostics.diagnose(pyom)
+
+    def run(self):
+        passed = True
+        pyom = PyOM(loglevel="error")
+
+        diag = CountingDiagnostic()
+        self.run_schedule(pyom, [("diag", diag, None, 3, 8)], 0, 25)
+        passed = self.check("sampling at multiples of the interval", diag.sampled == [0, 3, 6, 9, 12, 15, 18, 21, 24], repr(diag.sampled)) and passed
+        passed = self.check("output at multiples of the interval", diag.written == [0, 8, 16, 24], repr(diag.written)) and passed
+
+        # e.g. 3000 years of 20 minute time steps, where float time would have drifted
+        start = 3000 * 365 * 72 + 1
+        diag = CountingDiagnostic()
+        self.run_schedule(pyom, [("diag", diag, None, 72, None)], start, 150)
+        expected = [itt for itt in range(start, start + 150) if itt % 72 == 0]
+        passed = self.check("sampling after {} time steps".format(start), diag.sampled == expected, repr(diag.sampled)) and passed
+        passed = self.check("no output without output interval", diag.written == []) and passed
+
+        pyom.dt_tracer = 1800.
+        passed = self.check("frequency is converted to time steps", diagnostics._frequency_to_interval(pyom, "diag", 86400.) == 48) and passed
+        passed = self.check("frequency is rounded to time steps", diagnostics._frequency_to_interval(pyom, "diag", 4000.) == 2) and passed
+        passed = self.check("short frequency runs every time step", diagnostics._frequency_to_interval(pyom, "diag", 60.) == 1) and passed
+        passed = self.check("no frequency gives no interval", diagnostics._frequency_to_interval(pyom, "diag", None) is None) and passed
+
+        grouped = [CountingDiagnostic("rho") for _ in range(2)]
+        single = [CountingDiagnostic("rho") for _ in range(2)]
+        diags = [("a", grouped[0], "density", 1, None), ("b", grouped[1], "density", 2, None),
+                 ("c", single[0], None, 1, None), ("d", single[1], None, 1, None)]
+        self.run_schedule(pyom, diags, 0, 4)
+        computed = [d.computed for d in grouped + single]
+        passed = self.check("intermediates are shared within a group", sum(computed[:2]) == 4, repr(computed[:2])) and passed
+        passed = self.check("intermediates are not shared without a group", computed[2:] == [4, 4], repr(computed[2:])) and passed
+        passed = self.check("cache is cleared after each time step", pyom._diagnostics_cache == {}) and passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = DiagnosticsScheduleTest().run()
+    sys.exit(int(not passed))
@@ -43,6 +43,7 @@ class DiffusionTest(PyOMTest):
             self.set_attribute(a,np.random.randn(self.nx+4,self.ny+4,self.nz,3))
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
+        numerics.calc_grid_metrics(self.pyom_new)
         numerics.calc_topo(self.pyom_new)
         self.pyom_legacy.fortran.calc_topo()
 
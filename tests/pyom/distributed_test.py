@@ -0,0 +1,229 @@
+"""
+Checks the domain decomposition (climate.pyom.distributed): halo exchanges, gathering
+and scattering on a small grid, the streamfunction solvers on ACC2, and a run of ACC2
+with periodic wind stress forcing on several local processes (see run_distributed),
+each compared with the serial model.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.forcing import PeriodicForcing
+from climate.pyom import distributed
+from climate.pyom.core.external import solve_poisson
+
+VARIABLES = (("surface_taux", ("xu", "yt")), ("u", ("xu", "yt", "zt", "timesteps")),
+             ("temp", ("xt", "yt", "zt", "timesteps")), ("psi", ("xu", "yu", "timesteps")))
+
+
+class ForcedACC2(ACC2):
+    """
+    ACC2 with a wind stress that varies periodically over 4 days
+    """
+    def set_initial_conditions(self):
+        ACC2.set_initial_conditions(self)
+        taux = self.surface_taux.copy()
+        self._forcing = PeriodicForcing(4 * 86400., 4)
+        # callable source, so the records are not sliced along with the model arrays
+        self._forcing.add("taux", lambda n: (1. + 0.5 * n) * taux)
+
+    def set_forcing(self):
+        self._forcing.update(self.itt * self.dt_tracer)
+        self.surface_taux[...] = self._forcing["taux"]
+        ACC2.set_forcing(self)
+
+    def set_diagnostics(self):
+        pass
+
+
+def save_results(pyom):
+    """
+    gather results on rank 0 and write them to the working directory
+    """
+    results = {var: distributed.gather(pyom, getattr(pyom, var), dims) for var, dims in VARIABLES}
+    # streamfunction values on land are not used by the model
+    mask = distributed.gather(pyom, pyom.maskZ[..., -1], ("xu", "yu"))
+    if mask is not None:
+        results["psi"] *= mask[..., np.newaxis]
+    if pyom.comm is None or pyom.comm.rank == 0:
+        np.savez("results_{}x{}.npz".format(*pyom.n_proc), **results)
+
+
+def save_solutions(pyom):
+    """
+    solve the streamfunction equation for a random right hand side with the gathered
+    and the distributed solver, and write the gathered solutions to the working directory
+    """
+    nx, ny = getattr(pyom, "nx_global", pyom.nx), getattr(pyom, "ny_global", pyom.ny)
+    np.random.seed(17)
+    rhs = np.zeros((nx + 4, ny + 4))
+    rhs[2:-2, 2:-2] = np.random.randn(nx, ny)
+    rhs[:2, :], rhs[-2:, :] = rhs[-4:-2, :], rhs[2:4, :]
+    rhs = distributed.scatter(pyom, rhs, ("xt", "yt"))
+    solutions = {}
+    for name, distributed_solver in (("gathered", False), ("distributed", True)):
+        pyom.distributed_poisson_solver = distributed_solver
+        solve_poisson.solve.pyom = None # set up the solver again
+        solution = np.zeros_like(rhs)
+        solve_poisson.solve(pyom, rhs.copy(), solution)
+        solutions[name] = distributed.gather(pyom, solution, ("xt", "yt"))
+    if pyom.comm is None or pyom.comm.rank == 0:
+        np.savez("solutions_{}x{}.npz".format(*pyom.n_proc), **solutions)
+
+
+class CommunicationCheck(object):
+    """
+    Exchanges, gathers, and scatters arrays with known values on a small grid. Run by
+    run_distributed in place of a model; ranks that find a wrong result fail.
+    """
+    def __init__(self, enable_cyclic_x):
+        self.enable_cyclic_x = enable_cyclic_x
+        self.nx_global, self.ny_global = 12, 8
+        self.comm = None
+
+    def global_arrays(self):
+        arrays = [np.arange((self.nx_global + 4) * (self.ny_global + 4), dtype=float).reshape(self.nx_global + 4, -1),
+                  np.random.RandomState(1).randn(self.nx_global + 4, self.ny_global + 4, 3)]
+        if self.enable_cyclic_x:
+            for array in arrays:
+                array[:2], array[-2:] = array[-4:-2], array[2:4]
+        return arrays
+
+    def assert_equal(self, name, actual, expected):
+        if not np.array_equal(actual, expected):
+            raise AssertionError("{} differs on rank {}".format(name, self.comm.rank))
+
+    def run(self, n_proc):
+        self.n_proc = n_proc
+        self.nx, self.ny = self.nx_global // n_proc[0], self.ny_global // n_proc[1]
+        self.proc_idx = (self.comm.rank % n_proc[0], self.comm.rank // n_proc[0])
+        self.is_pe, self.js_pe = self.proc_idx[0] * self.nx, self.proc_idx[1] * self.ny
+        index = (slice(self.is_pe, self.is_pe + self.nx + 4), slice(self.js_pe, self.js_pe + self.ny + 4))
+        expected = [array[index] for array in self.global_arrays()]
+
+        local = [array.copy() for array in expected]
+        for array in local:
+            array[:2], array[-2:], array[:, :2], array[:, -2:] = np.nan, np.nan, np.nan, np.nan
+        distributed.exchange_overlap(self, *local, tag=3)
+        # ghost cells at closed boundaries are not exchanged
+        exchanged = np.ones((self.nx + 4, self.ny + 4), dtype=bool)
+        if not self.enable_cyclic_x:
+            exchanged[:2] &= self.proc_idx[0] > 0
+            exchanged[-2:] &= self.proc_idx[0] < n_proc[0] - 1
+        exchanged[:, :2] &= self.proc_idx[1] > 0
+        exchanged[:, -2:] &= self.proc_idx[1] < n_proc[1] - 1
+        for n, (actual, values) in enumerate(zip(local, expected)):
+            self.assert_equal("exchanged array {}".format(n), actual[exchanged], values[exchanged])
+
+        for dims, values, global_values in zip((("xt", "yt"), ("xu", "yu", "zt")), expected, self.global_arrays()):
+            gathered = distributed.gather(self, values, dims)
+            if self.comm.rank == 0:
+                self.assert_equal("gathered {}".format(dims), gathered, global_values)
+            else:
+                self.assert_equal("gathered {}".format(dims), gathered, None)
+            scattered = distributed.scatter(self, global_values if self.comm.rank == 0 else None, dims)
+            self.assert_equal("scattered {}".format(dims), scattered, values)
+
+
+class DistributedTest(object):
+    timesteps = 4
+    layouts = ((2, 1), (1, 2), (2, 2))
+    communication_layouts = ((2, 1), (1, 2), (2, 2), (3, 2))
+
+    def check(self, name, passed, message=""):
+        print("{:<50} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def check_difference(self, name, actual, expected, rtol):
+        difference = np.abs(actual - expected).max()
+        scale = np.abs(expected).max()
+        return self.check(name, difference <= rtol * scale,
+                          "max. abs. difference: {:.2e} (scale {:.2e})".format(difference, scale))
+
+    def check_communication(self):
+        passed = True
+        for enable_cyclic_x in (True, False):
+            for n_proc in self.communication_layouts:
+                name = "communication on {}x{} processes{}".format(n_proc[0], n_proc[1], ", cyclic" if enable_cyclic_x else "")
+                try:
+                    distributed.run_distributed(CommunicationCheck, n_proc, model_args=(enable_cyclic_x,))
+                except RuntimeError as error:
+                    passed = self.check(name, False, str(error)) and passed
+                else:
+                    passed = self.check(name, True) and passed
+        return passed
+
+    def check_configuration(self):
+        passed = True
+        pyom = ForcedACC2(loglevel="warning")
+        pyom.set_parameter()
+        pyom.n_proc = (2, 1)
+        comm = distributed.PipeCommunicator.create(2)[0]
+        distributed.check_configuration(pyom, comm)
+        for name, setting, value in (("non-hydrostatic model", "enable_hydrostatic", False),
+                                     ("model without streamfunction", "enable_streamfunction", False),
+                                     ("indivisible grid", "nx", 31)):
+            original = getattr(pyom, setting)
+            setattr(pyom, setting, value)
+            try:
+                distributed.check_configuration(pyom, comm)
+            except ValueError:
+                passed = self.check("{} is rejected".format(name), True) and passed
+            else:
+                passed = self.check("{} is rejected".format(name), False) and passed
+            setattr(pyom, setting, original)
+        return passed
+
+    def check_solvers(self):
+        passed = True
+        serial = ForcedACC2(loglevel="warning")
+        serial.run(n_proc=(1, 1), runlen=0.)
+        save_solutions(serial)
+        expected = np.load("solutions_1x1.npz")["gathered"]
+        for n_proc in self.layouts:
+            distributed.run_distributed(ForcedACC2, n_proc, model_kwargs=dict(loglevel="warning"),
+                                        callback=save_solutions, runlen=0.)
+            actual = np.load("solutions_{}x{}.npz".format(*n_proc))
+            for name in ("gathered", "distributed"):
+                passed = self.check_difference("{} solver on {}x{} processes".format(name, *n_proc),
+                                               actual[name][2:-2, 2:-2], expected[2:-2, 2:-2], 1e-8) and passed
+        return passed
+
+    def check_run(self):
+        passed = True
+        run_kwargs = dict(runlen=self.timesteps * 86400 / 2., snapint=86400 / 2.)
+        serial = ForcedACC2(loglevel="warning")
+        serial.run(n_proc=(1, 1), **run_kwargs)
+        save_results(serial)
+        expected = np.load("results_1x1.npz")
+        for n_proc in self.layouts:
+            distributed.run_distributed(ForcedACC2, n_proc, model_kwargs=dict(loglevel="warning"),
+                                        callback=save_results, **run_kwargs)
+            actual = np.load("results_{}x{}.npz".format(*n_proc))
+            for var, _ in VARIABLES:
+                passed = self.check_difference("{} on {}x{} processes".format(var, *n_proc),
+                                               actual[var], expected[var], 1e-8) and passed
+        return passed
+
+    def run(self):
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            passed = self.check_configuration()
+            passed = self.check_communication() and passed
+            passed = self.check_solvers() and passed
+            passed = self.check_run() and passed
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        return passed
+
+
+if __name__ == "__main__":
+    passed = DistributedTest().run()
+    sys.exit(int(not passed))
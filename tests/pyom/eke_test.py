@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 
 from test_base import PyOMTest
-from climate.pyom.core import eke
+from climate.pyom.core import eke, numerics
 
 class EKETest(PyOMTest):
     nx, ny, nz = 70, 60, 50
@@ -55,6 +55,7 @@ class EKETest(PyOMTest):
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
 
+        numerics.calc_grid_metrics(self.pyom_new)
         self.test_module = eke
         pyom_args = (self.pyom_new,)
         pyom_legacy_args = dict()
@@ -3,7 +3,7 @@ import matplotlib.pyplot as plt
 import sys
 
 from test_base import PyOMTest
-from climate.pyom.core import friction
+from climate.pyom.core import friction, numerics
 
 class FrictionTest(PyOMTest):
     nx, ny, nz = 70, 60, 50
@@ -54,6 +54,7 @@ class FrictionTest(PyOMTest):
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
 
+        numerics.calc_grid_metrics(self.pyom_new)
         self.test_module = friction
         pyom_args = (self.pyom_new,)
         pyom_legacy_args = dict()
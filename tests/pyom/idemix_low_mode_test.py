@@ -0,0 +1,207 @@
+"""
+End-to-end regression test for the IDEMIX low mode (M2 and NIW) wave compartments.
+
+Runs a small basin with an island (so that waves are reflected at every kind of
+boundary) and compares the vectorized spectral advection against a direct
+loop implementation, checks that advection and reflection conserve energy, and
+compares the integrated wave energy after a few time steps to reference values.
+Unlike the other tests, this one does not need the Fortran library.
+"""
+import sys
+import numpy as np
+
+from climate.pyom import PyOM, pyom_method
+from climate.pyom.core import idemix
+
+class LowModeBasin(PyOM):
+    @pyom_method
+    def set_parameter(self):
+        self.nx, self.ny, self.nz = 30, 24, 10
+        self.np = 14
+        self.dt_mom = 3600.
+        self.dt_tracer = 3600.
+
+        self.coord_degree = True
+        self.enable_cyclic_x = True
+
+        self.congr_epsilon = 1e-12
+        self.congr_max_iterations = 5000
+        self.enable_streamfunction = True
+
+        self.enable_hor_friction = True
+        self.A_h = 5e4
+        self.enable_hor_friction_cos_scaling = True
+        self.hor_friction_cosPower = 1
+        self.enable_implicit_vert_friction = True
+        self.eq_of_state_type = 3
+
+        self.enable_idemix = True
+        self.enable_idemix_hor_diffusion = True
+        self.enable_idemix_M2 = True
+        self.enable_idemix_niw = True
+
+    @pyom_method
+    def set_grid(self):
+        self.dxt[...] = 4.0
+        self.dyt[...] = 4.0
+        self.x_origin = 0.0
+        self.y_origin = -46.0
+        self.dzt[...] = 200.
+
+    @pyom_method
+    def set_coriolis(self):
+        self.coriolis_t[...] = 2 * self.omega * np.sin(self.yt[np.newaxis, :] / 180. * self.pi)
+
+    @pyom_method
+    def set_topography(self):
+        x, y = np.meshgrid(self.xt, self.yt, indexing="ij")
+        island = (x > 40.) & (x < 64.) & (np.abs(y) < 14.)
+        shallow = (x > 80.) & (x < 90.)
+        self.kbot[...] = np.where(island, 0, np.where(shallow, self.nz // 2, 1))
+
+    @pyom_method
+    def set_initial_conditions(self):
+        self.temp[..., :2] = (20. * np.exp(self.zt / 800.))[np.newaxis, np.newaxis, :, np.newaxis] \
+                             * self.maskT[..., np.newaxis]
+        self.salt[..., :2] = 35. * self.maskT[..., np.newaxis]
+
+        self.topo_hrms[...] = 100. * self.maskT[..., -1]
+        self.topo_lam[...] = 1e4 * self.maskT[..., -1]
+        x = self.xt[:, np.newaxis]
+        self.forc_M2[..., 1:-1] = (1e-6 * (x < 30.) * self.maskT[..., -1])[..., np.newaxis] / (2 * self.pi)
+        self.forc_niw[..., 1:-1] = (1e-6 * (x > 100.) * self.maskT[..., -1])[..., np.newaxis] / (2 * self.pi)
+
+    @pyom_method
+    def set_forcing(self):
+        pass
+
+    @pyom_method
+    def set_diagnostics(self):
+        pass
+
+
+def superbee_spectral_loops(pyom, var, uvel, vvel, wvel):
+    """
+    direct loop implementation of adv_flux_superbee_spectral and reflect_flux
+    """
+    def flux(vel, cfl, rjp, rj, rjm, var_s, var_sp1):
+        if rj != 0.:
+            cr = rjm / (rj + 1e-20) if vel > 0 else rjp / (rj + 1e-20)
+        else:
+            cr = rjm * 1e20 if vel > 0 else rjp * 1e20
+        cr = max(0., max(min(1., 2. * cr), min(2., cr)))
+        return vel * (var_sp1 + var_s) * 0.5 - abs(vel) * ((1. - cr) + cfl * cr) * rj * 0.5
+
+    nx, ny, nxp = pyom.nx, pyom.ny, pyom.np
+    adv_fe, adv_fn, adv_ft = (np.zeros((nx+4, ny+4, nxp)) for _ in range(3))
+    for k in range(1, nxp-1):
+        for j in range(2, ny+2):
+            for i in range(1, nx+2):
+                cfl = abs(uvel[i,j,k] * pyom.dt_tracer / (pyom.cost[j] * pyom.dxt[i]))
+                adv_fe[i,j,k] = flux(uvel[i,j,k], cfl, (var[i+2,j,k] - var[i+1,j,k]) * pyom.maskUp[i+1,j,k],
+                                     (var[i+1,j,k] - var[i,j,k]) * pyom.maskUp[i,j,k],
+                                     (var[i,j,k] - var[i-1,j,k]) * pyom.maskUp[i-1,j,k], var[i,j,k], var[i+1,j,k])
+        for j in range(1, ny+2):
+            for i in range(2, nx+2):
+                cfl = abs(vvel[i,j,k] * pyom.dt_tracer / pyom.dyt[j])
+                adv_fn[i,j,k] = flux(vvel[i,j,k], cfl, (var[i,j+2,k] - var[i,j+1,k]) * pyom.maskVp[i,j+1,k],
+                                     (var[i,j+1,k] - var[i,j,k]) * pyom.maskVp[i,j,k],
+                                     (var[i,j,k] - var[i,j-1,k]) * pyom.maskVp[i,j-1,k], var[i,j,k], var[i,j+1,k])
+    for k in range(0, nxp-1):
+        kp2 = k + 2 if k + 2 < nxp else 2
+        km1 = k - 1 if k > 0 else nxp - 3
+        for j in range(2, ny+2):
+            for i in range(2, nx+2):
+                cfl = abs(wvel[i,j,k] * pyom.dt_tracer / pyom.dphit[k])
+                adv_ft[i,j,k] = flux(wvel[i,j,k], cfl, (var[i,j,kp2] - var[i,j,k+1]) * pyom.maskWp[i,j,k+1],
+                                     (var[i,j,k+1] - var[i,j,k]) * pyom.maskWp[i,j,k],
+                                     (var[i,j,k] - var[i,j,km1]) * pyom.maskWp[i,j,km1], var[i,j,k], var[i,j,k+1])
+
+    for k in range(1, nxp-1):
+        for j in range(1, ny+2):
+            for i in range(2, nx+2):
+                kk = pyom.bc_south[i,j,k]
+                if kk > 0:
+                    adv_fn[i,j,k] += adv_fn[i,j+1,k]
+                    adv_fn[i,j,kk] -= adv_fn[i,j+1,k]
+        for j in range(1, ny+2):
+            for i in range(2, nx+2):
+                kk = pyom.bc_north[i,j,k]
+                if kk > 0:
+                    adv_fn[i,j,k] += adv_fn[i,j-1,k]
+                    adv_fn[i,j,kk] -= adv_fn[i,j-1,k]
+        for j in range(2, ny+2):
+            for i in range(1, nx+2):
+                kk = pyom.bc_west[i,j,k]
+                if kk > 0:
+                    adv_fe[i,j,k] += adv_fe[i+1,j,k]
+                    adv_fe[i,j,kk] -= adv_fe[i+1,j,k]
+        for j in range(2, ny+2):
+            for i in range(1, nx+2):
+                kk = pyom.bc_east[i,j,k]
+                if kk > 0:
+                    adv_fe[i,j,k] += adv_fe[i-1,j,k]
+                    adv_fe[i,j,kk] -= adv_fe[i-1,j,k]
+    return adv_fe, adv_fn, adv_ft
+
+
+class LowModeTest(object):
+    timesteps = 5
+    # total M2 and NIW energy after the given number of time steps
+    reference_energy = {"E_M2": 573135360264.14001, "E_niw": 288527610175.87097}
+
+    def __init__(self):
+        self.pyom = LowModeBasin(loglevel="warning")
+
+    def check(self, name, passed, message=""):
+        print("{:<40} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def total_energy(self, var):
+        pyom = self.pyom
+        return np.sum(getattr(pyom, var)[2:-2, 2:-2, 1:-1, pyom.tau] * pyom.maskTp[2:-2, 2:-2, 1:-1] \
+                      * pyom.area_t[2:-2, 2:-2, np.newaxis] * pyom.dphit[np.newaxis, np.newaxis, 1:-1])
+
+    def run(self):
+        pyom = self.pyom
+        pyom.run(runlen=self.timesteps * 3600., snapint=1e10)
+        passed = True
+
+        for boundary in ("south", "north", "west", "east"):
+            passed = self.check("reflection at {} boundaries".format(boundary),
+                                np.any(getattr(pyom, "bc_" + boundary) > 0)) and passed
+
+        # vectorized and loop version of the spectral advection, including reflection
+        np.random.seed(17)
+        var = np.random.rand(pyom.nx+4, pyom.ny+4, pyom.np) * pyom.maskTp
+        var[:,:,0], var[:,:,-1] = var[:,:,-2], var[:,:,1]
+        for compartment in ("M2", "niw"):
+            uvel, vvel, wvel = (getattr(pyom, v + "_" + compartment) for v in "uvw")
+            adv = [np.zeros((pyom.nx+4, pyom.ny+4, pyom.np)) for _ in range(3)]
+            idemix.adv_flux_superbee_spectral(pyom, adv[0], adv[1], adv[2], var, uvel, vvel, wvel)
+            idemix.reflect_flux(pyom, adv[0], adv[1])
+            reference = superbee_spectral_loops(pyom, var, uvel, vvel, wvel)
+            for direction, a, b in zip(("x", "y", "angle"), adv, reference):
+                passed = self.check("{} advection ({})".format(compartment, direction), np.allclose(a, b, rtol=1e-12, atol=0.),
+                                    "max. abs. difference: {:.2e}".format(np.abs(a - b).max())) and passed
+
+        # advection and reflection conserve energy
+        for var, tendency in (("E_M2", "dE_M2p"), ("E_niw", "dE_niwp")):
+            dE = getattr(pyom, tendency)[2:-2, 2:-2, 1:-1, pyom.taum1]
+            weights = pyom.maskTp[2:-2, 2:-2, 1:-1] * pyom.area_t[2:-2, 2:-2, np.newaxis] * pyom.dphit[np.newaxis, np.newaxis, 1:-1]
+            residual = np.sum(dE * weights) / np.sum(np.abs(dE) * weights)
+            passed = self.check("{} advection conserves energy".format(var), abs(residual) < 1e-12,
+                                "relative residual: {:.2e}".format(residual)) and passed
+
+        for var in ("E_M2", "E_niw"):
+            energy = getattr(pyom, var)
+            passed = self.check("{} is finite".format(var), np.all(np.isfinite(energy))) and passed
+            total = self.total_energy(var)
+            reference = self.reference_energy[var]
+            passed = self.check("{} total energy".format(var), np.allclose(total, reference, rtol=1e-8, atol=0.),
+                                "{!r} (reference: {!r})".format(total, reference)) and passed
+        return passed
+
+if __name__ == "__main__":
+    passed = LowModeTest().run()
+    sys.exit(int(not passed))
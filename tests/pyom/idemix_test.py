@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 
 from test_base import PyOMTest
-from climate.pyom.core import idemix
+from climate.pyom.core import idemix, numerics
 
 class IdemixTest(PyOMTest):
     nx, ny, nz = 70, 60, 50
@@ -55,6 +55,7 @@ class IdemixTest(PyOMTest):
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
 
+        numerics.calc_grid_metrics(self.pyom_new)
         istemp = bool(np.random.randint(0,2))
 
         pyom_args = (self.pyom_new.temp,istemp,self.pyom_new)
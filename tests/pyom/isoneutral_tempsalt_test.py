@@ -0,0 +1,193 @@
+"""
+Checks isopycnal and skew diffusion of temperature and salinity against a reference
+implementation, which computes the fluxes of every tracer and diffusion kind separately
+from the diffusivities (as isoneutral_diffusion did before slope sums and flux weights
+were shared). Both the separate calls of isoneutral_diffusion and
+isoneutral_skew_diffusion and the single pass of isoneutral_diffusion_tempsalt are
+compared with the reference.
+
+Uses a spun-up ACC2 state with non-uniform salinity, so, unlike most other tests, this
+one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import isoneutral, utilities, diffusion
+
+VARIABLES = ("temp", "salt", "dtemp_iso", "dsalt_iso", "P_diss_iso", "P_diss_skew",
+             "flux_east", "flux_north", "flux_top")
+
+
+class EnergyConservingACC2(ACC2):
+    def set_parameter(self):
+        ACC2.set_parameter(self)
+        self.enable_conserve_energy = True
+
+    def set_initial_conditions(self):
+        ACC2.set_initial_conditions(self)
+        # salinity of ACC2 is uniform, add some structure in depth and latitude
+        salt_anomaly = 0.5 * (1. - self.zt[np.newaxis, :] / self.zt[0]) + 0.2 * np.sin(np.pi * self.yt[:, np.newaxis] / 40.)
+        self.salt[..., :2] += (salt_anomaly[np.newaxis, :, :] * self.maskT)[..., np.newaxis]
+
+    def set_diagnostics(self):
+        pass
+
+
+def reference_fluxes(pyom, tr, K_iso, K_skew):
+    """
+    isoneutral fluxes of tracer tr with diffusivities K_iso and K_skew, stored in the
+    model's flux arrays
+    """
+    tr = tr[..., pyom.tau]
+    tr_pad = np.empty((pyom.nx+4, pyom.ny+4, pyom.nz+2))
+    tr_pad[:, :, 1:-1] = tr
+    tr_pad[:, :, 0] = tr[:, :, 1]
+    tr_pad[:, :, -1] = tr[:, :, -2]
+    K1 = K_iso - K_skew
+    K2 = K_iso + K_skew
+
+    diffloc = np.empty((pyom.nx+1, pyom.ny, pyom.nz))
+    diffloc[:, :, 1:] = 0.25 * (K1[1:-2, 2:-2, 1:] + K1[1:-2, 2:-2, :-1] + K1[2:-1, 2:-2, 1:] + K1[2:-1, 2:-2, :-1])
+    diffloc[:, :, 0] = 0.5 * (K1[1:-2, 2:-2, 0] + K1[2:-1, 2:-2, 0])
+    sumz = np.zeros((pyom.nx+1, pyom.ny, pyom.nz))
+    for kr in range(2):
+        for ip in range(2):
+            sumz += diffloc * pyom.Ai_ez[1:-2, 2:-2, :, ip, kr] \
+                    * (tr_pad[1+ip:-2+ip, 2:-2, 1+kr:-1+kr or None] - tr_pad[1+ip:-2+ip, 2:-2, kr:-2+kr])
+    pyom.flux_east[1:-2, 2:-2, :] = sumz / (4. * pyom.dzt[np.newaxis, np.newaxis, :]) + (tr[2:-1, 2:-2, :] - tr[1:-2, 2:-2, :]) \
+                                    / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxu[1:-2, np.newaxis, np.newaxis]) * pyom.K_11[1:-2, 2:-2, :]
+
+    diffloc = np.empty((pyom.nx, pyom.ny+1, pyom.nz))
+    diffloc[:, :, 1:] = 0.25 * (K1[2:-2, 1:-2, 1:] + K1[2:-2, 1:-2, :-1] + K1[2:-2, 2:-1, 1:] + K1[2:-2, 2:-1, :-1])
+    diffloc[:, :, 0] = 0.5 * (K1[2:-2, 1:-2, 0] + K1[2:-2, 2:-1, 0])
+    sumz = np.zeros((pyom.nx, pyom.ny+1, pyom.nz))
+    for kr in range(2):
+        for jp in range(2):
+            sumz += diffloc * pyom.Ai_nz[2:-2, 1:-2, :, jp, kr] \
+                    * (tr_pad[2:-2, 1+jp:-2+jp, 1+kr:-1+kr or None] - tr_pad[2:-2, 1+jp:-2+jp, kr:-2+kr])
+    pyom.flux_north[2:-2, 1:-2, :] = pyom.cosu[np.newaxis, 1:-2, np.newaxis] * (sumz / (4. * pyom.dzt[np.newaxis, np.newaxis, :])
+                                     + (tr[2:-2, 2:-1, :] - tr[2:-2, 1:-2, :]) / pyom.dyu[np.newaxis, 1:-2, np.newaxis] * pyom.K_22[2:-2, 1:-2, :])
+
+    diffloc = K2[2:-2, 2:-2, :-1]
+    sumx = 0.
+    for ip in range(2):
+        for kr in range(2):
+            sumx += diffloc * pyom.Ai_bx[2:-2, 2:-2, :-1, ip, kr] / pyom.cost[np.newaxis, 2:-2, np.newaxis] \
+                    * (tr[2+ip:-2+ip, 2:-2, kr:-1+kr or None] - tr[1+ip:-3+ip, 2:-2, kr:-1+kr or None])
+    sumy = 0.
+    for jp in range(2):
+        for kr in range(2):
+            sumy += diffloc * pyom.Ai_by[2:-2, 2:-2, :-1, jp, kr] * pyom.cosu[np.newaxis, 1+jp:-3+jp, np.newaxis] \
+                    * (tr[2:-2, 2+jp:-2+jp, kr:-1+kr or None] - tr[2:-2, 1+jp:-3+jp, kr:-1+kr or None])
+    pyom.flux_top[2:-2, 2:-2, :-1] = sumx / (4 * pyom.dxt[2:-2, np.newaxis, np.newaxis]) \
+                                     + sumy / (4 * pyom.dyt[np.newaxis, 2:-2, np.newaxis] * pyom.cost[np.newaxis, 2:-2, np.newaxis])
+    pyom.flux_top[:, :, -1] = 0.
+
+
+def reference_diffusion(pyom, tr, istemp, iso=True, skew=False):
+    """
+    isopycnal (iso) or skew (skew) diffusion of tracer tr, including dissipation
+    """
+    K_iso = pyom.K_iso if iso else np.zeros_like(pyom.K_iso)
+    K_skew = pyom.K_gm if skew else np.zeros_like(pyom.K_gm)
+    reference_fluxes(pyom, tr, K_iso, K_skew)
+    tendency = pyom.dtemp_iso if istemp else pyom.dsalt_iso
+
+    aloc = np.zeros((pyom.nx+4, pyom.ny+4, pyom.nz))
+    aloc[2:-2, 2:-2, :] = pyom.maskT[2:-2, 2:-2, :] * ((pyom.flux_east[2:-2, 2:-2, :] - pyom.flux_east[1:-3, 2:-2, :])
+                                                       / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dxt[2:-2, np.newaxis, np.newaxis])
+                                                       + (pyom.flux_north[2:-2, 2:-2, :] - pyom.flux_north[2:-2, 1:-3, :])
+                                                       / (pyom.cost[np.newaxis, 2:-2, np.newaxis] * pyom.dyt[np.newaxis, 2:-2, np.newaxis]))
+    aloc[:, :, 0] += pyom.maskT[:, :, 0] * pyom.flux_top[:, :, 0] / pyom.dzt[0]
+    aloc[:, :, 1:] += pyom.maskT[:, :, 1:] * (pyom.flux_top[:, :, 1:] - pyom.flux_top[:, :, :-1]) / pyom.dzt[np.newaxis, np.newaxis, 1:]
+    tendency[...] += aloc
+    tr[2:-2, 2:-2, :, pyom.taup1] += pyom.dt_tracer * aloc[2:-2, 2:-2, :]
+
+    if iso:
+        delta = np.zeros((pyom.nx, pyom.ny, pyom.nz))
+        a_tri, b_tri, c_tri = (np.zeros((pyom.nx, pyom.ny, pyom.nz)) for _ in range(3))
+        delta[:, :, :-1] = pyom.dt_tracer / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.K_33[2:-2, 2:-2, :-1]
+        a_tri[:, :, 1:] = -delta[:, :, :-1] / pyom.dzt[np.newaxis, np.newaxis, 1:]
+        b_tri[:, :, 1:-1] = 1 + (delta[:, :, 1:-1] + delta[:, :, :-2]) / pyom.dzt[np.newaxis, np.newaxis, 1:-1]
+        b_tri[:, :, -1] = 1 + delta[:, :, -2] / pyom.dzt[np.newaxis, np.newaxis, -1]
+        b_tri_edge = 1 + delta / pyom.dzt[np.newaxis, np.newaxis, :]
+        c_tri[:, :, :-1] = -delta[:, :, :-1] / pyom.dzt[np.newaxis, np.newaxis, :-1]
+        before = tr[:, :, :, pyom.taup1].copy()
+        sol, water_mask = utilities.solve_implicit(pyom, pyom.kbot[2:-2, 2:-2] - 1, a_tri, b_tri, c_tri,
+                                                   tr[2:-2, 2:-2, :, pyom.taup1], b_edge=b_tri_edge)
+        tr[2:-2, 2:-2, :, pyom.taup1] = np.where(water_mask, sol, tr[2:-2, 2:-2, :, pyom.taup1])
+        tendency[...] += (tr[:, :, :, pyom.taup1] - before) / pyom.dt_tracer
+
+    int_drhodX = pyom.int_drhodT[..., pyom.tau] if istemp else pyom.int_drhodS[..., pyom.tau]
+    p_arr = pyom.P_diss_iso if iso else pyom.P_diss_skew
+    diffusion.dissipation_on_wgrid(pyom, p_arr, int_drhodX=int_drhodX)
+    fxa = (-int_drhodX[2:-2, 2:-2, 1:] + int_drhodX[2:-2, 2:-2, :-1]) / pyom.dzw[np.newaxis, np.newaxis, :-1]
+    p_arr[2:-2, 2:-2, :-1] += -pyom.grav / pyom.rho_0 * fxa * pyom.flux_top[2:-2, 2:-2, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
+    if iso:
+        p_arr[2:-2, 2:-2, :-1] += -pyom.grav / pyom.rho_0 * fxa * pyom.K_33[2:-2, 2:-2, :-1] \
+                                  * (tr[2:-2, 2:-2, 1:, pyom.taup1] - tr[2:-2, 2:-2, :-1, pyom.taup1]) \
+                                  / pyom.dzw[np.newaxis, np.newaxis, :-1] * pyom.maskW[2:-2, 2:-2, :-1]
+
+
+def reference(pyom):
+    reference_diffusion(pyom, pyom.temp, True)
+    reference_diffusion(pyom, pyom.salt, False)
+    reference_diffusion(pyom, pyom.temp, True, iso=False, skew=True)
+    reference_diffusion(pyom, pyom.salt, False, iso=False, skew=True)
+
+
+def separate(pyom):
+    isoneutral.isoneutral_diffusion(pyom, pyom.temp, True)
+    isoneutral.isoneutral_diffusion(pyom, pyom.salt, False)
+    isoneutral.isoneutral_skew_diffusion(pyom, pyom.temp, True)
+    isoneutral.isoneutral_skew_diffusion(pyom, pyom.salt, False)
+
+
+class IsoneutralTempSaltTest(object):
+    timesteps = 3
+
+    def check(self, name, passed, message=""):
+        print("{:<40} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run(self):
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            pyom = EnergyConservingACC2(loglevel="warning")
+            pyom.run(runlen=self.timesteps * 86400 / 2., snapint=86400 / 2.)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        state = {var: getattr(pyom, var).copy() for var in VARIABLES}
+
+        results = {}
+        for name, routine in (("reference", reference), ("separate", separate),
+                              ("tempsalt", isoneutral.isoneutral_diffusion_tempsalt)):
+            for var in VARIABLES:
+                getattr(pyom, var)[...] = state[var]
+            for var in ("dtemp_iso", "dsalt_iso", "P_diss_iso", "P_diss_skew"):
+                getattr(pyom, var)[...] = 0.
+            isoneutral.isoneutral_diffusion_pre(pyom)
+            routine(pyom)
+            results[name] = {var: getattr(pyom, var)[2:-2, 2:-2].copy() for var in VARIABLES}
+
+        passed = self.check("salinity is not uniform", np.ptp(results["reference"]["salt"][..., pyom.tau]) > 0.1)
+        expected = results["reference"]
+        for name in ("separate", "tempsalt"):
+            for var in VARIABLES:
+                actual = results[name][var]
+                scale = np.abs(expected[var]).max()
+                passed = self.check("{} ({})".format(var, name), np.allclose(actual, expected[var], rtol=0., atol=1e-12 * scale),
+                                    "max. abs. difference: {:.2e} (scale {:.2e})".format(np.abs(actual - expected[var]).max(), scale)) and passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = IsoneutralTempSaltTest().run()
+    sys.exit(int(not passed))
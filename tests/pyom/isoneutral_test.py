@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 
 from test_base import PyOMTest
-from climate.pyom.core import isoneutral
+from climate.pyom.core import isoneutral, numerics
 
 class IsoneutralTest(PyOMTest):
     nx, ny, nz = 70, 60, 50
@@ -47,6 +47,7 @@ class IsoneutralTest(PyOMTest):
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
 
+        numerics.calc_grid_metrics(self.pyom_new)
         istemp = bool(np.random.randint(0,2))
 
         pyom_args = (self.pyom_new,self.pyom_new.temp,istemp)
@@ -0,0 +1,101 @@
+"""
+Checks the call tree recorded by the kernel profiler (climate.pyom.profiling) for
+nested PyOM methods, and its JSON and table reports with and without memory tracing.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import sys
+import json
+import types
+
+from climate.pyom import PyOM, profiling
+
+SOURCE = """
+from climate.pyom import pyom_method
+
+@pyom_method
+def inner(pyom, size):
+    return np.ones(size).sum()
+
+@pyom_method
+def outer(pyom, size):
+    return inner(pyom, size) + inner(pyom, 1)
+"""
+
+LARGE_ARRAY = 2 * 10**7 # 160 MB, beyond the peak of the small test process
+
+
+def iter_nodes(node):
+    yield node
+    for child in node["children"]:
+        for descendant in iter_nodes(child):
+            yield descendant
+
+
+class KernelProfilerTest(object):
+    def check(self, name, passed, message=""):
+        print("{:<60} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def profile(self, module, trace_memory):
+        pyom = PyOM(loglevel="error")
+        pyom.kernel_profiler = profiling.KernelProfiler(trace_memory=trace_memory)
+        pyom.kernel_profiler.start()
+        module.outer(pyom, LARGE_ARRAY if trace_memory else 10)
+        module.outer(pyom, 10)
+        pyom.kernel_profiler.stop()
+        return pyom.kernel_profiler
+
+    def check_tree(self, profiler):
+        passed = True
+        root = json.loads(profiler.report_json())
+        passed = self.check("root node", root["name"] == "total" and root["calls"] == 1) and passed
+        outer = root["children"]
+        passed = self.check("outer kernel below root", [node["name"] for node in outer] == [module_name("outer")]
+                            and outer[0]["calls"] == 2, str([(node["name"], node["calls"]) for node in outer])) and passed
+        inner = outer[0]["children"] if outer else []
+        passed = self.check("inner kernel below outer kernel", [node["name"] for node in inner] == [module_name("inner")]
+                            and inner[0]["calls"] == 4 and not inner[0]["children"],
+                            str([(node["name"], node["calls"]) for node in inner])) and passed
+        if outer and inner:
+            passed = self.check("nested time is part of caller time",
+                                root["time"] >= outer[0]["time"] >= inner[0]["time"] > 0.) and passed
+        table = profiler.report_table().splitlines()
+        table_passed = len(table) == 4 and table[2].startswith("  " + module_name("outer")) \
+                       and table[3].startswith("    " + module_name("inner"))
+        passed = self.check("table rows", table_passed, "" if table_passed else "\n".join(table)) and passed
+        return passed
+
+    def run(self):
+        module = types.ModuleType("kernel_profiler_test_module")
+        exec(SOURCE, module.__dict__)
+
+        profiler = self.profile(module, trace_memory=False)
+        passed = self.check_tree(profiler)
+        nodes = list(iter_nodes(json.loads(profiler.report_json())))
+        passed = self.check("no memory field without tracing",
+                            not any("peak_rss_increase" in node for node in nodes)) and passed
+        passed = self.check("no memory column without tracing",
+                            not "RSS" in profiler.report_table().splitlines()[0]) and passed
+
+        profiler = self.profile(module, trace_memory=True)
+        if not profiler.trace_memory:
+            return self.check("memory tracing", True, "(skipped, resource module not available)") and passed
+        passed = self.check_tree(profiler) and passed
+        root = json.loads(profiler.report_json())
+        nodes = list(iter_nodes(root))
+        passed = self.check("memory field with tracing",
+                            all(node.get("peak_rss_increase", -1) >= 0 for node in nodes)) and passed
+        inner = root["children"][0]["children"][0]
+        passed = self.check("peak memory raised by large array", inner["peak_rss_increase"] >= LARGE_ARRAY * 8 // 2,
+                            "{} bytes".format(inner["peak_rss_increase"])) and passed
+        passed = self.check("memory column with tracing", "RSS" in profiler.report_table().splitlines()[0]) and passed
+        return passed
+
+
+def module_name(name):
+    return "kernel_profiler_test_module." + name
+
+
+if __name__ == "__main__":
+    passed = KernelProfilerTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,107 @@
+"""
+Compares every kernel of the Numba backend (climate.pyom.backends.numba_backend) with
+the generic NumPy method it replaces, on ACC2 with random grid spacings, velocities and
+tracers. Without Numba, the kernels run as plain Python loops, so this test needs neither
+Numba nor the Fortran library.
+"""
+import sys
+import importlib
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import numerics
+from climate.pyom.backends import numba_backend
+
+
+class NumbaKernelTest(object):
+    def check(self, name, actual, expected):
+        scale = np.abs(expected).max()
+        passed = actual.shape == expected.shape and np.allclose(actual, expected, rtol=0., atol=1e-12 * scale)
+        if not passed:
+            print("{:<60} failed ({:.2e} scale {:.2e})".format(name, np.abs(actual - expected).max(), scale))
+        return passed
+
+    def setup(self):
+        pyom = ACC2(loglevel="warning")
+        pyom.setup()
+        np.random.seed(42)
+        for name in ("dxt", "dxu", "dyt", "dyu", "dzt", "dzw"):
+            grid = getattr(pyom, name)
+            grid[...] = grid * (0.5 + np.random.rand(*grid.shape))
+        for name in ("cost", "cosu"):
+            getattr(pyom, name)[...] = 0.5 + 0.5 * np.random.rand(pyom.ny + 4)
+        numerics.calc_grid_metrics(pyom)
+        for name in ("u", "v", "w"):
+            getattr(pyom, name)[...] = 0.1 * np.random.randn(*pyom.u.shape) * pyom.maskT[..., np.newaxis]
+        for name in ("temp", "salt"):
+            var = getattr(pyom, name)
+            var[...] = var + np.random.randn(*var.shape) * pyom.maskT[..., np.newaxis]
+        pyom.coriolis_t[...] = 1e-4 * np.random.randn(*pyom.coriolis_t.shape)
+        pyom.K_iso[...] = 1000. * np.random.rand(*pyom.K_iso.shape)
+        pyom.K_gm[...] = 1000. * np.random.rand(*pyom.K_gm.shape)
+        return pyom
+
+    def kernel_arguments(self, pyom):
+        """
+        test cases for each kernel, as lists of arguments following the model; array
+        arguments are copied for each call and compared afterwards
+        """
+        temp, salt = pyom.temp[..., pyom.tau], pyom.salt[..., pyom.tau]
+        batch = np.stack((temp, salt), axis=-1)
+        fluxes = lambda var: [np.zeros_like(var) for _ in range(3)]
+        velocity = tuple(a[..., pyom.tau] for a in (pyom.u, pyom.v, pyom.w))
+        velocity_taum1 = tuple(a[..., pyom.taum1] for a in (pyom.u, pyom.v, pyom.w))
+        masks = (pyom.maskU, pyom.maskV, pyom.maskW)
+        return {
+            "advection._adv_flux_superbee": [
+                fluxes(temp) + [temp, velocity, masks, (pyom.dxtr, pyom.dytr, pyom.dztr)],
+                fluxes(batch) + [batch, velocity_taum1, masks, (pyom.dxtr, pyom.dytr, pyom.dzwr)],
+            ],
+            "advection.adv_flux_2nd": [fluxes(temp) + [temp], fluxes(batch) + [batch]],
+            "momentum._coriolis_and_metric_terms": [[]],
+            "isoneutral.isoneutral.isoneutral_diffusion_pre": [[]],
+        }
+
+    def run_kernel(self, pyom, function, arguments, state):
+        """
+        run function on a copy of the arguments, starting from the given model state;
+        returns the array arguments and model variables afterwards
+        """
+        for name, value in state.items():
+            getattr(pyom, name)[...] = value
+        arguments = [a.copy() if isinstance(a, np.ndarray) else a for a in arguments]
+        function(pyom, *arguments)
+        return arguments, {name: getattr(pyom, name).copy() for name in state}
+
+    def run(self):
+        pyom = self.setup()
+        cases = self.kernel_arguments(pyom)
+        state = {name: getattr(pyom, name).copy() for name in pyom.variables}
+        passed = True
+        for kernel_name, kernel in sorted(numba_backend.KERNELS.items()):
+            module_name, function_name = kernel_name.rsplit(".", 1)
+            method = getattr(importlib.import_module(module_name), function_name)
+            short_name = kernel_name.replace("climate.pyom.core.", "")
+            if not short_name in cases:
+                print("{:<60} failed (no test case)".format(short_name))
+                passed = False
+                continue
+            kernel_passed = True
+            for n, arguments in enumerate(cases[short_name]):
+                expected_args, expected_vars = self.run_kernel(pyom, method, arguments, state)
+                actual_args, actual_vars = self.run_kernel(pyom, kernel, arguments, state)
+                for i, (actual, expected) in enumerate(zip(actual_args, expected_args)):
+                    if isinstance(expected, np.ndarray):
+                        kernel_passed = self.check("{} case {} argument {}".format(short_name, n, i),
+                                                   actual, expected) and kernel_passed
+                for name in sorted(state):
+                    kernel_passed = self.check("{} case {} {}".format(short_name, n, name),
+                                               actual_vars[name], expected_vars[name]) and kernel_passed
+            print("{:<60} {}".format(short_name, "passed" if kernel_passed else "failed"))
+            passed = passed and kernel_passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = NumbaKernelTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,131 @@
+"""
+Runs ACC2 with the isopycnal overturning diagnostic
+(climate.pyom.diagnostics_tools.overturning) and compares its output with a direct
+evaluation of the pyOM2 definitions, which selects the cells below each isopycnal
+by comparing with every sigma level instead of binning.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+from netCDF4 import Dataset
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import density
+from climate.pyom.diagnostics_tools import overturning
+
+VARIABLES = ("trans", "vsf_depth", "z_sig", "bolus_iso", "bolus_depth")
+
+
+class OverturningACC2(ACC2):
+    def set_diagnostics(self):
+        for diag in self.diagnostics.values():
+            diag.sampling_frequency = diag.output_frequency = None
+        self.diagnostics["overturning"].sampling_frequency = self.dt_tracer
+        self.diagnostics["overturning"].output_frequency = 4 * self.dt_tracer
+
+
+class ReferenceOverturning(object):
+    """
+    accumulates the overturning diagnostic with loops over sigma levels and latitudes
+    """
+    def __init__(self):
+        self.sums = None
+        self.nitts = 0
+        self.records = []
+
+    def diagnose(self, pyom):
+        nlevel = pyom.nz * overturning.LEVELS_PER_CELL
+        sige = float(density.get_rho(pyom, 35., -2., overturning.P_REF))
+        sigs = float(density.get_rho(pyom, 35., 30., overturning.P_REF))
+        sigma = sigs + (sige - sigs) / (nlevel - 1) * np.arange(nlevel)
+        if self.sums is None:
+            self.sums = {"trans": np.zeros((pyom.ny, nlevel)), "z_sig": np.zeros((pyom.ny, nlevel)),
+                         "bolus_iso": np.zeros((pyom.ny, nlevel)), "vsf_depth": np.zeros((pyom.ny, pyom.nz)),
+                         "bolus_depth": np.zeros((pyom.ny, pyom.nz))}
+
+        sig_loc = density.get_rho(pyom, pyom.salt[..., pyom.tau], pyom.temp[..., pyom.tau], overturning.P_REF)
+        sig_face = 0.5 * (sig_loc[2:-2, 2:-2] + sig_loc[2:-2, 3:-1])
+        area = pyom.dxt[2:-2, np.newaxis, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis] \
+               * pyom.dzt[np.newaxis, np.newaxis, :] * pyom.maskV[2:-2, 2:-2]
+        transport = pyom.v[2:-2, 2:-2, :, pyom.tau] * area
+        bolus_fac = pyom.dxt[2:-2, np.newaxis, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis] * pyom.maskV[2:-2, 2:-2]
+        bolus = np.zeros_like(transport)
+        for k in range(pyom.nz):
+            bolus[:, :, k] = pyom.B1_gm[2:-2, 2:-2, k] - (pyom.B1_gm[2:-2, 2:-2, k-1] if k > 0 else 0.)
+        bolus *= bolus_fac
+
+        for m in range(nlevel):
+            below = sig_face > sigma[m]
+            self.sums["trans"][:, m] += np.sum(transport * below, axis=(0, 2))
+            self.sums["z_sig"][:, m] += np.sum(area * below, axis=(0, 2))
+            self.sums["bolus_iso"][:, m] += np.sum(bolus * below, axis=(0, 2))
+        for k in range(pyom.nz):
+            self.sums["vsf_depth"][:, k] += np.sum(transport[:, :, :k+1], axis=(0, 2))
+            self.sums["bolus_depth"][:, k] += np.sum(bolus_fac[:, :, k] * pyom.B1_gm[2:-2, 2:-2, k], axis=0)
+        self.nitts += 1
+
+    def output(self, pyom):
+        record = {key: value / self.nitts for key, value in self.sums.items()}
+        zarea = np.cumsum(np.sum(pyom.dxt[2:-2, np.newaxis, np.newaxis] * pyom.cosu[np.newaxis, 2:-2, np.newaxis]
+                                 * pyom.dzt[np.newaxis, np.newaxis, :] * pyom.maskV[2:-2, 2:-2], axis=0), axis=1)
+        z_sig = record["z_sig"]
+        for j in range(pyom.ny):
+            for m in range(z_sig.shape[1]):
+                # first depth level with at least the given area below
+                k = next((k for k in range(1, pyom.nz) if zarea[j, k] >= z_sig[j, m]), pyom.nz - 1)
+                lo, hi = zarea[j, k-1], zarea[j, k]
+                weight = min(max((z_sig[j, m] - lo) / max(hi - lo, 1e-20), 0.), 1.)
+                z_sig[j, m] = (1. - weight) * pyom.zw[k-1] + weight * pyom.zw[k]
+        self.records.append(record)
+        for value in self.sums.values():
+            value[...] = 0.
+        self.nitts = 0
+
+
+class OverturningTest(object):
+    timesteps = 8
+
+    def check(self, name, passed, message=""):
+        print("{:<50} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run(self):
+        passed = True
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        reference = ReferenceOverturning()
+        diagnose, output = overturning.diagnose, overturning.output
+        def diagnose_both(pyom):
+            reference.diagnose(pyom)
+            diagnose(pyom)
+        def output_both(pyom):
+            reference.output(pyom)
+            output(pyom)
+        overturning.diagnose, overturning.output = diagnose_both, output_both
+        try:
+            pyom = OverturningACC2(loglevel="warning")
+            pyom.run(runlen=self.timesteps * 86400 / 2.)
+            with Dataset("overturning.nc") as f:
+                passed = self.check("number of records", len(f["Time"]) == len(reference.records) == self.timesteps // 4,
+                                    "{} {}".format(len(f["Time"]), len(reference.records))) and passed
+                for n, expected in enumerate(reference.records):
+                    for var in VARIABLES:
+                        actual = f[var][n, ...].T
+                        difference = np.abs(actual - expected[var]).max()
+                        scale = np.abs(expected[var]).max()
+                        passed = self.check("{} record {}".format(var, n), difference <= 1e-10 * scale,
+                                            "max. abs. difference: {:.2e} (scale {:.2e})".format(difference, scale)) and passed
+        finally:
+            overturning.diagnose, overturning.output = diagnose, output
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        return passed
+
+
+if __name__ == "__main__":
+    passed = OverturningTest().run()
+    sys.exit(int(not passed))
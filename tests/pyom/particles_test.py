@@ -0,0 +1,126 @@
+"""
+Advects particles (climate.pyom.diagnostics_tools.particles) on ACC2 through a uniform
+velocity field and compares their positions with the analytical trajectories on the
+sphere, checks that longer sampling intervals still advect every time step, and that
+particles that cross the cyclic boundary onto land are put back inside the domain.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import warnings
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom import diagnostics
+
+U, V, W = 0.3, 0.1, 1e-5
+
+
+class ParticleACC2(ACC2):
+    """
+    ACC2 with particles in the open ocean, including some near the cyclic boundary
+    """
+    sampling_steps = None
+    positions = None
+
+    def set_diagnostics(self):
+        for diag in self.diagnostics.values():
+            diag.sampling_frequency = diag.output_frequency = None
+        particles = self.diagnostics["particles"]
+        particles.output_frequency = 4 * self.dt_tracer
+        if self.sampling_steps:
+            particles.sampling_frequency = self.sampling_steps * self.dt_tracer
+
+    def set_particles(self):
+        if self.positions is not None:
+            return self.positions
+        x, y = np.meshgrid(np.array([10., 27.3, 45., 58.5]), np.array([-38., -30.5, -25.]))
+        return x.flatten(), y.flatten(), -500. - 10. * np.arange(x.size)
+
+
+def expected_positions(pyom, x, y, z, time):
+    """
+    trajectories in a uniform velocity field on the sphere, where
+    dx/dy = U / (V cos(y)) integrates to the inverse Gudermannian function
+    """
+    inverse_gudermannian = lambda y: np.log(np.tan(np.pi / 4. + y / 360. * np.pi))
+    y_end = y + V * time / pyom.degtom
+    x_end = x + U / V * 180. / np.pi * (inverse_gudermannian(y_end) - inverse_gudermannian(y))
+    x0 = pyom._particles_xu[1]
+    x_end = x0 + np.mod(x_end - x0, pyom._particles_xu[pyom.nx + 1] - x0)
+    return x_end, y_end, z + W * time
+
+
+class ParticlesTest(object):
+    timesteps = 12
+
+    def check(self, name, passed, message=""):
+        print("{:<50} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def advect(self, sampling_steps, velocity=(U, V, W), positions=None):
+        ParticleACC2.sampling_steps = sampling_steps
+        ParticleACC2.positions = positions
+        pyom = ParticleACC2(loglevel="warning")
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            pyom.setup()
+        for var, value in zip((pyom.u, pyom.v, pyom.w), velocity):
+            var[...] = value
+        start = (pyom._particles_x.copy(), pyom._particles_y.copy(), pyom._particles_z.copy())
+        for _ in range(self.timesteps):
+            diagnostics.diagnose(pyom)
+            pyom.itt += 1
+        diagnostics.finalize_diagnostics(pyom)
+        return pyom, start, [str(w.message) for w in caught]
+
+    def check_uniform_flow(self, sampling_steps):
+        passed = True
+        pyom, start, caught = self.advect(sampling_steps)
+        actual = (pyom._particles_x, pyom._particles_y, pyom._particles_z)
+        expected = expected_positions(pyom, *start, time=self.timesteps * pyom.dt_tracer)
+        name = "every {} time steps".format(sampling_steps) if sampling_steps else "every time step"
+        frequency = pyom.diagnostics["particles"].sampling_frequency
+        passed = self.check("sampling frequency, requested {}".format(name),
+                            frequency == pyom.dt_tracer, str(frequency)) and passed
+        warned = any("sampling_frequency" in message for message in caught)
+        passed = self.check("warning, requested {}".format(name), warned == bool(sampling_steps)) and passed
+        for coord, a, e in zip("xyz", actual, expected):
+            difference = np.abs(a - e).max()
+            passed = self.check("{} position, requested {}".format(coord, name), difference < 1e-8,
+                                "max. abs. difference: {:.2e}".format(difference)) and passed
+        return passed
+
+    def check_cyclic_wall(self):
+        """
+        eastward flow carries particles at the eastern edge across the cyclic boundary
+        onto the land strip at the western edge, so they are put back every step
+        """
+        positions = (np.array([57.9, 57.95]), np.array([-10., 0.]), np.array([-500., -500.]))
+        pyom, start, _ = self.advect(None, velocity=(U, 0., 0.), positions=positions)
+        x = pyom._particles_x
+        x0, x1 = pyom._particles_xu[1], pyom._particles_xu[pyom.nx + 1]
+        passed = self.check("positions at cyclic wall inside domain", np.all((x >= x0) & (x < x1)), str(x))
+        passed = self.check("positions at cyclic wall reverted", np.array_equal(x, start[0]), str(x)) and passed
+        return passed
+
+    def run(self):
+        passed = True
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for sampling_steps in (None, 3):
+                passed = self.check_uniform_flow(sampling_steps) and passed
+            passed = self.check_cyclic_wall() and passed
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        return passed
+
+
+if __name__ == "__main__":
+    passed = ParticlesTest().run()
+    sys.exit(int(not passed))
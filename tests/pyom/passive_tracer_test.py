@@ -0,0 +1,106 @@
+"""
+End-to-end test for passive tracers.
+
+Runs ACC2 with passive tracers that start from and are forced like temperature and
+salinity, and checks that they stay identical to them. A second run with all mixing
+schemes checks that tracers in a batch do not interact (a linear combination of
+tracers stays that linear combination), that unforced tracers are conserved, and that
+the tracers are written to the snapshot output.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+from netCDF4 import Dataset
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom.core import cyclic
+
+
+class TracerACC2(ACC2):
+    """
+    ACC2 with passive tracers temp_copy, salt_copy, mixture (of both), and dye
+    """
+    settings = {} #: additional model settings
+
+    def set_parameter(self):
+        ACC2.set_parameter(self)
+        for key, value in self.settings.items():
+            setattr(self, key, value)
+        self.register_passive_tracer("temp_copy", "Temperature copy", "deg C", "Passive copy of temperature")
+        self.register_passive_tracer("salt_copy", "Salinity copy", "g/kg", "Passive copy of salinity")
+        self.register_passive_tracer("mixture", "Mixture", "", "2 * temperature - 3 * salinity")
+        self.register_passive_tracer("dye", "Dye", "", "Unforced dye")
+
+    def set_initial_conditions(self):
+        ACC2.set_initial_conditions(self)
+        # salinity of ACC2 is uniform, add some structure in depth and latitude
+        salt_anomaly = 0.5 * (1. - self.zt[np.newaxis, :] / self.zt[0]) + 0.2 * np.sin(np.pi * self.yt[:, np.newaxis] / 40.)
+        self.salt[..., :2] += (salt_anomaly[np.newaxis, :, :] * self.maskT)[..., np.newaxis]
+        self.temp_copy[...] = self.temp
+        self.salt_copy[...] = self.salt
+        self.mixture[...] = 2 * self.temp - 3 * self.salt
+        np.random.seed(17)
+        self.dye[..., :2] = np.random.rand(*self.maskT.shape)[..., np.newaxis] * self.maskT[..., np.newaxis]
+        cyclic.enforce_boundaries(self, self.dye)
+        self.initial_dye_content = np.sum(self.volume_t[2:-2, 2:-2] * self.dye[2:-2, 2:-2, :, 0])
+
+    def set_forcing(self):
+        ACC2.set_forcing(self)
+        self.forc_tracer_surface[..., 0] = self.forc_temp_surface
+        self.forc_tracer_surface[..., 1] = self.forc_salt_surface
+        self.forc_tracer_surface[..., 2] = 2 * self.forc_temp_surface - 3 * self.forc_salt_surface
+
+    def set_diagnostics(self):
+        pass
+
+
+class PassiveTracerTest(object):
+    timesteps = 5
+
+    def check(self, name, passed, message=""):
+        print("{:<50} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run_model(self, **settings):
+        pyom = TracerACC2(loglevel="warning")
+        pyom.settings = settings
+        pyom.run(runlen=self.timesteps * 86400 / 2., snapint=86400 / 2.)
+        return pyom
+
+    def run(self):
+        passed = True
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            pyom = self.run_model(enable_superbee_advection=True, enable_skew_diffusion=True,
+                                  enable_hor_diffusion=True, K_h=200.)
+            for copy, original in (("temp_copy", "temp"), ("salt_copy", "salt")):
+                a, b = getattr(pyom, copy), getattr(pyom, original)
+                passed = self.check("{} equals {}".format(copy, original), np.allclose(a, b, rtol=1e-12, atol=0.),
+                                    "max. abs. difference: {:.2e}".format(np.abs(a - b).max())) and passed
+
+            pyom = self.run_model(enable_biharmonic_mixing=True, K_hbi=1e12)
+            mixture = 2 * pyom.temp_copy - 3 * pyom.salt_copy
+            passed = self.check("tracers in a batch are independent", np.allclose(pyom.mixture, mixture, rtol=1e-10, atol=1e-10),
+                                "max. abs. difference: {:.2e}".format(np.abs(pyom.mixture - mixture).max())) and passed
+            content = np.sum(pyom.volume_t[2:-2, 2:-2] * pyom.dye[2:-2, 2:-2, :, pyom.tau])
+            residual = content / pyom.initial_dye_content - 1.
+            passed = self.check("dye is conserved", abs(residual) < 1e-12, "relative residual: {:.2e}".format(residual)) and passed
+
+            with Dataset("snapshot.nc", "r") as snapshot:
+                for key in pyom.passive_tracers:
+                    output = snapshot.variables.get(key)
+                    passed = self.check("{} is written to snapshot".format(key), output is not None and output.shape[0] > 0) and passed
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        return passed
+
+
+if __name__ == "__main__":
+    passed = PassiveTracerTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,53 @@
+"""
+Checks the backend namespaces of PyOM methods (climate.pyom.pyom_method): methods see the
+backend as np without modifying their module, and changes to the module take effect
+for models created afterwards.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import sys
+import types
+
+from climate.pyom import PyOM
+
+SOURCE = """
+from climate.pyom import pyom_method
+
+def helper():
+    return "original"
+
+@pyom_method
+def method(pyom):
+    return np, helper()
+"""
+
+
+class PyOMMethodTest(object):
+    def check(self, name, passed, message=""):
+        print("{:<60} {}{}".format(name, "passed" if passed else "failed", " " + message if message else ""))
+        return passed
+
+    def run(self):
+        passed = True
+        module = types.ModuleType("pyom_method_test_module")
+        exec(SOURCE, module.__dict__)
+
+        pyom = PyOM(loglevel="error")
+        backend, result = module.method(pyom)
+        passed = self.check("method sees the backend as np", backend is pyom.backend) and passed
+        passed = self.check("module namespace is not modified", not "np" in module.__dict__) and passed
+        passed = self.check("method sees module globals", result == "original", result) and passed
+
+        module.helper = lambda: "patched"
+        _, result = module.method(pyom)
+        passed = self.check("changes wait for the next model", result == "original", result) and passed
+        PyOM(loglevel="error")
+        _, result = module.method(pyom)
+        passed = self.check("namespace is refreshed for new models", result == "patched", result) and passed
+        backend, _ = module.method(pyom)
+        passed = self.check("refreshed namespace keeps the backend", backend is pyom.backend) and passed
+        return passed
+
+
+if __name__ == "__main__":
+    passed = PyOMMethodTest().run()
+    sys.exit(int(not passed))
@@ -172,8 +172,8 @@ class PyOMTest(object):
             for a, (v1, v2) in differing_arrays.items():
                 print("{}, {}, {}".format(a,repr(np.asarray(v1).max()),repr(np.asarray(v2).max())))
 
-        pyom_timers = {k: Timer("pyom " + k) for k in self.test_routines}
-        pyom_legacy_timers = {k: Timer("pyom legacy " + k) for k in self.test_routines}
+        pyom_timers = {k: Timer("pyom " + k, flush=flush) for k in self.test_routines}
+        pyom_legacy_timers = {k: Timer("pyom legacy " + k, flush=flush) for k in self.test_routines}
         all_passed = True
         for routine in self.test_routines.keys():
             pyom_routine, pyom_legacy_routine = self.get_routine(routine,self.test_module)
@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 
 from test_base import PyOMTest
-from climate.pyom.core import thermodynamics
+from climate.pyom.core import thermodynamics, numerics
 
 class ThermodynamicsTest(PyOMTest):
     nx, ny, nz = 70, 60, 50
@@ -59,6 +59,7 @@ class ThermodynamicsTest(PyOMTest):
 
         self.set_attribute("kbot",np.random.randint(0, self.nz, size=(self.nx+4,self.ny+4)))
 
+        numerics.calc_grid_metrics(self.pyom_new)
         self.test_module = thermodynamics
         pyom_args = (self.pyom_new,)
         pyom_legacy_args = dict()
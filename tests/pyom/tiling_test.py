@@ -0,0 +1,147 @@
+"""
+Compares tiled execution (climate.pyom.tiling) with the untiled model: every kernel
+marked as tiled on ACC2 with random grid spacings, velocities and tracers, and a few
+time steps of ACC2, using tiles that do not divide the domain.
+Unlike most other tests, this one does not need the Fortran library.
+"""
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import numpy as np
+
+from climate.setup.acc2.acc2 import ACC2
+from climate.pyom import tiling
+from climate.pyom.pyom_method import _pyom_method
+from climate.pyom.core import numerics
+
+TILE_SIZE = (7, 9)
+THREADS = 3
+VARIABLES = ("u", "v", "w", "temp", "salt", "psi", "tke", "eke", "E_iw")
+
+
+class TiledACC2(ACC2):
+    def set_diagnostics(self):
+        for diag in self.diagnostics.values():
+            diag.sampling_frequency = diag.output_frequency = None
+
+
+class TilingTest(object):
+    timesteps = 4
+
+    def check(self, name, actual, expected, rtol=1e-12):
+        difference = np.abs(actual - expected).max()
+        scale = np.abs(expected).max()
+        passed = actual.shape == expected.shape and difference <= rtol * scale
+        if not passed:
+            print("{:<70} failed ({:.2e} scale {:.2e})".format(name, difference, scale))
+        return passed
+
+    def setup(self):
+        pyom = TiledACC2(loglevel="warning")
+        pyom.setup()
+        np.random.seed(42)
+        for name in ("dxt", "dxu", "dyt", "dyu", "dzt", "dzw"):
+            grid = getattr(pyom, name)
+            grid[...] = grid * (0.5 + np.random.rand(*grid.shape))
+        for name in ("cost", "cosu"):
+            getattr(pyom, name)[...] = 0.5 + 0.5 * np.random.rand(pyom.ny + 4)
+        numerics.calc_grid_metrics(pyom)
+        for name in ("u", "v", "w"):
+            getattr(pyom, name)[...] = 0.1 * np.random.randn(*pyom.u.shape) * pyom.maskT[..., np.newaxis]
+        for name in ("temp", "salt"):
+            var = getattr(pyom, name)
+            var[...] = var + np.random.randn(*var.shape) * pyom.maskT[..., np.newaxis]
+        pyom.coriolis_t[...] = 1e-4 * np.random.randn(*pyom.coriolis_t.shape)
+        pyom.K_iso[...] = 1000. * np.random.rand(*pyom.K_iso.shape)
+        return pyom
+
+    def kernel_arguments(self, pyom):
+        """
+        test cases for each tiled kernel, as lists of arguments following the model
+        """
+        temp = pyom.temp[..., pyom.tau]
+        batch = np.stack((temp, pyom.salt[..., pyom.tau]), axis=-1)
+        fluxes = lambda var: [np.zeros_like(var) for _ in range(3)]
+        return {
+            "climate.pyom.core.advection.adv_flux_2nd": [fluxes(temp) + [temp], fluxes(batch) + [batch]],
+            "climate.pyom.core.advection.adv_flux_superbee": [fluxes(temp) + [temp], fluxes(batch) + [batch]],
+            "climate.pyom.core.momentum._coriolis_and_metric_terms": [[]],
+            "climate.pyom.core.isoneutral.isoneutral.isoneutral_diffusion_pre": [[]],
+        }
+
+    def run_kernel(self, pyom, function, arguments, state):
+        for name, value in state.items():
+            getattr(pyom, name)[...] = value
+        arguments = [a.copy() for a in arguments]
+        function(pyom, *arguments)
+        return arguments, {name: getattr(pyom, name).copy() for name in state}
+
+    def check_kernels(self):
+        pyom = self.setup()
+        cases = self.kernel_arguments(pyom)
+        state = {name: getattr(pyom, name).copy() for name in pyom.variables}
+        pyom.tiling_threads, pyom.tile_size = THREADS, TILE_SIZE
+        passed = True
+        for function in _pyom_method.methods:
+            if not getattr(function, "tiled", False):
+                continue
+            kernel_name = "{}.{}".format(function.__module__, function.__name__)
+            if not kernel_name in cases:
+                print("{:<70} failed (no test case)".format(kernel_name))
+                passed = False
+                continue
+            method = getattr(importlib.import_module(function.__module__), function.__name__)
+            kernel_passed = True
+            for n, arguments in enumerate(cases[kernel_name]):
+                expected_args, expected_vars = self.run_kernel(pyom, method, arguments, state)
+                tiling.start_pool(pyom)
+                try:
+                    actual_args, actual_vars = self.run_kernel(pyom, method, arguments, state)
+                finally:
+                    tiling.stop_pool(pyom)
+                for i, (actual, expected) in enumerate(zip(actual_args, expected_args)):
+                    kernel_passed = self.check("{} case {} argument {}".format(kernel_name, n, i),
+                                               actual, expected) and kernel_passed
+                for name in sorted(state):
+                    kernel_passed = self.check("{} case {} {}".format(kernel_name, n, name),
+                                               actual_vars[name], expected_vars[name]) and kernel_passed
+            print("{:<70} {}".format(kernel_name, "passed" if kernel_passed else "failed"))
+            passed = passed and kernel_passed
+        return passed
+
+    def check_run(self):
+        results = []
+        for tiling_threads in (0, THREADS):
+            pyom = TiledACC2(loglevel="warning")
+            pyom.run(runlen=self.timesteps * 86400 / 2., tiling_threads=tiling_threads, tile_size=TILE_SIZE)
+            results.append({var: getattr(pyom, var).copy() for var in VARIABLES})
+        # streamfunction values on land are not used by the model
+        for result in results:
+            result["psi"] *= pyom.maskZ[..., -1, np.newaxis]
+        passed = True
+        for var in VARIABLES:
+            # differences in round-off are amplified by the iterative streamfunction solver
+            var_passed = self.check(var, results[1][var], results[0][var], rtol=1e-10)
+            print("{:<70} {}".format("{} after {} tiled time steps".format(var, self.timesteps),
+                                     "passed" if var_passed else "failed"))
+            passed = passed and var_passed
+        return passed
+
+    def run(self):
+        workdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            passed = self.check_kernels()
+            passed = self.check_run() and passed
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+        return passed
+
+
+if __name__ == "__main__":
+    passed = TilingTest().run()
+    sys.exit(int(not passed))
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy
+
+from climate import tools
+
+
+class FillHolesTest(unittest.TestCase):
+    def setUp(self):
+        numpy.random.seed(5)
+        self.data = numpy.random.rand(30, 20)
+        self.data[3:12, 4:15] = numpy.nan
+        self.data[25:, :] = numpy.nan
+
+    def nearest_distances(self, valid, cyclic_x=False):
+        i, j = numpy.indices(valid.shape)
+        vi, vj = i[valid], j[valid]
+        di = numpy.abs(i[..., numpy.newaxis] - vi)
+        if cyclic_x:
+            di = numpy.minimum(di, valid.shape[0] - di)
+        return numpy.min(di**2 + (j[..., numpy.newaxis] - vj)**2, axis=-1)
+
+    def check_nearest(self, filled, cyclic_x=False):
+        valid = ~numpy.isnan(self.data)
+        self.assertFalse(numpy.any(numpy.isnan(filled)))
+        self.assertTrue(numpy.array_equal(filled[valid], self.data[valid]))
+        # every hole is filled with a value from one of its nearest valid points
+        distances = self.nearest_distances(valid, cyclic_x)
+        i, j = numpy.indices(valid.shape)
+        for k, l in zip(*numpy.where(~valid)):
+            di = numpy.abs(i - k)
+            if cyclic_x:
+                di = numpy.minimum(di, valid.shape[0] - di)
+            nearest = valid & (di**2 + (j - l)**2 == distances[k, l])
+            self.assertIn(filled[k, l], self.data[nearest])
+
+    def test_fill(self):
+        self.check_nearest(tools.fill_holes(self.data))
+
+    def test_cyclic(self):
+        filled = tools.fill_holes(self.data, cyclic_x=True)
+        self.check_nearest(filled, cyclic_x=True)
+        # the last rows are closer to the first ones across the boundary
+        self.assertTrue(numpy.array_equal(filled[-1], self.data[0]))
+
+    def test_no_copy_on_input(self):
+        original = self.data.copy()
+        tools.fill_holes(self.data)
+        self.assertTrue(numpy.array_equal(numpy.isnan(original), numpy.isnan(self.data)))
+
+    def test_special_cases(self):
+        data = numpy.random.rand(5, 5)
+        self.assertTrue(numpy.array_equal(tools.fill_holes(data), data))
+        data[...] = numpy.nan
+        self.assertTrue(numpy.all(numpy.isnan(tools.fill_holes(data))))
+        data = numpy.array([numpy.nan, 1., numpy.nan, numpy.nan, 4.])
+        self.assertTrue(numpy.array_equal(tools.fill_holes(data), [1., 1., 1., 4., 4.]))
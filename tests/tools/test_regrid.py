@@ -0,0 +1,64 @@
+import unittest
+
+import numpy
+import scipy.interpolate
+
+from climate import tools
+
+
+class RegridTest(unittest.TestCase):
+    def setUp(self):
+        numpy.random.seed(17)
+        self.coords = (numpy.linspace(0., 360., 37), numpy.linspace(-80., 80., 17), numpy.sort(-numpy.random.uniform(0., 5000., 10)))
+        # target grid extends beyond the source grid and hits some source coordinates exactly
+        self.grid = (numpy.linspace(-5., 365., 75), numpy.linspace(-90., 90., 37), numpy.linspace(-5500., -5., 12))
+        self.data = numpy.random.rand(37, 17, 10)
+        self.data[self.data < 0.1] = numpy.nan
+
+    def interpn(self, var, kind="linear"):
+        grid = numpy.rollaxis(numpy.array(numpy.meshgrid(*self.grid, indexing="ij")), 0, 4)
+        return scipy.interpolate.interpn(self.coords, var, grid, bounds_error=False, fill_value=None, method=kind)
+
+    def assertEqualWithNaN(self, a, b):
+        self.assertTrue(numpy.array_equal(numpy.isnan(a), numpy.isnan(b)))
+        valid = ~numpy.isnan(a)
+        self.assertTrue(numpy.allclose(a[valid], b[valid], rtol=1e-12, atol=1e-12))
+
+    def test_matches_interpn(self):
+        for kind in ("linear", "nearest"):
+            self.assertEqualWithNaN(tools.regrid(self.coords, self.data, self.grid, kind=kind), self.interpn(self.data, kind))
+
+    def test_interpolate(self):
+        expected = tools.fill_holes(self.interpn(self.data))
+        self.assertEqualWithNaN(tools.interpolate(self.coords, self.data, self.grid), expected)
+
+    def test_stack(self):
+        stack = numpy.random.rand(37, 17, 10, 3)
+        result = tools.regrid(self.coords, stack, self.grid)
+        for k in range(3):
+            self.assertEqualWithNaN(result[..., k], self.interpn(stack[..., k]))
+
+    def test_operator_cache(self):
+        operators = tools.get_regrid_operator(self.coords, self.grid)
+        self.assertEqual(len(operators), 3)
+        self.assertEqual(operators[0].shape, (75, 37))
+        coords = tuple(x.copy() for x in self.coords)
+        self.assertIs(tools.get_regrid_operator(coords, self.grid), operators)
+        self.assertIsNot(tools.get_regrid_operator(coords, self.grid, kind="nearest"), operators)
+
+    def test_skip_missing(self):
+        coords, grid = (numpy.arange(5.),), (numpy.array([0.5, 1., 1.5, 2., 2.5, 3.5]),)
+        data = numpy.array([0., 1., numpy.nan, 3., numpy.nan])
+        result = tools.regrid(coords, data, grid, skip_missing=True)
+        # missing neighbors are skipped, the remaining neighbor is used instead
+        self.assertTrue(numpy.allclose(result, [0.5, 1., 1., 3., 3., 3.]))
+        data[:] = numpy.nan
+        self.assertTrue(numpy.all(numpy.isnan(tools.regrid(coords, data, grid, skip_missing=True))))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            tools.regrid(self.coords, self.data, self.grid[:2])
+        with self.assertRaises(ValueError):
+            tools.regrid((self.coords[0][::-1],), self.data, self.grid[:1])
+        with self.assertRaises(ValueError):
+            tools.regrid(self.coords, self.data, self.grid, kind="cubic")